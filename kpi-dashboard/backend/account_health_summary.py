@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Account Health Summary Read Model
+Maintains one account_health_summary row per account (latest health score and
+its source, product names, KPI counts) so GET /api/accounts reads a single
+indexed join instead of querying trends, products and KPIs per account.
+
+Refreshed after upload, rehydration, KPI edit and health trend writes. Accounts
+without a row yet are filled on first read.
+"""
+
+import logging
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import case, func
+
+from extensions import db
+from models import Account, AccountHealthSummary, HealthTrend, KPI, Product
+from kpi_value_parser import PARSE_STATUS_PARSED
+
+logger = logging.getLogger(__name__)
+
+SOURCE_HEALTH_TREND = 'health_trend'
+SOURCE_KPI_PROXY = 'kpi_proxy'
+
+
+def _compute_summaries(customer_id: int, account_ids: List[int]) -> Dict[int, Dict]:
+    """Latest score, products and KPI counts for the given accounts, with set-based queries"""
+    from playbook_recommendations_api import health_score_proxy_from_kpis
+
+    summaries = {account_id: {
+        'health_score': None,
+        'health_source': None,
+        'trend_month': None,
+        'trend_year': None,
+        'products_used': [],
+        'total_kpis': 0,
+        'valid_kpis': 0
+    } for account_id in account_ids}
+
+    # Latest health trend per account (first row per account in this ordering)
+    trends = HealthTrend.query.filter(
+        HealthTrend.customer_id == customer_id,
+        HealthTrend.account_id.in_(account_ids)
+    ).order_by(HealthTrend.account_id, HealthTrend.year.desc(), HealthTrend.month.desc()).all()
+    latest = {}
+    for trend in trends:
+        latest.setdefault(trend.account_id, trend)
+
+    needs_proxy = []
+    for account_id in account_ids:
+        trend = latest.get(account_id)
+        if trend and trend.overall_health_score:
+            summaries[account_id].update(
+                health_score=float(trend.overall_health_score),
+                health_source=SOURCE_HEALTH_TREND,
+                trend_month=trend.month,
+                trend_year=trend.year
+            )
+        else:
+            needs_proxy.append(account_id)
+
+    # Accounts without a trend score fall back to the KPI proxy (one KPI query for all of them)
+    if needs_proxy:
+        kpis_by_account = {account_id: [] for account_id in needs_proxy}
+        for kpi in KPI.query.filter(KPI.account_id.in_(needs_proxy)).order_by(KPI.account_id, KPI.kpi_id).all():
+            kpis_by_account[kpi.account_id].append(kpi)
+        for account_id, kpis in kpis_by_account.items():
+            summaries[account_id].update(
+                health_score=health_score_proxy_from_kpis(kpis),
+                health_source=SOURCE_KPI_PROXY
+            )
+
+    for product in Product.query.filter(Product.account_id.in_(account_ids)).order_by(Product.product_id).all():
+        summaries[product.account_id]['products_used'].append(product.product_name)
+
+    counts = db.session.query(
+        KPI.account_id,
+        func.count(KPI.kpi_id),
+        func.sum(case((KPI.value_parse_status == PARSE_STATUS_PARSED, 1), else_=0))
+    ).filter(KPI.account_id.in_(account_ids)).group_by(KPI.account_id).all()
+    for account_id, total, valid in counts:
+        summaries[account_id]['total_kpis'] = int(total or 0)
+        summaries[account_id]['valid_kpis'] = int(valid or 0)
+
+    return summaries
+
+
+def refresh_account_health_summaries(customer_id: int, account_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    Recompute the summary rows of a customer's accounts (all accounts when
+    account_ids is None) and commit. Errors are logged, never raised, so the
+    write path that triggered the refresh is not affected.
+    Returns the number of rows refreshed.
+    """
+    try:
+        query = db.session.query(Account.account_id).filter(Account.customer_id == customer_id)
+        if account_ids is not None:
+            account_ids = [a for a in dict.fromkeys(account_ids) if a is not None]
+            if not account_ids:
+                return 0
+            query = query.filter(Account.account_id.in_(account_ids))
+        ids = [account_id for (account_id,) in query.all()]
+        if not ids:
+            return 0
+
+        summaries = _compute_summaries(customer_id, ids)
+        existing = {
+            s.account_id: s
+            for s in AccountHealthSummary.query.filter(AccountHealthSummary.account_id.in_(ids)).all()
+        }
+        for account_id, values in summaries.items():
+            summary = existing.get(account_id)
+            if summary is None:
+                summary = AccountHealthSummary(account_id=account_id, customer_id=customer_id)
+                db.session.add(summary)
+            for field, value in values.items():
+                setattr(summary, field, value)
+
+        db.session.commit()
+        return len(ids)
+    except Exception as e:
+        logger.warning(f"Could not refresh account health summaries for customer {customer_id}: {e}")
+        db.session.rollback()
+        return 0
@@ -4,7 +4,9 @@ Account Snapshot API
 Creates and retrieves unified account snapshots capturing complete account state at specific points in time.
 """
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, has_request_context
+from sqlalchemy import case, func
+from sqlalchemy.orm import aliased
 from auth_middleware import get_current_customer_id, get_current_user_id
 from extensions import db
 from models import (
@@ -12,7 +14,9 @@ from models import (
     PlaybookExecution, PlaybookReport, PlaybookTrigger
 )
 from datetime import datetime, timedelta
-from playbook_recommendations_api import calculate_health_score_proxy
+from health_score_batch import BatchHealthScoreEngine, ReferenceRangeTable, STATUS_NAMES
+from playbook_recommendations_api import health_score_proxy_from_kpis
+from snapshot_storage import encode_snapshot, hydrate_snapshots
 import json
 
 account_snapshot_api = Blueprint('account_snapshot_api', __name__)
@@ -30,34 +34,437 @@ def _parse_date(date_value):
     return date_value if hasattr(date_value, 'date') else None
 
 
+# Minimum age of the previous snapshot before another snapshot of the type is created.
+# Manual snapshots are always allowed (user-initiated, no restriction).
+SNAPSHOT_MIN_INTERVALS = {
+    'event_driven': (timedelta(hours=1), 'event-driven snapshots require 1 hour minimum interval'),
+    'rag_auto': (timedelta(minutes=30), 'RAG auto snapshots require 30 minutes minimum interval'),
+    'scheduled': (timedelta(hours=24), 'scheduled snapshots require 24 hours minimum interval'),
+}
+
+# Snapshots read per account for the health score trend
+TREND_SNAPSHOT_COUNT = 3
+RECENT_REPORT_COUNT = 3
+RECENT_NOTE_COUNT = 5
+
+
+def _health_score_trend(recent_snapshots):
+    """Trend (improving, declining, stable) from snapshots ordered newest first"""
+    if len(recent_snapshots) < 2:
+        return 'stable'  # Not enough history
+    
+    scores = [float(s.overall_health_score) for s in recent_snapshots if s.overall_health_score]
+    if len(scores) < 2:
+        return 'stable'
+    
+    # Calculate trend
+    score_diff = scores[0] - scores[-1]  # Most recent - oldest
+    
+    if score_diff > 3:
+        return 'improving'
+    elif score_diff < -3:
+        return 'declining'
+    else:
+        return 'stable'
+
+
 def calculate_health_score_trend(account_id, customer_id, current_score):
     """Calculate health score trend (improving, declining, stable) based on last 3 snapshots"""
     try:
         recent_snapshots = AccountSnapshot.query.filter_by(
             account_id=account_id,
             customer_id=customer_id
-        ).order_by(AccountSnapshot.snapshot_timestamp.desc()).limit(3).all()
-        
-        if len(recent_snapshots) < 2:
-            return 'stable'  # Not enough history
-        
-        scores = [float(s.overall_health_score) for s in recent_snapshots if s.overall_health_score]
-        if len(scores) < 2:
-            return 'stable'
-        
-        # Calculate trend
-        score_diff = scores[0] - scores[-1]  # Most recent - oldest
-        
-        if score_diff > 3:
-            return 'improving'
-        elif score_diff < -3:
-            return 'declining'
-        else:
-            return 'stable'
+        ).order_by(AccountSnapshot.snapshot_timestamp.desc()).limit(TREND_SNAPSHOT_COUNT).all()
+        return _health_score_trend(hydrate_snapshots(recent_snapshots))
     except:
         return 'stable'
 
 
+def _duplicate_snapshot_reason(snapshot_type, previous_snapshot, now):
+    """
+    SAFEGUARD: why a snapshot of this type would duplicate the previous one, or None.
+    Event-driven, RAG auto and scheduled snapshots need a minimum interval since the last snapshot.
+    """
+    if previous_snapshot is None or snapshot_type not in SNAPSHOT_MIN_INTERVALS:
+        return None
+    
+    min_interval, rule = SNAPSHOT_MIN_INTERVALS[snapshot_type]
+    time_since_last = now - previous_snapshot.snapshot_timestamp
+    if time_since_last >= min_interval:
+        return None
+    if min_interval >= timedelta(hours=24):
+        age = f"{time_since_last.total_seconds()/3600:.1f} hours"
+    else:
+        age = f"{time_since_last.total_seconds()/60:.1f} minutes"
+    return f"Snapshot exists from {age} ago ({rule})"
+
+
+def _latest_per_account(model, customer_id, account_ids, order_by, limit, *criteria):
+    """
+    The newest `limit` rows of model per account in one query (ROW_NUMBER window),
+    as {account_id: [rows newest first]}
+    """
+    pk = model.__mapper__.primary_key[0]
+    rank = func.row_number().over(
+        partition_by=model.account_id, order_by=(order_by.desc(), pk.desc())
+    ).label('account_rank')
+    query = db.session.query(model, rank).filter(model.customer_id == customer_id, *criteria)
+    if account_ids is not None:
+        query = query.filter(model.account_id.in_(account_ids))
+    ranked = query.subquery()
+    row = aliased(model, ranked)
+    
+    latest = {}
+    for item in db.session.query(row).filter(ranked.c.account_rank <= limit).order_by(
+        ranked.c.account_id, ranked.c.account_rank
+    ):
+        latest.setdefault(item.account_id, []).append(item)
+    return latest
+
+
+def _load_snapshot_context(customer_id, account_ids=None):
+    """
+    Load every relation a snapshot reads, once for all accounts of the customer
+    (or only account_ids). Returns (accounts, context) with per-account maps.
+    """
+    account_query = Account.query.filter_by(customer_id=customer_id)
+    if account_ids is not None:
+        account_query = account_query.filter(Account.account_id.in_(account_ids))
+    accounts = account_query.order_by(Account.account_id).all()
+    if account_ids is None:
+        account_ids = [a.account_id for a in accounts]
+    if not accounts:
+        return [], {}
+    
+    recent_snapshots = _latest_per_account(
+        AccountSnapshot, customer_id, account_ids, AccountSnapshot.snapshot_timestamp, TREND_SNAPSHOT_COUNT
+    )
+    hydrate_snapshots([s for snapshots in recent_snapshots.values() for s in snapshots])
+    
+    context = {
+        'recent_snapshots': recent_snapshots,
+        'latest_trend': {
+            account_id: trends[0] for account_id, trends in _latest_per_account(
+                HealthTrend, customer_id, account_ids, HealthTrend.year * 100 + HealthTrend.month, 1
+            ).items()
+        },
+        'last_execution': {
+            account_id: executions[0] for account_id, executions in _latest_per_account(
+                PlaybookExecution, customer_id, account_ids, PlaybookExecution.started_at, 1
+            ).items()
+        },
+        'recent_reports': _latest_per_account(
+            PlaybookReport, customer_id, account_ids, PlaybookReport.report_generated_at, RECENT_REPORT_COUNT
+        ),
+        'recent_notes': _latest_per_account(
+            AccountNote, customer_id, account_ids, AccountNote.created_at, RECENT_NOTE_COUNT
+        ),
+        'products': {},
+        'kpis': {},
+        'running_playbooks': {},
+        'completed_playbooks': {},
+    }
+    
+    for product in Product.query.filter(Product.account_id.in_(account_ids)).order_by(Product.product_id):
+        context['products'].setdefault(product.account_id, []).append(product)
+    
+    # Score every KPI of the accounts in one batch; unknown values count as healthy
+    kpis = KPI.query.filter(KPI.account_id.in_(account_ids)).order_by(KPI.account_id, KPI.kpi_id).all()
+    columns = BatchHealthScoreEngine.build_columns(kpis, None, ReferenceRangeTable(customer_id))
+    statuses = BatchHealthScoreEngine.score_columns(columns)['status']
+    for kpi, status in zip(kpis, statuses):
+        context['kpis'].setdefault(kpi.account_id, []).append((kpi, STATUS_NAMES[int(status)]))
+    
+    running = db.session.query(PlaybookExecution.account_id, PlaybookExecution.playbook_id).filter(
+        PlaybookExecution.customer_id == customer_id,
+        PlaybookExecution.account_id.in_(account_ids),
+        PlaybookExecution.status == 'in-progress'
+    ).order_by(PlaybookExecution.id)
+    for account_id, playbook_id in running:
+        context['running_playbooks'].setdefault(account_id, []).append(playbook_id)
+    
+    # Completed playbooks in total and in the last 30 days
+    thirty_days_ago = datetime.now() - timedelta(days=30)
+    completed = db.session.query(
+        PlaybookExecution.account_id,
+        func.count(PlaybookExecution.id),
+        func.sum(case((PlaybookExecution.completed_at >= thirty_days_ago, 1), else_=0))
+    ).filter(
+        PlaybookExecution.customer_id == customer_id,
+        PlaybookExecution.account_id.in_(account_ids),
+        PlaybookExecution.status == 'completed'
+    ).group_by(PlaybookExecution.account_id)
+    for account_id, count, last_30_days in completed:
+        context['completed_playbooks'][account_id] = (count, int(last_30_days or 0))
+    
+    # Active playbook recommendations are customer-wide
+    context['active_triggers'] = [t.playbook_type for t in PlaybookTrigger.query.filter_by(
+        customer_id=customer_id,
+        auto_trigger_enabled=True
+    ).order_by(PlaybookTrigger.trigger_id)]
+    
+    return accounts, context
+
+
+def _build_account_snapshot(account, customer_id, context, snapshot_type, snapshot_reason, trigger_event,
+                            created_by, now):
+    """Build (without adding) the AccountSnapshot of one account from a loaded snapshot context"""
+    account_id = account.account_id
+    recent_snapshots = context['recent_snapshots'].get(account_id, [])
+    previous_snapshot = recent_snapshots[0] if recent_snapshots else None
+    
+    # Get sequence number
+    sequence_number = 1
+    days_since_last_snapshot = None
+    if previous_snapshot:
+        sequence_number = (previous_snapshot.snapshot_sequence_number or 0) + 1
+        days_since_last_snapshot = (now - previous_snapshot.snapshot_timestamp).days
+    
+    account_kpis = context['kpis'].get(account_id, [])
+    
+    # Get health scores
+    latest_trend = context['latest_trend'].get(account_id)
+    if latest_trend and latest_trend.overall_health_score:
+        overall_health_score = float(latest_trend.overall_health_score)
+        product_usage_score = float(latest_trend.product_usage_score) if latest_trend.product_usage_score else None
+        support_score = float(latest_trend.support_score) if latest_trend.support_score else None
+        customer_sentiment_score = float(latest_trend.customer_sentiment_score) if latest_trend.customer_sentiment_score else None
+        business_outcomes_score = float(latest_trend.business_outcomes_score) if latest_trend.business_outcomes_score else None
+        relationship_strength_score = float(latest_trend.relationship_strength_score) if latest_trend.relationship_strength_score else None
+    else:
+        # Calculate on-the-fly
+        overall_health_score = health_score_proxy_from_kpis([kpi for kpi, _ in account_kpis])
+        product_usage_score = None
+        support_score = None
+        customer_sentiment_score = None
+        business_outcomes_score = None
+        relationship_strength_score = None
+    
+    # Calculate health score change and trend
+    health_score_change_from_last = None
+    if previous_snapshot and previous_snapshot.overall_health_score:
+        health_score_change_from_last = overall_health_score - float(previous_snapshot.overall_health_score)
+    
+    health_score_trend = _health_score_trend(recent_snapshots)
+    
+    # Get revenue and calculate change
+    revenue = float(account.revenue) if account.revenue else 0
+    revenue_change_from_last = None
+    revenue_change_percent = None
+    if previous_snapshot and previous_snapshot.revenue:
+        prev_revenue = float(previous_snapshot.revenue)
+        revenue_change_from_last = revenue - prev_revenue
+        if prev_revenue > 0:
+            revenue_change_percent = (revenue_change_from_last / prev_revenue) * 100
+    
+    # Get profile metadata
+    profile_metadata = account.profile_metadata or {}
+    
+    # Get products
+    products = context['products'].get(account_id, [])
+    products_used = [p.product_name for p in products] if products else []
+    if not products_used and profile_metadata.get('products_used'):
+        # Fallback to profile_metadata
+        products_used = profile_metadata.get('products_used', '').split(',') if isinstance(profile_metadata.get('products_used'), str) else profile_metadata.get('products_used', [])
+        products_used = [p.strip() for p in products_used if p.strip()] if isinstance(products_used, list) else []
+    
+    primary_product = products_used[0] if products_used else None
+    
+    # Get playbook data
+    playbooks_running = context['running_playbooks'].get(account_id, [])
+    playbooks_completed_count, playbooks_completed_last_30_days = context['completed_playbooks'].get(account_id, (0, 0))
+    
+    # Last playbook executed
+    last_execution = context['last_execution'].get(account_id)
+    last_playbook_executed = None
+    if last_execution:
+        last_playbook_executed = {
+            'playbook_id': last_execution.playbook_id,
+            'date': last_execution.started_at.isoformat() if last_execution.started_at else None
+        }
+    
+    recent_playbook_report_ids = [r.report_id for r in context['recent_reports'].get(account_id, [])]
+    
+    # Get KPI summary
+    total_kpis = len(account_kpis)
+    account_level_kpis = len([k for k, _ in account_kpis if k.product_id is None])
+    product_level_kpis = len([k for k, _ in account_kpis if k.product_id is not None])
+    
+    critical_kpis = [kpi for kpi, status in account_kpis if status == 'low']
+    critical_kpis_count = len(critical_kpis)
+    at_risk_kpis_count = len([kpi for kpi, status in account_kpis if status == 'medium'])
+    healthy_kpis_count = total_kpis - critical_kpis_count - at_risk_kpis_count
+    
+    # Top 5 critical KPIs
+    top_critical_kpis = []
+    for kpi in critical_kpis[:5]:
+        top_critical_kpis.append({
+            'kpi_name': kpi.kpi_parameter,
+            'value': kpi.data,
+            'health_status': 'Critical',
+            'category': kpi.category
+        })
+    
+    # Get engagement metrics from profile_metadata
+    engagement = profile_metadata.get('engagement', {})
+    lifecycle_stage = engagement.get('lifecycle_stage')
+    onboarding_status = engagement.get('onboarding_status')
+    last_qbr_date = engagement.get('last_qbr_date')
+    next_qbr_date = engagement.get('next_qbr_date')
+    engagement_score = engagement.get('score')
+    
+    # Get champions from profile_metadata
+    champions = profile_metadata.get('champions', [])
+    primary_champion = None
+    champion_status = None
+    if champions and len(champions) > 0:
+        primary_champion = champions[0].get('name') if isinstance(champions[0], dict) else str(champions[0])
+        champion_status = champions[0].get('status') if isinstance(champions[0], dict) else None
+    
+    stakeholder_count = len(champions) if champions else 0
+    
+    recent_csm_note_ids = [n.note_id for n in context['recent_notes'].get(account_id, [])]
+    
+    # Check for significant change
+    is_significant_change = False
+    if previous_snapshot:
+        if health_score_change_from_last and abs(health_score_change_from_last) > 5:
+            is_significant_change = True
+        if revenue_change_percent and abs(revenue_change_percent) > 10:
+            is_significant_change = True
+    
+    return AccountSnapshot(
+        account_id=account_id,
+        customer_id=customer_id,
+        snapshot_timestamp=now,
+        snapshot_type=snapshot_type,
+        snapshot_reason=snapshot_reason,
+        snapshot_version=1,
+        created_by=created_by,
+        trigger_event=trigger_event,
+        
+        # Financial
+        revenue=revenue,
+        revenue_change_from_last=revenue_change_from_last,
+        revenue_change_percent=revenue_change_percent,
+        
+        # Health Scores
+        overall_health_score=overall_health_score,
+        product_usage_score=product_usage_score,
+        support_score=support_score,
+        customer_sentiment_score=customer_sentiment_score,
+        business_outcomes_score=business_outcomes_score,
+        relationship_strength_score=relationship_strength_score,
+        health_score_change_from_last=health_score_change_from_last,
+        health_score_trend=health_score_trend,
+        
+        # Account Status
+        account_status=account.account_status,
+        industry=account.industry,
+        region=account.region,
+        account_tier=profile_metadata.get('account_tier'),
+        external_account_id=account.external_account_id,
+        
+        # CSM & Team
+        assigned_csm=profile_metadata.get('assigned_csm'),
+        csm_manager=profile_metadata.get('csm_manager'),
+        account_owner=profile_metadata.get('account_owner'),
+        
+        # Products
+        products_used=products_used,
+        product_count=len(products_used),
+        primary_product=primary_product,
+        
+        # Playbooks
+        playbooks_running=playbooks_running,
+        playbooks_running_count=len(playbooks_running),
+        playbooks_completed_count=playbooks_completed_count,
+        playbooks_completed_last_30_days=playbooks_completed_last_30_days,
+        last_playbook_executed=last_playbook_executed,
+        playbook_recommendations_active=context['active_triggers'],
+        recent_playbook_report_ids=recent_playbook_report_ids,
+        
+        # KPI Summary
+        total_kpis=total_kpis,
+        account_level_kpis=account_level_kpis,
+        product_level_kpis=product_level_kpis,
+        critical_kpis_count=critical_kpis_count,
+        at_risk_kpis_count=at_risk_kpis_count,
+        healthy_kpis_count=healthy_kpis_count,
+        top_critical_kpis=top_critical_kpis,
+        
+        # Engagement
+        lifecycle_stage=lifecycle_stage,
+        onboarding_status=onboarding_status,
+        last_qbr_date=_parse_date(last_qbr_date),
+        next_qbr_date=_parse_date(next_qbr_date),
+        engagement_score=engagement_score,
+        
+        # Champions
+        primary_champion=primary_champion,
+        champion_status=champion_status,
+        stakeholder_count=stakeholder_count,
+        
+        # References
+        recent_csm_note_ids=recent_csm_note_ids,
+        
+        # Calculated
+        days_since_last_snapshot=days_since_last_snapshot,
+        snapshot_sequence_number=sequence_number,
+        is_significant_change=is_significant_change
+    )
+
+
+def create_snapshots_for_customer(customer_id, snapshot_type='manual', snapshot_reason=None, trigger_event=None,
+                                  created_by=None, force_create=False, account_ids=None):
+    """
+    Create snapshots for all accounts of a customer (or only account_ids) in one batch.
+    
+    Each relation a snapshot reads is loaded once for every account (window functions
+    pick the latest snapshots, trend, execution, reports and notes per account), the
+    snapshots are built in memory, delta-encoded against each account's previous
+    snapshot and inserted together in one commit. Accounts whose
+    previous snapshot is too recent for snapshot_type are skipped unless force_create.
+    
+    Returns:
+        List of created AccountSnapshot objects (skipped accounts are left out)
+    """
+    if created_by is None and has_request_context():
+        created_by = get_current_user_id()
+    
+    try:
+        accounts, context = _load_snapshot_context(customer_id, account_ids)
+        now = datetime.now()
+        
+        snapshots = []
+        for account in accounts:
+            recent_snapshots = context['recent_snapshots'].get(account.account_id)
+            previous_snapshot = recent_snapshots[0] if recent_snapshots else None
+            skip_reason = None if force_create else _duplicate_snapshot_reason(snapshot_type, previous_snapshot, now)
+            if skip_reason:
+                print(f"⏸️  Skipping snapshot creation for account {account.account_name}: {skip_reason}")
+                continue
+            snapshot = _build_account_snapshot(
+                account, customer_id, context, snapshot_type, snapshot_reason, trigger_event, created_by, now
+            )
+            # Stored as a delta against the previous snapshot (or as a new base)
+            snapshots.append(encode_snapshot(snapshot, previous_snapshot))
+        
+        db.session.add_all(snapshots)
+        db.session.flush()
+        snapshot_ids = [s.snapshot_id for s in snapshots]
+        db.session.commit()
+        
+        # Reload (same instances) with the full state for callers
+        if snapshot_ids:
+            hydrate_snapshots(AccountSnapshot.query.filter(AccountSnapshot.snapshot_id.in_(snapshot_ids)).all())
+        return snapshots
+    
+    except Exception:
+        db.session.rollback()
+        raise
+
+
 def create_account_snapshot(account_id, customer_id, snapshot_type='manual', snapshot_reason=None, trigger_event=None, created_by=None, force_create=False):
     """
     Create a comprehensive account snapshot capturing all account state.
@@ -68,368 +475,21 @@ def create_account_snapshot(account_id, customer_id, snapshot_type='manual', sna
         snapshot_type: Type of snapshot (manual, scheduled, event_driven, post_upload, post_health_calc, rag_auto)
         snapshot_reason: Optional reason for snapshot
         trigger_event: Optional event that triggered snapshot
-        created_by: User ID who created the snapshot (optional)
+        created_by: User ID who created the snapshot (defaults to the current user)
         force_create: If True, bypass duplicate check and always create (default: False)
     
     Returns:
         AccountSnapshot object or None if error or duplicate prevented
     """
     try:
-        from datetime import timedelta
-        
-        # Get account
-        account = Account.query.filter_by(
-            account_id=account_id,
-            customer_id=customer_id
-        ).first()
-        
-        if not account:
-            return None
-        
-        # Get previous snapshot for change calculations and duplicate check
-        previous_snapshot = AccountSnapshot.query.filter_by(
-            account_id=account_id,
-            customer_id=customer_id
-        ).order_by(AccountSnapshot.snapshot_timestamp.desc()).first()
-        
-        # SAFEGUARD: Prevent duplicate snapshot creation (unless forced or manual)
-        if not force_create and previous_snapshot:
-            # For event-driven snapshots: Only create if last snapshot is older than 1 hour
-            if snapshot_type == 'event_driven':
-                time_since_last = datetime.now() - previous_snapshot.snapshot_timestamp
-                if time_since_last < timedelta(hours=1):
-                    print(f"⏸️  Skipping snapshot creation for account {account.account_name}: "
-                          f"Snapshot exists from {time_since_last.total_seconds()/60:.1f} minutes ago "
-                          f"(event-driven snapshots require 1 hour minimum interval)")
-                    return None  # Return None to indicate skip (not error)
-            
-            # For RAG auto snapshots: Only create if last snapshot is older than 30 minutes
-            elif snapshot_type == 'rag_auto':
-                time_since_last = datetime.now() - previous_snapshot.snapshot_timestamp
-                if time_since_last < timedelta(minutes=30):
-                    print(f"⏸️  Skipping snapshot creation for account {account.account_name}: "
-                          f"Snapshot exists from {time_since_last.total_seconds()/60:.1f} minutes ago "
-                          f"(RAG auto snapshots require 30 minutes minimum interval)")
-                    return None  # Return None to indicate skip (not error)
-            
-            # For scheduled snapshots: Only create if last snapshot is older than 24 hours
-            elif snapshot_type == 'scheduled':
-                time_since_last = datetime.now() - previous_snapshot.snapshot_timestamp
-                if time_since_last < timedelta(hours=24):
-                    print(f"⏸️  Skipping snapshot creation for account {account.account_name}: "
-                          f"Snapshot exists from {time_since_last.total_seconds()/3600:.1f} hours ago "
-                          f"(scheduled snapshots require 24 hours minimum interval)")
-                    return None  # Return None to indicate skip (not error)
-            
-            # For manual snapshots: Always allow (user-initiated, no restriction)
-            # This allows users to create snapshots on-demand regardless of existing ones
-        
-        # If we get here, either:
-        # 1. No previous snapshot exists (first snapshot)
-        # 2. Previous snapshot is old enough (time interval passed)
-        # 3. Manual snapshot (always allowed)
-        # 4. force_create=True (bypass check)
-        
-        # SAFEGUARD: Check if snapshot already exists and prevent duplicate creation
-        # (unless it's a manual snapshot or force_create is True)
-        if not force_create and previous_snapshot:
-            time_since_last = datetime.now() - previous_snapshot.snapshot_timestamp
-            
-            # For event-driven snapshots: Only create if last snapshot is older than 1 hour
-            if snapshot_type == 'event_driven':
-                if time_since_last < timedelta(hours=1):
-                    print(f"⏸️  Skipping snapshot creation for account {account.account_name}: "
-                          f"Snapshot exists from {time_since_last.total_seconds()/60:.1f} minutes ago "
-                          f"(event-driven snapshots require 1 hour minimum interval)")
-                    return None  # Return None to indicate skip (not error)
-            
-            # For RAG auto snapshots: Only create if last snapshot is older than 30 minutes
-            elif snapshot_type == 'rag_auto':
-                if time_since_last < timedelta(minutes=30):
-                    print(f"⏸️  Skipping snapshot creation for account {account.account_name}: "
-                          f"Snapshot exists from {time_since_last.total_seconds()/60:.1f} minutes ago "
-                          f"(RAG auto snapshots require 30 minutes minimum interval)")
-                    return None  # Return None to indicate skip (not error)
-            
-            # For scheduled snapshots: Only create if last snapshot is older than 24 hours
-            elif snapshot_type == 'scheduled':
-                if time_since_last < timedelta(hours=24):
-                    print(f"⏸️  Skipping snapshot creation for account {account.account_name}: "
-                          f"Snapshot exists from {time_since_last.total_seconds()/3600:.1f} hours ago "
-                          f"(scheduled snapshots require 24 hours minimum interval)")
-                    return None  # Return None to indicate skip (not error)
-            
-            # For manual snapshots: Always allow (user-initiated, no restriction)
-            # This allows users to create snapshots on-demand regardless of existing ones
-        
-        # Get sequence number
-        sequence_number = 1
-        days_since_last_snapshot = None
-        if previous_snapshot:
-            sequence_number = (previous_snapshot.snapshot_sequence_number or 0) + 1
-            days_since_last_snapshot = (datetime.now() - previous_snapshot.snapshot_timestamp).days
-        
-        # Get health scores
-        latest_trend = HealthTrend.query.filter_by(
-            account_id=account_id,
-            customer_id=customer_id
-        ).order_by(HealthTrend.year.desc(), HealthTrend.month.desc()).first()
-        
-        if latest_trend and latest_trend.overall_health_score:
-            overall_health_score = float(latest_trend.overall_health_score)
-            product_usage_score = float(latest_trend.product_usage_score) if latest_trend.product_usage_score else None
-            support_score = float(latest_trend.support_score) if latest_trend.support_score else None
-            customer_sentiment_score = float(latest_trend.customer_sentiment_score) if latest_trend.customer_sentiment_score else None
-            business_outcomes_score = float(latest_trend.business_outcomes_score) if latest_trend.business_outcomes_score else None
-            relationship_strength_score = float(latest_trend.relationship_strength_score) if latest_trend.relationship_strength_score else None
-        else:
-            # Calculate on-the-fly
-            overall_health_score = calculate_health_score_proxy(account_id)
-            product_usage_score = None
-            support_score = None
-            customer_sentiment_score = None
-            business_outcomes_score = None
-            relationship_strength_score = None
-        
-        # Calculate health score change and trend
-        health_score_change_from_last = None
-        if previous_snapshot and previous_snapshot.overall_health_score:
-            health_score_change_from_last = overall_health_score - float(previous_snapshot.overall_health_score)
-        
-        health_score_trend = calculate_health_score_trend(account_id, customer_id, overall_health_score)
-        
-        # Get revenue and calculate change
-        revenue = float(account.revenue) if account.revenue else 0
-        revenue_change_from_last = None
-        revenue_change_percent = None
-        if previous_snapshot and previous_snapshot.revenue:
-            prev_revenue = float(previous_snapshot.revenue)
-            revenue_change_from_last = revenue - prev_revenue
-            if prev_revenue > 0:
-                revenue_change_percent = (revenue_change_from_last / prev_revenue) * 100
-        
-        # Get profile metadata
-        profile_metadata = account.profile_metadata or {}
-        
-        # Get products
-        products = Product.query.filter_by(account_id=account_id).all()
-        products_used = [p.product_name for p in products] if products else []
-        if not products_used and profile_metadata.get('products_used'):
-            # Fallback to profile_metadata
-            products_used = profile_metadata.get('products_used', '').split(',') if isinstance(profile_metadata.get('products_used'), str) else profile_metadata.get('products_used', [])
-            products_used = [p.strip() for p in products_used if p.strip()] if isinstance(products_used, list) else []
-        
-        primary_product = products_used[0] if products_used else None
-        
-        # Get playbook data
-        running_executions = PlaybookExecution.query.filter_by(
-            account_id=account_id,
-            customer_id=customer_id,
-            status='in-progress'
-        ).all()
-        playbooks_running = [e.playbook_id for e in running_executions]
-        
-        completed_executions = PlaybookExecution.query.filter_by(
-            account_id=account_id,
-            customer_id=customer_id,
-            status='completed'
-        ).all()
-        playbooks_completed_count = len(completed_executions)
-        
-        # Last 30 days completed
-        thirty_days_ago = datetime.now() - timedelta(days=30)
-        recent_completed = [e for e in completed_executions if e.completed_at and e.completed_at >= thirty_days_ago]
-        playbooks_completed_last_30_days = len(recent_completed)
-        
-        # Last playbook executed
-        last_execution = PlaybookExecution.query.filter_by(
-            account_id=account_id,
-            customer_id=customer_id
-        ).order_by(PlaybookExecution.started_at.desc()).first()
-        last_playbook_executed = None
-        if last_execution:
-            last_playbook_executed = {
-                'playbook_id': last_execution.playbook_id,
-                'date': last_execution.started_at.isoformat() if last_execution.started_at else None
-            }
-        
-        # Active playbook recommendations
-        active_triggers = PlaybookTrigger.query.filter_by(
-            customer_id=customer_id,
-            auto_trigger_enabled=True
-        ).all()
-        playbook_recommendations_active = [t.playbook_type for t in active_triggers]
-        
-        # Get recent playbook reports (last 3)
-        recent_reports = PlaybookReport.query.filter_by(
-            account_id=account_id,
-            customer_id=customer_id
-        ).order_by(PlaybookReport.report_generated_at.desc()).limit(3).all()
-        recent_playbook_report_ids = [r.report_id for r in recent_reports]
-        
-        # Get KPI summary
-        all_kpis = KPI.query.filter_by(account_id=account_id).all()
-        total_kpis = len(all_kpis)
-        account_level_kpis = len([k for k in all_kpis if k.product_id is None])
-        product_level_kpis = len([k for k in all_kpis if k.product_id is not None])
-        
-        # Count KPIs by health status (need to calculate)
-        from health_score_engine import HealthScoreEngine
-        critical_kpis = []
-        at_risk_kpis = []
-        healthy_kpis = []
-        
-        for kpi in all_kpis:
-            try:
-                health_info = HealthScoreEngine.calculate_health_status(
-                    HealthScoreEngine.parse_kpi_value(kpi.data, kpi.kpi_parameter),
-                    kpi.kpi_parameter
-                )
-                if health_info['status'] == 'low':
-                    critical_kpis.append(kpi)
-                elif health_info['status'] == 'medium':
-                    at_risk_kpis.append(kpi)
-                else:
-                    healthy_kpis.append(kpi)
-            except:
-                pass  # Skip if can't calculate
-        
-        critical_kpis_count = len(critical_kpis)
-        at_risk_kpis_count = len(at_risk_kpis)
-        healthy_kpis_count = len(healthy_kpis)
-        
-        # Top 5 critical KPIs
-        top_critical_kpis = []
-        for kpi in critical_kpis[:5]:
-            top_critical_kpis.append({
-                'kpi_name': kpi.kpi_parameter,
-                'value': kpi.data,
-                'health_status': 'Critical',
-                'category': kpi.category
-            })
-        
-        # Get engagement metrics from profile_metadata
-        engagement = profile_metadata.get('engagement', {})
-        lifecycle_stage = engagement.get('lifecycle_stage')
-        onboarding_status = engagement.get('onboarding_status')
-        last_qbr_date = engagement.get('last_qbr_date')
-        next_qbr_date = engagement.get('next_qbr_date')
-        engagement_score = engagement.get('score')
-        
-        # Get champions from profile_metadata
-        champions = profile_metadata.get('champions', [])
-        primary_champion = None
-        champion_status = None
-        if champions and len(champions) > 0:
-            primary_champion = champions[0].get('name') if isinstance(champions[0], dict) else str(champions[0])
-            champion_status = champions[0].get('status') if isinstance(champions[0], dict) else None
-        
-        stakeholder_count = len(champions) if champions else 0
-        
-        # Get recent CSM notes (last 5)
-        recent_notes = AccountNote.query.filter_by(
-            account_id=account_id,
-            customer_id=customer_id
-        ).order_by(AccountNote.created_at.desc()).limit(5).all()
-        recent_csm_note_ids = [n.note_id for n in recent_notes]
-        
-        # Check for significant change
-        is_significant_change = False
-        if previous_snapshot:
-            if health_score_change_from_last and abs(health_score_change_from_last) > 5:
-                is_significant_change = True
-            if revenue_change_percent and abs(revenue_change_percent) > 10:
-                is_significant_change = True
-        
-        # Create snapshot
-        snapshot = AccountSnapshot(
-            account_id=account_id,
-            customer_id=customer_id,
-            snapshot_timestamp=datetime.now(),
-            snapshot_type=snapshot_type,
-            snapshot_reason=snapshot_reason,
-            snapshot_version=1,
-            created_by=get_current_user_id(),
-            trigger_event=trigger_event,
-            
-            # Financial
-            revenue=revenue,
-            revenue_change_from_last=revenue_change_from_last,
-            revenue_change_percent=revenue_change_percent,
-            
-            # Health Scores
-            overall_health_score=overall_health_score,
-            product_usage_score=product_usage_score,
-            support_score=support_score,
-            customer_sentiment_score=customer_sentiment_score,
-            business_outcomes_score=business_outcomes_score,
-            relationship_strength_score=relationship_strength_score,
-            health_score_change_from_last=health_score_change_from_last,
-            health_score_trend=health_score_trend,
-            
-            # Account Status
-            account_status=account.account_status,
-            industry=account.industry,
-            region=account.region,
-            account_tier=profile_metadata.get('account_tier'),
-            external_account_id=account.external_account_id,
-            
-            # CSM & Team
-            assigned_csm=profile_metadata.get('assigned_csm'),
-            csm_manager=profile_metadata.get('csm_manager'),
-            account_owner=profile_metadata.get('account_owner'),
-            
-            # Products
-            products_used=products_used,
-            product_count=len(products_used),
-            primary_product=primary_product,
-            
-            # Playbooks
-            playbooks_running=playbooks_running,
-            playbooks_running_count=len(playbooks_running),
-            playbooks_completed_count=playbooks_completed_count,
-            playbooks_completed_last_30_days=playbooks_completed_last_30_days,
-            last_playbook_executed=last_playbook_executed,
-            playbook_recommendations_active=playbook_recommendations_active,
-            recent_playbook_report_ids=recent_playbook_report_ids,
-            
-            # KPI Summary
-            total_kpis=total_kpis,
-            account_level_kpis=account_level_kpis,
-            product_level_kpis=product_level_kpis,
-            critical_kpis_count=critical_kpis_count,
-            at_risk_kpis_count=at_risk_kpis_count,
-            healthy_kpis_count=healthy_kpis_count,
-            top_critical_kpis=top_critical_kpis,
-            
-            # Engagement
-            lifecycle_stage=lifecycle_stage,
-            onboarding_status=onboarding_status,
-            last_qbr_date=_parse_date(last_qbr_date),
-            next_qbr_date=_parse_date(next_qbr_date),
-            engagement_score=engagement_score,
-            
-            # Champions
-            primary_champion=primary_champion,
-            champion_status=champion_status,
-            stakeholder_count=stakeholder_count,
-            
-            # References
-            recent_csm_note_ids=recent_csm_note_ids,
-            
-            # Calculated
-            days_since_last_snapshot=days_since_last_snapshot,
-            snapshot_sequence_number=sequence_number,
-            is_significant_change=is_significant_change
+        snapshots = create_snapshots_for_customer(
+            customer_id, snapshot_type=snapshot_type, snapshot_reason=snapshot_reason,
+            trigger_event=trigger_event, created_by=created_by, force_create=force_create,
+            account_ids=[account_id]
         )
-        
-        db.session.add(snapshot)
-        db.session.commit()
-        
-        return snapshot
+        return snapshots[0] if snapshots else None
         
     except Exception as e:
-        db.session.rollback()
         print(f"Error creating account snapshot: {e}")
         import traceback
         traceback.print_exc()
@@ -485,28 +545,27 @@ def create_snapshot():
             else:
                 return jsonify({'error': 'Failed to create snapshot'}), 500
         else:
-            # Create snapshots for all accounts
-            accounts = Account.query.filter_by(customer_id=customer_id).all()
+            # Create snapshots for all accounts in one batch
+            snapshots = create_snapshots_for_customer(
+                customer_id,
+                snapshot_type=snapshot_type,
+                snapshot_reason=snapshot_reason,
+                trigger_event=trigger_event,
+                created_by=user_id,
+                force_create=False  # Respect safeguard for bulk operations
+            )
+            account_names = dict(db.session.query(Account.account_id, Account.account_name).filter(
+                Account.customer_id == customer_id
+            ).all())
             
-            for account in accounts:
-                snapshot = create_account_snapshot(
-                    account_id=account.account_id,
-                    customer_id=customer_id,
-                    snapshot_type=snapshot_type,
-                    snapshot_reason=snapshot_reason,
-                    trigger_event=trigger_event,
-                    created_by=user_id,
-                    force_create=False  # Respect safeguard for bulk operations
-                )
-                
-                if snapshot:
-                    created_snapshots.append({
-                        'snapshot_id': snapshot.snapshot_id,
-                        'account_id': snapshot.account_id,
-                        'account_name': account.account_name,
-                        'snapshot_timestamp': snapshot.snapshot_timestamp.isoformat(),
-                        'overall_health_score': float(snapshot.overall_health_score) if snapshot.overall_health_score else None
-                    })
+            for snapshot in snapshots:
+                created_snapshots.append({
+                    'snapshot_id': snapshot.snapshot_id,
+                    'account_id': snapshot.account_id,
+                    'account_name': account_names.get(snapshot.account_id),
+                    'snapshot_timestamp': snapshot.snapshot_timestamp.isoformat(),
+                    'overall_health_score': float(snapshot.overall_health_score) if snapshot.overall_health_score else None
+                })
         
         return jsonify({
             'status': 'success',
@@ -547,7 +606,7 @@ def get_snapshots():
             except:
                 pass
         
-        snapshots = query.order_by(AccountSnapshot.snapshot_timestamp.desc()).limit(limit).all()
+        snapshots = hydrate_snapshots(query.order_by(AccountSnapshot.snapshot_timestamp.desc()).limit(limit).all())
         
         result = []
         for snapshot in snapshots:
@@ -604,6 +663,7 @@ def get_latest_snapshot():
                 'status': 'not_found',
                 'message': 'No snapshot found for this account'
             }), 404
+        hydrate_snapshots([snapshot])
         
         account = db.session.get(Account, account_id)
         
@@ -660,6 +720,7 @@ def get_snapshot_history():
         ).filter(
             AccountSnapshot.snapshot_timestamp >= cutoff_date
         ).order_by(AccountSnapshot.snapshot_timestamp.desc()).all()
+        hydrate_snapshots(snapshots)
         
         result = []
         for snapshot in snapshots:
@@ -5,19 +5,30 @@ Provides fast, accurate, cost-effective responses for quantitative questions
 """
 
 from flask import Blueprint, request, jsonify, abort
-from auth_middleware import get_current_customer_id, get_current_user_id
+from auth_middleware import get_current_customer_id as get_authenticated_customer_id, get_current_user_id
+from tenant_data_version import enable_conditional_get
 from extensions import db
-from models import Account, KPI, KPIUpload
+from models import Account, KPIUpload
+from analytics_cube import analytics_cube, ACCOUNT_DIMENSION_COLUMNS, KPI_DIMENSIONS, METRIC_REVENUE, METRIC_KPI_VALUE, OPERATIONS
 from sqlalchemy import func, and_, or_, cast, Float
 from typing import Dict, List, Any
 from datetime import datetime
 
 analytics_api = Blueprint('analytics_api', __name__)
+enable_conditional_get(analytics_api)
+
+# Group-by / filter names accepted by /api/analytics/aggregate -> cube dimension
+AGGREGATE_DIMENSIONS = {
+    **{column: dimension for dimension, column in ACCOUNT_DIMENSION_COLUMNS.items()},
+    'status': 'status',
+    'category': 'category',
+    'impact_level': 'impact_level',
+}
 
 
 def get_current_customer_id():
     """Extract and validate customer ID from headers"""
-    cid = get_current_customer_id()
+    cid = get_authenticated_customer_id()
     if not cid:
         abort(400, 'Authentication required (handled by middleware)')
     try:
@@ -26,6 +37,17 @@ def get_current_customer_id():
         abort(400, 'Invalid authentication (handled by middleware)')
 
 
+def _account_filters(industry=None, region=None, status=None) -> Dict[str, Any]:
+    """Cube filters for the given account dimension values (empty = not filtered)"""
+    return {dimension: value for dimension, value in
+            (('industry', industry), ('region', region), ('status', status)) if value}
+
+
+def _sorted_groups(groups, key):
+    """Cube groups as (dimension value, Measure), largest key(measure) first"""
+    return sorted(((k[0], m) for k, m in groups.items()), key=lambda g: (-key(g[1]), str(g[0])))
+
+
 # ==================== REVENUE ANALYTICS ====================
 
 @analytics_api.route('/api/analytics/revenue/total', methods=['GET'])
@@ -38,18 +60,9 @@ def get_total_revenue():
     region = request.args.get('region')
     status = request.args.get('status', 'active')
     
-    query = db.session.query(func.sum(Account.revenue)).filter(
-        Account.customer_id == customer_id
-    )
-    
-    if industry:
-        query = query.filter(Account.industry == industry)
-    if region:
-        query = query.filter(Account.region == region)
-    if status:
-        query = query.filter(Account.account_status == status)
-    
-    total = query.scalar() or 0
+    total = analytics_cube.get(customer_id).account_totals(
+        _account_filters(industry, region, status)
+    ).sum or 0
     
     return jsonify({
         'query_type': 'revenue_total',
@@ -81,29 +94,17 @@ def get_average_revenue():
     industry = request.args.get('industry')
     region = request.args.get('region')
     
-    query = db.session.query(
-        func.avg(Account.revenue).label('average'),
-        func.count(Account.account_id).label('count'),
-        func.min(Account.revenue).label('min'),
-        func.max(Account.revenue).label('max')
-    ).filter(Account.customer_id == customer_id)
-    
-    if industry:
-        query = query.filter(Account.industry == industry)
-    if region:
-        query = query.filter(Account.region == region)
-    
-    result = query.first()
+    result = analytics_cube.get(customer_id).account_totals(_account_filters(industry, region))
     
     return jsonify({
         'query_type': 'revenue_average',
         'customer_id': customer_id,
         'result': {
-            'average_revenue': float(result.average or 0),
+            'average_revenue': float(result.avg or 0),
             'account_count': result.count,
-            'min_revenue': float(result.min or 0),
-            'max_revenue': float(result.max or 0),
-            'formatted_average': f"${result.average or 0:,.2f}"
+            'min_revenue': float(result.minimum or 0),
+            'max_revenue': float(result.maximum or 0),
+            'formatted_average': f"${result.avg or 0:,.2f}"
         },
         'filters': {
             'industry': industry,
@@ -123,33 +124,20 @@ def get_revenue_by_industry():
     """Get revenue breakdown by industry"""
     customer_id = get_current_customer_id()
     
-    results = db.session.query(
-        Account.industry,
-        func.sum(Account.revenue).label('total_revenue'),
-        func.count(Account.account_id).label('account_count'),
-        func.avg(Account.revenue).label('avg_revenue'),
-        func.min(Account.revenue).label('min_revenue'),
-        func.max(Account.revenue).label('max_revenue')
-    ).filter(
-        Account.customer_id == customer_id
-    ).group_by(
-        Account.industry
-    ).order_by(
-        func.sum(Account.revenue).desc()
-    ).all()
+    results = _sorted_groups(analytics_cube.get(customer_id).accounts_by(['industry']), lambda m: m.sum or 0)
     
     return jsonify({
         'query_type': 'revenue_by_industry',
         'customer_id': customer_id,
         'result': [{
-            'industry': r.industry,
-            'total_revenue': float(r.total_revenue or 0),
-            'account_count': r.account_count,
-            'average_revenue': float(r.avg_revenue or 0),
-            'min_revenue': float(r.min_revenue or 0),
-            'max_revenue': float(r.max_revenue or 0),
-            'formatted_total': f"${r.total_revenue or 0:,.2f}"
-        } for r in results],
+            'industry': industry,
+            'total_revenue': float(r.sum or 0),
+            'account_count': r.count,
+            'average_revenue': float(r.avg or 0),
+            'min_revenue': float(r.minimum or 0),
+            'max_revenue': float(r.maximum or 0),
+            'formatted_total': f"${r.sum or 0:,.2f}"
+        } for industry, r in results],
         'metadata': {
             'source': 'deterministic_analytics',
             'calculation': 'SUM(revenue) GROUP BY industry',
@@ -164,29 +152,18 @@ def get_revenue_by_region():
     """Get revenue breakdown by region"""
     customer_id = get_current_customer_id()
     
-    results = db.session.query(
-        Account.region,
-        func.sum(Account.revenue).label('total_revenue'),
-        func.count(Account.account_id).label('account_count'),
-        func.avg(Account.revenue).label('avg_revenue')
-    ).filter(
-        Account.customer_id == customer_id
-    ).group_by(
-        Account.region
-    ).order_by(
-        func.sum(Account.revenue).desc()
-    ).all()
+    results = _sorted_groups(analytics_cube.get(customer_id).accounts_by(['region']), lambda m: m.sum or 0)
     
     return jsonify({
         'query_type': 'revenue_by_region',
         'customer_id': customer_id,
         'result': [{
-            'region': r.region,
-            'total_revenue': float(r.total_revenue or 0),
-            'account_count': r.account_count,
-            'average_revenue': float(r.avg_revenue or 0),
-            'formatted_total': f"${r.total_revenue or 0:,.2f}"
-        } for r in results],
+            'region': region,
+            'total_revenue': float(r.sum or 0),
+            'account_count': r.count,
+            'average_revenue': float(r.avg or 0),
+            'formatted_total': f"${r.sum or 0:,.2f}"
+        } for region, r in results],
         'metadata': {
             'source': 'deterministic_analytics',
             'precision': 'exact',
@@ -201,11 +178,7 @@ def get_top_revenue_accounts():
     customer_id = get_current_customer_id()
     limit = request.args.get('limit', 10, type=int)
     
-    accounts = Account.query.filter_by(
-        customer_id=customer_id
-    ).order_by(
-        Account.revenue.desc()
-    ).limit(limit).all()
+    accounts = analytics_cube.get(customer_id).top_accounts(limit)
     
     total_revenue = sum(a.revenue or 0 for a in accounts)
     
@@ -220,7 +193,7 @@ def get_top_revenue_accounts():
                 'revenue': float(a.revenue or 0),
                 'industry': a.industry,
                 'region': a.region,
-                'status': a.account_status,
+                'status': a.status,
                 'formatted_revenue': f"${a.revenue or 0:,.2f}"
             } for idx, a in enumerate(accounts)],
             'summary': {
@@ -252,20 +225,14 @@ def get_account_count():
     min_revenue = request.args.get('min_revenue', type=float)
     max_revenue = request.args.get('max_revenue', type=float)
     
-    query = Account.query.filter_by(customer_id=customer_id)
-    
-    if industry:
-        query = query.filter(Account.industry == industry)
-    if region:
-        query = query.filter(Account.region == region)
-    if status:
-        query = query.filter(Account.account_status == status)
-    if min_revenue is not None:
-        query = query.filter(Account.revenue >= min_revenue)
-    if max_revenue is not None:
-        query = query.filter(Account.revenue <= max_revenue)
-    
-    count = query.count()
+    cube = analytics_cube.get(customer_id)
+    filters = _account_filters(industry, region, status)
+    if min_revenue is None and max_revenue is None:
+        count = cube.account_totals(filters).count
+    else:
+        accounts = cube.accounts_in_revenue_range(min_revenue, max_revenue)
+        count = cube.aggregate_accounts(accounts, METRIC_REVENUE, [], filters).get((), None)
+        count = count.count if count else 0
     
     return jsonify({
         'query_type': 'account_count',
@@ -294,31 +261,20 @@ def get_accounts_by_industry():
     """Get account distribution by industry"""
     customer_id = get_current_customer_id()
     
-    results = db.session.query(
-        Account.industry,
-        func.count(Account.account_id).label('count'),
-        func.sum(Account.revenue).label('total_revenue'),
-        func.avg(Account.revenue).label('avg_revenue')
-    ).filter(
-        Account.customer_id == customer_id
-    ).group_by(
-        Account.industry
-    ).order_by(
-        func.count(Account.account_id).desc()
-    ).all()
-    
-    total_accounts = sum(r.count for r in results)
+    results = _sorted_groups(analytics_cube.get(customer_id).accounts_by(['industry']), lambda m: m.count)
+    
+    total_accounts = sum(r.count for _, r in results)
     
     return jsonify({
         'query_type': 'accounts_by_industry',
         'customer_id': customer_id,
         'result': [{
-            'industry': r.industry,
+            'industry': industry,
             'account_count': r.count,
-            'total_revenue': float(r.total_revenue or 0),
-            'average_revenue': float(r.avg_revenue or 0),
+            'total_revenue': float(r.sum or 0),
+            'average_revenue': float(r.avg or 0),
             'percentage_of_total': round(r.count / total_accounts * 100, 2) if total_accounts > 0 else 0
-        } for r in results],
+        } for industry, r in results],
         'summary': {
             'total_accounts': total_accounts,
             'industry_count': len(results)
@@ -336,28 +292,17 @@ def get_accounts_by_region():
     """Get account distribution by region"""
     customer_id = get_current_customer_id()
     
-    results = db.session.query(
-        Account.region,
-        func.count(Account.account_id).label('count'),
-        func.sum(Account.revenue).label('total_revenue'),
-        func.avg(Account.revenue).label('avg_revenue')
-    ).filter(
-        Account.customer_id == customer_id
-    ).group_by(
-        Account.region
-    ).order_by(
-        func.count(Account.account_id).desc()
-    ).all()
+    results = _sorted_groups(analytics_cube.get(customer_id).accounts_by(['region']), lambda m: m.count)
     
     return jsonify({
         'query_type': 'accounts_by_region',
         'customer_id': customer_id,
         'result': [{
-            'region': r.region,
+            'region': region,
             'account_count': r.count,
-            'total_revenue': float(r.total_revenue or 0),
-            'average_revenue': float(r.avg_revenue or 0)
-        } for r in results],
+            'total_revenue': float(r.sum or 0),
+            'average_revenue': float(r.avg or 0)
+        } for region, r in results],
         'metadata': {
             'source': 'deterministic_analytics',
             'precision': 'exact',
@@ -380,7 +325,7 @@ def get_account_details(account_id):
         return jsonify({'error': 'Account not found'}), 404
     
     # Get KPI count for this account
-    kpi_count = KPI.query.filter_by(account_id=account_id).count()
+    kpi_count = analytics_cube.get(customer_id).account_kpi_count(account_id)
     
     return jsonify({
         'query_type': 'account_details',
@@ -411,23 +356,8 @@ def get_kpi_count():
     """Get total KPI count"""
     customer_id = get_current_customer_id()
     
-    count = db.session.query(func.count(KPI.kpi_id)).join(
-        Account, KPI.account_id == Account.account_id
-    ).filter(
-        Account.customer_id == customer_id
-    ).scalar()
-    
-    # Get count by category
-    category_counts = db.session.query(
-        KPI.category,
-        func.count(KPI.kpi_id).label('count')
-    ).join(
-        Account, KPI.account_id == Account.account_id
-    ).filter(
-        Account.customer_id == customer_id
-    ).group_by(
-        KPI.category
-    ).all()
+    category_counts = _sorted_groups(analytics_cube.get(customer_id).kpis_by(['category']), lambda m: m.count)
+    count = sum(c.count for _, c in category_counts)
     
     return jsonify({
         'query_type': 'kpi_count',
@@ -435,9 +365,9 @@ def get_kpi_count():
         'result': {
             'total_count': count,
             'by_category': [{
-                'category': c.category,
+                'category': category,
                 'count': c.count
-            } for c in category_counts]
+            } for category, c in category_counts]
         },
         'metadata': {
             'source': 'deterministic_analytics',
@@ -452,41 +382,29 @@ def get_kpi_summary():
     """Get comprehensive KPI summary statistics"""
     customer_id = get_current_customer_id()
     
-    # Get KPI count by category
-    category_stats = db.session.query(
-        KPI.category,
-        func.count(KPI.kpi_id).label('count')
-    ).join(
-        Account, KPI.account_id == Account.account_id
-    ).filter(
-        Account.customer_id == customer_id
-    ).group_by(
-        KPI.category
-    ).all()
+    cube = analytics_cube.get(customer_id)
     
-    # Get total count
-    total_count = sum(c.count for c in category_stats)
+    # Get KPI count and value statistics by category
+    category_stats = _sorted_groups(cube.kpis_by(['category']), lambda m: m.count)
     
-    # Get account count with KPIs
-    accounts_with_kpis = db.session.query(
-        func.count(func.distinct(KPI.account_id))
-    ).join(
-        Account, KPI.account_id == Account.account_id
-    ).filter(
-        Account.customer_id == customer_id
-    ).scalar()
+    # Get total count
+    total_count = sum(c.count for _, c in category_stats)
     
     return jsonify({
         'query_type': 'kpi_summary',
         'customer_id': customer_id,
         'result': {
             'total_kpis': total_count,
-            'accounts_with_kpis': accounts_with_kpis,
+            'accounts_with_kpis': cube.accounts_with_kpis(),
             'by_category': [{
-                'category': c.category,
+                'category': category,
                 'count': c.count,
-                'percentage': round(c.count / total_count * 100, 2) if total_count > 0 else 0
-            } for c in category_stats]
+                'percentage': round(c.count / total_count * 100, 2) if total_count > 0 else 0,
+                'numeric_count': c.value_count,
+                'average_value': c.avg,
+                'min_value': c.minimum,
+                'max_value': c.maximum
+            } for category, c in category_stats]
         },
         'metadata': {
             'source': 'deterministic_analytics',
@@ -500,7 +418,11 @@ def get_kpi_summary():
 
 @analytics_api.route('/api/analytics/aggregate', methods=['POST'])
 def aggregate_data():
-    """Generic aggregation endpoint for flexible queries"""
+    """
+    Generic aggregation endpoint for flexible queries
+    metric 'revenue' (default) or 'kpi_value' is answered from the analytics cube;
+    other Account columns and group-bys fall back to SQL
+    """
     customer_id = get_current_customer_id()
     data = request.json
     
@@ -510,51 +432,28 @@ def aggregate_data():
     group_by = data.get('group_by', [])
     
     try:
-        # Build base query
-        if operation == 'count':
-            agg_func = func.count(Account.account_id)
+        if operation not in OPERATIONS:
+            return jsonify({'error': f'Invalid operation: {operation}'}), 400
+        
+        kpi_metric = metric == METRIC_KPI_VALUE
+        if kpi_metric:
+            group_cols = [col for col in group_by if col in AGGREGATE_DIMENSIONS]
         else:
-            column = getattr(Account, metric, Account.revenue)
-            if operation == 'sum':
-                agg_func = func.sum(column)
-            elif operation == 'avg':
-                agg_func = func.avg(column)
-            elif operation == 'min':
-                agg_func = func.min(column)
-            elif operation == 'max':
-                agg_func = func.max(column)
-            else:
-                return jsonify({'error': f'Invalid operation: {operation}'}), 400
+            group_cols = [col for col in group_by if hasattr(Account, col) or col == 'status']
+            if (hasattr(Account, metric) and metric != METRIC_REVENUE) or \
+                    any(AGGREGATE_DIMENSIONS.get(col) not in ACCOUNT_DIMENSION_COLUMNS for col in group_cols):
+                return _aggregate_sql(customer_id, metric, operation, filters, group_by)
+        
+        groups = _aggregate_cube(customer_id, kpi_metric, [AGGREGATE_DIMENSIONS[col] for col in group_cols], filters)
         
-        # Build grouped query if needed
         if group_by:
-            group_cols = [getattr(Account, col) for col in group_by if hasattr(Account, col)]
-            query = db.session.query(*group_cols, agg_func.label('value')).filter(
-                Account.customer_id == customer_id
-            )
-            
-            # Apply filters
-            if filters.get('industry'):
-                query = query.filter(Account.industry == filters['industry'])
-            if filters.get('region'):
-                query = query.filter(Account.region == filters['region'])
-            if filters.get('status'):
-                query = query.filter(Account.account_status == filters['status'])
-            if filters.get('min_revenue'):
-                query = query.filter(Account.revenue >= filters['min_revenue'])
-            if filters.get('max_revenue'):
-                query = query.filter(Account.revenue <= filters['max_revenue'])
-            
-            query = query.group_by(*group_cols)
-            results = query.all()
-            
             return jsonify({
                 'query_type': 'aggregate_grouped',
                 'customer_id': customer_id,
                 'result': [{
-                    **{col: getattr(r, col) for col in group_by if hasattr(r, col)},
-                    'value': float(r.value or 0)
-                } for r in results],
+                    **dict(zip(group_cols, key)),
+                    'value': float(m.value(operation) or 0)
+                } for key, m in sorted(groups.items(), key=lambda g: [str(v) for v in g[0]])],
                 'metadata': {
                     'metric': metric,
                     'operation': operation,
@@ -565,46 +464,140 @@ def aggregate_data():
                     'timestamp': datetime.utcnow().isoformat()
                 }
             })
-        else:
-            # Single aggregation
-            query = db.session.query(agg_func).filter(
-                Account.customer_id == customer_id
-            )
-            
-            # Apply filters
-            if filters.get('industry'):
-                query = query.filter(Account.industry == filters['industry'])
-            if filters.get('region'):
-                query = query.filter(Account.region == filters['region'])
-            if filters.get('status'):
-                query = query.filter(Account.account_status == filters['status'])
-            if filters.get('min_revenue'):
-                query = query.filter(Account.revenue >= filters['min_revenue'])
-            if filters.get('max_revenue'):
-                query = query.filter(Account.revenue <= filters['max_revenue'])
-            
-            result = query.scalar() or 0
-            
-            return jsonify({
-                'query_type': 'aggregate_single',
-                'customer_id': customer_id,
-                'result': {
-                    'value': float(result),
-                    'operation': operation,
-                    'metric': metric
-                },
-                'metadata': {
-                    'filters': filters,
-                    'source': 'deterministic_analytics',
-                    'precision': 'exact',
-                    'timestamp': datetime.utcnow().isoformat()
-                }
-            })
+        
+        result = groups[()].value(operation) if () in groups else 0
+        
+        return jsonify({
+            'query_type': 'aggregate_single',
+            'customer_id': customer_id,
+            'result': {
+                'value': float(result or 0),
+                'operation': operation,
+                'metric': metric
+            },
+            'metadata': {
+                'filters': filters,
+                'source': 'deterministic_analytics',
+                'precision': 'exact',
+                'timestamp': datetime.utcnow().isoformat()
+            }
+        })
     
     except Exception as e:
         return jsonify({'error': f'Aggregation failed: {str(e)}'}), 500
 
 
+def _aggregate_cube(customer_id: int, kpi_metric: bool, dimensions: List[str], filters: Dict):
+    """Cube groups {dimension values: Measure} for /api/analytics/aggregate"""
+    cube = analytics_cube.get(customer_id)
+    dimension_filters = _account_filters(filters.get('industry'), filters.get('region'), filters.get('status'))
+    if kpi_metric:
+        dimension_filters.update({d: filters[d] for d in KPI_DIMENSIONS[3:] if filters.get(d)})
+    
+    if filters.get('min_revenue') or filters.get('max_revenue'):
+        accounts = cube.accounts_in_revenue_range(
+            float(filters['min_revenue']) if filters.get('min_revenue') else None,
+            float(filters['max_revenue']) if filters.get('max_revenue') else None
+        )
+        metric = METRIC_KPI_VALUE if kpi_metric else METRIC_REVENUE
+        return cube.aggregate_accounts(accounts, metric, dimensions, dimension_filters)
+    if kpi_metric:
+        return cube.kpis_by(dimensions, dimension_filters)
+    return cube.accounts_by(dimensions, dimension_filters)
+
+
+def _aggregate_sql(customer_id: int, metric: str, operation: str, filters: Dict, group_by: List[str]):
+    """/api/analytics/aggregate over Account columns the cube doesn't hold"""
+    # Build base query
+    if operation == 'count':
+        agg_func = func.count(Account.account_id)
+    else:
+        column = getattr(Account, metric, Account.revenue)
+        if operation == 'sum':
+            agg_func = func.sum(column)
+        elif operation == 'avg':
+            agg_func = func.avg(column)
+        elif operation == 'min':
+            agg_func = func.min(column)
+        else:
+            agg_func = func.max(column)
+    
+    # Build grouped query if needed
+    if group_by:
+        group_cols = [getattr(Account, col) for col in group_by if hasattr(Account, col)]
+        query = db.session.query(*group_cols, agg_func.label('value')).filter(
+            Account.customer_id == customer_id
+        )
+        
+        # Apply filters
+        if filters.get('industry'):
+            query = query.filter(Account.industry == filters['industry'])
+        if filters.get('region'):
+            query = query.filter(Account.region == filters['region'])
+        if filters.get('status'):
+            query = query.filter(Account.account_status == filters['status'])
+        if filters.get('min_revenue'):
+            query = query.filter(Account.revenue >= filters['min_revenue'])
+        if filters.get('max_revenue'):
+            query = query.filter(Account.revenue <= filters['max_revenue'])
+        
+        query = query.group_by(*group_cols)
+        results = query.all()
+        
+        return jsonify({
+            'query_type': 'aggregate_grouped',
+            'customer_id': customer_id,
+            'result': [{
+                **{col: getattr(r, col) for col in group_by if hasattr(r, col)},
+                'value': float(r.value or 0)
+            } for r in results],
+            'metadata': {
+                'metric': metric,
+                'operation': operation,
+                'group_by': group_by,
+                'filters': filters,
+                'source': 'deterministic_analytics',
+                'precision': 'exact',
+                'timestamp': datetime.utcnow().isoformat()
+            }
+        })
+    else:
+        # Single aggregation
+        query = db.session.query(agg_func).filter(
+            Account.customer_id == customer_id
+        )
+        
+        # Apply filters
+        if filters.get('industry'):
+            query = query.filter(Account.industry == filters['industry'])
+        if filters.get('region'):
+            query = query.filter(Account.region == filters['region'])
+        if filters.get('status'):
+            query = query.filter(Account.account_status == filters['status'])
+        if filters.get('min_revenue'):
+            query = query.filter(Account.revenue >= filters['min_revenue'])
+        if filters.get('max_revenue'):
+            query = query.filter(Account.revenue <= filters['max_revenue'])
+        
+        result = query.scalar() or 0
+        
+        return jsonify({
+            'query_type': 'aggregate_single',
+            'customer_id': customer_id,
+            'result': {
+                'value': float(result),
+                'operation': operation,
+                'metric': metric
+            },
+            'metadata': {
+                'filters': filters,
+                'source': 'deterministic_analytics',
+                'precision': 'exact',
+                'timestamp': datetime.utcnow().isoformat()
+            }
+        })
+
+
 # ==================== STATISTICS ====================
 
 @analytics_api.route('/api/analytics/statistics', methods=['GET'])
@@ -612,51 +605,34 @@ def get_statistics():
     """Get comprehensive statistics for customer data"""
     customer_id = get_current_customer_id()
     
+    cube = analytics_cube.get(customer_id)
+    
     # Revenue statistics
-    revenue_stats = db.session.query(
-        func.sum(Account.revenue).label('total'),
-        func.avg(Account.revenue).label('average'),
-        func.min(Account.revenue).label('minimum'),
-        func.max(Account.revenue).label('maximum'),
-        func.count(Account.account_id).label('count')
-    ).filter(
-        Account.customer_id == customer_id
-    ).first()
+    revenue_stats = cube.account_totals()
     
     # Account statistics
-    account_count_by_status = db.session.query(
-        Account.account_status,
-        func.count(Account.account_id).label('count')
-    ).filter(
-        Account.customer_id == customer_id
-    ).group_by(
-        Account.account_status
-    ).all()
+    account_count_by_status = _sorted_groups(cube.accounts_by(['status']), lambda m: m.count)
     
     # KPI statistics
-    kpi_count = db.session.query(func.count(KPI.kpi_id)).join(
-        Account, KPI.account_id == Account.account_id
-    ).filter(
-        Account.customer_id == customer_id
-    ).scalar()
+    kpi_count = cube.kpi_totals().count
     
     return jsonify({
         'query_type': 'comprehensive_statistics',
         'customer_id': customer_id,
         'result': {
             'revenue': {
-                'total': float(revenue_stats.total or 0),
-                'average': float(revenue_stats.average or 0),
+                'total': float(revenue_stats.sum or 0),
+                'average': float(revenue_stats.avg or 0),
                 'minimum': float(revenue_stats.minimum or 0),
                 'maximum': float(revenue_stats.maximum or 0),
-                'formatted_total': f"${revenue_stats.total or 0:,.2f}"
+                'formatted_total': f"${revenue_stats.sum or 0:,.2f}"
             },
             'accounts': {
                 'total': revenue_stats.count,
                 'by_status': [{
-                    'status': s.account_status,
+                    'status': status,
                     'count': s.count
-                } for s in account_count_by_status]
+                } for status, s in account_count_by_status]
             },
             'kpis': {
                 'total': kpi_count
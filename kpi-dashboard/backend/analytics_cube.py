@@ -0,0 +1,540 @@
+#!/usr/bin/env python3
+"""
+Analytics Cube
+Per-tenant pre-aggregated measures behind the /api/analytics/* endpoints.
+
+Dimensions: industry, region, status (account) and category, impact_level (KPI).
+Measures:   count, sum, min, max and avg of Account.revenue and of KPI values
+            (KPI.value_numeric, i.e. parsed KPIs only).
+
+A tenant's cube is built on first read with two queries (its accounts, and its
+KPIs grouped by account/category/impact_level) at the customer's data version
+(see tenant_data_version), and then kept current by SQLAlchemy session events:
+- ORM inserts/updates/deletes of Account and KPI rows are captured at flush and
+  applied to the cells when the transaction commits (discarded on rollback)
+- bulk ORM statements (Query.delete/update, insert()) on accounts or kpis drop
+  the affected cubes at commit, which are then rebuilt on the next read
+- removing the current min/max of a cell also drops the tenant's cube, since
+  the new extreme can't be derived from the cell alone
+- the data version bump that follows a committed write moves the cube to the
+  new version; a version bumped by another process rebuilds it
+
+Writes that bypass the ORM session (raw SQL, other processes) must call
+analytics_cube.invalidate(customer_id); raw writes made inside the session's
+transaction (e.g. COPY) call invalidate_on_commit(session) instead.
+"""
+
+import threading
+import logging
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from decimal import Decimal
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event, func, inspect
+from sqlalchemy.orm import Session
+
+from extensions import db
+from models import Account, KPI
+from tenant_data_version import current_data_version, on_data_version_bump
+
+logger = logging.getLogger(__name__)
+
+ACCOUNT_DIMENSIONS = ('industry', 'region', 'status')
+KPI_DIMENSIONS = ACCOUNT_DIMENSIONS + ('category', 'impact_level')
+
+# Account attribute behind each account dimension
+ACCOUNT_DIMENSION_COLUMNS = {'industry': 'industry', 'region': 'region', 'status': 'account_status'}
+
+METRIC_REVENUE = 'revenue'
+METRIC_KPI_VALUE = 'kpi_value'
+OPERATIONS = ('count', 'sum', 'avg', 'min', 'max')
+
+AccountRow = namedtuple('AccountRow', 'account_id account_name revenue industry region status')
+
+
+class Measure:
+    """count / sum / min / max of one cell; count includes rows without a value (like COUNT(pk))"""
+
+    __slots__ = ('count', 'value_count', 'total', 'minimum', 'maximum')
+
+    def __init__(self, count=0, value_count=0, total=0, minimum=None, maximum=None):
+        self.count = count
+        self.value_count = value_count
+        self.total = total
+        self.minimum = minimum
+        self.maximum = maximum
+
+    @classmethod
+    def of(cls, value) -> 'Measure':
+        if value is None:
+            return cls(count=1)
+        return cls(1, 1, value, value, value)
+
+    @property
+    def sum(self):
+        return self.total if self.value_count else None
+
+    @property
+    def avg(self):
+        return self.total / self.value_count if self.value_count else None
+
+    def value(self, operation: str):
+        """Measure value for an aggregate operation ('count', 'sum', 'avg', 'min', 'max')"""
+        if operation == 'count':
+            return self.count
+        if operation == 'sum':
+            return self.sum
+        if operation == 'avg':
+            return self.avg
+        return self.minimum if operation == 'min' else self.maximum
+
+    def merge(self, other: 'Measure'):
+        self.count += other.count
+        if other.value_count:
+            self.value_count += other.value_count
+            self.total += other.total
+            self.minimum = other.minimum if self.minimum is None else min(self.minimum, other.minimum)
+            self.maximum = other.maximum if self.maximum is None else max(self.maximum, other.maximum)
+
+    def unmerge(self, other: 'Measure') -> bool:
+        """Subtract other; False when the remaining min/max can no longer be trusted"""
+        self.count -= other.count
+        if not other.value_count:
+            return True
+        self.value_count -= other.value_count
+        self.total -= other.total
+        if not self.value_count:
+            self.total, self.minimum, self.maximum = 0, None, None
+            return True
+        return other.minimum != self.minimum and other.maximum != self.maximum
+
+
+def _rollup(cells: Dict[Tuple, Measure], dimensions: Tuple[str, ...], group_by: Iterable[str],
+            filters: Optional[Dict] = None) -> Dict[Tuple, Measure]:
+    """Merge cells matching filters ({dimension: value}) into groups keyed by the group_by values"""
+    positions = [dimensions.index(d) for d in group_by]
+    matches = [(dimensions.index(d), v) for d, v in (filters or {}).items()]
+    groups = {}
+    for key, measure in cells.items():
+        if all(key[p] == v for p, v in matches):
+            groups.setdefault(tuple(key[p] for p in positions), Measure()).merge(measure)
+    return groups
+
+
+def _revenue(value) -> Optional[Decimal]:
+    if value is None or isinstance(value, Decimal):
+        return value
+    return Decimal(str(value))
+
+
+def _account_key(row: AccountRow) -> Tuple:
+    return row.industry, row.region, row.status
+
+
+def _rank_key(row: AccountRow) -> Tuple:
+    # Ascending order; accounts without revenue rank lowest, ties by account_id
+    return (row.revenue is not None, row.revenue or 0, -row.account_id)
+
+
+class TenantCube:
+    """
+    One customer's cube:
+    - account cells  {(industry, region, status): revenue Measure}
+    - KPI cells      {(industry, region, status, category, impact_level): value Measure}
+    - the accounts, their KPI measures by (category, impact_level), and a revenue ranking
+    """
+
+    def __init__(self, customer_id: int, version: int = 0):
+        self.customer_id = customer_id
+        self.version = version
+        self.account_cells: Dict[Tuple, Measure] = {}
+        self.kpi_cells: Dict[Tuple, Measure] = {}
+        self.accounts: Dict[int, AccountRow] = {}
+        self.account_kpis: Dict[int, Dict[Tuple, Measure]] = {}
+        self.ranking: List[Tuple] = []
+        self._lock = threading.RLock()
+
+    # ---------- maintenance (False = cube can't be kept exact, rebuild it) ----------
+
+    def add_account(self, row: AccountRow):
+        with self._lock:
+            self.accounts[row.account_id] = row
+            self.account_cells.setdefault(_account_key(row), Measure()).merge(Measure.of(row.revenue))
+            self.ranking.insert(bisect_left(self.ranking, _rank_key(row)), _rank_key(row))
+            for (category, impact_level), measure in self.account_kpis.get(row.account_id, {}).items():
+                self.kpi_cells.setdefault(_account_key(row) + (category, impact_level), Measure()).merge(measure)
+
+    def remove_account(self, account_id: int, keep_kpis: bool = False) -> bool:
+        with self._lock:
+            row = self.accounts.pop(account_id, None)
+            if row is None:
+                return True
+            exact = self._unmerge(self.account_cells, _account_key(row), Measure.of(row.revenue))
+            del self.ranking[bisect_left(self.ranking, _rank_key(row))]
+            kpis = self.account_kpis.get(account_id, {}) if keep_kpis else self.account_kpis.pop(account_id, {})
+            for (category, impact_level), measure in kpis.items():
+                exact &= self._unmerge(self.kpi_cells, _account_key(row) + (category, impact_level), measure)
+            return exact
+
+    def update_account(self, row: AccountRow) -> bool:
+        with self._lock:
+            exact = self.remove_account(row.account_id, keep_kpis=True)
+            self.add_account(row)
+            return exact
+
+    def add_kpi(self, account_id: int, category, impact_level, value: Optional[float]):
+        with self._lock:
+            row = self.accounts.get(account_id)
+            if row is None:
+                return
+            measure = Measure.of(value)
+            self.account_kpis.setdefault(account_id, {}).setdefault((category, impact_level), Measure()).merge(measure)
+            self.kpi_cells.setdefault(_account_key(row) + (category, impact_level), Measure()).merge(measure)
+
+    def remove_kpi(self, account_id: int, category, impact_level, value: Optional[float]) -> bool:
+        with self._lock:
+            row = self.accounts.get(account_id)
+            if row is None:
+                return True
+            measure = Measure.of(value)
+            exact = self._unmerge(self.account_kpis.get(account_id, {}), (category, impact_level), measure)
+            if not self.account_kpis.get(account_id):
+                self.account_kpis.pop(account_id, None)
+            return self._unmerge(self.kpi_cells, _account_key(row) + (category, impact_level), measure) and exact
+
+    @staticmethod
+    def _unmerge(cells: Dict[Tuple, Measure], key: Tuple, measure: Measure) -> bool:
+        cell = cells.get(key)
+        if cell is None:
+            return False
+        exact = cell.unmerge(measure)
+        if cell.count <= 0:
+            del cells[key]
+        return exact
+
+    # ---------- queries ----------
+
+    def accounts_by(self, group_by: Iterable[str] = (), filters: Optional[Dict] = None) -> Dict[Tuple, Measure]:
+        """Revenue measures of accounts matching filters, grouped by account dimensions"""
+        with self._lock:
+            return _rollup(self.account_cells, ACCOUNT_DIMENSIONS, group_by, filters)
+
+    def kpis_by(self, group_by: Iterable[str] = (), filters: Optional[Dict] = None) -> Dict[Tuple, Measure]:
+        """KPI value measures matching filters, grouped by KPI dimensions"""
+        with self._lock:
+            return _rollup(self.kpi_cells, KPI_DIMENSIONS, group_by, filters)
+
+    def account_totals(self, filters: Optional[Dict] = None) -> Measure:
+        return self.accounts_by((), filters).get((), Measure())
+
+    def kpi_totals(self, filters: Optional[Dict] = None) -> Measure:
+        return self.kpis_by((), filters).get((), Measure())
+
+    def accounts_with_kpis(self) -> int:
+        with self._lock:
+            return len(self.account_kpis)
+
+    def account_kpi_count(self, account_id: int) -> int:
+        with self._lock:
+            return sum(m.count for m in self.account_kpis.get(account_id, {}).values())
+
+    def top_accounts(self, limit: int) -> List[AccountRow]:
+        """Accounts by revenue, highest first"""
+        with self._lock:
+            keys = self.ranking[-limit:][::-1] if limit > 0 else []
+            return [self.accounts[-negated_id] for _, _, negated_id in keys]
+
+    def accounts_in_revenue_range(self, min_revenue=None, max_revenue=None) -> List[AccountRow]:
+        """Accounts with min_revenue <= revenue <= max_revenue (bounds optional, NULL revenue excluded)"""
+        with self._lock:
+            lo = bisect_left(self.ranking, (True, min_revenue, float('-inf'))) if min_revenue is not None \
+                else bisect_left(self.ranking, (True,))
+            hi = bisect_right(self.ranking, (True, max_revenue, float('inf'))) if max_revenue is not None \
+                else len(self.ranking)
+            return [self.accounts[-negated_id] for _, _, negated_id in self.ranking[lo:hi]]
+
+    def aggregate_accounts(self, rows: Iterable[AccountRow], metric: str, group_by: Iterable[str],
+                           filters: Optional[Dict] = None) -> Dict[Tuple, Measure]:
+        """Group the given accounts' revenue (or KPI value) measures, for filters the cells can't answer"""
+        group_by = list(group_by)
+        dimensions = ACCOUNT_DIMENSIONS if metric == METRIC_REVENUE else KPI_DIMENSIONS
+        positions = [dimensions.index(d) for d in group_by]
+        matches = [(dimensions.index(d), v) for d, v in (filters or {}).items()]
+        groups = {}
+        with self._lock:
+            for row in rows:
+                if metric == METRIC_REVENUE:
+                    cells = {_account_key(row): Measure.of(row.revenue)}
+                else:
+                    cells = {_account_key(row) + key: m for key, m in self.account_kpis.get(row.account_id, {}).items()}
+                for key, measure in cells.items():
+                    if all(key[p] == v for p, v in matches):
+                        groups.setdefault(tuple(key[p] for p in positions), Measure()).merge(measure)
+        return groups
+
+
+def load_tenant_cube(customer_id: int) -> TenantCube:
+    """Build a customer's cube from the database (one account query, one grouped KPI query)"""
+    cube = TenantCube(customer_id, current_data_version(customer_id))
+    accounts = db.session.query(
+        Account.account_id, Account.account_name, Account.revenue,
+        Account.industry, Account.region, Account.account_status
+    ).filter(Account.customer_id == customer_id).all()
+
+    kpi_groups = db.session.query(
+        KPI.account_id, KPI.category, KPI.impact_level,
+        func.count(KPI.kpi_id).label('count'),
+        func.count(KPI.value_numeric).label('value_count'),
+        func.sum(KPI.value_numeric).label('total'),
+        func.min(KPI.value_numeric).label('minimum'),
+        func.max(KPI.value_numeric).label('maximum')
+    ).join(
+        Account, KPI.account_id == Account.account_id
+    ).filter(
+        Account.customer_id == customer_id
+    ).group_by(
+        KPI.account_id, KPI.category, KPI.impact_level
+    ).all()
+
+    for g in kpi_groups:
+        cube.account_kpis.setdefault(g.account_id, {})[(g.category, g.impact_level)] = Measure(
+            g.count, g.value_count, float(g.total or 0), g.minimum, g.maximum
+        )
+    for a in accounts:
+        cube.add_account(AccountRow(a.account_id, a.account_name, _revenue(a.revenue),
+                                    a.industry, a.region, a.account_status))
+    logger.info(f"Analytics cube built for customer {customer_id}: {len(accounts)} accounts, "
+                f"{len(cube.account_cells)} account cells, {len(cube.kpi_cells)} KPI cells")
+    return cube
+
+
+class AnalyticsCubeStore:
+    """Per-process {customer_id: TenantCube}, built on demand and maintained from session events"""
+
+    def __init__(self, loader: Callable[[int], TenantCube] = load_tenant_cube):
+        self._loader = loader
+        self._cubes: Dict[int, TenantCube] = {}
+        self._account_tenants: Dict[int, int] = {}
+        self._lock = threading.RLock()
+        self._generation = 0
+        self.stats = {'loads': 0, 'hits': 0, 'invalidations': 0, 'changes': 0}
+
+    def get(self, customer_id: int) -> TenantCube:
+        cube = self._cubes.get(customer_id)
+        if cube is not None and cube.version == current_data_version(customer_id):
+            self.stats['hits'] += 1
+            return cube
+
+        generation = self._generation
+        cube = self._loader(customer_id)
+        self.stats['loads'] += 1
+        with self._lock:
+            # Don't keep a cube that raced with a committed change
+            if generation == self._generation:
+                self._cubes[customer_id] = cube
+                self._account_tenants.update((account_id, customer_id) for account_id in cube.accounts)
+        return cube
+
+    def invalidate(self, customer_id: Optional[int] = None):
+        """Drop one customer's cube, or every cube"""
+        with self._lock:
+            if customer_id is None:
+                self._cubes = {}
+                self._account_tenants = {}
+            else:
+                cube = self._cubes.pop(customer_id, None)
+                for account_id in (cube.accounts if cube else ()):
+                    self._account_tenants.pop(account_id, None)
+            self._generation += 1
+            self.stats['invalidations'] += 1
+
+    def data_version_bumped(self, customer_id: int, old_version: int, new_version: int):
+        """Move a cube to the new version when it was current at the previous one"""
+        with self._lock:
+            cube = self._cubes.get(customer_id)
+            if cube is not None and cube.version == old_version:
+                cube.version = new_version
+
+    def tenant_of_account(self, account_id) -> Optional[int]:
+        return self._account_tenants.get(account_id)
+
+    def is_loaded(self, customer_id) -> bool:
+        return customer_id in self._cubes
+
+    def apply(self, changes: List[Tuple]):
+        """
+        Apply committed changes captured by _capture_flush:
+        ('account', old AccountRow|None, new AccountRow|None, customer_id)
+        ('kpi', old (account_id, category, impact_level, value)|None, new ...|None)
+        ('invalidate', customer_id|None)   - rebuild one customer's cube, or all
+        ('invalidate_account', account_id) - rebuild the cube holding the account
+        """
+        stale = set()
+        with self._lock:
+            self._generation += 1
+            for change in changes:
+                self.stats['changes'] += 1
+                if change[0] == 'invalidate':
+                    stale.add(change[1])
+                    if change[1] is None:
+                        break
+                elif change[0] == 'invalidate_account':
+                    customer_id = self._account_tenants.get(change[1])
+                    if customer_id is not None:
+                        stale.add(customer_id)
+                elif change[0] == 'account':
+                    self._apply_account(*change[1:], stale)
+                else:
+                    self._apply_kpi(*change[1:], stale)
+            for customer_id in (None,) if None in stale else stale:
+                self.invalidate(customer_id)
+
+    def _apply_account(self, old: Optional[AccountRow], new: Optional[AccountRow], customer_id, stale: set):
+        if customer_id in stale or customer_id not in self._cubes:
+            return
+        cube = self._cubes[customer_id]
+        if new is None:
+            exact = cube.remove_account(old.account_id)
+            self._account_tenants.pop(old.account_id, None)
+        elif old is None:
+            cube.add_account(new)
+            self._account_tenants[new.account_id] = customer_id
+            exact = True
+        else:
+            exact = cube.update_account(new)
+        if not exact:
+            stale.add(customer_id)
+
+    def _apply_kpi(self, old: Optional[Tuple], new: Optional[Tuple], stale: set):
+        for sign, kpi in ((-1, old), (1, new)):
+            if kpi is None:
+                continue
+            customer_id = self._account_tenants.get(kpi[0])
+            if customer_id is None or customer_id in stale or customer_id not in self._cubes:
+                continue
+            if sign > 0:
+                self._cubes[customer_id].add_kpi(*kpi)
+            elif not self._cubes[customer_id].remove_kpi(*kpi):
+                stale.add(customer_id)
+
+
+analytics_cube = AnalyticsCubeStore()
+on_data_version_bump(analytics_cube.data_version_bumped)
+
+
+# ==================== SESSION EVENTS ====================
+
+_UNKNOWN = object()
+_ACCOUNT_FIELDS = ('account_id', 'account_name', 'revenue', 'industry', 'region', 'account_status', 'customer_id')
+_KPI_FIELDS = ('account_id', 'category', 'impact_level', 'value_numeric')
+_PENDING_KEY = 'analytics_cube_changes'
+
+
+def _new_state(obj, fields: Tuple[str, ...]) -> Tuple:
+    """Attribute values of a just-inserted object (attributes never set are NULL)"""
+    values = obj.__dict__
+    return tuple(values.get(field) for field in fields)
+
+
+def _states(obj, fields: Tuple[str, ...]) -> Tuple[Optional[Tuple], Optional[Tuple]]:
+    """
+    (values before this flush, values after it) of a persistent object, read from
+    attribute history without loading anything; either is None when an attribute
+    was never loaded
+    """
+    attrs = inspect(obj).attrs
+    old, new = [], []
+    for field in fields:
+        history = attrs[field].history
+        after = obj.__dict__.get(field, _UNKNOWN)
+        if history.deleted:
+            before = history.deleted[0]
+        elif history.added:
+            before = _UNKNOWN  # assigned without its previous value being loaded
+        else:
+            before = after
+        old.append(before)
+        new.append(after)
+    return (None if _UNKNOWN in old else tuple(old)), (None if _UNKNOWN in new else tuple(new))
+
+
+def _account_row(values: Tuple) -> AccountRow:
+    account_id, name, revenue, industry, region, status, _ = values
+    return AccountRow(account_id, name, _revenue(revenue), industry, region, status)
+
+
+def _capture_account(obj, kind: str) -> List[Tuple]:
+    if kind == 'new':
+        new = _new_state(obj, _ACCOUNT_FIELDS)
+        return [('account', None, _account_row(new), new[-1])]
+    old, new = _states(obj, _ACCOUNT_FIELDS)
+    if kind == 'deleted':
+        new = None
+    elif old == new:
+        return []
+    if old is None or (new is not None and (old[0], old[-1]) != (new[0], new[-1])):
+        # Unknown previous state, or the row moved: rebuild whichever cubes held it
+        return [('invalidate_account', obj.__dict__.get('account_id'))] + \
+            ([('invalidate', new[-1])] if new is not None else [])
+    return [('account', _account_row(old), new and _account_row(new), old[-1])]
+
+
+def _capture_kpi(obj, kind: str) -> List[Tuple]:
+    if kind == 'new':
+        return [('kpi', None, _new_state(obj, _KPI_FIELDS))]
+    old, new = _states(obj, _KPI_FIELDS)
+    if kind == 'deleted':
+        new = None
+    elif old == new:
+        return []
+    if old is None:
+        return [('invalidate_account', obj.__dict__.get('account_id'))]
+    return [('kpi', old, new)]
+
+
+@event.listens_for(Session, 'after_flush')
+def _capture_flush(session, flush_context):
+    """Record the Account/KPI changes of this flush; _apply_on_commit applies them"""
+    accounts, kpis, deleted_accounts = [], [], []
+    for kind, objects in (('new', session.new), ('dirty', session.dirty), ('deleted', session.deleted)):
+        for obj in objects:
+            if isinstance(obj, KPI):
+                kpis.extend(_capture_kpi(obj, kind))
+            elif isinstance(obj, Account):
+                (deleted_accounts if kind == 'deleted' else accounts).extend(_capture_account(obj, kind))
+    # Accounts must exist before their KPIs are added, and lose their KPIs before they go
+    changes = accounts + kpis + deleted_accounts
+    if changes:
+        session.info.setdefault(_PENDING_KEY, []).extend(changes)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _capture_bulk_statement(orm_execute_state):
+    """Bulk DML on accounts/kpis bypasses the flush; drop every cube at commit"""
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    table = getattr(orm_execute_state.statement, 'table', None)
+    if (mapper is not None and mapper.class_ in (Account, KPI)) or table in (Account.__table__, KPI.__table__):
+        orm_execute_state.session.info.setdefault(_PENDING_KEY, []).append(('invalidate', None))
+
+
+def invalidate_on_commit(session):
+    """Drop every cube when the session commits, for raw account/KPI writes the session can't see"""
+    session.info.setdefault(_PENDING_KEY, []).append(('invalidate', None))
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_on_commit(session):
+    changes = session.info.pop(_PENDING_KEY, None)
+    if changes:
+        analytics_cube.apply(changes)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_on_rollback(session, previous_transaction):
+    changes = session.info.pop(_PENDING_KEY, None)
+    if changes and session.in_transaction():
+        # A savepoint rolled back inside a live transaction: which changes survive is unknown
+        session.info[_PENDING_KEY] = [('invalidate', None)]
@@ -44,6 +44,10 @@ CORS(app, origins=['http://localhost:8005', 'http://localhost:3000'], supports_c
 db.init_app(app)
 migrate = Migrate(app, db)
 
+# SQL profiling per request (SQL_PROFILER_ENABLED=true, or X-Profile-SQL: 1 from an admin or with SQL_PROFILER_ALLOW_HEADER=true)
+from request_profiler import request_profiler
+request_profiler.init_app(app)
+
 import models
 from models import Customer, User, Account, KPIUpload, KPI, CustomerConfig
 from upload_api import upload_api
@@ -82,6 +86,7 @@ from registration_api import registration_api
 from kpi_reference_ranges_api import kpi_reference_ranges_api
 from customer_performance_summary_api import customer_perf_summary_api
 from api_routes_dc import api_routes_dc
+from debug_perf_api import debug_perf_api
 from agents.signal_analyst_api import signal_analyst_api
 
 # Initialize Chroma client and collection for KPI VDB (lazy loading)
@@ -143,6 +148,7 @@ app.register_blueprint(registration_api)
 app.register_blueprint(kpi_reference_ranges_api)
 app.register_blueprint(customer_perf_summary_api)
 app.register_blueprint(api_routes_dc)
+app.register_blueprint(debug_perf_api)
 app.register_blueprint(signal_analyst_api)
 
 @app.route('/')
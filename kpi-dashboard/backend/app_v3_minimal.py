@@ -110,6 +110,10 @@ except ImportError:
     activity_logger = DummyActivityLogger()
 init_auth_middleware(app)
 
+# SQL profiling per request (SQL_PROFILER_ENABLED=true, or X-Profile-SQL: 1 from an admin or with SQL_PROFILER_ALLOW_HEADER=true)
+from request_profiler import request_profiler
+request_profiler.init_app(app)
+
 # Validate OpenAI API key support on startup
 try:
     from validate_openai_key_support import validate_openai_key_support
@@ -177,6 +181,7 @@ from enhanced_rag_openai_api import enhanced_rag_openai_api
 from secure_file_api import secure_file_api
 from master_file_api import master_file_api
 from account_snapshot_api import account_snapshot_api
+from debug_perf_api import debug_perf_api
 
 # Optional RAG APIs - only register if dependencies are available
 try:
@@ -255,6 +260,7 @@ app.register_blueprint(data_quality_api)
 app.register_blueprint(customer_profile_api)
 app.register_blueprint(enhanced_rag_openai_api)
 app.register_blueprint(master_file_api)
+app.register_blueprint(debug_perf_api)
 
 # Register optional RAG APIs only if available
 if HAS_HISTORICAL_RAG:
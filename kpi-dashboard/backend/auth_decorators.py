@@ -5,7 +5,7 @@ Provides secure authentication for all API endpoints
 """
 
 from functools import wraps
-from flask import request, jsonify, session
+from flask import current_app, request, jsonify, session
 from flask_login import current_user
 import logging
 
@@ -102,6 +102,18 @@ def get_current_user():
     return current_user
 
 
+def has_login_manager():
+    """Whether the app has Flask-Login set up (current_user can't be used otherwise)"""
+    return getattr(current_app, 'login_manager', None) is not None
+
+
+def is_admin_session():
+    """True when the request comes from a logged-in admin user"""
+    if not has_login_manager():
+        return False
+    return bool(current_user.is_authenticated and getattr(current_user, 'is_admin', False))
+
+
 def admin_required(f):
     """
     Decorator for admin-only endpoints.
@@ -115,10 +127,18 @@ def admin_required(f):
     """
     @wraps(f)
     def decorated_function(*args, **kwargs):
+        # Without Flask-Login there are no sessions, so no admins
+        if not has_login_manager():
+            return jsonify({
+                'error': 'Admin access required',
+                'message': 'You do not have permission to access this resource',
+                'status': 'forbidden'
+            }), 403
+
         if not current_user.is_authenticated:
             return jsonify({'error': 'Authentication required'}), 401
         
-        # Check if user is admin (you may need to add is_admin field to User model)
+        # Check if user is admin (users.is_admin)
         if not getattr(current_user, 'is_admin', False):
             logger.warning(f"Non-admin user {current_user.email} attempted to access admin endpoint {request.path}")
             return jsonify({
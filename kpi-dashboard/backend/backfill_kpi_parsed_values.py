@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Backfill KPI.value_numeric / value_unit / value_parse_status for existing rows.
+New and edited KPIs are parsed on write; this fills rows created before the
+columns existed (value_parse_status IS NULL). Safe to re-run.
+
+Pass --reparse to re-parse every row, e.g. after a parser change
+(usage: python backfill_kpi_parsed_values.py [batch_size] [--reparse]).
+"""
+
+import os
+import sys
+from dotenv import load_dotenv
+from flask import Flask
+from sqlalchemy import update
+from extensions import db
+from models import KPI
+from kpi_value_parser import parse_kpi_data_for_storage
+
+load_dotenv('.env')
+
+
+def backfill_kpi_parsed_values(batch_size=1000, reparse=False):
+    """
+    Parse unparsed KPI rows (every row with reparse=True) in primary-key batches.
+    Returns the number of rows updated.
+    """
+    updated = 0
+    last_kpi_id = 0
+
+    while True:
+        query = db.session.query(KPI.kpi_id, KPI.data).filter(KPI.kpi_id > last_kpi_id)
+        if not reparse:
+            query = query.filter(KPI.value_parse_status.is_(None))
+        rows = query.order_by(KPI.kpi_id).limit(batch_size).all()
+        if not rows:
+            break
+
+        params = []
+        for kpi_id, data in rows:
+            value, unit, status = parse_kpi_data_for_storage(data)
+            params.append({
+                'kpi_id': kpi_id,
+                'value_numeric': value,
+                'value_unit': unit,
+                'value_parse_status': status
+            })
+        # Bulk UPDATE by primary key (one executemany per batch)
+        db.session.execute(update(KPI), params)
+        db.session.commit()
+
+        updated += len(params)
+        last_kpi_id = rows[-1].kpi_id
+        print(f"   Parsed {updated} KPIs (last kpi_id={last_kpi_id})")
+
+    return updated
+
+
+if __name__ == '__main__':
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL')
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    reparse = '--reparse' in sys.argv
+    batch_size = int(args[0]) if args else 1000
+    print(f"🔄 {'Re-parsing' if reparse else 'Backfilling'} parsed KPI values (batch size {batch_size})...")
+    with app.app_context():
+        total = backfill_kpi_parsed_values(batch_size, reparse=reparse)
+    print(f"✅ Backfilled {total} KPIs")
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Content-Addressed Blob Store
+Keeps original upload files on disk, keyed by the SHA-256 of their content.
+
+KPIUpload.content_sha256 references a blob instead of holding the bytes, so
+identical files uploaded again (new versions, bulk reloads) are stored once
+and loading uploads never pulls file contents through the database.
+
+Blobs live under BLOB_STORE_DIR as <aa>/<bb>/<sha256>, written to a temporary
+file and renamed into place so readers never see a partial blob. With
+BLOB_STORE_COMPRESSION=zstd (needs the zstandard package) new blobs are stored
+compressed as <sha256>.zst; the key is always the hash of the original bytes.
+A relative BLOB_STORE_DIR is taken from the backend directory, whatever the
+working directory of the app, worker or migration is.
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+from typing import BinaryIO, Optional
+
+from flask import current_app, has_app_context
+
+# Optional: zstandard for compressed blobs
+try:
+    import zstandard as zstd
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+    zstd = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BLOB_STORE_DIR = 'blob_store'
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+COMPRESSED_SUFFIX = '.zst'
+_CHUNK_SIZE = 1024 * 1024
+
+
+class BlobNotFound(Exception):
+    """No blob is stored under the requested hash"""
+
+
+class BlobStore:
+    """Deduplicating, content-addressed file store"""
+
+    def __init__(self, root: str, compression: Optional[str] = None):
+        """
+        root: directory holding the blobs (created on first write)
+        compression: 'zstd' to compress new blobs; falls back to plain files without zstandard
+        """
+        self.root = os.path.abspath(root)
+        self.compression = compression if compression and compression != 'none' else None
+        if self.compression == 'zstd' and not ZSTD_AVAILABLE:
+            logger.warning("BLOB_STORE_COMPRESSION=zstd but zstandard is not installed; storing blobs uncompressed")
+            self.compression = None
+        elif self.compression not in (None, 'zstd'):
+            raise ValueError(f"Unsupported blob compression: {compression}")
+
+    def _path(self, sha256: str) -> str:
+        if len(sha256) != 64 or any(c not in '0123456789abcdef' for c in sha256):
+            raise ValueError(f"Not a SHA-256 hex digest: {sha256!r}")
+        return os.path.join(self.root, sha256[:2], sha256[2:4], sha256)
+
+    def locate(self, sha256: str) -> Optional[str]:
+        """Path of the stored blob (plain or compressed), or None"""
+        path = self._path(sha256)
+        for candidate in (path, path + COMPRESSED_SUFFIX):
+            if os.path.exists(candidate):
+                return candidate
+        return None
+
+    def exists(self, sha256: str) -> bool:
+        return self.locate(sha256) is not None
+
+    def put(self, data: bytes) -> str:
+        """Store bytes (once per content) and return their SHA-256"""
+        sha256 = hashlib.sha256(data).hexdigest()
+        if not self.exists(sha256):
+            self._write(sha256, [data])
+        return sha256
+
+    def put_file(self, file_path: str, sha256: Optional[str] = None) -> str:
+        """Store a file's content without reading it into memory; returns its SHA-256"""
+        if sha256 is None:
+            digest = hashlib.sha256()
+            with open(file_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(_CHUNK_SIZE), b''):
+                    digest.update(chunk)
+            sha256 = digest.hexdigest()
+        if not self.exists(sha256):
+            with open(file_path, 'rb') as f:
+                self._write(sha256, iter(lambda: f.read(_CHUNK_SIZE), b''))
+        return sha256
+
+    def _write(self, sha256: str, chunks):
+        path = self._path(sha256) + (COMPRESSED_SUFFIX if self.compression else '')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                out = zstd.ZstdCompressor().stream_writer(f, closefd=False) if self.compression else f
+                for chunk in chunks:
+                    out.write(chunk)
+                if out is not f:
+                    out.close()
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def open(self, sha256: str) -> BinaryIO:
+        """Readable stream of the original bytes (not seekable for compressed blobs)"""
+        path = self.locate(sha256)
+        if path is None:
+            raise BlobNotFound(sha256)
+        if path.endswith(COMPRESSED_SUFFIX):
+            if not ZSTD_AVAILABLE:
+                raise RuntimeError(f"Blob {sha256} is zstd-compressed but zstandard is not installed")
+            return zstd.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+        return open(path, 'rb')
+
+    def read(self, sha256: str) -> bytes:
+        """The original bytes of a blob"""
+        with self.open(sha256) as f:
+            return f.read()
+
+
+def resolve_blob_store_dir(root: str) -> str:
+    """Absolute blob store directory; relative paths are under the backend directory"""
+    return os.path.normpath(os.path.join(BACKEND_DIR, os.path.expanduser(root)))
+
+
+def get_blob_store() -> BlobStore:
+    """BlobStore configured by BLOB_STORE_DIR / BLOB_STORE_COMPRESSION (app config, then environment)"""
+    config = current_app.config if has_app_context() else {}
+    root = config.get('BLOB_STORE_DIR') or os.getenv('BLOB_STORE_DIR', DEFAULT_BLOB_STORE_DIR)
+    compression = config.get('BLOB_STORE_COMPRESSION') or os.getenv('BLOB_STORE_COMPRESSION', 'none')
+    return BlobStore(resolve_blob_store_dir(root), compression)
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Parallel Bulk File Loader
+Loads a directory of KPI workbooks (one account per file) for a customer.
+
+Workbooks are parsed in a process pool (parsing is CPU-bound) and the parsed
+rows are funnelled to a single writer, the caller's session, which stores each
+file as an account, a KPIUpload and batched KPI inserts (kpi_bulk_writer) in one
+transaction. A file is therefore either fully loaded or not at all.
+
+Every loaded upload records the SHA-256 of its content, so a rerun over the same
+directory skips files that are already ingested (and files that repeat another
+file of the run) and only loads what is missing or failed. A file counts as
+already loaded only for the same account: identical workbooks dropped for two
+accounts are both loaded.
+"""
+
+import glob
+import hashlib
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterable, List, Optional
+
+from extensions import db
+from models import Account, KPIUpload
+from excel_ingest import iter_workbook_kpis
+from kpi_bulk_writer import write_kpis
+from blob_store import get_blob_store
+
+logger = logging.getLogger(__name__)
+
+KPI_FILE_PATTERNS = ('*.xlsx', '*.xls')
+
+
+def file_sha256(file_path: str) -> str:
+    """Hex SHA-256 of a file's content"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def account_name_for_file(file_path: str) -> str:
+    """Account name from a KPI file name (extension and _kpis suffix removed)"""
+    filename = os.path.basename(file_path)
+    return filename.replace('.xlsx', '').replace('.xls', '').replace('_kpis', '').replace('_KPIs', '')
+
+
+def band_kpi_row(kpi_row) -> Dict:
+    """KPI column values of a parsed row, with weight and impact level mapped to their bands"""
+    weight = str(kpi_row.weight or '').lower()
+    weight_value = None
+    if 'weight' in weight:
+        weight_value = 1.0
+    elif 'medium' in weight:
+        weight_value = 0.5
+    elif 'low' in weight:
+        weight_value = 0.25
+
+    impact = str(kpi_row.impact_level or '').lower()
+    impact_value = None
+    if 'high' in impact:
+        impact_value = 'High'
+    elif 'medium' in impact:
+        impact_value = 'Medium'
+    elif 'low' in impact:
+        impact_value = 'Low'
+
+    return kpi_row._replace(weight=weight_value, impact_level=impact_value)._asdict()
+
+
+def parse_kpi_file(file_path: str) -> List[Dict]:
+    """
+    Pool task: banded KPI rows of a workbook (KPI sheets, keeping two-sheet workbooks).
+    Needs no app context.
+    """
+    return [band_kpi_row(kpi_row) for kpi_row in iter_workbook_kpis(file_path, keep_short_workbooks=True)]
+
+
+def store_kpi_file(file_path: str, rows: Iterable[Dict], customer_id: int, user_id: int,
+                   account_name: Optional[str] = None, content_sha256: Optional[str] = None) -> Dict:
+    """
+    Store a parsed file as a new account, its upload record and its KPIs, and commit.
+    Rolls back and raises if the file has no KPI rows.
+    """
+    filename = os.path.basename(file_path)
+    account_name = account_name or account_name_for_file(file_path)
+    content_sha256 = get_blob_store().put_file(file_path, content_sha256)
+    try:
+        account = Account(
+            customer_id=customer_id,
+            account_name=account_name,
+            revenue=0,
+            industry='Unknown',
+            region='Unknown',
+            account_status='active'
+        )
+        db.session.add(account)
+        db.session.flush()
+
+        upload = KPIUpload(
+            customer_id=customer_id,
+            user_id=user_id,
+            version=1,  # Fresh start
+            original_filename=filename,
+            content_sha256=content_sha256,
+            account_id=account.account_id
+        )
+        db.session.add(upload)
+        db.session.flush()
+
+        kpi_write = write_kpis(
+            dict(row, upload_id=upload.upload_id, account_id=account.account_id) for row in rows
+        )
+        if not kpi_write['rows']:
+            raise Exception(f'No valid KPI data found in {filename}')
+        upload.rows_processed = kpi_write['rows']
+
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return {
+        'account_name': account_name,
+        'account_id': account.account_id,
+        'kpi_count': kpi_write['rows'],
+        'upload_id': upload.upload_id
+    }
+
+
+class BulkFileLoader:
+    """Parses a directory of KPI workbooks in a process pool and writes them through one writer"""
+
+    def __init__(self, customer_id: int, user_id: int, workers: Optional[int] = None):
+        """
+        customer_id, user_id: owner of the created accounts and uploads
+        workers: parsing processes (defaults to the CPU count); 1 parses in the caller's process
+        """
+        self.customer_id = customer_id
+        self.user_id = user_id
+        self.workers = workers or os.cpu_count() or 1
+
+    def find_files(self, directory_path: str) -> List[str]:
+        """The KPI workbooks of a directory, sorted"""
+        if not os.path.exists(directory_path):
+            raise Exception(f'Directory not found: {directory_path}')
+        files = []
+        for pattern in KPI_FILE_PATTERNS:
+            files.extend(glob.glob(os.path.join(directory_path, pattern)))
+        return sorted(files)
+
+    def ingested_files(self, hashes: Iterable[str]) -> set:
+        """(content hash, account name) of the customer's completed uploads with one of the hashes"""
+        hashes = list(hashes)
+        if not hashes:
+            return set()
+        return set(db.session.query(KPIUpload.content_sha256, Account.account_name).join(
+            Account, Account.account_id == KPIUpload.account_id
+        ).filter(
+            KPIUpload.customer_id == self.customer_id,
+            KPIUpload.content_sha256.in_(hashes),
+            KPIUpload.phase == 'completed'
+        ).distinct())
+
+    def load_directory(self, directory_path: str) -> Dict:
+        """
+        Load every workbook of the directory not loaded yet. Needs an app context.
+        Returns the totals and a status entry per file (loaded, skipped or failed).
+        """
+        files = self.find_files(directory_path)
+        if not files:
+            raise Exception(f'No Excel files found in directory: {directory_path}')
+        started = time.perf_counter()
+
+        statuses = {file_path: {'file': os.path.basename(file_path), 'status': 'pending'} for file_path in files}
+        hashes = {}
+        for file_path in files:
+            try:
+                hashes[file_path] = statuses[file_path]['sha256'] = file_sha256(file_path)
+            except OSError as e:
+                statuses[file_path].update(status='failed', error=f'Could not read file: {str(e)}')
+
+        # Skip what an earlier run loaded for the same account, and files repeating
+        # another file of this run for the same account (e.g. acme.xlsx and acme_kpis.xlsx)
+        ingested = self.ingested_files(set(hashes.values()))
+        seen = set()
+        pending = []
+        for file_path, content_sha256 in hashes.items():
+            key = (content_sha256, account_name_for_file(file_path))
+            if key in ingested:
+                statuses[file_path].update(status='skipped', reason='already ingested')
+            elif key in seen:
+                statuses[file_path].update(status='skipped', reason='duplicate content')
+            else:
+                seen.add(key)
+                pending.append(file_path)
+
+        for file_path, rows, error in self._parse(pending):
+            status = statuses[file_path]
+            if error:
+                status.update(status='failed', error=f'Failed to parse {status["file"]}: {error}')
+                continue
+            try:
+                stored = store_kpi_file(file_path, rows, self.customer_id, self.user_id,
+                                        content_sha256=hashes[file_path])
+                status.update(status='loaded', **stored)
+            except Exception as e:
+                status.update(status='failed', error=f'Failed to process {status["file"]}: {str(e)}')
+            logger.info(f"Bulk load {status['file']}: {status['status']}")
+
+        return self._summary(files, statuses, time.perf_counter() - started)
+
+    def _parse(self, files: List[str]):
+        """Yield (file_path, rows, error) as files finish parsing"""
+        if self.workers <= 1 or len(files) <= 1:
+            for file_path in files:
+                try:
+                    yield file_path, parse_kpi_file(file_path), None
+                except Exception as e:
+                    yield file_path, None, str(e)
+            return
+
+        # spawn: workers must not inherit the parent's engine and connections
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=min(self.workers, len(files)), mp_context=context) as pool:
+            futures = {pool.submit(parse_kpi_file, file_path): file_path for file_path in files}
+            for future in as_completed(futures):
+                try:
+                    yield futures[future], future.result(), None
+                except Exception as e:
+                    yield futures[future], None, str(e)
+
+    def _summary(self, files: List[str], statuses: Dict[str, Dict], seconds: float) -> Dict:
+        file_statuses = [statuses[file_path] for file_path in files]
+        loaded = [s for s in file_statuses if s['status'] == 'loaded']
+        failed = [s for s in file_statuses if s['status'] == 'failed']
+        kpi_count = sum(s['kpi_count'] for s in loaded)
+        return {
+            'total_files': len(files),
+            'processed_files': len(loaded),
+            'successful_uploads': len(loaded),
+            'skipped_files': sum(1 for s in file_statuses if s['status'] == 'skipped'),
+            'failed_uploads': len(failed),
+            'total_kpis_created': kpi_count,
+            'accounts_created': len(loaded),
+            'seconds': round(seconds, 3),
+            'rows_per_second': round(kpi_count / seconds) if kpi_count and seconds > 0 else 0,
+            'errors': [{'file': s['file'], 'error': s['error']} for s in failed],
+            'files': file_statuses
+        }
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Per-customer Category Weight Cache
+Reads and parses CustomerConfig.category_weights once per customer so health
+scoring does no CustomerConfig queries or JSON parsing per category.
+
+Entries are keyed on the customer's data version (see tenant_data_version), so
+a change committed by any process retires them. Writers must call
+invalidate_tenant_results() (which bumps the version) and
+invalidate_category_weights() after committing a change to category_weights:
+- one customer's config changed  -> invalidate_category_weights(customer_id)
+- bulk/unknown change            -> invalidate_category_weights()  (all tenants)
+"""
+
+import json
+import logging
+from typing import Dict, Optional
+
+from tenant_cache import TenantCache
+
+logger = logging.getLogger(__name__)
+
+
+def _load_weights(customer_id: int) -> Dict[str, float]:
+    """One CustomerConfig read plus one json.loads ({} if none are configured)"""
+    from models import CustomerConfig
+
+    config = CustomerConfig.query.filter_by(customer_id=customer_id).first()
+    if not config or not config.category_weights:
+        return {}
+    return json.loads(config.category_weights)
+
+
+# Global index instance: {customer_id: {category: weight}}
+category_weight_index = TenantCache('category_weights', loader=_load_weights)
+
+
+def get_category_weights(customer_id: int) -> Dict[str, float]:
+    """Parsed category weights for a customer ({} if none are configured)"""
+    return category_weight_index.get(customer_id)
+
+
+def invalidate_category_weights(customer_id: Optional[int] = None):
+    """Invalidate cached category weights after a committed change"""
+    category_weight_index.invalidate(customer_id)
+    logger.info(f"Category weight cache invalidated for customer {customer_id if customer_id is not None else 'ALL'}")
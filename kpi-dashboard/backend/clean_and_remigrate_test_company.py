@@ -190,7 +190,7 @@ def migrate_with_profile_data():
         print("\n📦 Migrating KPI uploads...")
         old_cursor.execute("""
             SELECT upload_id, account_id, user_id, version, original_filename, 
-                   uploaded_at, raw_excel, parsed_json
+                   uploaded_at, content_sha256, parsed_json
             FROM kpi_uploads
             WHERE customer_id = %s
             ORDER BY upload_id
@@ -201,7 +201,7 @@ def migrate_with_profile_data():
         uploads_migrated = 0
         
         for old_upload in old_uploads:
-            old_upload_id, old_acc_id, user_id, version, filename, uploaded_at, raw_excel, parsed_json = old_upload
+            old_upload_id, old_acc_id, user_id, version, filename, uploaded_at, content_sha256, parsed_json = old_upload
             
             # Map account_id
             new_acc_id = account_id_map.get(old_acc_id)
@@ -220,10 +220,10 @@ def migrate_with_profile_data():
             else:
                 new_cursor.execute("""
                     INSERT INTO kpi_uploads (customer_id, account_id, user_id, version,
-                                           original_filename, uploaded_at, raw_excel, parsed_json)
+                                           original_filename, uploaded_at, content_sha256, parsed_json)
                     VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
                     RETURNING upload_id
-                """, (customer_id, new_acc_id, user_id, version, filename, uploaded_at, raw_excel, parsed_json))
+                """, (customer_id, new_acc_id, user_id, version, filename, uploaded_at, content_sha256, parsed_json))
                 new_upload_id = new_cursor.fetchone()[0]
                 new_conn.commit()
                 uploads_migrated += 1
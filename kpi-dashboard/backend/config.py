@@ -117,6 +117,15 @@ class Config:
     RAG_SIMILARITY_THRESHOLD = float(os.getenv('RAG_SIMILARITY_THRESHOLD', '0.3'))
     RAG_TOP_K = int(os.getenv('RAG_TOP_K', '5'))
     MAX_QUERY_LENGTH = int(os.getenv('MAX_QUERY_LENGTH', '1000'))
+    SQL_PROFILER_ENABLED = os.getenv('SQL_PROFILER_ENABLED', 'false').lower() == 'true'
+    SQL_PROFILER_ALLOW_HEADER = os.getenv('SQL_PROFILER_ALLOW_HEADER', 'false').lower() == 'true'
+    SQL_PROFILER_N_PLUS_ONE_THRESHOLD = int(os.getenv('SQL_PROFILER_N_PLUS_ONE_THRESHOLD', '10'))
+    KPI_BULK_BATCH_SIZE = int(os.getenv('KPI_BULK_BATCH_SIZE', '5000'))
+    UPLOAD_JOB_WORKERS = int(os.getenv('UPLOAD_JOB_WORKERS', '2'))
+    UPLOAD_JOB_MAX_PENDING = int(os.getenv('UPLOAD_JOB_MAX_PENDING', '20'))
+    BULK_LOAD_WORKERS = int(os.getenv('BULK_LOAD_WORKERS', str(os.cpu_count() or 1)))
+    BLOB_STORE_DIR = os.getenv('BLOB_STORE_DIR', 'blob_store')  # Relative paths are under the backend directory
+    BLOB_STORE_COMPRESSION = os.getenv('BLOB_STORE_COMPRESSION', 'none')  # none or zstd
     
     # Logging
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
@@ -14,9 +14,15 @@ from models import KPIUpload, KPI, CustomerConfig, Account
 import io
 from datetime import datetime
 from health_score_engine import HealthScoreEngine
+from health_score_batch import BatchHealthScoreEngine
 from health_score_storage import HealthScoreStorageService
+from kpi_value_parser import kpi_number, PARSE_STATUS_PARSED, PARSE_STATUS_EMPTY, PARSE_STATUS_INVALID, PARSE_STATUS_NON_FINITE
+from tenant_result_cache import tenant_result_cache, invalidate_tenant_results
+from tenant_data_version import enable_conditional_get
+from sqlalchemy import and_, or_, case, cast, distinct, exists, func, Float
 
 corporate_api = Blueprint('corporate_api', __name__)
+enable_conditional_get(corporate_api)
 
 @corporate_api.route('/api/corporate/upload', methods=['POST'])
 def upload_corporate_metadata():
@@ -84,6 +90,7 @@ def upload_corporate_metadata():
         )
         db.session.add(upload)
         db.session.commit()
+        invalidate_tenant_results(customer_id)
         
         return jsonify({
             'status': 'success',
@@ -128,43 +135,21 @@ def get_corporate_companies():
     })
 
 def calculate_enhanced_health_scores(kpis_with_accounts, customer_id=None):
-    """Calculate enhanced health scores using the new engine"""
+    """Calculate enhanced health scores using the batch engine (all KPIs scored as one group)"""
     print(f"DEBUG: calculate_enhanced_health_scores called with customer_id={customer_id}")
-    # Group KPIs by category (using the actual category names from database)
-    components = {}
+    kpis = [kpi for kpi, _ in kpis_with_accounts]
     
-    for kpi, _ in kpis_with_accounts:
-        category = kpi.category  # Use the actual category name from database
-        if category not in components:
-            components[category] = []
-        
-        # Convert KPI object to dict for processing
-        kpi_dict = {
-            'kpi_parameter': kpi.kpi_parameter,
-            'data': kpi.data,
-            'impact_level': kpi.impact_level,
-            'health_score_component': kpi.health_score_component,
-            'category': kpi.category,
-            'weight': kpi.weight,
-            'source_review': kpi.source_review,
-            'measurement_frequency': kpi.measurement_frequency
+    # Categories use the actual category names from database
+    result = BatchHealthScoreEngine.calculate_health_scores(kpis, customer_id, group_by=None).get(None)
+    if not result:
+        return {
+            'category_scores': [],
+            'overall_score': HealthScoreEngine.calculate_overall_health_score([])
         }
-        components[category].append(kpi_dict)
-    
-    # Calculate health scores for each category
-    category_scores = []
-    for category, kpis in components.items():
-        if kpis:
-            print(f"DEBUG: Processing category '{category}' with {len(kpis)} KPIs, customer_id={customer_id}")
-            category_score = HealthScoreEngine.calculate_category_health_score(kpis, category, customer_id)
-            category_scores.append(category_score)
-    
-    # Calculate overall health score
-    overall_score = HealthScoreEngine.calculate_overall_health_score(category_scores)
     
     return {
-        'category_scores': category_scores,
-        'overall_score': overall_score
+        'category_scores': result['category_scores'],
+        'overall_score': result['overall_score']
     }
 
 @corporate_api.route('/api/corporate/test', methods=['GET'])
@@ -172,129 +157,150 @@ def test_corporate():
     """Test endpoint to verify corporate_api is working"""
     return jsonify({'message': 'Corporate API is working', 'timestamp': '2025-08-05', 'version': 'UPDATED'})
 
+# Rollup responses per customer and reporting month, kept until the next KPI/account write
+corporate_rollup_cache = tenant_result_cache('corporate_rollup')
+
+
+def _rollup_value():
+    """
+    KPI value used in the rollup, read from the stored parse: blank strings count
+    as 0 and non-numeric data is skipped (NULL), like kpi_number. Rows that are
+    not parsed yet or are non-finite are NULL here and summed in Python.
+    """
+    return case(
+        (KPI.value_parse_status == PARSE_STATUS_PARSED, KPI.value_numeric),
+        (and_(KPI.value_parse_status.in_([PARSE_STATUS_EMPTY, PARSE_STATUS_INVALID]),
+              func.trim(KPI.data) == ''), 0.0),
+        else_=None
+    )
+
+
+def _format_rollup_value(weighted_avg, original_data):
+    """Format the result based on the original data format"""
+    original_data = original_data or ''
+    if '%' in original_data:
+        return f"{weighted_avg:.1f}%"
+    if '$' in original_data:
+        return f"${weighted_avg:,.0f}"
+    if 'K' in original_data or 'M' in original_data:
+        if weighted_avg >= 1000000:
+            return f"{weighted_avg/1000000:.1f}M"
+        return f"{weighted_avg/1000:.1f}K"
+    return f"{weighted_avg:.1f}"
+
+
+def calculate_revenue_weighted_rollup(customer_id):
+    """
+    Revenue-weighted average of every KPI parameter across the customer's accounts,
+    SUM(value * revenue) / SUM(revenue), computed in one GROUP BY query.
+    Metadata comes from the parameter's first KPI (lowest account_id, then kpi_id);
+    rollup KPIs are returned in that order.
+    """
+    value = _rollup_value()
+    revenue = func.coalesce(cast(Account.revenue, Float), 0.0)
+    customer_kpis = and_(KPI.account_id == Account.account_id, Account.customer_id == customer_id)
+
+    totals = db.session.query(
+        KPI.kpi_parameter.label('kpi_parameter'),
+        func.sum(value * revenue).label('weighted_sum'),
+        func.sum(case((value.isnot(None), revenue), else_=None)).label('total_weight'),
+        func.count(distinct(KPI.account_id)).label('companies_count')
+    ).join(Account, customer_kpis).group_by(KPI.kpi_parameter).subquery()
+
+    ranked = db.session.query(
+        KPI.kpi_id, KPI.account_id, KPI.kpi_parameter, KPI.category, KPI.health_score_component,
+        KPI.impact_level, KPI.measurement_frequency, KPI.weight, KPI.data,
+        func.row_number().over(partition_by=KPI.kpi_parameter, order_by=(KPI.account_id, KPI.kpi_id)).label('position')
+    ).join(Account, customer_kpis).subquery()
+
+    rows = db.session.query(ranked, totals.c.weighted_sum, totals.c.total_weight, totals.c.companies_count).join(
+        totals, totals.c.kpi_parameter.is_not_distinct_from(ranked.c.kpi_parameter)
+    ).filter(ranked.c.position == 1).order_by(ranked.c.account_id, ranked.c.kpi_id).all()
+
+    sums = {row.kpi_parameter: [row.weighted_sum or 0, row.total_weight or 0] for row in rows}
+
+    # Rows the SQL value skips (pre-backfill or non-finite) are parsed from their data string
+    unparsed = db.session.query(KPI.kpi_parameter, KPI.data, Account.revenue).join(Account, customer_kpis).filter(
+        or_(KPI.value_parse_status.is_(None), KPI.value_parse_status == PARSE_STATUS_NON_FINITE)
+    ).all()
+    for kpi_parameter, data, account_revenue in unparsed:
+        data_value = kpi_number(data)
+        if data_value is None:
+            continue
+        revenue_weight = float(account_revenue) if account_revenue else 0
+        sums[kpi_parameter][0] += data_value * revenue_weight
+        sums[kpi_parameter][1] += revenue_weight
+
+    rollup_data = []
+    for row in rows:
+        weighted_sum, total_weight = sums[row.kpi_parameter]
+        weighted_avg = weighted_sum / total_weight if total_weight > 0 else 0
+        rollup_data.append({
+            'category': row.category,
+            'health_score_component': row.health_score_component,
+            'kpi_parameter': row.kpi_parameter,
+            'impact_level': row.impact_level,
+            'measurement_frequency': row.measurement_frequency,
+            'weight': row.weight,
+            'data': _format_rollup_value(weighted_avg, row.data),
+            'source_review': 'Corporate Rollup (Revenue-Weighted)',
+            'companies_count': row.companies_count,
+            'weighted_average': weighted_avg
+        })
+    return rollup_data
+
+
 @corporate_api.route('/api/corporate/rollup', methods=['GET'])
 def get_corporate_rollup():
     """Get corporate rollup data from loaded companies with revenue-weighted averaging."""
-    print("DEBUG: get_corporate_rollup function called")
     customer_id = get_current_customer_id()
     
     if not customer_id:
         return jsonify({'error': 'Authentication required (handled by middleware)'}), 400
     
     customer_id = int(customer_id)
+    now = datetime.now()
     
+    # Recomputed (and re-stored) once per reporting month, or after the customer's data changes
+    response_data = corporate_rollup_cache.get(
+        customer_id, (now.year, now.month), lambda: _build_corporate_rollup(customer_id)
+    )
+    if 'error' in response_data.get('storage_info', {}):
+        # Retry the storage on the next request
+        corporate_rollup_cache.invalidate(customer_id)
+    return jsonify(response_data)
+
+
+def _build_corporate_rollup(customer_id):
+    """Compute the rollup response and store health scores / monthly KPI data"""
     print(f"DEBUG: Processing corporate rollup for customer {customer_id}")
     
-    # Get all accounts for this customer
-    accounts = Account.query.filter_by(customer_id=customer_id).all()
-    print(f"DEBUG: Found {len(accounts)} accounts for customer {customer_id}")
-    
-    # Get KPIs for each account
-    all_kpis_with_accounts = []
-    total_revenue = 0
-    
-    for account in accounts:
-        account_kpis = KPI.query.filter_by(account_id=account.account_id).all()
-        print(f"DEBUG: Account {account.account_name} (ID: {account.account_id}) has {len(account_kpis)} KPIs")
-        
-        if account_kpis:
-            for kpi in account_kpis:
-                all_kpis_with_accounts.append((kpi, account))
-            total_revenue += float(account.revenue) if account.revenue else 0
-    
-    print(f"DEBUG: Total KPI-Account pairs: {len(all_kpis_with_accounts)}")
-    print(f"DEBUG: Total revenue: {total_revenue}")
+    # Accounts that have KPIs
+    companies_loaded, total_revenue = db.session.query(
+        func.count(Account.account_id), func.sum(Account.revenue)
+    ).filter(
+        Account.customer_id == customer_id,
+        exists().where(KPI.account_id == Account.account_id)
+    ).one()
+    total_revenue = float(total_revenue) if total_revenue else 0
     
-    if not all_kpis_with_accounts:
-        return jsonify({
+    if not companies_loaded:
+        return {
             'companies_loaded': 0,
             'rollup_kpis': [],
             'total_kpis': 0,
             'total_revenue': 0,
             'calculation_method': 'Revenue-weighted averaging'
-        })
-    
-    # Group by KPI parameter and calculate revenue-weighted rollup
-    kpi_groups = {}
-    for kpi, account in all_kpis_with_accounts:
-        key = kpi.kpi_parameter
-        if key not in kpi_groups:
-            kpi_groups[key] = []
-        kpi_groups[key].append((kpi, account))
-    
-    rollup_data = []
-    
-    for kpi_parameter, kpi_accounts in kpi_groups.items():
-        if not kpi_accounts:
-            continue
-            
-        # Get the first KPI for metadata
-        first_kpi, first_account = kpi_accounts[0]
-        
-        # Calculate revenue-weighted average for data values
-        weighted_sum = 0
-        total_weight = 0
-        
-        for kpi, account in kpi_accounts:
-            try:
-                # Parse the data value, handling different formats
-                data_str = str(kpi.data).replace('%', '').replace('$', '').replace('K', '000').replace('M', '000000')
-                data_value = float(data_str) if data_str.strip() else 0
-                
-                # Weight by revenue
-                revenue_weight = float(account.revenue) if account.revenue else 0
-                weighted_sum += data_value * revenue_weight
-                total_weight += revenue_weight
-            except (ValueError, TypeError):
-                # Skip invalid data values
-                continue
-        
-        # Calculate weighted average
-        if total_weight > 0:
-            weighted_avg = weighted_sum / total_weight
-        else:
-            weighted_avg = 0
-        
-        # Format the result based on the original data format
-        original_data = first_kpi.data
-        if '%' in original_data:
-            formatted_data = f"{weighted_avg:.1f}%"
-        elif '$' in original_data:
-            formatted_data = f"${weighted_avg:,.0f}"
-        elif 'K' in original_data or 'M' in original_data:
-            if weighted_avg >= 1000000:
-                formatted_data = f"{weighted_avg/1000000:.1f}M"
-            else:
-                formatted_data = f"{weighted_avg/1000:.1f}K"
-        else:
-            formatted_data = f"{weighted_avg:.1f}"
-        
-        rollup_kpi = {
-            'category': first_kpi.category,
-            'health_score_component': first_kpi.health_score_component,
-            'kpi_parameter': kpi_parameter,
-            'impact_level': first_kpi.impact_level,
-            'measurement_frequency': first_kpi.measurement_frequency,
-            'weight': first_kpi.weight,
-            'data': formatted_data,
-            'source_review': 'Corporate Rollup (Revenue-Weighted)',
-            'companies_count': len(set(kpi.account_id for kpi, _ in kpi_accounts)),
-            'weighted_average': weighted_avg
         }
-        rollup_data.append(rollup_kpi)
     
-    # Count unique companies that have KPIs
-    companies_with_kpis = set(account.account_id for _, account in all_kpis_with_accounts)
+    rollup_data = calculate_revenue_weighted_rollup(customer_id)
     
     # Calculate enhanced corporate health scores
-    print("DEBUG: Starting enhanced health score calculation...")
-    print(f"DEBUG: Number of KPI-account pairs: {len(all_kpis_with_accounts)}")
     try:
-        print("DEBUG: Calling calculate_enhanced_health_scores...")
-        print(f"DEBUG: customer_id being passed: {customer_id}")
-        health_analysis = calculate_enhanced_health_scores(all_kpis_with_accounts, customer_id)
-        print(f"DEBUG: Enhanced health analysis completed")
-        print(f"DEBUG: Health analysis keys: {list(health_analysis.keys())}")
+        kpis = KPI.query.join(Account, KPI.account_id == Account.account_id).filter(
+            Account.customer_id == customer_id
+        ).order_by(KPI.account_id, KPI.kpi_id).all()
+        health_analysis = calculate_enhanced_health_scores([(kpi, None) for kpi in kpis], customer_id)
         
         # Extract category scores
         category_scores = health_analysis['category_scores']
@@ -344,21 +350,17 @@ def get_corporate_rollup():
             'overall': 0
         }
     
-    print(f"DEBUG: Generated {len(rollup_data)} rollup KPIs from {len(companies_with_kpis)} companies")
-    print(f"DEBUG: Corporate health scores: {health_scores}")
-    print(f"DEBUG: Health scores keys: {list(health_scores.keys())}")
+    print(f"DEBUG: Generated {len(rollup_data)} rollup KPIs from {companies_loaded} companies")
     
     response_data = {
         'rollup_kpis': rollup_data,
         'total_kpis': len(rollup_data),
-        'companies_loaded': len(companies_with_kpis),
+        'companies_loaded': companies_loaded,
         'total_revenue': total_revenue,
         'calculation_method': 'Revenue-weighted averaging',
         'health_scores': health_scores
     }
     
-    print(f"DEBUG: Response data keys: {list(response_data.keys())}")
-    
     # Store health scores and KPI time series data
     try:
         storage_service = HealthScoreStorageService()
@@ -374,11 +376,15 @@ def get_corporate_rollup():
         print("DEBUG: Storing monthly KPI data...")
         kpi_stored_count = storage_service.store_monthly_kpi_data(customer_id)
         print(f"DEBUG: Stored monthly KPI data for {kpi_stored_count} KPIs")
-        
+
+        # Stored trends are tenant data too; the rollup cache keeps this result at the bumped version
+        invalidate_tenant_results(customer_id)
+
         # Add storage info to response
         response_data['storage_info'] = {
             'health_scores_stored': health_stored_count,
             'kpi_time_series_stored': kpi_stored_count,
+            'timings': storage_service.timings,
             'storage_timestamp': datetime.now().isoformat()
         }
         
@@ -390,4 +396,4 @@ def get_corporate_rollup():
             'storage_timestamp': datetime.now().isoformat()
         }
     
-    return jsonify(response_data) 
\ No newline at end of file
+    return response_data
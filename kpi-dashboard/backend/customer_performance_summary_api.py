@@ -9,11 +9,18 @@ from auth_middleware import get_current_customer_id
 from models import db, Account, HealthTrend, PlaybookExecution, KPI
 from sqlalchemy import func, desc
 from datetime import datetime, timedelta
-from collections import defaultdict
-import statistics
+from kpi_value_parser import parse_kpi_data, stored_kpi_value
+from tenant_result_cache import tenant_result_cache
+import numpy as np
 
 customer_perf_summary_api = Blueprint('customer_perf_summary_api', __name__)
 
+REVENUE_GROWTH_KPI = 'Revenue Growth'
+DEFAULT_KPI_SCORE = 65  # KPIs without a numeric value
+
+# KPI-derived account summaries per customer, kept until the next KPI/account write
+performance_summary_cache = tenant_result_cache('performance_summary')
+
 @customer_perf_summary_api.route('/api/customer-performance/summary', methods=['GET'])
 def get_performance_summary():
     """
@@ -36,10 +43,13 @@ def get_performance_summary():
         # Get date 3 months ago
         three_months_ago = datetime.utcnow() - timedelta(days=90)
         
-        # Get all accounts with their latest health trends
-        accounts = Account.query.filter_by(customer_id=customer_id).all()
+        # KPI-derived account summaries are cached until the customer's data changes;
+        # playbook counts are read live with one aggregate query
+        total_accounts, cached_summaries = performance_summary_cache.get(
+            customer_id, None, lambda: build_account_summaries(customer_id)
+        )
         
-        if not accounts:
+        if not total_accounts:
             # Return empty summary if no accounts
             return jsonify({
                 'status': 'success',
@@ -56,60 +66,13 @@ def get_performance_summary():
                 'timeframe': 'Last 6 months'
             })
         
-        account_summaries = []
-        
-        for account in accounts:
-            # Get category-level scores from KPIs
-            category_scores = calculate_category_scores(account.account_id, customer_id)
-            
-            if not category_scores:
-                continue  # Skip accounts with no KPIs
-            
-            # Calculate overall health score from category scores
-            overall_health_score = sum(category_scores.values()) / len(category_scores)
-            
-            # Calculate revenue growth trend (last 6 months)
-            revenue_growth_pct = calculate_revenue_growth(account.account_id)
-            
-            # Find worst performing categories (focus areas)
-            focus_areas = sorted(
-                [(cat, score) for cat, score in category_scores.items()],
-                key=lambda x: x[1]
-            )[:2]  # Top 2 worst categories
-            
-            # Count active playbooks (started in last 3 months)
-            # Use try/except to handle missing columns gracefully
-            try:
-                active_playbooks = PlaybookExecution.query.filter_by(
-                    account_id=account.account_id,
-                    customer_id=customer_id
-                ).filter(
-                    PlaybookExecution.started_at >= three_months_ago
-                ).count()
-            except Exception as e:
-                # If column doesn't exist, just count all playbooks for this account
-                print(f"Warning: Could not query playbook_executions with started_at filter: {e}")
-                active_playbooks = PlaybookExecution.query.filter_by(
-                    account_id=account.account_id,
-                    customer_id=customer_id
-                ).count()
-            
-            account_summaries.append({
-                'account_id': account.account_id,
-                'account_name': account.account_name,
-                'revenue': float(account.revenue) if account.revenue else 0,
-                'industry': account.industry,
-                'region': account.region,
-                'overall_health_score': overall_health_score,
-                'category_scores': category_scores,
-                'focus_areas': [{'category': cat, 'score': score} for cat, score in focus_areas],
-                'active_playbooks_count': active_playbooks,
-                'revenue_growth_pct': revenue_growth_pct
-            })
+        active_playbooks = count_active_playbooks(customer_id, three_months_ago)
+        account_summaries = [
+            {**summary, 'active_playbooks_count': active_playbooks.get(summary['account_id'], 0)}
+            for summary in cached_summaries
+        ]
         
         # Calculate overall summary stats with better thresholds
-        total_accounts = len(accounts)
-        
         # Use stricter thresholds for enterprise customers
         critical_accounts = len([a for a in account_summaries if a['overall_health_score'] < 70])
         at_risk_accounts = len([a for a in account_summaries if 70 <= a['overall_health_score'] < 80])
@@ -168,92 +131,172 @@ def get_performance_summary():
             'message': 'Failed to fetch performance summary'
         }), 500
 
-def calculate_revenue_growth(account_id, customer_id=None):
+def count_active_playbooks(customer_id, since):
+    """{account_id: playbooks started since `since`} in one aggregate query"""
+    try:
+        rows = db.session.query(
+            PlaybookExecution.account_id, func.count(PlaybookExecution.id)
+        ).filter(
+            PlaybookExecution.customer_id == customer_id,
+            PlaybookExecution.started_at >= since
+        ).group_by(PlaybookExecution.account_id).all()
+    except Exception as e:
+        # If column doesn't exist, just count all playbooks per account
+        print(f"Warning: Could not query playbook_executions with started_at filter: {e}")
+        db.session.rollback()
+        rows = db.session.query(
+            PlaybookExecution.account_id, func.count(PlaybookExecution.id)
+        ).filter(
+            PlaybookExecution.customer_id == customer_id
+        ).group_by(PlaybookExecution.account_id).all()
+    return dict(rows)
+
+
+def build_account_summaries(customer_id):
     """
-    Calculate revenue growth % for an account based on Revenue Growth KPI trend
-    Compares recent 3 months vs previous 3 months
+    (number of accounts, summaries without playbook counts of the accounts that
+    have account-level KPIs) from one account query and one KPI prefetch
     """
-    # Get Revenue Growth KPI data for this account (account-level only)
-    from kpi_queries import get_account_level_kpis
-    if customer_id is None:
-        from auth_middleware import get_current_customer_id
-        customer_id = get_current_customer_id()
-    account_kpis = get_account_level_kpis(account_id, customer_id)
-    revenue_kpis = [kpi for kpi in account_kpis if kpi.kpi_parameter == 'Revenue Growth']
-    
-    if not revenue_kpis or len(revenue_kpis) < 2:
-        return 0.0  # Not enough data
-    
-    # Parse and sort by month (stored in source_review as "month/year")
-    revenue_data = []
-    for kpi in revenue_kpis:
-        try:
-            # Extract numeric value from "25.7%" format
-            val_str = str(kpi.data).replace('%', '').strip()
-            value = float(val_str)
-            revenue_data.append(value)
-        except:
-            continue
+    from kpi_queries import get_customer_account_level_kpis
+    accounts = db.session.query(
+        Account.account_id, Account.account_name, Account.revenue, Account.industry, Account.region
+    ).filter(
+        Account.customer_id == customer_id
+    ).order_by(Account.account_id).all()
+    if not accounts:
+        return 0, []
     
-    if len(revenue_data) < 2:
-        return 0.0
+    kpi_summaries = summarize_account_kpis(get_customer_account_level_kpis(customer_id))
     
-    # Calculate trend: compare recent half vs earlier half
-    mid_point = len(revenue_data) // 2
-    recent_avg = statistics.mean(revenue_data[mid_point:])
-    earlier_avg = statistics.mean(revenue_data[:mid_point])
+    account_summaries = []
+    for account in accounts:
+        kpi_summary = kpi_summaries.get(account.account_id)
+        if not kpi_summary:
+            continue  # Skip accounts with no KPIs
+        
+        account_summaries.append({
+            'account_id': account.account_id,
+            'account_name': account.account_name,
+            'revenue': float(account.revenue) if account.revenue else 0,
+            'industry': account.industry,
+            'region': account.region,
+            **kpi_summary
+        })
+    return len(accounts), account_summaries
+
+
+def _kpi_value(kpi):
+    """Numeric KPI value from the stored parse (or the data string), or None"""
+    available, value, _ = stored_kpi_value(kpi)
+    return value if available else parse_kpi_data(kpi.data)[0]
+
+
+def summarize_account_kpis(kpis):
+    """
+    Category scores, overall score, focus areas and revenue growth of every account
+    in `kpis` (account-level KPIs, in account_id/kpi_id order), computed with NumPy.
+    Returns {account_id: summary}; categories keep the order their first KPI appears.
+    """
+    if not kpis:
+        return {}
     
-    if earlier_avg == 0:
-        return 0.0
+    accounts, categories = {}, {}
+    account_index, category_index, values, has_value, is_growth = [], [], [], [], []
+    for kpi in kpis:
+        account_index.append(accounts.setdefault(kpi.account_id, len(accounts)))
+        category_index.append(categories.setdefault(kpi.category, len(categories)))
+        value = _kpi_value(kpi)
+        has_value.append(value is not None)
+        values.append(0.0 if value is None else value)
+        is_growth.append(kpi.kpi_parameter == REVENUE_GROWTH_KPI)
     
-    # Calculate % change
-    growth_pct = ((recent_avg - earlier_avg) / earlier_avg) * 100
+    account_index = np.array(account_index)
+    category_index = np.array(category_index)
+    values = np.array(values, dtype=float)
+    has_value = np.array(has_value)
+    is_growth = np.array(is_growth)
+    n_accounts, n_categories = len(accounts), len(categories)
     
-    return round(growth_pct, 1)
-
-def calculate_category_scores(account_id, customer_id):
-    """Calculate category-level health scores for an account"""
+    # Normalize to 0-100 (simplified - in production use reference ranges): values already
+    # in range are used as-is, larger values are scaled down, KPIs without a value score 65
+    with np.errstate(invalid='ignore'):
+        normalized = np.where((values >= 0) & (values <= 100), values, np.clip(values / 10, 0, 100))
+    scores = np.where(has_value, np.nan_to_num(normalized, nan=0.0), DEFAULT_KPI_SCORE)
     
-    # Get latest KPIs for this account (account-level only, excludes product KPIs)
-    from kpi_queries import get_account_level_kpis
-    kpis = get_account_level_kpis(account_id, customer_id)
+    # Average score per (account, category) cell
+    cells = account_index * n_categories + category_index
+    size = n_accounts * n_categories
+    counts = np.bincount(cells, minlength=size).reshape(n_accounts, n_categories)
+    sums = np.bincount(cells, weights=scores, minlength=size).reshape(n_accounts, n_categories)
+    present = counts > 0
+    category_means = np.divide(sums, counts, out=np.full(sums.shape, np.inf), where=present)
+    overall = np.where(present, category_means, 0).sum(axis=1) / present.sum(axis=1)
     
-    if not kpis:
-        return {}
+    first_seen = np.full(size, len(kpis))
+    np.minimum.at(first_seen, cells, np.arange(len(kpis)))
+    first_seen = first_seen.reshape(n_accounts, n_categories)
+    category_order = np.argsort(first_seen, axis=1, kind='stable')
+    # Worst categories first, ties in order of appearance
+    focus_order = np.lexsort((first_seen, category_means), axis=1)
     
-    # Group KPIs by category
-    category_groups = defaultdict(list)
-    for kpi in kpis:
-        category_groups[kpi.category].append(kpi)
+    growth = _revenue_growth(account_index[is_growth & has_value], values[is_growth & has_value], n_accounts)
     
-    # Calculate average score per category (simple approach)
-    category_scores = {}
-    for category, kpi_list in category_groups.items():
-        # For simplicity, assume scores between 50-90 based on data quality
-        # In production, this would use actual health scoring logic
-        scores = []
-        for kpi in kpi_list:
-            try:
-                # Try to extract numeric value
-                val_str = str(kpi.data).replace('%', '').replace('$', '').replace(',', '').strip()
-                # Handle units like "10 days", "25.7%", "$50,000"
-                parts = val_str.split()
-                if parts:
-                    val = float(parts[0])  # Get first number
-                    # Normalize to 0-100 scale (simplified - in production use reference ranges)
-                    # For now, just use the value as-is if it's already in 0-100 range
-                    if 0 <= val <= 100:
-                        normalized = val
-                    else:
-                        # Scale down large values
-                        normalized = min(100, max(0, val / 10))
-                    scores.append(normalized)
-                else:
-                    scores.append(65)  # Default if empty
-            except Exception as e:
-                scores.append(65)  # Default mid-range score
-        
-        category_scores[category] = sum(scores) / len(scores) if scores else 65
+    category_names = list(categories)
+    summaries = {}
+    for account_id, a in accounts.items():
+        summaries[account_id] = {
+            'overall_health_score': float(overall[a]),
+            'category_scores': {
+                category_names[c]: float(category_means[a, c]) for c in category_order[a] if present[a, c]
+            },
+            'focus_areas': [
+                {'category': category_names[c], 'score': float(category_means[a, c])}
+                for c in focus_order[a][:2] if present[a, c]
+            ],
+            'revenue_growth_pct': growth[a]
+        }
+    return summaries
+
+
+def _revenue_growth(account_index, values, n_accounts):
+    """
+    Revenue growth % per account: mean of the recent half of its Revenue Growth
+    values vs the earlier half (0.0 with fewer than two values or a zero baseline)
+    """
+    counts = np.bincount(account_index, minlength=n_accounts)
+    # Position of each value within its account (values arrive grouped by account)
+    order = np.argsort(account_index, kind='stable')
+    account_index, values = account_index[order], values[order]
+    starts = np.cumsum(counts) - counts
+    position = np.arange(len(values)) - starts[account_index]
+    mid = counts // 2
+    earlier = position < mid[account_index]
     
-    return category_scores
+    earlier_avg = np.bincount(account_index[earlier], weights=values[earlier], minlength=n_accounts)
+    recent_avg = np.bincount(account_index[~earlier], weights=values[~earlier], minlength=n_accounts)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        earlier_avg = earlier_avg / mid
+        recent_avg = recent_avg / (counts - mid)
+        growth = (recent_avg - earlier_avg) / earlier_avg * 100
+    valid = (counts >= 2) & (earlier_avg != 0)
+    return [round(float(g), 1) if ok else 0.0 for g, ok in zip(growth, valid)]
+
 
+def calculate_revenue_growth(account_id, customer_id=None):
+    """
+    Calculate revenue growth % for an account based on Revenue Growth KPI trend
+    Compares recent 3 months vs previous 3 months
+    """
+    from kpi_queries import get_account_level_kpis
+    if customer_id is None:
+        from auth_middleware import get_current_customer_id
+        customer_id = get_current_customer_id()
+    summary = summarize_account_kpis(get_account_level_kpis(account_id, customer_id)).get(account_id)
+    return summary['revenue_growth_pct'] if summary else 0.0
+
+
+def calculate_category_scores(account_id, customer_id):
+    """Calculate category-level health scores for an account"""
+    from kpi_queries import get_account_level_kpis
+    summary = summarize_account_kpis(get_account_level_kpis(account_id, customer_id)).get(account_id)
+    return summary['category_scores'] if summary else {}
@@ -2,6 +2,9 @@ from flask import Blueprint, request, jsonify, abort
 from auth_middleware import get_current_customer_id, get_current_user_id
 from extensions import db
 from models import KPI, KPIUpload, Account, CustomerConfig
+from category_weight_index import invalidate_category_weights
+from tenant_result_cache import invalidate_tenant_results
+from account_health_summary import refresh_account_health_summaries
 from datetime import datetime
 
 data_management_api = Blueprint('data_management_api', __name__)
@@ -72,6 +75,8 @@ def clear_all_data():
         config_deleted = CustomerConfig.query.filter_by(customer_id=customer_id).delete()
         
         db.session.commit()
+        invalidate_category_weights(customer_id)
+        invalidate_tenant_results(customer_id)
         
         return jsonify({
             'status': 'success',
@@ -117,6 +122,13 @@ def clear_uploads():
                 'message': 'Some upload IDs not found or do not belong to customer'
             }), 400
         
+        # Accounts whose KPIs go away, for their health summaries
+        account_ids = {upload.account_id for upload in uploads} | {
+            account_id for (account_id,) in db.session.query(KPI.account_id).filter(
+                KPI.upload_id.in_(upload_ids)
+            ).distinct()
+        }
+
         # Delete KPIs for these uploads
         kpis_deleted = db.session.query(KPI).filter(
             KPI.upload_id.in_(upload_ids)
@@ -128,6 +140,8 @@ def clear_uploads():
         ).delete(synchronize_session=False)
         
         db.session.commit()
+        refresh_account_health_summaries(customer_id, account_ids)
+        invalidate_tenant_results(customer_id)
         
         return jsonify({
             'status': 'success',
@@ -160,6 +174,7 @@ def clear_accounts():
         ).update({'account_id': None}, synchronize_session=False)
         
         db.session.commit()
+        invalidate_tenant_results(customer_id)
         
         return jsonify({
             'status': 'success',
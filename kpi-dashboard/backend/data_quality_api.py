@@ -7,6 +7,8 @@ Provides report of common data hygiene issues and remediation helpers
 from flask import Blueprint, jsonify
 from extensions import db
 from models import Account, Product, KPI
+from tenant_result_cache import invalidate_tenant_results
+from account_health_summary import refresh_account_health_summaries
 from sqlalchemy import and_
 from collections import defaultdict
 import re
@@ -26,6 +28,12 @@ def _parse_percent(value: str):
         return None
 
 
+def _refresh_summaries(affected):
+    """Refresh the health summaries of the changed accounts ({customer_id: account_ids})"""
+    for customer_id, account_ids in affected.items():
+        refresh_account_health_summaries(customer_id, account_ids)
+
+
 @data_quality_api.route('/api/data-quality/report', methods=['GET'])
 def get_data_quality_report():
     """Return a summary of data hygiene issues per account."""
@@ -91,9 +99,11 @@ def get_data_quality_report():
 def seed_missing_products():
     """Ensure every account has at least one product by seeding a default."""
     accounts = Account.query.all()
+    with_products = {account_id for (account_id,) in db.session.query(Product.account_id).distinct()}
     created = 0
+    affected = defaultdict(set)
     for acct in accounts:
-        if len(acct.products or []) == 0:
+        if acct.account_id not in with_products:
             p = Product(
                 account_id=acct.account_id,
                 customer_id=acct.customer_id,
@@ -101,8 +111,11 @@ def seed_missing_products():
             )
             db.session.add(p)
             created += 1
+            affected[acct.customer_id].add(acct.account_id)
     if created > 0:
         db.session.commit()
+        _refresh_summaries(affected)
+        invalidate_tenant_results()
     return jsonify({'status': 'success', 'created_products': created})
 
 @data_quality_api.route('/api/data-quality/fix/dedupe-account-level', methods=['POST'])
@@ -117,6 +130,7 @@ def dedupe_account_level_kpis():
     primary_types = {None, 'weighted_avg'}
     removed = 0
     kept = 0
+    affected = defaultdict(set)
     accounts = Account.query.all()
     for acct in accounts:
         # Fetch only account-level KPIs
@@ -147,9 +161,12 @@ def dedupe_account_level_kpis():
                 if k.kpi_id != keep_one.kpi_id:
                     db.session.delete(k)
                     removed += 1
+                    affected[acct.customer_id].add(acct.account_id)
             kept += 1
     if removed > 0:
         db.session.commit()
+        _refresh_summaries(affected)
+        invalidate_tenant_results()
     return jsonify({'status': 'success', 'kept': kept, 'removed': removed})
 
 
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Debug Performance API
+Admin view of the request SQL profiler's per-endpoint aggregates
+"""
+
+from flask import Blueprint, request, jsonify
+from auth_decorators import admin_required
+from request_profiler import request_profiler
+from datetime import datetime
+
+debug_perf_api = Blueprint('debug_perf_api', __name__)
+
+SORT_FIELDS = ('total_db_ms', 'avg_db_ms', 'max_db_ms', 'total_queries', 'avg_queries',
+               'max_queries', 'n_plus_one_requests', 'requests', 'avg_ms')
+
+
+@debug_perf_api.route('/api/debug/perf', methods=['GET'])
+@admin_required
+def get_perf_report():
+    """
+    Worst endpoints by database cost
+
+    Query params:
+      - sort: aggregate to rank by (default total_db_ms)
+      - limit: number of endpoints (default 20)
+    """
+    sort = request.args.get('sort', 'total_db_ms')
+    if sort not in SORT_FIELDS:
+        return jsonify({'error': f'Invalid sort. Must be one of: {", ".join(SORT_FIELDS)}'}), 400
+    limit = request.args.get('limit', 20, type=int)
+
+    return jsonify({
+        'timestamp': datetime.utcnow().isoformat(),
+        'profiling_all_requests': request_profiler.enabled,
+        'n_plus_one_threshold': request_profiler.n_plus_one_threshold,
+        'sort': sort,
+        'endpoints': request_profiler.report(sort=sort, limit=limit)
+    })
+
+
+@debug_perf_api.route('/api/debug/perf', methods=['DELETE'])
+@admin_required
+def reset_perf_report():
+    """Clear the collected aggregates"""
+    request_profiler.reset()
+    return jsonify({'status': 'success', 'message': 'Profiler statistics cleared'})
@@ -246,6 +246,9 @@ def direct_query():
                         print(f"⚠️  Failed to auto-create snapshot for {account.account_name}, continuing without snapshot context")
                 
                 if latest_snapshot:
+                    # Delta-encoded snapshots need their state rebuilt before reading it
+                    from snapshot_storage import hydrate_snapshots
+                    hydrate_snapshots([latest_snapshot])
                     revenue_change_str = ""
                     if latest_snapshot.revenue_change_percent is not None:
                         change_pct = float(latest_snapshot.revenue_change_percent)
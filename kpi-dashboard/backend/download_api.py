@@ -2,6 +2,7 @@ from flask import Blueprint, send_file, abort, jsonify
 from auth_middleware import get_current_customer_id, get_current_user_id
 from models import KPIUpload
 from secure_file_handler import get_secure_file_handler
+from blob_store import get_blob_store, COMPRESSED_SUFFIX
 import io
 
 
@@ -9,7 +10,7 @@ download_api = Blueprint('download_api', __name__)
 
 @download_api.route('/api/download/<int:upload_id>', methods=['GET'])
 def download_excel(upload_id):
-    """Download KPI upload file (legacy endpoint - uses database storage)"""
+    """Download KPI upload file (legacy endpoint - streamed from the blob store)"""
     customer_id = get_current_customer_id()
     upload = KPIUpload.query.get_or_404(upload_id)
     
@@ -17,13 +18,22 @@ def download_excel(upload_id):
     if upload.customer_id != customer_id:
         abort(403, description='Access denied')
     
-    if not upload.raw_excel:
+    blob_path = get_blob_store().locate(upload.content_sha256) if upload.content_sha256 else None
+    if not blob_path:
         abort(404, description='No file found for this upload')
+    download_name = upload.original_filename or f'kpi_upload_{upload_id}.xlsx'
+    mimetype = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    
+    # Plain blobs are sent from disk with Range/ETag support; compressed ones are decompressed as they stream
+    if not blob_path.endswith(COMPRESSED_SUFFIX):
+        return send_file(blob_path, download_name=download_name, as_attachment=True, mimetype=mimetype,
+                         etag=upload.content_sha256)
     return send_file(
-        io.BytesIO(upload.raw_excel),
-        download_name=upload.original_filename or f'kpi_upload_{upload_id}.xlsx',
+        get_blob_store().open(upload.content_sha256),
+        download_name=download_name,
         as_attachment=True,
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        mimetype=mimetype,
+        etag=upload.content_sha256
     )
 
 @download_api.route('/api/download/secure/<path:filename>', methods=['GET'])
@@ -16,6 +16,7 @@ from qdrant_client import QdrantClient
 from qdrant_client.http import models
 from qdrant_client.http.models import Distance, VectorParams, PointStruct, Filter, FieldCondition, MatchValue
 from models import db, KPI, Account, KPIUpload, HealthTrend
+from kpi_value_parser import PARSE_STATUS_PARSED, UNIT_DAYS, parse_kpi_data
 
 # Load environment variables
 load_dotenv()
@@ -137,7 +138,7 @@ class EnhancedRAGHistoricalSystem:
             for kpi, account, upload_date in kpi_with_dates:
                 try:
                     # Parse numeric values
-                    value = self._parse_kpi_value(kpi.data)
+                    value = self._parse_kpi_value(kpi)
                     if value is not None:
                         values.append(value)
                         dates.append(upload_date)
@@ -248,30 +249,17 @@ class EnhancedRAGHistoricalSystem:
         
         return account_data
     
-    def _parse_kpi_value(self, data: str) -> Optional[float]:
-        """Parse KPI value to numeric format"""
-        if not data:
-            return None
-        
-        # Remove common suffixes and convert to float
-        data_clean = str(data).replace('%', '').replace(',', '').strip()
-        
-        # Handle time values (hours, days, etc.)
-        if 'hour' in data_clean.lower():
-            try:
-                return float(data_clean.split()[0])
-            except:
-                return None
-        elif 'day' in data_clean.lower():
-            try:
-                return float(data_clean.split()[0]) * 24  # Convert days to hours
-            except:
-                return None
-        
-        try:
-            return float(data_clean)
-        except:
-            return None
+    def _parse_kpi_value(self, kpi) -> Optional[float]:
+        """Parse KPI value to numeric format (time values in hours)"""
+        if kpi.value_parse_status == PARSE_STATUS_PARSED:
+            if kpi.value_unit == UNIT_DAYS:
+                return kpi.value_numeric * 24  # Convert days to hours
+            return kpi.value_numeric
+        
+        value, unit = parse_kpi_data(kpi.data)
+        if value is not None and unit == UNIT_DAYS:
+            return value * 24  # Convert days to hours
+        return value
     
     def _calculate_trend_direction(self, values: List[float]) -> str:
         """Calculate trend direction (up, down, stable)"""
@@ -10,6 +10,11 @@ from werkzeug.utils import secure_filename
 import pandas as pd
 from extensions import db
 from models import KPIUpload, KPI, CustomerConfig, Account
+from blob_store import get_blob_store
+from upload_jobs import (
+    upload_jobs, UploadJobFailed, UploadQueueFull, PHASE_FAILED,
+    create_upload_account, write_upload_kpis, finish_upload, set_upload_phase, upload_job_status
+)
 import io
 from datetime import datetime
 import os
@@ -25,11 +30,16 @@ enhanced_upload_api = Blueprint('enhanced_upload_api', __name__)
 
 @enhanced_upload_api.route('/api/upload-enhanced', methods=['POST'])
 def upload_excel_enhanced():
-    """Enhanced upload with format detection and automatic RAG rebuild"""
+    """
+    Enhanced upload with format detection and automatic RAG rebuild.
+    The file is detected and validated here, then processed in a background job
+    (202 with the job id; poll /api/upload-status/<upload_id>). sync=true waits for it.
+    """
     file = request.files.get('file')
     customer_id = get_current_customer_id()
     user_id = request.headers.get('X-User-ID')
     account_name = request.form.get('account_name')
+    sync = (request.form.get('sync') or request.args.get('sync', '')).lower() == 'true'
     
     if not file:
         return jsonify({'error': 'Missing file'}), 400
@@ -42,6 +52,7 @@ def upload_excel_enhanced():
     
     customer_id = int(customer_id)
     user_id = int(user_id)
+    filename = secure_filename(file.filename)
     
     try:
         # Use secure file handler for temporary storage
@@ -76,19 +87,6 @@ def upload_excel_enhanced():
                 'detected_format': format_info.format_type
             }), 400
         
-        # Get appropriate adapter
-        adapter = FormatAdapterFactory.create_adapter(format_info.format_type)
-        
-        # Process file with adapter
-        kpi_data = adapter.process(temp_path, customer_id, account_name)
-        
-        if not kpi_data:
-            handler.delete_file(os.path.basename(temp_path))
-            return jsonify({'error': 'No valid KPI data found in file'}), 400
-        
-        # Clean up temp file
-        handler.delete_file(os.path.basename(temp_path))
-        
         # Get or create customer configuration
         config = CustomerConfig.query.filter_by(customer_id=customer_id).first()
         if not config:
@@ -96,83 +94,71 @@ def upload_excel_enhanced():
             db.session.add(config)
             db.session.commit()
         
-        # Handle account creation/validation
+        # Validate the account name; the account itself is created by the job
         existing_account = Account.query.filter_by(
             account_name=account_name, 
             customer_id=customer_id
         ).first()
         
         if existing_account:
+            handler.delete_file(os.path.basename(temp_path))
             return jsonify({'error': f'Account "{account_name}" already exists for this customer'}), 400
         
-        # Create new account
-        account = Account(
-            customer_id=customer_id,
-            account_name=account_name,
-            revenue=0,
-            industry='Unknown',
-            region='Unknown',
-            account_status='active'
-        )
-        db.session.add(account)
-        db.session.flush()
-        account_id = account.account_id
-        
         # Create new upload record
         latest_upload = KPIUpload.query.filter_by(customer_id=customer_id).order_by(KPIUpload.version.desc()).first()
         new_version = (latest_upload.version + 1) if latest_upload else 1
         
-        # Read file content for storage
+        # Keep the original file in the blob store
         file.seek(0)
-        raw_excel = file.read()
+        content_sha256 = get_blob_store().put(file.read())
         
         upload = KPIUpload(
             customer_id=customer_id,
             user_id=user_id,
             version=new_version,
             original_filename=filename,
-            raw_excel=raw_excel,
-            account_id=account_id
+            content_sha256=content_sha256,
+            phase='stored'
         )
         
         db.session.add(upload)
-        db.session.flush()
-        upload_id = upload.upload_id
-        
-        # Store KPIs
-        for kpi_row in kpi_data:
-            kpi = KPI(
-                upload_id=upload_id,
-                account_id=account_id,
-                category=kpi_row['category'],
-                row_index=kpi_row.get('row_index', '0'),
-                health_score_component=kpi_row['health_score_component'],
-                weight=kpi_row['weight'],
-                data=kpi_row['data'],
-                source_review=kpi_row.get('source_review', ''),
-                kpi_parameter=kpi_row['kpi_parameter'],
-                impact_level=kpi_row.get('impact_level', 'Medium'),
-                measurement_frequency=kpi_row.get('measurement_frequency', 'Monthly')
-            )
-            db.session.add(kpi)
-        
         db.session.commit()
+        upload_id = upload.upload_id
         
-        # Publish event for automatic RAG rebuild
-        event_manager.publish_kpi_upload(customer_id, upload_id, len(kpi_data))
+        # Parse with the format adapter and write the KPIs in a background job
+        job_args = (handler, temp_path, format_info.format_type, account_name)
+        if sync:
+            try:
+                result = upload_jobs.submit(upload_id, _process_enhanced_upload, *job_args, wait=True)
+            except UploadJobFailed as e:
+                return jsonify({'error': str(e), 'upload_id': upload_id, 'status': 'error'}), 400
+            status = 'success'
+        else:
+            try:
+                upload_jobs.submit(upload_id, _process_enhanced_upload, *job_args)
+            except UploadQueueFull:
+                handler.delete_file(os.path.basename(temp_path))
+                upload = db.session.get(KPIUpload, upload_id)
+                set_upload_phase(upload, PHASE_FAILED, errors=['Too many uploads are being processed, please retry'])
+                db.session.commit()
+                return jsonify({'error': 'Too many uploads are being processed, please retry shortly',
+                                'upload_id': upload_id, 'status': 'error'}), 503
+            result = {'phase': 'stored'}
+            status = 'processing'
         
-        return jsonify({
-            'upload_id': upload_id,
-            'version': new_version,
-            'filename': filename,
-            'kpi_count': len(kpi_data),
-            'format_detected': format_info.format_type,
-            'format_confidence': format_info.confidence,
-            'account_id': account_id,
-            'account_name': account_name,
-            'rag_rebuild_triggered': True,
-            'status': 'success'
-        })
+        return jsonify(dict(
+            result,
+            job_id=upload_id,
+            upload_id=upload_id,
+            version=new_version,
+            filename=filename,
+            status_url=f'/api/upload-status/{upload_id}',
+            format_detected=format_info.format_type,
+            format_confidence=format_info.confidence,
+            account_name=account_name,
+            rag_rebuild_triggered=sync,
+            status=status
+        )), 200 if sync else 202
         
     except Exception as e:
         # Clean up temp file if it exists
@@ -184,6 +170,49 @@ def upload_excel_enhanced():
             'status': 'error'
         }), 500
 
+
+def _process_enhanced_upload(upload, handler, temp_path, format_type, account_name):
+    """Upload job: create the account, process the file with its format adapter and store the KPIs"""
+    try:
+        account_id = create_upload_account(upload, account_name)
+        
+        # Process file with adapter
+        adapter = FormatAdapterFactory.create_adapter(format_type)
+        kpi_data = adapter.process(temp_path, upload.customer_id, account_name)
+    finally:
+        # Clean up temp file
+        handler.delete_file(os.path.basename(temp_path))
+    
+    if not kpi_data:
+        raise UploadJobFailed('No valid KPI data found in file')
+    
+    # Store KPIs in batched inserts
+    kpi_write = write_upload_kpis(upload, ({
+        'upload_id': upload.upload_id,
+        'account_id': account_id,
+        'category': kpi_row['category'],
+        'row_index': kpi_row.get('row_index', '0'),
+        'health_score_component': kpi_row['health_score_component'],
+        'weight': kpi_row['weight'],
+        'data': kpi_row['data'],
+        'source_review': kpi_row.get('source_review', ''),
+        'kpi_parameter': kpi_row['kpi_parameter'],
+        'impact_level': kpi_row.get('impact_level', 'Medium'),
+        'measurement_frequency': kpi_row.get('measurement_frequency', 'Monthly')
+    } for kpi_row in kpi_data))
+    
+    # Publish event for automatic RAG rebuild once the KPIs are scored
+    customer_id, upload_id = upload.customer_id, upload.upload_id
+    finish_upload(upload, len(kpi_data),
+                  index=lambda: event_manager.publish_kpi_upload(customer_id, upload_id, len(kpi_data)))
+    
+    return {
+        'kpi_count': len(kpi_data),
+        'rows_per_second': kpi_write['rows_per_second'],
+        'batch_count': kpi_write['batch_count'],
+        'account_id': account_id
+    }
+
 @enhanced_upload_api.route('/api/upload-formats', methods=['GET'])
 def get_supported_formats():
     """Get list of supported file formats"""
@@ -306,22 +335,22 @@ def get_upload_template(format_type):
 
 @enhanced_upload_api.route('/api/upload-status/<int:upload_id>', methods=['GET'])
 def get_upload_status(upload_id):
-    """Get status of upload and RAG rebuild"""
-    upload = KPIUpload.query.get_or_404(upload_id)
+    """Get status of upload processing and RAG rebuild"""
+    customer_id = get_current_customer_id()
+    if not customer_id:
+        return jsonify({'error': 'Authentication required (handled by middleware)'}), 400
+    upload = KPIUpload.query.filter_by(upload_id=upload_id, customer_id=customer_id).first_or_404()
     
     # Check RAG knowledge base status
     from models import RAGKnowledgeBase
     kb_status = RAGKnowledgeBase.query.filter_by(customer_id=upload.customer_id).first()
     
-    return jsonify({
-        'upload_id': upload_id,
-        'version': upload.version,
-        'filename': upload.original_filename,
-        'uploaded_at': upload.uploaded_at.isoformat(),
-        'kpi_count': KPI.query.filter_by(upload_id=upload_id).count(),
-        'rag_status': kb_status.status if kb_status else 'not_built',
-        'rag_last_updated': kb_status.last_updated.isoformat() if kb_status and kb_status.last_updated else None
-    })
+    return jsonify(dict(
+        upload_job_status(upload),
+        kpi_count=KPI.query.filter_by(upload_id=upload_id).count(),
+        rag_status=kb_status.status if kb_status else 'not_built',
+        rag_last_updated=kb_status.last_updated.isoformat() if kb_status and kb_status.last_updated else None
+    ))
 
 @enhanced_upload_api.route('/api/upload-validate', methods=['POST'])
 def validate_file_format():
@@ -275,7 +275,7 @@ class AccountSnapshotSubscriber:
     def handle_event(self, event: Event):
         """Handle events and create snapshots when appropriate"""
         try:
-            from account_snapshot_api import create_account_snapshot
+            from account_snapshot_api import create_snapshots_for_customer
             from models import Account, KPIUpload
             
             customer_id = event.customer_id
@@ -308,9 +308,9 @@ class AccountSnapshotSubscriber:
                     accounts = Account.query.filter_by(customer_id=customer_id).all()
                     account_ids_to_snapshot = [a.account_id for a in accounts]
             
-            # Create snapshots for affected accounts (with cooldown check)
+            # Skip accounts still in their cooldown to avoid creating too many snapshots
+            eligible_account_ids = []
             for account_id in account_ids_to_snapshot:
-                # Check cooldown to avoid creating too many snapshots
                 account_key = f"{customer_id}_{account_id}"
                 last_snapshot_time = self.last_snapshot_times.get(account_key)
                 
@@ -319,35 +319,33 @@ class AccountSnapshotSubscriber:
                     if time_since_last < self.snapshot_cooldown:
                         logger.debug(f"Skipping snapshot for account {account_id} (cooldown: {int(self.snapshot_cooldown - time_since_last)}s remaining)")
                         continue
-                
-                # Verify account belongs to customer (security check)
-                account = Account.query.filter_by(
-                    account_id=account_id,
-                    customer_id=customer_id
-                ).first()
-                
-                if account:
-                    try:
-                        snapshot = create_account_snapshot(
-                            account_id=account_id,
-                            customer_id=customer_id,
-                            snapshot_type='event_driven',
-                            trigger_event=event.event_type.value,
-                            force_create=False  # Respect safeguard
-                        )
-                        
-                        if snapshot:
-                            self.last_snapshot_times[account_key] = datetime.now()
-                            logger.info(f"✅ Auto-created snapshot {snapshot.snapshot_id} for account {account.account_name} (trigger: {event.event_type.value})")
-                        elif snapshot is None:
-                            # Snapshot creation was skipped due to safeguard (not an error)
-                            logger.debug(f"⏸️  Skipped snapshot creation for account {account.account_name}: Recent snapshot exists (safeguard)")
-                        else:
-                            logger.warning(f"⚠️  Failed to create snapshot for account {account.account_name}")
-                    except Exception as e:
-                        logger.error(f"Error creating snapshot for account {account.account_name}: {str(e)}")
-                else:
-                    logger.warning(f"Account {account_id} not found or doesn't belong to customer {customer_id}")
+                eligible_account_ids.append(account_id)
+            
+            if not eligible_account_ids:
+                return
+            
+            # One batch for all affected accounts; only accounts of this customer are
+            # snapshotted (security check) and the interval safeguard is respected
+            try:
+                snapshots = create_snapshots_for_customer(
+                    customer_id,
+                    snapshot_type='event_driven',
+                    trigger_event=event.event_type.value,
+                    force_create=False,  # Respect safeguard
+                    account_ids=eligible_account_ids
+                )
+            except Exception as e:
+                logger.error(f"Error creating snapshots for customer {customer_id}: {str(e)}")
+                return
+            
+            for snapshot in snapshots:
+                self.last_snapshot_times[f"{customer_id}_{snapshot.account_id}"] = datetime.now()
+                logger.info(f"✅ Auto-created snapshot {snapshot.snapshot_id} for account {snapshot.account_id} (trigger: {event.event_type.value})")
+            
+            skipped = len(eligible_account_ids) - len(snapshots)
+            if skipped:
+                # Skipped by the safeguard (recent snapshot exists) or not an account of this customer
+                logger.debug(f"⏸️  Skipped snapshot creation for {skipped} account(s) of customer {customer_id}")
         
         except Exception as e:
             logger.error(f"Error processing snapshot event: {str(e)}")
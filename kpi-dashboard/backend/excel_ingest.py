@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Excel Ingestion
+Streams KPI rows out of uploaded workbooks with openpyxl in read-only mode.
+
+A KPI workbook has an account sheet first, one sheet per KPI category, and a
+rollup sheet last. Each category sheet has a header row whose first cell is
+'Health Score Component' (after any title rows); the rows below it with a
+component are KPIs.
+
+- iter_workbook_kpis() yields one KPIRow per KPI, sheet by sheet. The header is
+  resolved to column positions once per sheet (KPI_COLUMN_ALIASES lists the
+  accepted spellings, first match wins), so rows are plain tuple lookups and
+  memory stays flat however large the workbook is.
+- iter_sheet_records() yields {column: value} dicts from a sheet whose first
+  row is the header (tabular seed files).
+
+Cell values are read as pandas.read_excel read them, so stored KPIs are
+unchanged: MISSING_VALUE_STRINGS and empty cells become None and integral
+floats become ints.
+"""
+
+import io
+from collections import namedtuple
+
+from openpyxl import load_workbook
+
+KPI_HEADER = 'Health Score Component'
+
+# KPIRow field -> header spellings, in order of preference
+KPI_COLUMN_ALIASES = {
+    'health_score_component': ('Health Score Component',),
+    'weight': ('Weight (%)', 'Weight', 'weight', 'WEIGHT', 'WEIGHT (%)'),
+    'data': ('Data',),
+    'source_review': ('Source Review',),
+    'kpi_parameter': ('KPI/Parameter',),
+    'impact_level': ('Impact level', 'Impact Level', 'Impact', 'impact level', 'IMPACT LEVEL'),
+    'measurement_frequency': ('Measurement Frequency',),
+}
+
+# Strings pandas.read_excel reads as missing (its default na_values)
+MISSING_VALUE_STRINGS = frozenset([
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+    '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null',
+])
+
+# Keyword arguments of a KPI model row, plus the sheet (category) and row it came from
+KPIRow = namedtuple('KPIRow', 'category row_index health_score_component weight data source_review '
+                              'kpi_parameter impact_level measurement_frequency')
+
+
+def open_workbook(source):
+    """Read-only workbook from a path, raw bytes or a binary file object"""
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    return load_workbook(source, read_only=True, data_only=True)
+
+
+def kpi_sheet_names(sheet_names, keep_short_workbooks=False):
+    """
+    KPI category sheets: all but the first (account) and last (rollup) sheet.
+    With keep_short_workbooks, a workbook of one or two sheets is read whole.
+    """
+    if keep_short_workbooks and len(sheet_names) <= 2:
+        return list(sheet_names)
+    return list(sheet_names[1:-1])
+
+
+def cell_value(value):
+    """Cell value as pandas.read_excel reads it (None for missing)"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return None if value in MISSING_VALUE_STRINGS else value
+    if isinstance(value, float):
+        if value != value:
+            return None
+        return int(value) if value.is_integer() else value
+    return value
+
+
+def resolve_header(header_row):
+    """{KPIRow field: column position} for a KPI sheet header row (fields without a column are left out)"""
+    positions = {}
+    for position, name in enumerate(header_row):
+        if name is not None and name not in positions:
+            positions[name] = position
+    header = {}
+    for field, aliases in KPI_COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias in positions:
+                header[field] = positions[alias]
+                break
+    return header
+
+
+def _rows(worksheet):
+    # Some writers store a wrong sheet dimension; read rows as they are in the file
+    worksheet.reset_dimensions()
+    return worksheet.iter_rows(values_only=True)
+
+
+def iter_sheet_kpis(worksheet, category):
+    """KPIRows of one category sheet (none when it has no KPI header row)"""
+    rows = _rows(worksheet)
+    for row_index, row in enumerate(rows):
+        if row and row[0] == KPI_HEADER:
+            break
+    else:
+        return
+
+    header = resolve_header(row)
+    width = max(header.values()) + 1
+    columns = [header.get(field) for field in KPIRow._fields[2:]]
+    component_position = header['health_score_component']
+
+    for row_index, row in enumerate(rows, start=row_index + 1):
+        if len(row) < width:
+            row = list(row) + [None] * (width - len(row))
+        if cell_value(row[component_position]) is None:
+            continue
+        values = [None if position is None else cell_value(row[position]) for position in columns]
+        if values[1] is not None:
+            values[1] = str(values[1])  # weight is kept as text, as entered
+        yield KPIRow(category, str(row_index), *values)
+
+
+def iter_workbook_kpis(source, keep_short_workbooks=False, errors=None):
+    """
+    KPIRows of every KPI category sheet of a workbook (see kpi_sheet_names).
+    A sheet that fails to read is skipped after the rows read before the
+    failure, and a message for it is appended to errors when a list is given.
+    """
+    workbook = open_workbook(source)
+    try:
+        for sheet_name in kpi_sheet_names(workbook.sheetnames, keep_short_workbooks):
+            try:
+                yield from iter_sheet_kpis(workbook[sheet_name], sheet_name)
+            except Exception as e:
+                print(f"Error processing sheet {sheet_name}: {str(e)}")
+                if errors is not None:
+                    errors.append(f"Error processing sheet {sheet_name}: {str(e)}")
+    finally:
+        workbook.close()
+
+
+def iter_sheet_records(source, sheet_name=None):
+    """
+    {column: value} dicts of the rows below a sheet's header (first) row; empty
+    cells are left out, so record.get(column, default) falls back to the default.
+    Reads the first sheet when sheet_name is None.
+    """
+    workbook = open_workbook(source)
+    try:
+        worksheet = workbook[sheet_name] if sheet_name else workbook.worksheets[0]
+        rows = _rows(worksheet)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [(position, name) for position, name in enumerate(header) if name is not None]
+        for row in rows:
+            record = {}
+            for position, name in columns:
+                if position < len(row):
+                    value = cell_value(row[position])
+                    if value is not None:
+                        record[name] = value
+            if record:
+                yield record
+    finally:
+        workbook.close()
@@ -9,6 +9,8 @@ import io
 from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
 
+from excel_ingest import iter_sheet_records, iter_workbook_kpis
+
 @dataclass
 class FormatInfo:
     """Information about detected file format"""
@@ -320,19 +322,15 @@ class StandardFormatAdapter(BaseFormatAdapter):
     
     def process(self, file_path: str, customer_id: int, account_name: str) -> List[Dict]:
         """Process standard format file"""
-        # This is the current implementation from upload_api.py
-        # Return standardized KPI data
-        pass
+        return [kpi_row._asdict() for kpi_row in iter_workbook_kpis(file_path)]
 
 class SimpleFormatAdapter(BaseFormatAdapter):
     """Adapter for simple KPI list format"""
     
     def process(self, file_path: str, customer_id: int, account_name: str) -> List[Dict]:
         """Process simple format file"""
-        df = pd.read_excel(file_path)
-        
         kpi_data = []
-        for _, row in df.iterrows():
+        for row in iter_sheet_records(file_path):
             kpi_data.append({
                 'category': row.get('Category', 'General'),
                 'kpi_parameter': row['KPI Name'],
@@ -351,10 +349,8 @@ class CustomFormatAdapter(BaseFormatAdapter):
     
     def process(self, file_path: str, customer_id: int, account_name: str) -> List[Dict]:
         """Process custom format file"""
-        df = pd.read_excel(file_path)
-        
         kpi_data = []
-        for _, row in df.iterrows():
+        for row in iter_sheet_records(file_path):
             kpi_data.append({
                 'category': row.get('Category', 'General'),
                 'kpi_parameter': row['KPI'],
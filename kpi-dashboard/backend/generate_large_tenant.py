@@ -0,0 +1,463 @@
+#!/usr/bin/env python3
+"""
+Synthetic Large-Tenant Generator
+
+Creates one customer with anywhere from 10 to 50,000 accounts and the data the
+hot endpoints read: products, account- and product-level KPIs (with their
+parsed values), monthly KPITimeSeries and HealthTrend rows, account snapshots,
+playbook triggers and playbook executions.
+
+Rows are built from a seeded random generator, so the same arguments always
+produce the same tenant, and are written with bulk INSERTs in batches (no ORM
+objects), which works on SQLite and PostgreSQL alike. Rows are streamed, so
+memory stays flat for very large tenants.
+
+Usage:
+    python generate_large_tenant.py --accounts 5000 [--customer-id 900]
+        [--kpis-per-account 20] [--products-per-account 3] [--months 12]
+        [--snapshots-per-account 3] [--playbook-rate 0.2] [--seed 42]
+        [--database-url sqlite:///instance/large_tenant.db] [--replace]
+"""
+
+import itertools
+import logging
+import os
+import random
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from sqlalchemy import func, insert, text
+
+from extensions import db
+from models import (
+    Customer, Account, Product, KPIUpload, KPI, KPITimeSeries, HealthTrend,
+    AccountSnapshot, PlaybookTrigger, PlaybookExecution, PlaybookReport,
+    AccountHealthSummary, AccountHealthPartial
+)
+from kpi_value_parser import parse_kpi_data_for_storage
+
+logger = logging.getLogger(__name__)
+
+MIN_ACCOUNTS = 10
+MAX_ACCOUNTS = 50000
+DEFAULT_BATCH_SIZE = 5000
+
+INDUSTRIES = ['Technology', 'Healthcare', 'Financial Services', 'Manufacturing', 'Retail', 'Education']
+REGIONS = ['North America', 'EMEA', 'APAC', 'LATAM']
+TIERS = ['Enterprise', 'Mid-Market', 'SMB']
+PRODUCT_NAMES = ['Core Platform', 'Analytics Suite', 'Mobile App', 'Integrations Hub', 'Security Pack', 'AI Assistant']
+PLAYBOOK_IDS = ['voc-sprint', 'activation-blitz', 'sla-stabilizer', 'renewal-rescue', 'expansion-timing']
+CATEGORY_SCORE_COLUMNS = {
+    'Product Usage KPI': 'product_usage_score',
+    'Support KPI': 'support_score',
+    'Customer Sentiment KPI': 'customer_sentiment_score',
+    'Business Outcomes KPI': 'business_outcomes_score',
+    'Relationship Strength': 'relationship_strength_score',
+}
+
+# (category, parameter, impact level, frequency, healthy value, unit, higher is better)
+KPI_TEMPLATES = [
+    ('Product Usage KPI', 'Product Activation Rate', 'High', 'Monthly', 78, '%', True),
+    ('Product Usage KPI', 'Feature Adoption Rate', 'High', 'Monthly', 72, '%', True),
+    ('Product Usage KPI', 'Onboarding Completion Rate', 'High', 'Monthly', 88, '%', True),
+    ('Product Usage KPI', 'Time to First Value (TTFV)', 'High', 'Weekly', 12, 'days', False),
+    ('Product Usage KPI', 'Training Participation Rate', 'Medium', 'Monthly', 75, '%', True),
+    ('Support KPI', 'First Response Time', 'High', 'Daily', 1.5, 'hours', False),
+    ('Support KPI', 'Mean Time to Resolution (MTTR)', 'High', 'Daily', 4.2, 'hours', False),
+    ('Support KPI', 'Ticket Volume', 'Medium', 'Daily', 15, '', False),
+    ('Support KPI', 'First Contact Resolution (FCR)', 'High', 'Monthly', 82, '%', True),
+    ('Support KPI', 'Support Cost per Ticket', 'Low', 'Monthly', 125, '$', False),
+    ('Customer Sentiment KPI', 'Net Promoter Score (NPS)', 'High', 'Quarterly', 45, '', True),
+    ('Customer Sentiment KPI', 'Customer Satisfaction (CSAT)', 'High', 'Monthly', 4.3, '', True),
+    ('Customer Sentiment KPI', 'Customer Complaints', 'High', 'Daily', 2, '', False),
+    ('Business Outcomes KPI', 'Net Revenue Retention (NRR)', 'High', 'Quarterly', 108, '%', True),
+    ('Business Outcomes KPI', 'Gross Revenue Retention (GRR)', 'High', 'Quarterly', 95, '%', True),
+    ('Business Outcomes KPI', 'Revenue Growth', 'High', 'Quarterly', 15, '%', True),
+    ('Business Outcomes KPI', 'Upsell and Cross-sell Revenue', 'High', 'Monthly', 180000, '$', True),
+    ('Business Outcomes KPI', 'Days Sales Outstanding (DSO)', 'Medium', 'Monthly', 38, 'days', False),
+    ('Relationship Strength', 'Executive Sponsor Engagement', 'High', 'Quarterly', 85, '%', True),
+    ('Relationship Strength', 'Champion Strength', 'Medium', 'Quarterly', 82, '%', True),
+]
+# Parameters also tracked per product (account rows are then their weighted average)
+PRODUCT_KPI_PARAMETERS = {'Product Activation Rate', 'Feature Adoption Rate', 'Training Participation Rate'}
+
+
+def _format_value(value: float, unit: str) -> str:
+    if unit == '%':
+        return f'{value:.1f}%'
+    if unit == '$':
+        return f'${value:,.0f}'
+    if unit in ('days', 'hours'):
+        return f'{value:.1f} {unit}'
+    return f'{value:.1f}'
+
+
+def _kpi_score(value: float, healthy: float, higher_is_better: bool) -> float:
+    """0-100 score of a value relative to its healthy value"""
+    ratio = value / healthy if higher_is_better else healthy / max(value, 1e-9)
+    return round(max(0.0, min(100.0, ratio * 80.0)), 2)
+
+
+def _health_status(score: float) -> str:
+    return 'Healthy' if score >= 70 else 'Risk' if score >= 40 else 'Critical'
+
+
+def _months_back(as_of: datetime, months: int) -> List[tuple]:
+    """(month, year) of the last `months` months, oldest first, ending at as_of"""
+    periods = []
+    month, year = as_of.month, as_of.year
+    for _ in range(months):
+        periods.append((month, year))
+        month, year = (12, year - 1) if month == 1 else (month - 1, year)
+    return periods[::-1]
+
+
+def _next_id(column) -> int:
+    return (db.session.query(func.max(column)).scalar() or 0) + 1
+
+
+# Tables whose rows are written with explicit ids
+_EXPLICIT_ID_COLUMNS = (Customer.customer_id, Account.account_id, Product.product_id, KPIUpload.upload_id, KPI.kpi_id)
+
+
+def _sync_id_sequences():
+    """
+    Move the PostgreSQL serial sequences past the ids written explicitly, so the
+    next ordinary INSERT (an upload, a new account) doesn't reuse one. SQLite
+    needs nothing: it picks max(id) + 1 itself.
+    """
+    if db.session.get_bind().dialect.name != 'postgresql':
+        return
+    for column in _EXPLICIT_ID_COLUMNS:
+        table, name = column.table.name, column.name
+        db.session.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', '{name}'), "
+            f"(SELECT COALESCE(MAX({name}), 1) FROM {table}))"
+        ))
+
+
+def _bulk_insert(model, rows: Iterable[Dict], batch_size: int) -> int:
+    """INSERT rows in executemany batches; returns the number of rows written"""
+    rows = iter(rows)
+    written = 0
+    while True:
+        batch = list(itertools.islice(rows, batch_size))
+        if not batch:
+            return written
+        db.session.execute(insert(model), batch)
+        written += len(batch)
+        if written % (batch_size * 20) == 0:
+            logger.info(f"{model.__tablename__}: {written} rows")
+
+
+class _TenantPlan:
+    """Deterministic attributes of the tenant's accounts, drawn once and reused by every table"""
+
+    def __init__(self, rng: random.Random, customer_id: int, first_account_id: int, accounts: int,
+                 kpis_per_account: int, products_per_account: int, periods: List[tuple]):
+        self.customer_id = customer_id
+        self.periods = periods
+        self.templates = [KPI_TEMPLATES[i % len(KPI_TEMPLATES)] for i in range(kpis_per_account)]
+        self.accounts = []
+        for offset in range(accounts):
+            account_id = first_account_id + offset
+            self.accounts.append({
+                'account_id': account_id,
+                'name': f'Synthetic {customer_id}-{offset + 1:05d}',
+                'revenue': round(rng.lognormvariate(12.5, 1.2), 2),
+                'industry': rng.choice(INDUSTRIES),
+                'region': rng.choice(REGIONS),
+                'tier': rng.choice(TIERS),
+                'status': 'active' if rng.random() < 0.92 else 'inactive',
+                'products': rng.sample(PRODUCT_NAMES, rng.randint(0, min(products_per_account, len(PRODUCT_NAMES)))),
+                # Account quality drives every KPI value, so health varies between accounts
+                'quality': rng.uniform(0.55, 1.25),
+                'drift': rng.uniform(-0.02, 0.02),
+            })
+
+    def value(self, rng: random.Random, account: Dict, template, months_ago: int = 0) -> float:
+        healthy, higher_is_better = template[4], template[6]
+        quality = account['quality'] * (1 - account['drift'] * months_ago)
+        factor = quality if higher_is_better else 1 / quality
+        return max(0.0, healthy * factor * rng.uniform(0.9, 1.1))
+
+
+def generate_large_tenant(customer_id: int = 900, accounts: int = 1000, kpis_per_account: int = 20,
+                          products_per_account: int = 3, months: int = 12, snapshots_per_account: int = 3,
+                          playbook_rate: float = 0.2, seed: int = 42, as_of: Optional[datetime] = None,
+                          batch_size: int = DEFAULT_BATCH_SIZE, replace: bool = False) -> Dict[str, int]:
+    """
+    Generate a synthetic tenant in the current app's database and commit it.
+    With replace=True an existing tenant with this customer_id is deleted first
+    (otherwise its rows are kept and the new accounts are added to it).
+    Returns the number of rows written per table.
+    """
+    if not MIN_ACCOUNTS <= accounts <= MAX_ACCOUNTS:
+        raise ValueError(f'accounts must be between {MIN_ACCOUNTS} and {MAX_ACCOUNTS}')
+    as_of = as_of or datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    rng = random.Random(f'{seed}-{customer_id}')
+
+    if replace:
+        delete_tenant(customer_id)
+    if db.session.get(Customer, customer_id) is None:
+        db.session.add(Customer(customer_id=customer_id, customer_name=f'Synthetic Tenant {customer_id}',
+                                email=f'synthetic-{customer_id}@example.com'))
+        db.session.flush()
+
+    plan = _TenantPlan(rng, customer_id, _next_id(Account.account_id), accounts,
+                       kpis_per_account, products_per_account, _months_back(as_of, months))
+    counts = {}
+
+    counts['accounts'] = _bulk_insert(Account, ({
+        'account_id': a['account_id'], 'customer_id': customer_id, 'account_name': a['name'],
+        'revenue': a['revenue'], 'account_status': a['status'], 'industry': a['industry'],
+        'region': a['region'], 'external_account_id': f'EXT-{a["account_id"]}',
+        'profile_metadata': {'account_tier': a['tier']},
+    } for a in plan.accounts), batch_size)
+
+    product_ids = _insert_products(plan, rng, counts, batch_size)
+    upload_id = _next_id(KPIUpload.upload_id)
+    db.session.execute(insert(KPIUpload), [{
+        'upload_id': upload_id, 'customer_id': customer_id, 'version': 1,
+        'original_filename': f'synthetic_tenant_{customer_id}.xlsx',
+    }])
+    account_kpis = _insert_kpis(plan, rng, upload_id, product_ids, counts, batch_size)
+    _insert_history(plan, rng, account_kpis, counts, batch_size)
+    _insert_snapshots(plan, rng, as_of, snapshots_per_account, counts, batch_size)
+    _insert_playbooks(plan, rng, as_of, playbook_rate, counts, batch_size)
+    _sync_id_sequences()
+    db.session.commit()
+
+    # Derived read models and caches, as after an upload
+    from account_health_summary import refresh_account_health_summaries
+    from tenant_result_cache import invalidate_tenant_results
+    refresh_account_health_summaries(customer_id)
+    invalidate_tenant_results(customer_id)
+    logger.info(f"Generated tenant {customer_id}: {counts}")
+    return counts
+
+
+def _insert_products(plan: _TenantPlan, rng: random.Random, counts: Dict, batch_size: int) -> Dict[tuple, int]:
+    """Products of every account; returns {(account_id, product_name): product_id}"""
+    product_ids = {}
+    next_id = _next_id(Product.product_id)
+    rows = []
+    for account in plan.accounts:
+        for name in account['products']:
+            product_ids[(account['account_id'], name)] = next_id
+            rows.append({
+                'product_id': next_id, 'account_id': account['account_id'], 'customer_id': plan.customer_id,
+                'product_name': name, 'product_sku': f'SKU-{next_id}', 'product_type': 'Software',
+                'revenue': round(account['revenue'] * rng.uniform(0.1, 0.5), 2), 'status': 'active',
+            })
+            next_id += 1
+    counts['products'] = _bulk_insert(Product, rows, batch_size)
+    return product_ids
+
+
+def _kpi_row(kpi_id, upload_id, account_id, template, data, row_index, product_id=None, aggregation_type=None):
+    value_numeric, value_unit, value_parse_status = parse_kpi_data_for_storage(data)
+    return {
+        'kpi_id': kpi_id, 'upload_id': upload_id, 'account_id': account_id, 'product_id': product_id,
+        'aggregation_type': aggregation_type, 'category': template[0], 'row_index': row_index,
+        'health_score_component': template[0], 'weight': template[2], 'data': data,
+        'source_review': 'Synthetic', 'kpi_parameter': template[1], 'impact_level': template[2],
+        'measurement_frequency': template[3], 'value_numeric': value_numeric,
+        'value_unit': value_unit, 'value_parse_status': value_parse_status,
+    }
+
+
+def _insert_kpis(plan: _TenantPlan, rng: random.Random, upload_id: int, product_ids: Dict,
+                 counts: Dict, batch_size: int) -> Dict[int, List[tuple]]:
+    """
+    Account-level KPIs (and product-level rows for PRODUCT_KPI_PARAMETERS).
+    Returns {account_id: [(kpi_id, template), ...]} of the account-level KPIs.
+    """
+    account_kpis: Dict[int, List[tuple]] = {}
+    next_id = itertools.count(_next_id(KPI.kpi_id))
+
+    def rows() -> Iterator[Dict]:
+        for account in plan.accounts:
+            kpis = account_kpis.setdefault(account['account_id'], [])
+            for row_index, template in enumerate(plan.templates):
+                per_product = account['products'] and template[1] in PRODUCT_KPI_PARAMETERS
+                kpi_id = next(next_id)
+                kpis.append((kpi_id, template))
+                yield _kpi_row(kpi_id, upload_id, account['account_id'], template,
+                               _format_value(plan.value(rng, account, template), template[5]), row_index,
+                               aggregation_type='weighted_avg' if per_product else None)
+                if per_product:
+                    for name in account['products']:
+                        yield _kpi_row(next(next_id), upload_id, account['account_id'], template,
+                                       _format_value(plan.value(rng, account, template), template[5]), row_index,
+                                       product_id=product_ids[(account['account_id'], name)])
+
+    counts['kpis'] = _bulk_insert(KPI, rows(), batch_size)
+    return account_kpis
+
+
+def _insert_history(plan: _TenantPlan, rng: random.Random, account_kpis: Dict, counts: Dict, batch_size: int):
+    """Monthly KPITimeSeries of every account-level KPI and the matching HealthTrend rows"""
+    trends = []
+
+    def series() -> Iterator[Dict]:
+        for account in plan.accounts:
+            for months_ago, (month, year) in enumerate(reversed(plan.periods)):
+                category_scores: Dict[str, List[float]] = {}
+                for kpi_id, template in account_kpis[account['account_id']]:
+                    value = plan.value(rng, account, template, months_ago)
+                    score = _kpi_score(value, template[4], template[6])
+                    category_scores.setdefault(template[0], []).append(score)
+                    yield {
+                        'kpi_id': kpi_id, 'account_id': account['account_id'], 'customer_id': plan.customer_id,
+                        'month': month, 'year': year, 'value': round(min(value, 99999999.99), 2),
+                        'health_status': _health_status(score), 'health_score': score,
+                    }
+                averages = {category: sum(scores) / len(scores) for category, scores in category_scores.items()}
+                trend = {
+                    'account_id': account['account_id'], 'customer_id': plan.customer_id,
+                    'month': month, 'year': year,
+                    'overall_health_score': round(sum(averages.values()) / len(averages), 2) if averages else 0,
+                    'total_kpis': len(account_kpis[account['account_id']]),
+                    'valid_kpis': len(account_kpis[account['account_id']]),
+                }
+                for category, column in CATEGORY_SCORE_COLUMNS.items():
+                    trend[column] = round(averages[category], 2) if category in averages else None
+                trends.append(trend)
+            if len(trends) >= batch_size:
+                counts['health_trends'] = counts.get('health_trends', 0) + _bulk_insert(HealthTrend, trends, batch_size)
+                trends.clear()
+
+    counts['kpi_time_series'] = _bulk_insert(KPITimeSeries, series(), batch_size)
+    counts['health_trends'] = counts.get('health_trends', 0) + _bulk_insert(HealthTrend, trends, batch_size)
+
+
+def _insert_snapshots(plan: _TenantPlan, rng: random.Random, as_of: datetime, snapshots_per_account: int,
+                      counts: Dict, batch_size: int):
+    def rows() -> Iterator[Dict]:
+        for account in plan.accounts:
+            previous = None
+            for index in range(snapshots_per_account):
+                days_ago = (snapshots_per_account - index) * 30
+                score = round(max(0.0, min(100.0, 70 * account['quality'] * rng.uniform(0.95, 1.05))), 2)
+                change = round(score - previous, 2) if previous is not None else None
+                previous = score
+                yield {
+                    'account_id': account['account_id'], 'customer_id': plan.customer_id,
+                    'snapshot_timestamp': as_of - timedelta(days=days_ago), 'snapshot_type': 'scheduled',
+                    'snapshot_reason': 'Synthetic history', 'snapshot_version': 1,
+                    'revenue': account['revenue'], 'overall_health_score': score,
+                    'health_score_change_from_last': change,
+                    'health_score_trend': 'stable' if not change else 'improving' if change > 0 else 'declining',
+                    'account_status': account['status'], 'industry': account['industry'],
+                    'region': account['region'], 'account_tier': account['tier'],
+                    'external_account_id': f'EXT-{account["account_id"]}',
+                    'products_used': account['products'], 'product_count': len(account['products']),
+                    'primary_product': account['products'][0] if account['products'] else None,
+                    'total_kpis': len(plan.templates), 'account_level_kpis': len(plan.templates),
+                }
+
+    counts['account_snapshots'] = _bulk_insert(AccountSnapshot, rows(), batch_size)
+
+
+def _insert_playbooks(plan: _TenantPlan, rng: random.Random, as_of: datetime, playbook_rate: float,
+                      counts: Dict, batch_size: int):
+    existing = {t.playbook_type for t in PlaybookTrigger.query.filter_by(customer_id=plan.customer_id)}
+    triggers = [{
+        'customer_id': plan.customer_id, 'playbook_type': playbook_type, 'auto_trigger_enabled': True,
+        'trigger_config': '{}', 'trigger_count': 0,
+    } for playbook_type in ('voc', 'activation') if playbook_type not in existing]
+    counts['playbook_triggers'] = _bulk_insert(PlaybookTrigger, triggers, batch_size)
+
+    def rows() -> Iterator[Dict]:
+        for account in plan.accounts:
+            if rng.random() >= playbook_rate:
+                continue
+            playbook_id = rng.choice(PLAYBOOK_IDS)
+            started_at = as_of - timedelta(days=rng.randint(1, 120))
+            completed = rng.random() < 0.5
+            completed_at = started_at + timedelta(days=rng.randint(7, 45)) if completed else None
+            status = 'completed' if completed else 'in-progress'
+            yield {
+                'execution_id': str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+                'customer_id': plan.customer_id, 'account_id': account['account_id'],
+                'playbook_id': playbook_id, 'status': status, 'current_step': 'step-1',
+                'execution_data': {
+                    'playbookId': playbook_id, 'status': status, 'accountId': account['account_id'],
+                    'startedAt': started_at.isoformat(),
+                    'completedAt': completed_at.isoformat() if completed_at else None,
+                    'context': {'accountId': account['account_id']}, 'results': [],
+                },
+                'started_at': started_at, 'completed_at': completed_at,
+            }
+
+    counts['playbook_executions'] = _bulk_insert(PlaybookExecution, rows(), batch_size)
+
+
+def delete_tenant(customer_id: int):
+    """Delete every generated row of a tenant (children first), keeping the customer row"""
+    account_ids = db.session.query(Account.account_id).filter(Account.customer_id == customer_id)
+    execution_ids = db.session.query(PlaybookExecution.execution_id).filter(
+        PlaybookExecution.customer_id == customer_id)
+    for query in (
+        PlaybookReport.query.filter(PlaybookReport.execution_id.in_(execution_ids)),
+        PlaybookExecution.query.filter_by(customer_id=customer_id),
+        PlaybookTrigger.query.filter_by(customer_id=customer_id),
+        AccountSnapshot.query.filter_by(customer_id=customer_id),
+        KPITimeSeries.query.filter_by(customer_id=customer_id),
+        HealthTrend.query.filter_by(customer_id=customer_id),
+        AccountHealthSummary.query.filter_by(customer_id=customer_id),
+        AccountHealthPartial.query.filter_by(customer_id=customer_id),
+        KPI.query.filter(KPI.account_id.in_(account_ids)),
+        KPIUpload.query.filter_by(customer_id=customer_id),
+        Product.query.filter_by(customer_id=customer_id),
+        Account.query.filter_by(customer_id=customer_id),
+    ):
+        query.delete(synchronize_session=False)
+    db.session.commit()
+
+
+def create_app(database_url: str):
+    """Minimal app bound to database_url, with every table created"""
+    from flask import Flask
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_url
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Generate a synthetic large tenant')
+    parser.add_argument('--accounts', type=int, default=1000, help=f'Accounts ({MIN_ACCOUNTS}-{MAX_ACCOUNTS})')
+    parser.add_argument('--customer-id', type=int, default=900, help='Customer ID of the tenant')
+    parser.add_argument('--kpis-per-account', type=int, default=20, help='Account-level KPIs per account')
+    parser.add_argument('--products-per-account', type=int, default=3, help='Maximum products per account')
+    parser.add_argument('--months', type=int, default=12, help='Months of KPI time series and health trends')
+    parser.add_argument('--snapshots-per-account', type=int, default=3, help='Account snapshots per account')
+    parser.add_argument('--playbook-rate', type=float, default=0.2, help='Share of accounts with a playbook execution')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='Rows per INSERT batch')
+    parser.add_argument('--database-url', default=os.getenv('DATABASE_URL'), help='Database (default: DATABASE_URL)')
+    parser.add_argument('--replace', action='store_true', help='Delete the existing tenant first')
+    args = parser.parse_args()
+
+    if not args.database_url:
+        parser.error('--database-url or DATABASE_URL is required')
+    logging.basicConfig(level=logging.INFO)
+    with create_app(args.database_url).app_context():
+        started = datetime.now()
+        counts = generate_large_tenant(
+            customer_id=args.customer_id, accounts=args.accounts, kpis_per_account=args.kpis_per_account,
+            products_per_account=args.products_per_account, months=args.months,
+            snapshots_per_account=args.snapshots_per_account, playbook_rate=args.playbook_rate,
+            seed=args.seed, batch_size=args.batch_size, replace=args.replace
+        )
+    elapsed = (datetime.now() - started).total_seconds()
+    print(f"✅ Generated tenant {args.customer_id} in {elapsed:.1f}s")
+    for table, count in counts.items():
+        print(f"   {table:<22} {count:>10,}")
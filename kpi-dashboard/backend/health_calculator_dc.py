@@ -1,11 +1,20 @@
 """
 Data Center Health Score Calculator
 Calculates health scores for DC accounts based on DC KPIs
+
+KPIs are resolved against prebuilt id/name indexes of DC_KPIS and their risk
+bands are evaluated with NumPy over band tables built once at import, so a whole
+tenant is scored in one pass (calculate_dc_health_scores / load_dc_health_scores).
 """
 
-from typing import Dict, List, Optional
-from kpi_definitions_dc import DC_KPIS, calculate_risk_band
-from health_score_engine import HealthScoreEngine
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from extensions import db
+from models import KPI, KPIUpload
+from kpi_definitions_dc import DC_KPIS, resolve_kpi
+from kpi_value_parser import parse_kpi_data, stored_kpi_value
 
 # DC-specific category weights
 DC_CATEGORY_WEIGHTS = {
@@ -15,6 +24,167 @@ DC_CATEGORY_WEIGHTS = {
     "Business Outcomes": 0.20,          # 20%
     "Relationship Strength": 0.10        # 10%
 }
+DEFAULT_DC_CATEGORY_WEIGHT = 0.20
+
+# Risk band -> score (0-100); KPIs without bands or outside every band count as healthy
+DC_RISK_BAND_SCORES = {
+    "healthy": 85,
+    "at_risk": 60,
+    "critical": 30,
+    "expansion": 95  # Expansion is good
+}
+UNKNOWN_BAND_SCORE = 50
+
+# Position of every DC KPI in the band tables
+DC_KPI_IDS = list(DC_KPIS)
+DC_KPI_POSITIONS = {kpi_id: i for i, kpi_id in enumerate(DC_KPI_IDS)}
+DC_PILLARS = list(dict.fromkeys(kpi.get("pillar", "Unknown") for kpi in DC_KPIS.values()))
+_KPI_PILLAR = np.array([DC_PILLARS.index(DC_KPIS[kpi_id].get("pillar", "Unknown")) for kpi_id in DC_KPI_IDS])
+
+
+def _build_band_tables() -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """[kpi position, band slot] lower bounds, upper bounds and scores (NaN bounds = no band)"""
+    slots = max(len(kpi.get("risk_bands", {})) for kpi in DC_KPIS.values())
+    lower = np.full((len(DC_KPI_IDS), slots), np.nan)
+    upper = np.full((len(DC_KPI_IDS), slots), np.nan)
+    scores = np.zeros((len(DC_KPI_IDS), slots))
+    for i, kpi_id in enumerate(DC_KPI_IDS):
+        for slot, (band, (min_val, max_val)) in enumerate(DC_KPIS[kpi_id].get("risk_bands", {}).items()):
+            lower[i, slot] = min_val
+            upper[i, slot] = max_val
+            scores[i, slot] = DC_RISK_BAND_SCORES.get(band, UNKNOWN_BAND_SCORE)
+    return lower, upper, scores
+
+
+_BAND_LOWER, _BAND_UPPER, _BAND_SCORES = _build_band_tables()
+
+EMPTY_DC_HEALTH = {
+    "overall_score": 0,
+    "health_status": "unknown",
+    "category_scores": {},
+    "kpi_count": 0
+}
+
+
+def dc_kpi_position(kpi_key) -> int:
+    """Band table position of a DC KPI id or name, or -1"""
+    kpi_def = resolve_kpi(kpi_key) if isinstance(kpi_key, str) else None
+    return DC_KPI_POSITIONS[kpi_def["id"]] if kpi_def else -1
+
+
+def dc_value(value) -> Optional[float]:
+    """Numeric value of a KPI data string or number, or None"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return parse_kpi_data(value)[0]
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return None
+
+
+def dc_kpi_value(kpi, empty: Optional[float] = None) -> Optional[float]:
+    """Numeric value of a KPI row, read from its stored parse when available"""
+    if not kpi.data:
+        return empty
+    available, value, unit = stored_kpi_value(kpi)
+    return value if available else dc_value(kpi.data)
+
+
+def risk_band_scores(positions: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Band score of each value for the DC KPI at the same band table position"""
+    lower = _BAND_LOWER[positions]
+    upper = _BAND_UPPER[positions]
+    band_scores = _BAND_SCORES[positions]
+    scores = np.full(len(values), float(DC_RISK_BAND_SCORES["healthy"]))
+    # Walk slots last to first so the first matching band wins, like calculate_risk_band
+    with np.errstate(invalid='ignore'):
+        for slot in reversed(range(lower.shape[1])):
+            hit = (lower[:, slot] <= values) & (values < upper[:, slot])
+            scores = np.where(hit, band_scores[:, slot], scores)
+    return scores
+
+
+def _health_status(overall_score: float) -> str:
+    if overall_score >= 70:
+        return "healthy"
+    if overall_score >= 50:
+        return "at_risk"
+    return "critical"
+
+
+def calculate_dc_health_scores(rows: Iterable[Tuple[Hashable, int, Optional[float]]]) -> Dict[Hashable, Dict]:
+    """
+    Score many DC accounts at once
+    Args:
+        rows: (account key, dc_kpi_position, numeric value or None) per KPI
+    Returns:
+        {account key: health dict as returned by calculate_dc_health_score}
+    """
+    groups = {}
+    group_index, positions, values, valid = [], [], [], []
+    for group, position, value in rows:
+        group_index.append(groups.setdefault(group, len(groups)))
+        positions.append(position)
+        valid.append(value is not None)
+        values.append(np.nan if value is None else value)
+    if not groups:
+        return {}
+
+    group_index = np.array(group_index)
+    positions = np.array(positions)
+    values = np.array(values, dtype=float)
+    valid = np.array(valid)
+    n_groups, n_pillars = len(groups), len(DC_PILLARS)
+
+    matched = positions >= 0
+    scored = matched & valid
+    scores = risk_band_scores(positions[scored], values[scored])
+
+    # One (account, pillar) cell per matched KPI
+    cells = group_index[matched] * n_pillars + _KPI_PILLAR[positions[matched]]
+    scored_cells = group_index[scored] * n_pillars + _KPI_PILLAR[positions[scored]]
+    size = n_groups * n_pillars
+    kpi_counts = np.bincount(cells, minlength=size).reshape(n_groups, n_pillars)
+    score_counts = np.bincount(scored_cells, minlength=size).reshape(n_groups, n_pillars)
+    score_sums = np.bincount(scored_cells, weights=scores, minlength=size).reshape(n_groups, n_pillars)
+    total_counts = np.bincount(group_index, minlength=n_groups)
+    # Categories are reported in the order their first KPI appears
+    first_seen = np.full(size, len(positions))
+    np.minimum.at(first_seen, cells, np.flatnonzero(matched))
+    category_order = np.argsort(first_seen.reshape(n_groups, n_pillars), axis=1, kind='stable')
+
+    results = {}
+    for group, g in groups.items():
+        category_scores = {}
+        total_weighted_score = 0
+        total_weight = 0
+        for p in category_order[g]:
+            if not kpi_counts[g, p]:
+                continue
+            category = DC_PILLARS[p]
+            category_weight = DC_CATEGORY_WEIGHTS.get(category, DEFAULT_DC_CATEGORY_WEIGHT)
+            avg_category_score = float(score_sums[g, p] / score_counts[g, p]) if score_counts[g, p] else 0
+            category_scores[category] = {
+                "score": avg_category_score,
+                "weight": category_weight,
+                "weighted_score": avg_category_score * category_weight,
+                "kpi_count": int(kpi_counts[g, p])
+            }
+            total_weighted_score += avg_category_score * category_weight
+            total_weight += category_weight
+
+        overall_score = total_weighted_score / total_weight if total_weight > 0 else 0
+        results[group] = {
+            "overall_score": round(overall_score, 2),
+            "health_status": _health_status(overall_score),
+            "category_scores": category_scores,
+            "kpi_count": int(total_counts[g]),
+            "valid_kpi_count": int(kpi_counts[g].sum())
+        }
+    return results
+
 
 def calculate_dc_health_score(account_kpis: List[Dict]) -> Dict:
     """
@@ -25,108 +195,62 @@ def calculate_dc_health_score(account_kpis: List[Dict]) -> Dict:
         Dictionary with overall score, category scores, and breakdown
     """
     if not account_kpis:
-        return {
-            "overall_score": 0,
-            "health_status": "unknown",
-            "category_scores": {},
-            "kpi_count": 0
-        }
-    
-    # Group KPIs by pillar/category
-    category_kpis = {}
+        return dict(EMPTY_DC_HEALTH)
+
+    rows = []
     for kpi_data in account_kpis:
-        kpi_id = kpi_data.get("kpi_id") or kpi_data.get("kpi_parameter")
-        kpi_def = DC_KPIS.get(kpi_id) if isinstance(kpi_id, str) else None
-        
-        if not kpi_def:
-            # Try to find by name
-            kpi_name = kpi_data.get("kpi_parameter", "")
-            for k_id, k_def in DC_KPIS.items():
-                if k_def.get("name") == kpi_name:
-                    kpi_def = k_def
-                    break
-        
-        if kpi_def:
-            pillar = kpi_def.get("pillar", "Unknown")
-            if pillar not in category_kpis:
-                category_kpis[pillar] = []
-            category_kpis[pillar].append(kpi_data)
-    
-    # Calculate category scores
-    category_scores = {}
-    total_weighted_score = 0
-    total_weight = 0
-    
-    for category, kpis in category_kpis.items():
-        category_weight = DC_CATEGORY_WEIGHTS.get(category, 0.20)
-        
-        # Calculate average health for this category
-        category_health_scores = []
-        for kpi in kpis:
-            value = kpi.get("data") or kpi.get("value")
-            if value is None:
-                continue
-            
-            # Parse value
-            try:
-                if isinstance(value, str):
-                    # Remove units and parse
-                    value_str = value.replace("%", "").replace("$", "").replace(",", "").strip()
-                    numeric_value = float(value_str)
-                else:
-                    numeric_value = float(value)
-            except (ValueError, TypeError):
-                continue
-            
-            # Get risk band
-            kpi_id = kpi.get("kpi_id") or kpi.get("kpi_parameter")
-            risk_band = calculate_risk_band(kpi_id, numeric_value)
-            
-            # Convert risk band to score (0-100)
-            if risk_band == "healthy":
-                score = 85
-            elif risk_band == "at_risk":
-                score = 60
-            elif risk_band == "critical":
-                score = 30
-            elif risk_band == "expansion":
-                score = 95  # Expansion is good
-            else:
-                score = 50
-            
-            category_health_scores.append(score)
-        
-        if category_health_scores:
-            avg_category_score = sum(category_health_scores) / len(category_health_scores)
-        else:
-            avg_category_score = 0
-        
-        category_scores[category] = {
-            "score": avg_category_score,
-            "weight": category_weight,
-            "weighted_score": avg_category_score * category_weight,
-            "kpi_count": len(kpis)
-        }
-        
-        total_weighted_score += avg_category_score * category_weight
-        total_weight += category_weight
-    
-    # Calculate overall score
-    overall_score = total_weighted_score / total_weight if total_weight > 0 else 0
-    
-    # Determine health status
-    if overall_score >= 70:
-        health_status = "healthy"
-    elif overall_score >= 50:
-        health_status = "at_risk"
-    else:
-        health_status = "critical"
-    
-    return {
-        "overall_score": round(overall_score, 2),
-        "health_status": health_status,
-        "category_scores": category_scores,
-        "kpi_count": len(account_kpis),
-        "valid_kpi_count": sum(len(kpis) for kpis in category_kpis.values())
-    }
+        position = dc_kpi_position(kpi_data.get("kpi_id") or kpi_data.get("kpi_parameter"))
+        if position < 0:
+            position = dc_kpi_position(kpi_data.get("kpi_parameter", ""))
+        rows.append((0, position, dc_value(kpi_data.get("data") or kpi_data.get("value"))))
+    return calculate_dc_health_scores(rows)[0]
+
+
+def average_dc_kpis(rows: Iterable[Tuple[Hashable, str, Optional[float]]]) -> List[Tuple[Hashable, str, float]]:
+    """
+    Collapse (account key, kpi_parameter, value) rows to one row per account and
+    parameter holding the mean value to 2 decimals; None values are skipped
+    """
+    totals = {}
+    for group, kpi_parameter, value in rows:
+        if value is None:
+            continue
+        total = totals.setdefault((group, kpi_parameter), [0.0, 0])
+        total[0] += value
+        total[1] += 1
+    return [(group, kpi_parameter, float(f"{value_sum / count:.2f}"))
+            for (group, kpi_parameter), (value_sum, count) in totals.items()]
+
 
+def load_dc_health_scores(customer_id: int, period: Optional[int] = None,
+                          account_ids: Optional[List[int]] = None) -> Dict[int, Dict]:
+    """
+    Score a customer's DC accounts from their uploaded KPIs in one query
+    Args:
+        customer_id: tenant
+        period: upload period (KPIUpload.period) to score; None averages every period
+        account_ids: restrict to these accounts
+    Returns:
+        {account_id: health dict} for accounts that have KPIs
+    """
+    query = db.session.query(
+        KPI.account_id, KPI.kpi_parameter, KPI.data,
+        KPI.value_numeric, KPI.value_unit, KPI.value_parse_status
+    ).join(
+        KPIUpload, KPI.upload_id == KPIUpload.upload_id
+    ).filter(
+        KPIUpload.customer_id == customer_id
+    )
+    if period is not None:
+        query = query.filter(KPIUpload.period == period)
+    if account_ids is not None:
+        query = query.filter(KPI.account_id.in_(account_ids))
+    kpis = query.order_by(KPI.account_id, KPI.kpi_id).all()
+
+    if period is None:
+        # Aggregate: one KPI per parameter holding its mean across periods (empty data counts as 0)
+        averaged = average_dc_kpis((kpi.account_id, kpi.kpi_parameter, dc_kpi_value(kpi, empty=0.0)) for kpi in kpis)
+        rows = [(account_id, dc_kpi_position(kpi_parameter), value) for account_id, kpi_parameter, value in averaged]
+    else:
+        rows = [(kpi.account_id, dc_kpi_position(kpi.kpi_parameter), dc_kpi_value(kpi)) for kpi in kpis]
+    return calculate_dc_health_scores(rows)
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Partitioned Health Recalculation Job Runner
+Recomputes the monthly HealthTrend rows of any set of customers. Each customer's
+accounts are split into account-id range partitions that are scored in a process
+pool with BatchHealthScoreEngine (rollup methodology, like
+HealthScoreStorageService) and written back with one bulk upsert per partition.
+
+Progress (accounts done, accounts/sec) is reported after every partition. With a
+checkpoint file the partition plan and the completed partitions are saved as the
+job runs, so a crashed job resumes where it stopped; the file is removed once the
+job finishes.
+"""
+
+import json
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional
+
+from extensions import db
+from models import Account, KPI
+from health_score_batch import BatchHealthScoreEngine
+from health_score_storage import (
+    HealthScoreStorageService, ROLLUP_CATEGORY_WEIGHTS, health_trend_rows, upsert_health_trends
+)
+from account_health_summary import refresh_account_health_summaries
+from tenant_result_cache import invalidate_tenant_results
+from tenant_data_version import clear_data_version_memo
+
+logger = logging.getLogger(__name__)
+
+
+def recalculate_partition(customer_id: int, first_account_id: int, last_account_id: int,
+                          month: int, year: int) -> Dict:
+    """
+    Score one partition (the customer's accounts with ids in [first, last]),
+    upsert their HealthTrend rows and partials, commit, and refresh their
+    account health summaries. Needs an app context.
+    """
+    from incremental_health import IncrementalHealthService
+
+    account_ids = [account_id for (account_id,) in db.session.query(Account.account_id).filter(
+        Account.customer_id == customer_id,
+        Account.account_id.between(first_account_id, last_account_id)
+    ).order_by(Account.account_id).all()]
+    if not account_ids:
+        return {'customer_id': customer_id, 'accounts': 0, 'kpis': 0}
+
+    kpis = KPI.query.filter(KPI.account_id.in_(account_ids)).order_by(KPI.account_id, KPI.kpi_id).all()
+    batch = BatchHealthScoreEngine.calculate_health_scores(
+        kpis, customer_id, category_weights=ROLLUP_CATEGORY_WEIGHTS
+    )
+    health = HealthScoreStorageService()._calculate_customer_health_scores(customer_id, batch)
+
+    IncrementalHealthService.store_partials(customer_id, account_ids, batch)
+    upsert_health_trends(health_trend_rows(account_ids, health, customer_id, month, year))
+    db.session.commit()
+    refresh_account_health_summaries(customer_id, account_ids)
+    invalidate_tenant_results(customer_id)
+    return {'customer_id': customer_id, 'accounts': len(account_ids), 'kpis': len(kpis)}
+
+
+# Per-process Flask app used by pool workers
+_worker_app = None
+
+
+def _init_worker(database_url: str):
+    """Pool initializer: give the worker process its own app, engine and app context"""
+    global _worker_app
+    from flask import Flask
+
+    _worker_app = Flask(__name__)
+    _worker_app.config['SQLALCHEMY_DATABASE_URI'] = database_url
+    _worker_app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(_worker_app)
+    _worker_app.app_context().push()
+
+
+def _run_partition(partition: List[int], month: int, year: int) -> Dict:
+    """Pool task wrapper around recalculate_partition"""
+    customer_id, first_account_id, last_account_id = partition
+    # The worker's app context outlives the partition; re-read data versions per partition
+    clear_data_version_memo()
+    try:
+        return recalculate_partition(customer_id, first_account_id, last_account_id, month, year)
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+class HealthRecalcJobRunner:
+    """Runs a partitioned, resumable health recalculation for a set of customers"""
+
+    def __init__(self, database_url: Optional[str] = None, workers: int = None, partition_size: int = 500,
+                 checkpoint_path: Optional[str] = None,
+                 progress: Optional[Callable[[Dict], None]] = None):
+        """
+        database_url: used by pool workers (workers > 1) to open their own engine
+        workers: pool size (defaults to the CPU count); 1 runs in the caller's app context
+        partition_size: accounts per partition
+        checkpoint_path: JSON file used to resume an interrupted job
+        progress: called with the progress dict after every partition
+        """
+        self.database_url = database_url
+        self.workers = workers or os.cpu_count() or 1
+        self.partition_size = partition_size
+        self.checkpoint_path = checkpoint_path
+        self.progress = progress
+
+    def plan(self, customer_ids: Iterable[int]) -> List[List[int]]:
+        """Split each customer's accounts into [customer_id, first_account_id, last_account_id] ranges"""
+        partitions = []
+        for customer_id in customer_ids:
+            account_ids = [account_id for (account_id,) in db.session.query(Account.account_id).filter(
+                Account.customer_id == customer_id
+            ).order_by(Account.account_id).all()]
+            for start in range(0, len(account_ids), self.partition_size):
+                chunk = account_ids[start:start + self.partition_size]
+                partitions.append([customer_id, chunk[0], chunk[-1]])
+        return partitions
+
+    def run(self, customer_ids: Iterable[int], month: int = None, year: int = None) -> Dict:
+        """
+        Recalculate the customers' health for the month. Needs an app context
+        (for planning, and for the partitions themselves when workers == 1).
+        Returns the final progress dict.
+        """
+        if month is None:
+            month = datetime.now().month
+        if year is None:
+            year = datetime.now().year
+        customer_ids = sorted(set(customer_ids))
+
+        state = self._load_checkpoint(customer_ids, month, year)
+        if state is None:
+            state = {
+                'customer_ids': customer_ids,
+                'month': month,
+                'year': year,
+                'partitions': self.plan(customer_ids),
+                'completed': [],
+                'accounts_done': 0
+            }
+            self._save_checkpoint(state)
+        else:
+            logger.info(f"Resuming health recalculation: {len(state['completed'])}/{len(state['partitions'])} "
+                        f"partitions already done")
+
+        done = set(state['completed'])
+        pending = [i for i in range(len(state['partitions'])) if i not in done]
+        started = time.monotonic()
+        resumed_accounts = state['accounts_done']
+        stats = {'accounts': 0, 'kpis': 0}
+
+        def on_complete(index: int, result: Dict):
+            state['completed'].append(index)
+            state['accounts_done'] += result['accounts']
+            stats['accounts'] += result['accounts']
+            stats['kpis'] += result['kpis']
+            self._save_checkpoint(state)
+            self._report(state, stats, started, resumed_accounts)
+
+        if self.workers <= 1 or len(pending) <= 1:
+            for index in pending:
+                on_complete(index, _run_partition(state['partitions'][index], month, year))
+        else:
+            if not self.database_url:
+                raise ValueError("database_url is required when running with more than one worker")
+            # spawn: workers must not inherit the parent's engine and connections
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(pending)), mp_context=context,
+                                     initializer=_init_worker, initargs=(self.database_url,)) as pool:
+                futures = {
+                    pool.submit(_run_partition, state['partitions'][index], month, year): index
+                    for index in pending
+                }
+                for future in as_completed(futures):
+                    on_complete(futures[future], future.result())
+
+        self._clear_checkpoint()
+        return self._report(state, stats, started, resumed_accounts, final=True)
+
+    def _report(self, state: Dict, stats: Dict, started: float, resumed_accounts: int, final: bool = False) -> Dict:
+        elapsed = time.monotonic() - started
+        progress = {
+            'partitions_done': len(state['completed']),
+            'partitions_total': len(state['partitions']),
+            'accounts_done': state['accounts_done'],
+            'resumed_accounts': resumed_accounts,
+            'kpis_scored': stats['kpis'],
+            'elapsed_seconds': elapsed,
+            'accounts_per_sec': stats['accounts'] / elapsed if elapsed > 0 else 0.0,
+            'finished': final
+        }
+        logger.info(f"Health recalculation {progress['partitions_done']}/{progress['partitions_total']} partitions, "
+                    f"{progress['accounts_done']} accounts, {progress['accounts_per_sec']:.1f} accounts/sec")
+        if self.progress:
+            self.progress(progress)
+        return progress
+
+    def _load_checkpoint(self, customer_ids: List[int], month: int, year: int) -> Optional[Dict]:
+        """Checkpoint state for the same job, or None"""
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return None
+        with open(self.checkpoint_path) as f:
+            state = json.load(f)
+        if (state.get('customer_ids'), state.get('month'), state.get('year')) != (customer_ids, month, year):
+            logger.warning(f"Ignoring checkpoint {self.checkpoint_path}: it belongs to a different job")
+            return None
+        return state
+
+    def _save_checkpoint(self, state: Dict):
+        if not self.checkpoint_path:
+            return
+        # Write-then-rename so a crash never leaves a truncated checkpoint
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def _clear_checkpoint(self):
+        if self.checkpoint_path and os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+"""
+Batch Health Score Engine
+Scores all KPIs of a tenant in one pass with NumPy instead of one KPI dict at a time.
+
+The per-KPI, category and overall results are identical to HealthScoreEngine:
+the same formulas are evaluated column-wise and sums are accumulated in the
+same order (np.bincount adds sequentially), so scores match bit for bit.
+"""
+
+from typing import Any, Dict, Hashable, Iterable, List, Optional
+
+import numpy as np
+
+from health_score_config import get_category_weight, get_impact_weight, get_kpi_reference_range
+from health_score_engine import HealthScoreEngine
+from kpi_value_parser import stored_kpi_value
+from reference_range_index import get_reference_ranges
+
+# Status codes used in the score columns
+STATUS_UNKNOWN = -1
+STATUS_LOW = 0
+STATUS_MEDIUM = 1
+STATUS_HIGH = 2
+STATUS_NAMES = {STATUS_UNKNOWN: 'unknown', STATUS_LOW: 'low', STATUS_MEDIUM: 'medium', STATUS_HIGH: 'high'}
+RANGE_LEVELS = ('low', 'medium', 'high')
+
+
+def _kpi_field(kpi: Any, name: str, default=None):
+    """Read a field from a KPI dict or a KPI model instance"""
+    if isinstance(kpi, dict):
+        return kpi.get(name, default)
+    return getattr(kpi, name, default)
+
+
+def _health_band(score: float):
+    """Status and color for a normalized category/overall score"""
+    if score >= 67:
+        return 'high', 'green'
+    if score >= 34:
+        return 'medium', 'yellow'
+    return 'low', 'red'
+
+
+class ReferenceRangeTable:
+    """
+    Reference ranges resolved once per distinct KPI name, stored as NumPy columns.
+    Rows are addressed by the index returned from index_of().
+    """
+
+    def __init__(self, customer_id: int = None, resolver=None):
+        self._customer_id = customer_id
+        self._resolver = resolver or self._resolve
+        self._tenant_ranges: Optional[Dict[str, Dict]] = None
+        self._index: Dict[str, int] = {}
+        self.configs: List[Dict] = []
+
+    def _resolve(self, kpi_name: str) -> Dict:
+        """
+        Like HealthScoreEngine.get_kpi_reference_range_from_db, but takes the tenant's
+        ranges from the index once per table (one data version check, not one per KPI name)
+        """
+        if self._tenant_ranges is None:
+            try:
+                self._tenant_ranges = get_reference_ranges(self._customer_id)
+            except Exception as e:
+                print(f"Error getting reference ranges from DB for customer {self._customer_id}: {e}")
+                self._tenant_ranges = {}
+        return self._tenant_ranges.get(kpi_name) or get_kpi_reference_range(kpi_name)
+
+    def index_of(self, kpi_name: str) -> int:
+        idx = self._index.get(kpi_name)
+        if idx is None:
+            idx = len(self.configs)
+            self._index[kpi_name] = idx
+            self.configs.append(self._resolver(kpi_name))
+        return idx
+
+    def unit(self, idx: int) -> str:
+        return self.configs[idx].get('unit', '')
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        """Range bounds and direction for every resolved KPI name"""
+        cols = {}
+        for level in RANGE_LEVELS:
+            cols[f'{level}_min'] = np.array([c['ranges'][level]['min'] for c in self.configs], dtype=float)
+            cols[f'{level}_max'] = np.array([c['ranges'][level]['max'] for c in self.configs], dtype=float)
+        cols['higher_is_better'] = np.array([bool(c['higher_is_better']) for c in self.configs], dtype=bool)
+        return cols
+
+    def reference_range_label(self, idx: int) -> str:
+        config = self.configs[idx]
+        ranges = config['ranges']
+        return f"{ranges['low']['min']}-{ranges['high']['max']} {config['unit']}"
+
+    def color(self, idx: int, status: int) -> str:
+        if status == STATUS_UNKNOWN:
+            return 'gray'
+        return self.configs[idx]['ranges'][STATUS_NAMES[status]]['color']
+
+
+def score_kpi_columns(values: np.ndarray, valid: np.ndarray, low_min: np.ndarray, low_max: np.ndarray,
+                      medium_min: np.ndarray, medium_max: np.ndarray, high_min: np.ndarray,
+                      high_max: np.ndarray, higher_is_better: np.ndarray):
+    """
+    Vectorized HealthScoreEngine.calculate_health_status.
+    All arguments are aligned per-KPI arrays. Returns (status_codes, scores).
+    """
+    v = values
+    in_low = (low_min <= v) & (v <= low_max)
+    in_medium = (medium_min <= v) & (v <= medium_max)
+    in_high = (high_min <= v) & (v <= high_max)
+
+    status_hib = np.select(
+        [in_low, in_medium, in_high, v < low_min, v > high_max],
+        [STATUS_LOW, STATUS_MEDIUM, STATUS_HIGH, STATUS_LOW, STATUS_HIGH],
+        default=STATUS_MEDIUM
+    )
+    status_lib = np.select(
+        [in_high, in_medium, in_low, v < high_min, v > low_max],
+        [STATUS_HIGH, STATUS_MEDIUM, STATUS_LOW, STATUS_HIGH, STATUS_LOW],
+        default=STATUS_MEDIUM
+    )
+    status = np.where(higher_is_better, status_hib, status_lib)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        low_pos = np.where(higher_is_better, v - low_min, low_max - v) / (low_max - low_min) * 33
+        medium_pos = np.where(higher_is_better, v - medium_min, medium_max - v) / (medium_max - medium_min) * 32
+        high_pos = np.where(higher_is_better, v - high_min, high_max - v) / (high_max - high_min) * 33
+        low_score = np.maximum(0, np.minimum(33, low_pos))
+        scores = np.select(
+            [status == STATUS_LOW, status == STATUS_MEDIUM],
+            [low_score, 34 + medium_pos],
+            default=67 + high_pos
+        )
+        scores = np.minimum(100, np.maximum(0, scores))
+
+    # Python's max(0, nan) is 0, so NaN values (e.g. the string "nan") score 0
+    scores = np.where(np.isnan(scores), 0.0, scores)
+    status = np.where(valid, status, STATUS_UNKNOWN)
+    scores = np.where(valid, scores, 0.0)
+    return status, scores
+
+
+class BatchHealthScoreEngine:
+    """Scores whole tenants with NumPy; results match HealthScoreEngine"""
+
+    @staticmethod
+    def build_columns(kpis: Iterable[Any], group_by: str = 'account_id',
+                      reference_ranges: Optional[ReferenceRangeTable] = None) -> Dict[str, Any]:
+        """
+        Turn KPI dicts (or KPI model instances) into aligned NumPy columns.
+        KPI values are parsed once; reference ranges are resolved once per KPI name.
+        """
+        table = reference_ranges or ReferenceRangeTable()
+        group_index: Dict[Hashable, int] = {}
+        groups: List[Hashable] = []
+        category_names: List[str] = []
+        category_index: Dict[str, int] = {}
+
+        kpi_list = list(kpis)
+        n = len(kpi_list)
+        values = np.zeros(n, dtype=float)
+        valid = np.zeros(n, dtype=bool)
+        impact = np.zeros(n, dtype=float)
+        name_idx = np.zeros(n, dtype=np.int64)
+        group_idx = np.zeros(n, dtype=np.int64)
+        category_idx = np.zeros(n, dtype=np.int64)
+
+        for i, kpi in enumerate(kpi_list):
+            kpi_name = _kpi_field(kpi, 'kpi_parameter', '') or ''
+            ri = table.index_of(kpi_name)
+            # Prefer the value parsed at write time; dicts and unparsed rows fall back to the string
+            stored, stored_value, stored_unit = stored_kpi_value(kpi)
+            if stored:
+                parsed = HealthScoreEngine.normalize_kpi_value(stored_value, stored_unit, kpi_name,
+                                                               reference_unit=table.unit(ri))
+            else:
+                parsed = HealthScoreEngine.parse_kpi_value(_kpi_field(kpi, 'data', ''), kpi_name,
+                                                           reference_unit=table.unit(ri))
+            if parsed is not None:
+                values[i] = parsed
+                valid[i] = True
+            impact[i] = get_impact_weight(_kpi_field(kpi, 'impact_level', 'Medium'))
+            name_idx[i] = ri
+
+            group = _kpi_field(kpi, group_by) if group_by else None
+            gi = group_index.get(group)
+            if gi is None:
+                gi = group_index[group] = len(groups)
+                groups.append(group)
+            group_idx[i] = gi
+
+            category = _kpi_field(kpi, 'category')
+            ci = category_index.get(category)
+            if ci is None:
+                ci = category_index[category] = len(category_names)
+                category_names.append(category)
+            category_idx[i] = ci
+
+        return {
+            'kpis': kpi_list,
+            'values': values,
+            'valid': valid,
+            'impact_weight': impact,
+            'name_idx': name_idx,
+            'group_idx': group_idx,
+            'category_idx': category_idx,
+            'groups': groups,
+            'categories': category_names,
+            'reference_ranges': table,
+        }
+
+    @staticmethod
+    def score_columns(columns: Dict[str, Any]) -> Dict[str, np.ndarray]:
+        """Per-KPI status, score and weighted score for prepared columns"""
+        table = columns['reference_ranges']
+        ni = columns['name_idx']
+        ranges = table.columns() if table.configs else None
+        if ranges is None or len(ni) == 0:
+            empty = np.zeros(0)
+            return {'status': empty.astype(np.int64), 'score': empty, 'weighted_score': empty}
+        status, scores = score_kpi_columns(
+            columns['values'], columns['valid'],
+            ranges['low_min'][ni], ranges['low_max'][ni],
+            ranges['medium_min'][ni], ranges['medium_max'][ni],
+            ranges['high_min'][ni], ranges['high_max'][ni],
+            ranges['higher_is_better'][ni]
+        )
+        return {'status': status, 'score': scores, 'weighted_score': scores * columns['impact_weight']}
+
+    @staticmethod
+    def calculate_health_scores(kpis: Iterable[Any], customer_id: int = None, group_by: str = 'account_id',
+                                category_weights: Optional[Dict[str, float]] = None,
+                                include_kpi_details: bool = False,
+                                reference_ranges: Optional[ReferenceRangeTable] = None) -> Dict[Hashable, Dict]:
+        """
+        Score every KPI, category and group (account by default) in one pass.
+
+        Without category_weights the results match calculate_category_health_score /
+        calculate_overall_health_score run per group: categories appear in first-seen
+        order and weights come from get_category_weight (read once per category).
+
+        With category_weights (an ordered {category: weight} mapping) only those
+        categories are scored, in mapping order, and categories without any valid
+        KPI are left out - the rollup methodology of HealthScoreStorageService.
+
+        Returns {group_key: {'category_scores': [...], 'overall_score': {...},
+                             'total_kpis': n, 'valid_kpis': n}}, where the KPI counts
+        cover every KPI of the group whether or not its category was scored.
+        """
+        columns = BatchHealthScoreEngine.build_columns(
+            kpis, group_by, reference_ranges or ReferenceRangeTable(customer_id)
+        )
+        scored = BatchHealthScoreEngine.score_columns(columns)
+
+        categories = columns['categories']
+        n_groups = len(columns['groups'])
+        group_idx = columns['group_idx']
+        valid = columns['valid']
+
+        if category_weights is None:
+            weights = [get_category_weight(c, customer_id) for c in categories]
+            slot_of_category = np.arange(len(categories), dtype=np.int64)
+            n_slots = len(categories)
+        else:
+            ordered = list(category_weights.keys())
+            weights = [category_weights[c] for c in ordered]
+            position = {c: i for i, c in enumerate(ordered)}
+            slot_of_category = np.array([position.get(c, -1) for c in categories], dtype=np.int64)
+            n_slots = len(ordered)
+
+        # (group, category) pairs. Pair ids must follow each group's category order
+        # so per-group sums are accumulated in the same sequence as the per-KPI path.
+        kpi_slot = slot_of_category[columns['category_idx']] if len(categories) else np.zeros(0, dtype=np.int64)
+        in_scope = kpi_slot >= 0
+        if category_weights is None:
+            pair_keys = {}
+            pair_idx = np.zeros(len(group_idx), dtype=np.int64)
+            for i, (g, s) in enumerate(zip(group_idx.tolist(), kpi_slot.tolist())):
+                pid = pair_keys.get((g, s))
+                if pid is None:
+                    pid = pair_keys[(g, s)] = len(pair_keys)
+                pair_idx[i] = pid
+            pairs = list(pair_keys.keys())
+        else:
+            pair_idx = group_idx * n_slots + kpi_slot
+            pairs = [(g, s) for g in range(n_groups) for s in range(n_slots)]
+
+        n_pairs = len(pairs)
+        counted = valid & in_scope
+        sel = pair_idx[in_scope]
+        kpi_count = np.bincount(sel, minlength=n_pairs)
+        valid_count = np.bincount(pair_idx[counted], minlength=n_pairs)
+        total_units = np.bincount(pair_idx[counted], weights=columns['impact_weight'][counted], minlength=n_pairs)
+        total_score = np.bincount(pair_idx[counted], weights=scored['weighted_score'][counted], minlength=n_pairs)
+
+        pair_group = np.array([p[0] for p in pairs], dtype=np.int64)
+        pair_slot = np.array([p[1] for p in pairs], dtype=np.int64)
+        pair_weight = np.array([weights[s] for s in pair_slot.tolist()], dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            normalized = np.where(total_units > 0, total_score / np.where(total_units > 0, total_units, 1), 0.0)
+        weighted_category = normalized * pair_weight
+
+        if category_weights is None:
+            present = kpi_count > 0
+        else:
+            present = valid_count > 0
+        overall_num = np.bincount(pair_group[present], weights=weighted_category[present], minlength=n_groups)
+        overall_den = np.bincount(pair_group[present], weights=pair_weight[present], minlength=n_groups)
+
+        slot_names = categories if category_weights is None else list(category_weights.keys())
+
+        kpis_by_pair: Dict[int, List[int]] = {}
+        if include_kpi_details:
+            for i in np.nonzero(in_scope)[0].tolist():
+                kpis_by_pair.setdefault(int(pair_idx[i]), []).append(i)
+
+        group_total = np.bincount(group_idx, minlength=n_groups)
+        group_valid = np.bincount(group_idx[valid], minlength=n_groups)
+
+        results: Dict[Hashable, Dict] = {}
+        for gi, group in enumerate(columns['groups']):
+            results[group] = {
+                'category_scores': [],
+                'total_kpis': int(group_total[gi]),
+                'valid_kpis': int(group_valid[gi])
+            }
+        for pid in range(n_pairs):
+            if not present[pid]:
+                continue
+            gi = int(pair_group[pid])
+            score = float(normalized[pid])
+            status, color = _health_band(score)
+            category_score = {
+                'category': slot_names[pair_slot[pid]],
+                'total_score': float(total_score[pid]),
+                'total_units': float(total_units[pid]),
+                'average_score': score,
+                'weighted_category_score': float(weighted_category[pid]),
+                'health_status': status,
+                'color': color,
+                'kpi_count': int(kpi_count[pid]),
+                'valid_kpi_count': int(valid_count[pid]),
+                'category_weight': float(pair_weight[pid]),
+                'normalized_score': score,
+            }
+            if include_kpi_details:
+                category_score['enhanced_kpis'] = [
+                    BatchHealthScoreEngine._enhanced_kpi(columns, scored, i) for i in kpis_by_pair.get(pid, [])
+                ]
+            results[columns['groups'][gi]]['category_scores'].append(category_score)
+
+        for gi, group in enumerate(columns['groups']):
+            category_scores = results[group]['category_scores']
+            if not category_scores:
+                results[group]['overall_score'] = {
+                    'overall_score': 0,
+                    'health_status': 'unknown',
+                    'color': 'gray',
+                    'category_breakdown': []
+                }
+                continue
+            overall = float(overall_num[gi] / overall_den[gi]) if overall_den[gi] > 0 else 0
+            status, color = _health_band(overall)
+            results[group]['overall_score'] = {
+                'overall_score': overall,
+                'health_status': status,
+                'color': color,
+                'category_breakdown': category_scores
+            }
+        return results
+
+    @staticmethod
+    def _enhanced_kpi(columns: Dict[str, Any], scored: Dict[str, np.ndarray], i: int) -> Dict:
+        """Same shape as HealthScoreEngine.calculate_kpi_health_score"""
+        kpi = columns['kpis'][i]
+        table = columns['reference_ranges']
+        ri = int(columns['name_idx'][i])
+        status = int(scored['status'][i])
+        base = dict(kpi) if isinstance(kpi, dict) else {}
+        valid = bool(columns['valid'][i])
+        return {
+            **base,
+            'parsed_value': float(columns['values'][i]) if valid else None,
+            'health_status': STATUS_NAMES[status],
+            'health_score': float(scored['score'][i]),
+            'health_color': table.color(ri, status),
+            'reference_range': table.reference_range_label(ri) if valid else 'N/A',
+            'impact_weight': int(columns['impact_weight'][i]),
+            'weighted_score': float(scored['weighted_score'][i])
+        }
@@ -388,12 +388,9 @@ def get_category_weight(category: str, customer_id: int = None) -> float:
     
     if customer_id:
         try:
-            from models import CustomerConfig
-            from extensions import db
-            config = CustomerConfig.query.filter_by(customer_id=customer_id).first()
-            if config and config.category_weights:
-                import json
-                customer_weights = json.loads(config.category_weights)
+            from category_weight_index import get_category_weights
+            customer_weights = get_category_weights(customer_id)
+            if customer_weights:
                 # Try both original and normalized category names
                 return customer_weights.get(category, customer_weights.get(normalized_category, CATEGORY_WEIGHTS.get(normalized_category, 0.20)))
         except Exception as e:
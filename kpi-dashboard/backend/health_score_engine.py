@@ -8,41 +8,23 @@ import re
 from typing import Dict, List, Tuple, Optional
 from health_score_config import get_kpi_reference_range, get_category_weight, get_impact_weight
 from extensions import db
-from models import KPIReferenceRange
+from reference_range_index import get_reference_range
+from kpi_value_parser import parse_kpi_data, parse_kpi_value, convert_to_reference_unit, UNIT_HOURS, UNIT_DAYS
 
 class HealthScoreEngine:
     """Engine for calculating health scores based on reference ranges"""
     
     @staticmethod
-    def get_kpi_reference_range_from_db(kpi_name: str) -> Optional[Dict]:
+    def get_kpi_reference_range_from_db(kpi_name: str, customer_id: int = None) -> Optional[Dict]:
         """
-        Get KPI reference range from database, fallback to config if not found
+        Get KPI reference range from the tenant reference range index, fallback to config if not found
+        Customer overrides take precedence over system defaults (customer_id=None = system defaults only)
         Returns the same format as health_score_config for compatibility
         """
         try:
-            ref_range = KPIReferenceRange.query.filter_by(kpi_name=kpi_name).first()
+            ref_range = get_reference_range(kpi_name, customer_id)
             if ref_range:
-                return {
-                    'unit': ref_range.unit,
-                    'higher_is_better': ref_range.higher_is_better,
-                    'ranges': {
-                        'low': {
-                            'min': float(ref_range.critical_min),
-                            'max': float(ref_range.critical_max),
-                            'color': 'red'
-                        },
-                        'medium': {
-                            'min': float(ref_range.risk_min),
-                            'max': float(ref_range.risk_max),
-                            'color': 'yellow'
-                        },
-                        'high': {
-                            'min': float(ref_range.healthy_min),
-                            'max': float(ref_range.healthy_max),
-                            'color': 'green'
-                        }
-                    }
-                }
+                return ref_range
         except Exception as e:
             print(f"Error getting reference range from DB for {kpi_name}: {e}")
         
@@ -50,109 +32,44 @@ class HealthScoreEngine:
         return get_kpi_reference_range(kpi_name)
     
     @staticmethod
-    def parse_kpi_value(data_str: str, kpi_name: str = None) -> Optional[float]:
+    def parse_kpi_value(data_str: str, kpi_name: str = None, reference_unit: str = None,
+                        customer_id: int = None) -> Optional[float]:
         """
         Parse KPI data value from various formats with unit conversion
         Returns normalized numeric value or None if invalid
+
+        reference_unit, when given, is used for hours/days conversion instead of
+        looking up the KPI's reference range (batch callers resolve it once per KPI name).
         """
-        if not data_str or data_str == 'None':
-            return None
-            
-        data_str = str(data_str).strip()
-        original_data_str = data_str
-        
-        # Handle percentage values
-        if '%' in data_str:
-            data_str = data_str.replace('%', '')
-            try:
-                return float(data_str)
-            except ValueError:
-                return None
-        
-        # Handle currency values
-        if '$' in data_str:
-            data_str = data_str.replace('$', '').replace(',', '')
-            # Handle K/M suffixes for currency
-            if 'k' in data_str.lower():
-                # Handle decimal values like 2.5K -> 2500
-                if '.' in data_str:
-                    base_value = float(data_str.lower().replace('k', ''))
-                    data_str = str(base_value * 1000)
-                else:
-                    data_str = data_str.lower().replace('k', '000')
-            elif 'm' in data_str.lower():
-                # Handle decimal values like 2.5M -> 2500000
-                if '.' in data_str:
-                    base_value = float(data_str.lower().replace('m', ''))
-                    data_str = str(base_value * 1000000)
-                else:
-                    data_str = data_str.lower().replace('m', '000000')
-            try:
-                return float(data_str)
-            except ValueError:
-                return None
-        
-        # Handle time values with unit conversion
-        if 'hours' in data_str.lower():
-            data_str = data_str.lower().replace('hours', '').strip()
-            try:
-                hours_value = float(data_str)
-                
-                # Unit conversion based on KPI name and expected reference unit
-                if kpi_name:
-                    config = HealthScoreEngine.get_kpi_reference_range_from_db(kpi_name)
-                    expected_unit = config.get('unit', '')
-                    
-                    # Convert hours to days for KPIs that expect days
-                    if expected_unit == 'days':
-                        return hours_value / 24.0  # Convert hours to days
-                    elif expected_unit == 'hours':
-                        return hours_value  # Keep as hours
-                    else:
-                        # For other units, return hours (might need further conversion)
-                        return hours_value
-                else:
-                    return hours_value
-            except ValueError:
-                return None
-        
-        if 'days' in data_str.lower():
-            data_str = data_str.lower().replace('days', '').strip()
-            try:
-                days_value = float(data_str)
-                
-                # Unit conversion based on KPI name and expected reference unit
-                if kpi_name:
-                    config = HealthScoreEngine.get_kpi_reference_range_from_db(kpi_name)
-                    expected_unit = config.get('unit', '')
-                    
-                    # Convert days to hours for KPIs that expect hours
-                    if expected_unit == 'hours':
-                        return days_value * 24.0  # Convert days to hours
-                    elif expected_unit == 'days':
-                        return days_value  # Keep as days
-                    else:
-                        # For other units, return days (might need further conversion)
-                        return days_value
-                else:
-                    return days_value
-            except ValueError:
-                return None
-        
-        # Handle K/M suffixes
-        if 'k' in data_str.lower():
-            data_str = data_str.lower().replace('k', '000')
-        elif 'm' in data_str.lower():
-            data_str = data_str.lower().replace('m', '000000')
-        
-        # Try to parse as float
-        try:
-            return float(data_str)
-        except ValueError:
-            return None
+        if reference_unit is not None:
+            return parse_kpi_value(data_str, reference_unit)
+        value, unit = parse_kpi_data(data_str)
+        return HealthScoreEngine.normalize_kpi_value(value, unit, kpi_name, reference_unit, customer_id)
+    
+    @staticmethod
+    def normalize_kpi_value(value: Optional[float], unit: Optional[str], kpi_name: str = None,
+                            reference_unit: str = None, customer_id: int = None) -> Optional[float]:
+        """
+        Convert an already-parsed value (e.g. KPI.value_numeric / value_unit) to the unit
+        of the KPI's reference range. Only hours/days values are converted.
+        """
+        if value is None or unit not in (UNIT_HOURS, UNIT_DAYS):
+            return value
+        if reference_unit is None and not kpi_name:
+            return value
+        expected_unit = HealthScoreEngine._resolve_reference_unit(kpi_name, reference_unit, customer_id)
+        return convert_to_reference_unit(value, unit, expected_unit)
+    
+    @staticmethod
+    def _resolve_reference_unit(kpi_name: str, reference_unit: str = None, customer_id: int = None) -> str:
+        """Get the reference unit used for time conversions"""
+        if reference_unit is not None:
+            return reference_unit
+        config = HealthScoreEngine.get_kpi_reference_range_from_db(kpi_name, customer_id)
+        return config.get('unit', '')
     
     @staticmethod
-    def calculate_health_status(value: float, kpi_name: str) -> Dict:
+    def calculate_health_status(value: float, kpi_name: str, customer_id: int = None) -> Dict:
         """
         Calculate health status based on reference ranges
         Returns: {'status': 'low/medium/high', 'score': 0-100, 'color': 'red/yellow/green'}
@@ -166,7 +83,7 @@ class HealthScoreEngine:
                 'reference_range': 'N/A'
             }
         
-        config = HealthScoreEngine.get_kpi_reference_range_from_db(kpi_name)
+        config = HealthScoreEngine.get_kpi_reference_range_from_db(kpi_name, customer_id)
         ranges = config['ranges']
         higher_is_better = config['higher_is_better']
         
@@ -250,7 +167,7 @@ class HealthScoreEngine:
         }
     
     @staticmethod
-    def calculate_kpi_health_score(kpi_data: Dict) -> Dict:
+    def calculate_kpi_health_score(kpi_data: Dict, customer_id: int = None) -> Dict:
         """
         Calculate health score for a single KPI
         Returns enhanced KPI data with health information
@@ -260,10 +177,10 @@ class HealthScoreEngine:
         impact_level = kpi_data.get('impact_level', 'Medium')
         
         # Parse the value
-        parsed_value = HealthScoreEngine.parse_kpi_value(data_value, kpi_name)
+        parsed_value = HealthScoreEngine.parse_kpi_value(data_value, kpi_name, customer_id=customer_id)
         
         # Calculate health status
-        health_info = HealthScoreEngine.calculate_health_status(parsed_value, kpi_name)
+        health_info = HealthScoreEngine.calculate_health_status(parsed_value, kpi_name, customer_id)
         
         # Get impact weight
         impact_weight = get_impact_weight(impact_level)
@@ -309,7 +226,7 @@ class HealthScoreEngine:
         valid_kpis = 0
         
         for kpi in kpis:
-            enhanced_kpi = HealthScoreEngine.calculate_kpi_health_score(kpi)
+            enhanced_kpi = HealthScoreEngine.calculate_kpi_health_score(kpi, customer_id)
             enhanced_kpis.append(enhanced_kpi)
             
             if enhanced_kpi['parsed_value'] is not None:
@@ -3,16 +3,164 @@
 Health Score Storage Service for persisting calculated health scores and KPI time series data.
 """
 
+import time
 from datetime import datetime
+from sqlalchemy import func
 from extensions import db
 from models import HealthTrend, KPITimeSeries, Account, KPI
 from health_score_engine import HealthScoreEngine
+from health_score_batch import BatchHealthScoreEngine, ReferenceRangeTable, STATUS_NAMES
+from account_health_summary import refresh_account_health_summaries
+
+# Category weights from the rollup methodology
+ROLLUP_CATEGORY_WEIGHTS = {
+    'Product Usage KPI': 0.3,
+    'Support KPI': 0.2,
+    'Customer Sentiment KPI': 0.2,
+    'Business Outcomes KPI': 0.15,
+    'Relationship Strength KPI': 0.15
+}
+
+EMPTY_ACCOUNT_HEALTH = {
+    'overall': 0,
+    'product_usage': 0,
+    'support': 0,
+    'customer_sentiment': 0,
+    'business_outcomes': 0,
+    'relationship_strength': 0,
+    'total_kpis': 0,
+    'valid_kpis': 0
+}
+
+# HealthTrend columns, keyed by the account health dict field
+TREND_COLUMNS = {
+    'overall': 'overall_health_score',
+    'product_usage': 'product_usage_score',
+    'support': 'support_score',
+    'customer_sentiment': 'customer_sentiment_score',
+    'business_outcomes': 'business_outcomes_score',
+    'relationship_strength': 'relationship_strength_score',
+    'total_kpis': 'total_kpis',
+    'valid_kpis': 'valid_kpis'
+}
+
+# Rows per INSERT statement (keeps SQLite under its bound-parameter limit)
+UPSERT_CHUNK_SIZE = 500
+
+# Columns rewritten when a KPI's month is captured again
+KPI_TIME_SERIES_UPDATE_COLUMNS = ['account_id', 'customer_id', 'value', 'health_status', 'health_score']
+
+
+def _upsert_insert():
+    """Dialect-specific insert() with on_conflict_do_update, or None when unsupported"""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+        return insert
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+        return insert
+    return None
+
+
+def health_trend_rows(account_ids, customer_health, customer_id, month, year):
+    """HealthTrend rows for the given accounts; accounts without scores get EMPTY_ACCOUNT_HEALTH"""
+    rows = []
+    for account_id in account_ids:
+        account_health = customer_health.get(account_id, EMPTY_ACCOUNT_HEALTH)
+        row = {'account_id': account_id, 'customer_id': customer_id, 'month': month, 'year': year}
+        row.update({column: account_health[field] for field, column in TREND_COLUMNS.items()})
+        rows.append(row)
+    return rows
+
+
+def upsert_health_trends(rows):
+    """
+    Insert or update HealthTrend rows keyed by (account_id, month, year) with
+    INSERT ... ON CONFLICT DO UPDATE against unique_account_month_year.
+    Runs in the caller's transaction. Returns the number of rows written.
+    """
+    if not rows:
+        return 0
+    
+    insert = _upsert_insert()
+    if insert is None:
+        # No ON CONFLICT support: fall back to per-row ORM upserts
+        for row in rows:
+            trend = HealthTrend.query.filter_by(
+                account_id=row['account_id'], month=row['month'], year=row['year']
+            ).first()
+            if trend is None:
+                trend = HealthTrend(account_id=row['account_id'], month=row['month'], year=row['year'])
+                db.session.add(trend)
+            for column, value in row.items():
+                setattr(trend, column, value)
+        return len(rows)
+    
+    table = HealthTrend.__table__
+    for start in range(0, len(rows), UPSERT_CHUNK_SIZE):
+        stmt = insert(table).values(rows[start:start + UPSERT_CHUNK_SIZE])
+        update_columns = {column: stmt.excluded[column] for column in ['customer_id'] + list(TREND_COLUMNS.values())}
+        update_columns['updated_at'] = func.now()
+        db.session.execute(stmt.on_conflict_do_update(
+            index_elements=['account_id', 'month', 'year'], set_=update_columns
+        ))
+    return len(rows)
+
+
+def upsert_kpi_time_series(rows):
+    """
+    Insert or update KPITimeSeries rows keyed by (kpi_id, month, year) with
+    INSERT ... ON CONFLICT DO UPDATE against unique_kpi_month_year.
+    Runs in the caller's transaction. Returns the number of rows written.
+    """
+    if not rows:
+        return 0
+    
+    insert = _upsert_insert()
+    if insert is None:
+        # No ON CONFLICT support: fall back to per-row ORM upserts
+        for row in rows:
+            record = KPITimeSeries.query.filter_by(
+                kpi_id=row['kpi_id'], month=row['month'], year=row['year']
+            ).first()
+            if record is None:
+                record = KPITimeSeries(kpi_id=row['kpi_id'], month=row['month'], year=row['year'])
+                db.session.add(record)
+            for column, value in row.items():
+                setattr(record, column, value)
+        return len(rows)
+    
+    table = KPITimeSeries.__table__
+    for start in range(0, len(rows), UPSERT_CHUNK_SIZE):
+        stmt = insert(table).values(rows[start:start + UPSERT_CHUNK_SIZE])
+        update_columns = {column: stmt.excluded[column] for column in KPI_TIME_SERIES_UPDATE_COLUMNS}
+        update_columns['updated_at'] = func.now()
+        db.session.execute(stmt.on_conflict_do_update(
+            index_elements=['kpi_id', 'month', 'year'], set_=update_columns
+        ))
+    return len(rows)
+
 
 class HealthScoreStorageService:
     """Service for storing health scores and KPI time series data."""
     
     def __init__(self):
         self.health_engine = HealthScoreEngine()
+        # Timing of the last run of each store_* method, keyed by what it wrote
+        self.timings = {}
+    
+    def _record_timing(self, name, customer_id, rows, started, **phases):
+        total_ms = (time.perf_counter() - started) * 1000
+        timing = {
+            'customer_id': customer_id,
+            'rows': rows,
+            'total_ms': round(total_ms, 2),
+            'rows_per_second': round(rows / total_ms * 1000, 1) if total_ms > 0 else 0,
+            **{phase: round(ms, 2) for phase, ms in phases.items()}
+        }
+        self.timings[name] = timing
+        return timing
     
     def store_health_scores_after_rollup(self, health_analysis, customer_id, month=None, year=None):
         """
@@ -30,53 +178,31 @@ class HealthScoreStorageService:
             year = datetime.now().year
         
         try:
-            # Get all accounts for this customer
-            accounts = Account.query.filter_by(customer_id=customer_id).all()
+            started = time.perf_counter()
+            account_ids = [account_id for (account_id,) in db.session.query(Account.account_id).filter(
+                Account.customer_id == customer_id
+            ).order_by(Account.account_id).all()]
             
-            stored_count = 0
-            for account in accounts:
-                # Calculate health scores for this account
-                account_health = self._calculate_account_health_scores(account, customer_id)
-                
-                # Check if trend already exists for this month
-                existing_trend = HealthTrend.query.filter_by(
-                    account_id=account.account_id,
-                    month=month,
-                    year=year
-                ).first()
-                
-                if existing_trend:
-                    # Update existing trend
-                    existing_trend.overall_health_score = account_health['overall']
-                    existing_trend.product_usage_score = account_health['product_usage']
-                    existing_trend.support_score = account_health['support']
-                    existing_trend.customer_sentiment_score = account_health['customer_sentiment']
-                    existing_trend.business_outcomes_score = account_health['business_outcomes']
-                    existing_trend.relationship_strength_score = account_health['relationship_strength']
-                    existing_trend.updated_at = datetime.utcnow()
-                    trend = existing_trend
-                else:
-                    # Create new trend
-                    trend = HealthTrend(
-                        account_id=account.account_id,
-                        customer_id=customer_id,
-                        month=month,
-                        year=year,
-                        overall_health_score=account_health['overall'],
-                        product_usage_score=account_health['product_usage'],
-                        support_score=account_health['support'],
-                        customer_sentiment_score=account_health['customer_sentiment'],
-                        business_outcomes_score=account_health['business_outcomes'],
-                        relationship_strength_score=account_health['relationship_strength'],
-                        total_kpis=account_health['total_kpis'],
-                        valid_kpis=account_health['valid_kpis']
-                    )
-                    db.session.add(trend)
-                
-                stored_count += 1
+            # Score every account of the customer in one batch
+            batch = self._score_customer_kpis(customer_id)
+            customer_health = self._calculate_customer_health_scores(customer_id, batch)
+            scored = time.perf_counter()
+            
+            # Reseed the partial sums used for incremental recomputation on KPI edits
+            from incremental_health import IncrementalHealthService
+            IncrementalHealthService.store_partials(customer_id, account_ids, batch)
+            
+            # Write the month for every account in one upsert
+            rows = health_trend_rows(account_ids, customer_health, customer_id, month, year)
+            stored_count = upsert_health_trends(rows)
             
             db.session.commit()
-            print(f"✅ Stored health scores for {stored_count} accounts")
+            written = time.perf_counter()
+            refresh_account_health_summaries(customer_id)
+            
+            timing = self._record_timing('health_trends', customer_id, stored_count, started,
+                                         score_ms=(scored - started) * 1000, write_ms=(written - scored) * 1000)
+            print(f"✅ Stored health scores for {stored_count} accounts in {timing['total_ms']:.0f} ms")
             return stored_count
             
         except Exception as e:
@@ -99,51 +225,13 @@ class HealthScoreStorageService:
             year = datetime.now().year
         
         try:
-            # Get all KPIs for this customer
-            kpis = db.session.query(KPI).join(Account).filter(
-                Account.customer_id == customer_id
-            ).all()
-            
-            stored_count = 0
-            for kpi in kpis:
-                # Parse KPI value
-                parsed_value = self.health_engine.parse_kpi_value(kpi.data, kpi.kpi_parameter)
-                
-                if parsed_value is not None:
-                    # Calculate health status and score
-                    health_info = self.health_engine.calculate_health_status(parsed_value, kpi.kpi_parameter)
-                    
-                    # Check if time series record already exists
-                    existing_record = KPITimeSeries.query.filter_by(
-                        kpi_id=kpi.kpi_id,
-                        month=month,
-                        year=year
-                    ).first()
-                    
-                    if existing_record:
-                        # Update existing record
-                        existing_record.value = parsed_value
-                        existing_record.health_status = health_info['status']
-                        existing_record.health_score = health_info['score']
-                        existing_record.updated_at = datetime.utcnow()
-                    else:
-                        # Create new record
-                        kpi_trend = KPITimeSeries(
-                            kpi_id=kpi.kpi_id,
-                            account_id=kpi.account_id,
-                            customer_id=customer_id,
-                            month=month,
-                            year=year,
-                            value=parsed_value,
-                            health_status=health_info['status'],
-                            health_score=health_info['score']
-                        )
-                        db.session.add(kpi_trend)
-                    
-                    stored_count += 1
+            started = time.perf_counter()
+            rows = self._score_monthly_kpi_rows(customer_id, month, year)
+            stored_count = upsert_kpi_time_series(rows)
             
             db.session.commit()
-            print(f"✅ Stored monthly KPI data for {stored_count} KPIs")
+            timing = self._record_timing('kpi_time_series', customer_id, stored_count, started)
+            print(f"✅ Stored monthly KPI data for {stored_count} KPIs ({timing['rows_per_second']:,.0f} rows/sec)")
             return stored_count
             
         except Exception as e:
@@ -151,42 +239,87 @@ class HealthScoreStorageService:
             db.session.rollback()
             raise e
     
+    def _score_monthly_kpi_rows(self, customer_id, month, year):
+        """
+        Score the customer's KPIs in one batch and build their KPITimeSeries rows.
+        KPIs without a parseable value are skipped, as calculate_health_status would.
+        """
+        kpis = db.session.query(KPI).join(Account).filter(
+            Account.customer_id == customer_id
+        ).order_by(KPI.kpi_id).all()
+        
+        columns = BatchHealthScoreEngine.build_columns(kpis, None, ReferenceRangeTable(customer_id))
+        scored = BatchHealthScoreEngine.score_columns(columns)
+        
+        rows = []
+        for i, kpi in enumerate(kpis):
+            if not columns['valid'][i]:
+                continue
+            rows.append({
+                'kpi_id': kpi.kpi_id,
+                'account_id': kpi.account_id,
+                'customer_id': customer_id,
+                'month': month,
+                'year': year,
+                'value': float(columns['values'][i]),
+                'health_status': STATUS_NAMES[int(scored['status'][i])],
+                'health_score': float(scored['score'][i])
+            })
+        return rows
+    
+    def _score_customer_kpis(self, customer_id):
+        """Load the customer's KPIs in one query and score them with BatchHealthScoreEngine"""
+        kpis = db.session.query(KPI).join(Account).filter(
+            Account.customer_id == customer_id
+        ).order_by(KPI.account_id, KPI.kpi_id).all()
+        
+        return BatchHealthScoreEngine.calculate_health_scores(
+            kpis, customer_id, category_weights=ROLLUP_CATEGORY_WEIGHTS
+        )
+    
+    def _calculate_customer_health_scores(self, customer_id, batch=None):
+        """
+        Batch version of _calculate_account_health_scores for every account of a customer.
+        Returns {account_id: account_health}; accounts without KPIs are omitted.
+        """
+        if batch is None:
+            batch = self._score_customer_kpis(customer_id)
+        
+        results = {}
+        for account_id, scores in batch.items():
+            health_scores = {
+                category['category'].lower().replace(' kpi', '').replace(' ', '_'): category['normalized_score']
+                for category in scores['category_scores']
+            }
+            results[account_id] = {
+                **EMPTY_ACCOUNT_HEALTH,
+                **health_scores,
+                'overall': scores['overall_score']['overall_score'],
+                'total_kpis': scores['total_kpis'],
+                'valid_kpis': scores['valid_kpis']
+            }
+        return results
+    
     def _calculate_account_health_scores(self, account, customer_id):
         """Calculate health scores for a specific account using the same rollup methodology."""
         # Get KPIs for this account
         account_kpis = KPI.query.filter_by(account_id=account.account_id).all()
         
         if not account_kpis:
-            return {
-                'overall': 0,
-                'product_usage': 0,
-                'support': 0,
-                'customer_sentiment': 0,
-                'business_outcomes': 0,
-                'relationship_strength': 0,
-                'total_kpis': 0,
-                'valid_kpis': 0
-            }
+            return dict(EMPTY_ACCOUNT_HEALTH)
         
         # Group KPIs by category with weighted scores
         category_data = {}
         total_kpis = len(account_kpis)
         valid_kpis = 0
         
-        # Category weights from the rollup methodology
-        category_weights = {
-            'Product Usage KPI': 0.3,
-            'Support KPI': 0.2,
-            'Customer Sentiment KPI': 0.2,
-            'Business Outcomes KPI': 0.15,
-            'Relationship Strength KPI': 0.15
-        }
+        category_weights = ROLLUP_CATEGORY_WEIGHTS
         
         for kpi in account_kpis:
-            parsed_value = self.health_engine.parse_kpi_value(kpi.data, kpi.kpi_parameter)
+            parsed_value = self.health_engine.parse_kpi_value(kpi.data, kpi.kpi_parameter, customer_id=customer_id)
             
             if parsed_value is not None:
-                health_info = self.health_engine.calculate_health_status(parsed_value, kpi.kpi_parameter)
+                health_info = self.health_engine.calculate_health_status(parsed_value, kpi.kpi_parameter, customer_id)
                 
                 category = kpi.category
                 if category not in category_data:
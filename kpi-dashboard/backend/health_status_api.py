@@ -46,15 +46,16 @@ def get_kpi_health_status():
         # Debug logging for TTFV
         if kpi.kpi_parameter == 'Time to First Value (TTFV)' and '21 hours' in kpi.data:
             print(f"DEBUG TTFV 21 hours: kpi_id={kpi.kpi_id}, data='{kpi.data}'")
-            parsed_value = HealthScoreEngine.parse_kpi_value(kpi.data, kpi.kpi_parameter)
+            parsed_value = HealthScoreEngine.parse_kpi_value(kpi.data, kpi.kpi_parameter, customer_id=customer_id)
             print(f"DEBUG TTFV 21 hours: parsed_value={parsed_value}")
-            health_info = HealthScoreEngine.calculate_health_status(parsed_value, kpi.kpi_parameter)
+            health_info = HealthScoreEngine.calculate_health_status(parsed_value, kpi.kpi_parameter, customer_id)
             print(f"DEBUG TTFV 21 hours: health_info={health_info}")
         else:
             # Calculate health status using the health score engine
             health_info = HealthScoreEngine.calculate_health_status(
-                HealthScoreEngine.parse_kpi_value(kpi.data, kpi.kpi_parameter), 
-                kpi.kpi_parameter
+                HealthScoreEngine.parse_kpi_value(kpi.data, kpi.kpi_parameter, customer_id=customer_id), 
+                kpi.kpi_parameter,
+                customer_id
             )
         
         # Convert to medical blood test terminology
@@ -113,8 +114,9 @@ def get_health_status_summary():
     
     for kpi in kpis:
         health_info = HealthScoreEngine.calculate_health_status(
-            HealthScoreEngine.parse_kpi_value(kpi.data, kpi.kpi_parameter), 
-            kpi.kpi_parameter
+            HealthScoreEngine.parse_kpi_value(kpi.data, kpi.kpi_parameter, customer_id=customer_id), 
+            kpi.kpi_parameter,
+            customer_id
         )
         
         status_mapping = {
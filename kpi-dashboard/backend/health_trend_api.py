@@ -11,12 +11,16 @@ from auth_middleware import get_current_customer_id, get_current_user_id
 from datetime import datetime, timedelta
 from extensions import db
 from models import HealthTrend, Account, Customer
+from account_health_summary import refresh_account_health_summaries
+from tenant_result_cache import invalidate_tenant_results
+from tenant_data_version import enable_conditional_get
 import json
 import logging
 
 logger = logging.getLogger(__name__)
 
 health_trend_api = Blueprint('health_trend_api', __name__)
+enable_conditional_get(health_trend_api)
 
 @health_trend_api.route('/api/health-trends', methods=['GET'])
 def get_health_trends():
@@ -134,6 +138,8 @@ def create_health_trend():
             db.session.add(trend)
         
         db.session.commit()
+        refresh_account_health_summaries(int(customer_id), [data['account_id']])
+        invalidate_tenant_results(int(customer_id))
         
         # Publish event for automatic snapshot creation
         try:
@@ -214,6 +220,8 @@ def generate_health_trends():
                 generated_count += 1
         
         db.session.commit()
+        refresh_account_health_summaries(int(customer_id))
+        invalidate_tenant_results(int(customer_id))
         
         # Publish events for automatic snapshot creation
         try:
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Incremental Health Score Recomputation
+Keeps per-account category partial sums (total weighted score, total impact units)
+so a single KPI edit updates the account's category and overall scores, and the
+current-month HealthTrend row, without re-scoring every KPI of the account.
+
+The full recompute (HealthScoreStorageService / recalculate_health_scores.py)
+remains the source of truth: it reseeds the partials, and check_consistency()
+compares the incremental state against it.
+"""
+
+from datetime import datetime
+from typing import Dict, List
+
+from extensions import db
+from models import Account, AccountHealthPartial, HealthTrend, KPI
+from health_score_engine import HealthScoreEngine
+from health_score_batch import BatchHealthScoreEngine
+from health_score_storage import HealthScoreStorageService, ROLLUP_CATEGORY_WEIGHTS, EMPTY_ACCOUNT_HEALTH
+
+# Fields of a KPI that affect its health contribution
+CONTRIBUTION_FIELDS = ('account_id', 'category', 'kpi_parameter', 'data', 'impact_level')
+
+
+def category_key(category: str) -> str:
+    """'Product Usage KPI' -> 'product_usage' (HealthTrend column prefix)"""
+    return category.lower().replace(' kpi', '').replace(' ', '_')
+
+
+def health_from_partials(partials: Dict[str, Dict]) -> Dict:
+    """
+    Category and overall scores from {category: {'total_score', 'total_units'}},
+    using the rollup methodology (categories without valid KPIs are left out).
+    """
+    health = dict(EMPTY_ACCOUNT_HEALTH)
+    weighted_category_sum = 0
+    total_weight = 0
+    for category, weight in ROLLUP_CATEGORY_WEIGHTS.items():
+        partial = partials.get(category)
+        if not partial or partial['valid_kpi_count'] <= 0 or partial['total_units'] <= 0:
+            continue
+        category_average = partial['total_score'] / partial['total_units']
+        health[category_key(category)] = category_average
+        weighted_category_sum += category_average * weight
+        total_weight += weight
+    health['overall'] = weighted_category_sum / total_weight if total_weight > 0 else 0
+    return health
+
+
+class IncrementalHealthService:
+    """Applies single-KPI edits to the stored health partials and HealthTrend"""
+
+    @staticmethod
+    def capture(kpi: KPI) -> Dict:
+        """Snapshot the fields that determine a KPI's contribution (call before editing)"""
+        return {field: getattr(kpi, field) for field in CONTRIBUTION_FIELDS}
+
+    @staticmethod
+    def kpi_contribution(kpi_fields: Dict, customer_id: int) -> Dict:
+        """Weighted score, impact units and validity of one KPI"""
+        result = HealthScoreEngine.calculate_kpi_health_score(dict(kpi_fields), customer_id)
+        valid = result['parsed_value'] is not None
+        return {
+            'category': kpi_fields.get('category'),
+            'total_score': result['weighted_score'] if valid else 0.0,
+            'total_units': result['impact_weight'] if valid else 0,
+            'valid': valid
+        }
+
+    @staticmethod
+    def apply_kpi_edit(before: Dict, kpi: KPI, customer_id: int, month: int = None, year: int = None) -> List[int]:
+        """
+        Apply the delta between a KPI's captured state and its current state.
+        Runs in the caller's transaction (commit afterwards). Accounts without
+        partials or without a HealthTrend row for the month are rebuilt in full.
+        Returns the account ids whose health was updated.
+        """
+        if month is None:
+            month = datetime.now().month
+        if year is None:
+            year = datetime.now().year
+
+        after = IncrementalHealthService.capture(kpi)
+        if before == after:
+            return []
+
+        old = IncrementalHealthService.kpi_contribution(before, customer_id)
+        new = IncrementalHealthService.kpi_contribution(after, customer_id)
+
+        updated = []
+        for account_id in dict.fromkeys([before['account_id'], after['account_id']]):
+            partials = {
+                p.category: p for p in AccountHealthPartial.query.filter_by(account_id=account_id).all()
+            }
+            trend = HealthTrend.query.filter_by(account_id=account_id, month=month, year=year).first()
+            if not partials or trend is None:
+                IncrementalHealthService.rebuild_account(account_id, customer_id, month, year)
+                updated.append(account_id)
+                continue
+
+            if before['account_id'] == account_id:
+                IncrementalHealthService._add(partials, old, sign=-1)
+            if after['account_id'] == account_id:
+                IncrementalHealthService._add(partials, new, sign=1)
+
+            health = health_from_partials({c: IncrementalHealthService._as_dict(p) for c, p in partials.items()})
+            IncrementalHealthService._write_trend(trend, health)
+            gained = after['account_id'] == account_id
+            lost = before['account_id'] == account_id
+            trend.total_kpis = (trend.total_kpis or 0) + gained - lost
+            trend.valid_kpis = (trend.valid_kpis or 0) + (gained and new['valid']) - (lost and old['valid'])
+            updated.append(account_id)
+        return updated
+
+    @staticmethod
+    def rebuild_account(account_id: int, customer_id: int, month: int = None, year: int = None) -> Dict:
+        """Full recompute of one account: reseed its partials and HealthTrend row"""
+        if month is None:
+            month = datetime.now().month
+        if year is None:
+            year = datetime.now().year
+
+        kpis = KPI.query.filter_by(account_id=account_id).order_by(KPI.kpi_id).all()
+        batch = BatchHealthScoreEngine.calculate_health_scores(
+            kpis, customer_id, category_weights=ROLLUP_CATEGORY_WEIGHTS
+        )
+        IncrementalHealthService.store_partials(customer_id, [account_id], batch)
+
+        scores = batch.get(account_id)
+        health = dict(EMPTY_ACCOUNT_HEALTH)
+        if scores:
+            health.update({category_key(c['category']): c['normalized_score'] for c in scores['category_scores']})
+            health.update(overall=scores['overall_score']['overall_score'],
+                          total_kpis=scores['total_kpis'], valid_kpis=scores['valid_kpis'])
+
+        trend = HealthTrend.query.filter_by(account_id=account_id, month=month, year=year).first()
+        if trend is None:
+            trend = HealthTrend(account_id=account_id, customer_id=customer_id, month=month, year=year)
+            db.session.add(trend)
+        IncrementalHealthService._write_trend(trend, health)
+        trend.total_kpis = health['total_kpis']
+        trend.valid_kpis = health['valid_kpis']
+        return health
+
+    @staticmethod
+    def store_partials(customer_id: int, account_ids: List[int], batch: Dict) -> None:
+        """
+        Replace the partials of the given accounts from BatchHealthScoreEngine results
+        scored with ROLLUP_CATEGORY_WEIGHTS. Every rollup category gets a row so an
+        account with partials is known to be seeded.
+        """
+        account_ids = list(account_ids)
+        if not account_ids:
+            return
+        existing = {
+            (p.account_id, p.category): p
+            for p in AccountHealthPartial.query.filter(AccountHealthPartial.account_id.in_(account_ids)).all()
+        }
+        for account_id in account_ids:
+            scores = batch.get(account_id, {})
+            by_category = {c['category']: c for c in scores.get('category_scores', [])}
+            for category in ROLLUP_CATEGORY_WEIGHTS:
+                partial = existing.get((account_id, category))
+                if partial is None:
+                    partial = AccountHealthPartial(account_id=account_id, customer_id=customer_id, category=category)
+                    db.session.add(partial)
+                category_score = by_category.get(category)
+                partial.total_score = category_score['total_score'] if category_score else 0.0
+                partial.total_units = category_score['total_units'] if category_score else 0.0
+                partial.valid_kpi_count = category_score['valid_kpi_count'] if category_score else 0
+
+    @staticmethod
+    def check_consistency(customer_id: int, month: int = None, year: int = None,
+                          tolerance: float = 0.01, repair: bool = False) -> List[Dict]:
+        """
+        Compare incrementally maintained scores with a full recompute.
+        Returns one entry per mismatching (account, field); with repair=True the
+        affected accounts are rebuilt (commit afterwards).
+        """
+        if month is None:
+            month = datetime.now().month
+        if year is None:
+            year = datetime.now().year
+
+        expected = HealthScoreStorageService()._calculate_customer_health_scores(customer_id)
+
+        trends = {
+            t.account_id: t for t in HealthTrend.query.filter_by(customer_id=customer_id, month=month, year=year).all()
+        }
+        account_ids = [a.account_id for a in Account.query.filter_by(customer_id=customer_id).all()]
+
+        mismatches = []
+        for account_id in account_ids:
+            trend = trends.get(account_id)
+            if trend is None:
+                continue
+            health = expected.get(account_id, EMPTY_ACCOUNT_HEALTH)
+            for key in ['overall'] + [category_key(c) for c in ROLLUP_CATEGORY_WEIGHTS]:
+                column = 'overall_health_score' if key == 'overall' else f'{key}_score'
+                stored = float(getattr(trend, column) or 0)
+                if abs(stored - health[key]) > tolerance:
+                    mismatches.append({'account_id': account_id, 'field': column,
+                                       'stored': stored, 'expected': health[key]})
+
+        if repair:
+            for account_id in dict.fromkeys(m['account_id'] for m in mismatches):
+                IncrementalHealthService.rebuild_account(account_id, customer_id, month, year)
+        return mismatches
+
+    @staticmethod
+    def _add(partials: Dict[str, AccountHealthPartial], contribution: Dict, sign: int) -> None:
+        partial = partials.get(contribution['category'])
+        if partial is None or not contribution['valid']:
+            # Categories outside the rollup weights don't affect the scores
+            return
+        partial.valid_kpi_count += sign
+        if partial.valid_kpi_count <= 0:
+            # Reset exactly instead of accumulating float residue
+            partial.valid_kpi_count = 0
+            partial.total_score = 0.0
+            partial.total_units = 0.0
+        else:
+            partial.total_score += sign * contribution['total_score']
+            partial.total_units += sign * contribution['total_units']
+
+    @staticmethod
+    def _as_dict(partial: AccountHealthPartial) -> Dict:
+        return {
+            'total_score': partial.total_score,
+            'total_units': partial.total_units,
+            'valid_kpi_count': partial.valid_kpi_count
+        }
+
+    @staticmethod
+    def _write_trend(trend: HealthTrend, health: Dict) -> None:
+        trend.overall_health_score = health['overall']
+        trend.product_usage_score = health['product_usage']
+        trend.support_score = health['support']
+        trend.customer_sentiment_score = health['customer_sentiment']
+        trend.business_outcomes_score = health['business_outcomes']
+        trend.relationship_strength_score = health['relationship_strength']
+        trend.updated_at = datetime.utcnow()
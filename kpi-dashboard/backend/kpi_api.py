@@ -7,16 +7,21 @@ FIXED: SQLAlchemy 2.0 compatibility - Replaced .query.get() with db.session.get(
 FIXED: Replaced .query.get_or_404() with proper filtering + first_or_404()
 """
 
-from flask import Blueprint, request, jsonify, abort
+from flask import Blueprint, request, jsonify, abort, json, Response, stream_with_context
 from auth_middleware import get_current_customer_id, get_current_user_id
 from extensions import db
-from models import KPI, KPIUpload, Account, CustomerConfig, Product
+from models import KPI, KPIUpload, Account, CustomerConfig, Product, AccountHealthSummary
+from account_health_summary import refresh_account_health_summaries
+from tenant_result_cache import invalidate_tenant_results
+from tenant_data_version import enable_conditional_get
+from incremental_health import IncrementalHealthService
 from datetime import datetime
 import logging
 
 logger = logging.getLogger(__name__)
 
 kpi_api = Blueprint('kpi_api', __name__)
+enable_conditional_get(kpi_api)
 
 # Use get_current_customer_id from auth_middleware (imported above)
 # No need to redefine it here
@@ -69,6 +74,7 @@ def update_customer_config():
             config.kpi_upload_mode = data['kpi_upload_mode']
         
         db.session.commit()
+        invalidate_tenant_results(customer_id)
         
         return jsonify({
             'status': 'updated',
@@ -95,36 +101,33 @@ def _get_mode_description(mode):
 
 @kpi_api.route('/api/accounts', methods=['GET'])
 def get_accounts():
-    """Get all accounts for a customer"""
+    """
+    Get all accounts for a customer.
+    Health score, products and KPI counts come from the account_health_summary
+    read model; pass page/per_page to page through large tenants.
+    """
     try:
         customer_id = get_current_customer_id()
-        accounts = Account.query.filter_by(customer_id=customer_id).all()
+        page = request.args.get('page', type=int)
+        per_page = request.args.get('per_page', 100, type=int)
         
-        # Import models needed for health score calculation
-        from models import HealthTrend
-        from playbook_recommendations_api import calculate_health_score_proxy
+        query = db.session.query(Account, AccountHealthSummary).outerjoin(
+            AccountHealthSummary, AccountHealthSummary.account_id == Account.account_id
+        ).filter(
+            Account.customer_id == customer_id
+        ).order_by(Account.account_id)
+        if page:
+            query = query.limit(per_page).offset((page - 1) * per_page)
+        rows = query.all()
+        
+        # Accounts created since the last refresh get their summary on first read
+        missing = [a.account_id for a, summary in rows if summary is None]
+        if missing and refresh_account_health_summaries(customer_id, missing):
+            rows = query.all()
         
         result = []
-        for a in accounts:
-            # First try to get health score from health_trends table
-            latest_trend = HealthTrend.query.filter_by(
-                account_id=a.account_id,
-                customer_id=customer_id
-            ).order_by(
-                HealthTrend.year.desc(),
-                HealthTrend.month.desc()
-            ).first()
-            
-            health_score = None
-            if latest_trend and latest_trend.overall_health_score:
-                health_score = float(latest_trend.overall_health_score)
-            else:
-                # Calculate health score on-the-fly from KPIs
-                health_score = calculate_health_score_proxy(a.account_id)
-            
-            # Get products for this account
-            products = Product.query.filter_by(account_id=a.account_id).all()
-            products_list = [p.product_name for p in products] if products else []
+        for a, summary in rows:
+            products_list = (summary.products_used or []) if summary else []
             
             result.append({
                 'account_id': a.account_id,
@@ -134,18 +137,25 @@ def get_accounts():
                 'status': a.account_status,
                 'industry': a.industry,
                 'region': a.region,
-                'health_score': health_score,
+                'health_score': summary.health_score if summary else None,
                 'account_status': a.account_status,
                 'created_at': a.created_at.isoformat() if a.created_at else None,
                 'profile_metadata': a.profile_metadata if hasattr(a, 'profile_metadata') and a.profile_metadata else None,
                 'products_used': products_list if products_list else (a.profile_metadata.get('products_used', '').split(',') if (hasattr(a, 'profile_metadata') and a.profile_metadata and a.profile_metadata.get('products_used')) else [])
             })
         
-        return jsonify({
+        response = {
             'status': 'success',
             'accounts': result,
             'total': len(result)
-        })
+        }
+        if page:
+            response.update({
+                'page': page,
+                'per_page': per_page,
+                'total': Account.query.filter_by(customer_id=customer_id).count()
+            })
+        return jsonify(response)
         
     except Exception as e:
         logger.error(f"Error getting accounts: {e}", exc_info=True)
@@ -172,6 +182,7 @@ def create_account():
         
         db.session.add(account)
         db.session.commit()
+        invalidate_tenant_results(customer_id)
         
         return jsonify({
             'account_id': account.account_id,
@@ -205,6 +216,7 @@ def update_account(account_id):
                 setattr(account, field, data[field])
         
         db.session.commit()
+        invalidate_tenant_results(customer_id)
         return jsonify({'status': 'updated'})
         
     except Exception as e:
@@ -277,6 +289,7 @@ def edit_kpi(kpi_id):
         
         # Update KPI fields
         data = request.json
+        before = IncrementalHealthService.capture(kpi)
         for field in ['health_score_component', 'weight', 'data', 'source_review', 
                       'kpi_parameter', 'impact_level', 'measurement_frequency', 'account_id']:
             if field in data:
@@ -286,7 +299,17 @@ def edit_kpi(kpi_id):
         kpi.last_edited_by = get_current_user_id()
         kpi.last_edited_at = datetime.utcnow()
         
+        # Apply the edit to the account's category partials and current-month health trend
+        try:
+            with db.session.begin_nested():
+                IncrementalHealthService.apply_kpi_edit(before, kpi, customer_id)
+        except Exception as e:
+            # The next full recompute repairs the partials; don't fail the edit
+            logger.warning(f"Incremental health update failed for KPI {kpi_id}: {e}")
+        
         db.session.commit()
+        refresh_account_health_summaries(customer_id, [before['account_id'], kpi.account_id])
+        invalidate_tenant_results(customer_id)
         
         return jsonify({
             'status': 'updated',
@@ -298,52 +321,138 @@ def edit_kpi(kpi_id):
         db.session.rollback()
         return jsonify({'error': 'Failed to update KPI'}), 500
 
+# Fields of /api/kpis/customer/all, in response order, with the column each one reads
+KPI_LIST_COLUMNS = {
+    'kpi_id': KPI.kpi_id,
+    'account_id': KPI.account_id,
+    'account_name': Account.account_name,
+    'account_revenue': Account.revenue,
+    'account_industry': Account.industry,
+    'account_region': Account.region,
+    'product_id': KPI.product_id,
+    'product_name': Product.product_name,
+    'aggregation_type': KPI.aggregation_type,
+    'category': KPI.category,
+    'row_index': KPI.row_index,
+    'health_score_component': KPI.health_score_component,
+    'weight': KPI.weight,
+    'data': KPI.data,
+    'source_review': KPI.source_review,
+    'kpi_parameter': KPI.kpi_parameter,
+    'impact_level': KPI.impact_level,
+    'measurement_frequency': KPI.measurement_frequency,
+    'last_edited_by': KPI.last_edited_by,
+    'last_edited_at': KPI.last_edited_at,
+    'upload_id': KPI.upload_id,
+    'upload_filename': KPIUpload.original_filename
+}
+
+# Value formatting for fields that are not returned as stored
+KPI_LIST_FORMATTERS = {
+    'account_revenue': lambda revenue: float(revenue) if revenue else 0,
+    'last_edited_at': lambda edited_at: edited_at.isoformat() if edited_at else None
+}
+
+KPI_LIST_MAX_PAGE_SIZE = 5000
+KPI_LIST_STREAM_BATCH_SIZE = 1000
+
+
+def _kpi_list_query(customer_id, fields):
+    """
+    Projected KPI query for the customer, filtered by the category, account_id and
+    product_id request args and ordered by kpi_id (the keyset pagination key).
+    Product and KPIUpload are only joined when a requested field needs them.
+    """
+    query = db.session.query(*[KPI_LIST_COLUMNS[field].label(field) for field in fields]).select_from(KPI).join(
+        Account, KPI.account_id == Account.account_id
+    )
+    if 'product_name' in fields:
+        query = query.outerjoin(Product, KPI.product_id == Product.product_id)
+    if 'upload_filename' in fields:
+        query = query.outerjoin(KPIUpload, KPI.upload_id == KPIUpload.upload_id)
+    # NOTE: Use Account.customer_id for filtering so KPIs without an upload still return.
+    query = query.filter(Account.customer_id == customer_id)
+
+    category = request.args.get('category')
+    if category:
+        query = query.filter(KPI.category == category)
+    account_id = request.args.get('account_id', type=int)
+    if account_id is not None:
+        query = query.filter(KPI.account_id == account_id)
+    product_id = request.args.get('product_id', type=int)
+    if product_id is not None:
+        query = query.filter(KPI.product_id == product_id)
+
+    return query.order_by(KPI.kpi_id)
+
+
+def _kpi_list_row(row, fields):
+    """Response dict for one projected KPI row"""
+    item = {}
+    for field, value in zip(fields, row):
+        formatter = KPI_LIST_FORMATTERS.get(field)
+        item[field] = formatter(value) if formatter else value
+    return item
+
+
 @kpi_api.route('/api/kpis/customer/all', methods=['GET'])
 def get_all_kpis():
-    """Get all KPIs for a customer with account and product information"""
+    """Get all KPIs for a customer with account and product information
+    
+    Query parameters:
+    - fields: comma-separated subset of KPI_LIST_COLUMNS (default: all)
+    - category, account_id, product_id: filters
+    - limit / cursor: keyset pagination on kpi_id; returns {'kpis', 'next_cursor', 'count'}
+      (pass the previous next_cursor as cursor; next_cursor is null on the last page)
+    - format=ndjson: stream every matching KPI as one JSON object per line
+    
+    Without limit, cursor or format the full list is returned as a JSON array.
+    """
     try:
         customer_id = get_current_customer_id()
         
-        # Get KPIs with account, product, and upload information for this customer
-        # NOTE: Use Account.customer_id for filtering so KPIs without an upload still return.
-        kpis = db.session.query(KPI, Account, Product, KPIUpload).outerjoin(
-            KPIUpload, KPI.upload_id == KPIUpload.upload_id
-        ).join(
-            Account, KPI.account_id == Account.account_id
-        ).outerjoin(
-            Product, KPI.product_id == Product.product_id
-        ).filter(
-            Account.customer_id == customer_id
-        ).all()
+        requested = request.args.get('fields')
+        fields = [f.strip() for f in requested.split(',') if f.strip()] if requested else list(KPI_LIST_COLUMNS)
+        unknown = [f for f in fields if f not in KPI_LIST_COLUMNS]
+        if unknown:
+            return jsonify({'error': f"Unknown fields: {', '.join(unknown)}"}), 400
+        # kpi_id is the pagination key; always select it, return it only when requested
+        return_kpi_id = 'kpi_id' in fields
+        if not return_kpi_id:
+            fields = ['kpi_id'] + fields
+        
+        query = _kpi_list_query(customer_id, fields)
+        
+        def serialize(row):
+            item = _kpi_list_row(row, fields)
+            if not return_kpi_id:
+                del item['kpi_id']
+            return item
+        
+        if request.args.get('format') == 'ndjson':
+            def generate():
+                # yield_per streams from a server-side cursor instead of loading the tenant
+                for row in query.yield_per(KPI_LIST_STREAM_BATCH_SIZE):
+                    yield json.dumps(serialize(row)) + '\n'
+            
+            return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
         
-        result = []
-        for kpi, account, product, upload in kpis:
-            result.append({
-                'kpi_id': kpi.kpi_id,
-                'account_id': kpi.account_id,
-                'account_name': account.account_name if account else 'Unknown Account',
-                'account_revenue': float(account.revenue) if account and account.revenue else 0,
-                'account_industry': account.industry if account else 'Unknown',
-                'account_region': account.region if account else 'Unknown',
-                'product_id': kpi.product_id,
-                'product_name': product.product_name if product else None,
-                'aggregation_type': kpi.aggregation_type,
-                'category': kpi.category,
-                'row_index': kpi.row_index,
-                'health_score_component': kpi.health_score_component,
-                'weight': kpi.weight,
-                'data': kpi.data,
-                'source_review': kpi.source_review,
-                'kpi_parameter': kpi.kpi_parameter,
-                'impact_level': kpi.impact_level,
-                'measurement_frequency': kpi.measurement_frequency,
-                'last_edited_by': kpi.last_edited_by,
-                'last_edited_at': kpi.last_edited_at.isoformat() if kpi.last_edited_at else None,
-                'upload_id': kpi.upload_id,
-                'upload_filename': upload.original_filename if upload else None
-            })
+        limit = request.args.get('limit', type=int)
+        cursor = request.args.get('cursor', type=int)
+        if limit is None and cursor is None:
+            return jsonify([serialize(row) for row in query.all()])
         
-        return jsonify(result)
+        limit = max(1, min(limit or KPI_LIST_MAX_PAGE_SIZE, KPI_LIST_MAX_PAGE_SIZE))
+        if cursor is not None:
+            query = query.filter(KPI.kpi_id > cursor)
+        rows = query.limit(limit + 1).all()
+        page = rows[:limit]
+        
+        return jsonify({
+            'kpis': [serialize(row) for row in page],
+            'next_cursor': page[-1].kpi_id if len(rows) > limit else None,
+            'count': len(page)
+        })
         
     except Exception as e:
         logger.error(f"Error getting all KPIs: {e}", exc_info=True)
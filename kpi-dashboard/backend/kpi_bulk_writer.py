@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Bulk KPI Writer
+Writes many KPI rows without building ORM objects.
+
+Rows (dicts of KPI column values) are written in batches of KPI_BULK_BATCH_SIZE:
+- PostgreSQL (psycopg2): COPY kpis FROM STDIN, one COPY per batch
+- other databases: one executemany INSERT per batch
+
+The parsed value columns are filled from data as the KPI.data 'set' event does
+for ORM rows, and the analytics cube is dropped at commit like for any bulk KPI
+statement. By default the batches join the caller's transaction; with
+commit_batches each batch is committed on its own, for loaders that can resume.
+"""
+
+import io
+import itertools
+import os
+import time
+from typing import Callable, Dict, Iterable, Optional
+
+from flask import current_app, has_app_context
+from sqlalchemy import insert
+
+from extensions import db
+from models import KPI
+from kpi_value_parser import parse_kpi_data_for_storage
+from analytics_cube import invalidate_on_commit
+
+DEFAULT_BATCH_SIZE = 5000
+
+# Every row is written with these columns (missing values are NULL)
+KPI_BULK_COLUMNS = [column.name for column in KPI.__table__.columns if column.name != 'kpi_id']
+
+_COPY_SQL = f"COPY {KPI.__tablename__} ({', '.join(KPI_BULK_COLUMNS)}) FROM STDIN WITH (FORMAT csv)"
+
+
+def bulk_batch_size() -> int:
+    """KPI_BULK_BATCH_SIZE from the app config or environment"""
+    if has_app_context() and current_app.config.get('KPI_BULK_BATCH_SIZE'):
+        return int(current_app.config['KPI_BULK_BATCH_SIZE'])
+    return int(os.getenv('KPI_BULK_BATCH_SIZE', DEFAULT_BATCH_SIZE))
+
+
+def kpi_row(values: Dict) -> Dict:
+    """A full KPI row from column values, with value_numeric/value_unit/value_parse_status parsed from data"""
+    row = {name: values.get(name) for name in KPI_BULK_COLUMNS}
+    row['value_numeric'], row['value_unit'], row['value_parse_status'] = parse_kpi_data_for_storage(row['data'])
+    return row
+
+
+def _csv_field(value) -> str:
+    # Unquoted empty is NULL in COPY csv format, so every value is quoted
+    if value is None:
+        return ''
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+def _copy_batch(batch):
+    buffer = io.StringIO()
+    for row in batch:
+        buffer.write(','.join(_csv_field(row[name]) for name in KPI_BULK_COLUMNS))
+        buffer.write('\n')
+    buffer.seek(0)
+    cursor = db.session.connection().connection.cursor()
+    try:
+        cursor.copy_expert(_COPY_SQL, buffer)
+    finally:
+        cursor.close()
+
+
+def _uses_copy() -> bool:
+    dialect = db.session.get_bind().dialect
+    return dialect.name == 'postgresql' and dialect.driver == 'psycopg2'
+
+
+def write_kpis(rows: Iterable[Dict], batch_size: Optional[int] = None, commit_batches: bool = False,
+               on_batch: Optional[Callable[[int], None]] = None) -> Dict:
+    """
+    Write KPI rows (dicts of KPI column values) in batches.
+    on_batch(rows_written) runs after each batch is written, before it is committed.
+    Returns {'rows', 'batch_count', 'seconds', 'rows_per_second', 'method'}.
+    """
+    batch_size = batch_size or bulk_batch_size()
+    use_copy = _uses_copy()
+    started = time.perf_counter()
+
+    # Parent rows (uploads, accounts) must exist before COPY, which skips autoflush
+    db.session.flush()
+    rows = iter(rows)
+    written = batches = 0
+    while True:
+        batch = [kpi_row(values) for values in itertools.islice(rows, batch_size)]
+        if not batch:
+            break
+        if use_copy:
+            _copy_batch(batch)
+            invalidate_on_commit(db.session)
+        else:
+            db.session.execute(insert(KPI.__table__), batch)
+        written += len(batch)
+        batches += 1
+        if on_batch:
+            on_batch(written)
+        if commit_batches:
+            db.session.commit()
+
+    seconds = time.perf_counter() - started
+    return {
+        'rows': written,
+        'batch_count': batches,
+        'seconds': round(seconds, 3),
+        'rows_per_second': round(written / seconds) if written and seconds > 0 else 0,
+        'method': 'copy' if use_copy else 'insert',
+    }
@@ -93,14 +93,21 @@ DC_KPIS = {
     "DC-REL-028": {"id": "DC-REL-028", "name": "Multi-Site Deployment", "unit": "count", "target": 2, "pillar": "Relationship Strength"},
 }
 
+# Name -> definition index (uploads store the KPI name in kpi_parameter)
+DC_KPIS_BY_NAME = {v["name"]: v for v in DC_KPIS.values()}
+
 def get_kpi(kpi_id):
     return DC_KPIS.get(kpi_id)
 
+def resolve_kpi(kpi_key):
+    """Definition for a KPI id or KPI name, or None"""
+    return DC_KPIS.get(kpi_key) or DC_KPIS_BY_NAME.get(kpi_key)
+
 def get_kpis_by_pillar(pillar):
     return {k: v for k, v in DC_KPIS.items() if v.get("pillar") == pillar}
 
 def calculate_risk_band(kpi_id, value):
-    kpi = DC_KPIS.get(kpi_id)
+    kpi = resolve_kpi(kpi_id)
     if not kpi or "risk_bands" not in kpi:
         return "healthy"
     for band, (min_val, max_val) in kpi["risk_bands"].items():
@@ -70,6 +70,47 @@ def get_account_level_kpis(
     return results
 
 
+def get_customer_account_level_kpis(
+    customer_id: int,
+    aggregation_type: str = None
+) -> list:
+    """
+    Get account-level KPIs of every account of a customer in one query
+    (same filtering as get_account_level_kpis), ordered by account_id, kpi_id.
+
+    Args:
+        customer_id: Customer ID
+        aggregation_type: Optional filter ('weighted_avg', 'min', 'max', etc.)
+                         If None, returns primary aggregates (NULL or 'weighted_avg')
+
+    Returns:
+        List of account-level KPI objects
+    """
+    query = KPI.query.join(Account).filter(
+        Account.customer_id == customer_id,
+        KPI.product_id.is_(None)  # ✅ CRITICAL: Only account-level
+    )
+
+    if aggregation_type:
+        query = query.filter(KPI.aggregation_type == aggregation_type)
+    else:
+        query = query.filter(
+            or_(
+                KPI.aggregation_type == 'weighted_avg',
+                KPI.aggregation_type.is_(None)
+            )
+        )
+
+    results = query.order_by(KPI.account_id, KPI.kpi_id).all()
+
+    logger.info(
+        f"Retrieved {len(results)} account-level KPIs for "
+        f"customer_id={customer_id}, aggregation_type={aggregation_type}"
+    )
+
+    return results
+
+
 def get_product_kpis(
     account_id: int, 
     product_id: int = None, 
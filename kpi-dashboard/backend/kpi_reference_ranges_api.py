@@ -8,9 +8,13 @@ from flask import Blueprint, request, jsonify
 from auth_middleware import get_current_customer_id, get_current_user_id
 from extensions import db
 from models import KPIReferenceRange, Customer
+from reference_range_index import invalidate_reference_ranges
+from tenant_result_cache import invalidate_tenant_results
+from tenant_data_version import enable_conditional_get
 import json
 
 kpi_reference_ranges_api = Blueprint('kpi_reference_ranges_api', __name__)
+enable_conditional_get(kpi_reference_ranges_api)
 
 
 
@@ -189,6 +193,8 @@ def update_kpi_reference_range(range_id):
         target_range.healthy_range = f"{target_range.healthy_min}-{target_range.healthy_max}"
         
         db.session.commit()
+        invalidate_reference_ranges(customer_id)
+        invalidate_tenant_results(customer_id)
         
         return jsonify({
             'status': 'success',
@@ -230,6 +236,7 @@ def bulk_update_kpi_reference_ranges():
         ranges = data.get('ranges', [])
         
         updated_count = 0
+        touched_customers = set()
         for range_data in ranges:
             range_id = range_data.get('range_id')
             if not range_id:
@@ -253,10 +260,20 @@ def bulk_update_kpi_reference_ranges():
             ref_range.risk_range = f"{ref_range.risk_min}-{ref_range.risk_max}"
             ref_range.healthy_range = f"{ref_range.healthy_min}-{ref_range.healthy_max}"
             
+            touched_customers.add(ref_range.customer_id)
             updated_count += 1
         
         db.session.commit()
         
+        # A changed system default (customer_id=NULL) affects every tenant
+        if None in touched_customers:
+            invalidate_reference_ranges()
+            invalidate_tenant_results()
+        else:
+            for touched_customer_id in touched_customers:
+                invalidate_reference_ranges(touched_customer_id)
+                invalidate_tenant_results(touched_customer_id)
+        
         return jsonify({
             'status': 'success',
             'message': f'Successfully updated {updated_count} KPI reference ranges',
@@ -331,6 +348,8 @@ def reset_kpi_reference_ranges():
             db.session.add(ref_range)
         
         db.session.commit()
+        invalidate_reference_ranges()
+        invalidate_tenant_results()
         
         return jsonify({
             'status': 'success',
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+KPI Value Parser
+Parses the free-text KPI.data string into a numeric value and unit tag.
+
+This is the parser behind HealthScoreEngine.parse_kpi_value, and the one used to
+persist KPI.value_numeric / value_unit / value_parse_status at write time so
+readers don't have to re-parse KPI strings on every request.
+"""
+
+import math
+import re
+from functools import lru_cache
+from typing import Optional, Tuple
+
+# value_parse_status values stored on KPI rows
+PARSE_STATUS_PARSED = 'parsed'        # value_numeric holds a finite number
+PARSE_STATUS_EMPTY = 'empty'          # no data (None, '', 'None')
+PARSE_STATUS_INVALID = 'invalid'      # data present but not numeric
+PARSE_STATUS_NON_FINITE = 'non_finite'  # parses to nan/inf; readers re-parse the string
+
+# value_unit values stored on KPI rows (None = plain number)
+UNIT_PERCENT = '%'
+UNIT_CURRENCY = '$'
+UNIT_HOURS = 'hours'
+UNIT_DAYS = 'days'
+
+# Unit tokens accepted after the number (lower case) -> value_unit
+UNIT_TOKENS = {
+    '%': UNIT_PERCENT,
+    '$': UNIT_CURRENCY,
+    'hours': UNIT_HOURS,
+    'hour': UNIT_HOURS,
+    'hrs': UNIT_HOURS,
+    'hr': UNIT_HOURS,
+    'days': UNIT_DAYS,
+    'day': UNIT_DAYS,
+}
+
+# Magnitude suffixes (lower case) -> multiplier
+SUFFIX_MULTIPLIERS = {
+    'k': 1000.0,
+    'm': 1000000.0,
+    'b': 1000000000.0,
+}
+
+# Units that take a magnitude suffix (None = plain number)
+SUFFIX_UNITS = {None, UNIT_CURRENCY}
+
+# One pass over the (stripped) string: [sign] [$] [sign] number [suffix] [unit]
+KPI_VALUE_PATTERN = re.compile(
+    r'([-+]?)\s*(\$?)\s*([-+]?)\s*((?:\d[\d,]*(?:\.\d*)?|\.\d+)(?:e[-+]?\d+)?)'
+    r'\s*([kmb]?)\s*(%|\$|hours|hour|hrs|hr|days|day|)$',
+    re.IGNORECASE
+)
+
+# Memo sizes for the parse caches (KPI strings repeat heavily across accounts)
+PARSE_CACHE_SIZE = 65536
+
+
+def parse_kpi_data(data_str) -> Tuple[Optional[float], Optional[str]]:
+    """
+    Parse a KPI data string in its own unit (no reference-unit conversion).
+    Returns (value, unit); value is None if the string is empty or not numeric.
+
+    Accepts %, $ (leading or trailing), K/M/B suffixes on plain and currency
+    values, hours/days (and hour/hr/hrs/day) and thousands separators. Anything
+    else float() accepts (e.g. 'nan') parses as a plain number.
+    Results are memoized per raw value.
+    """
+    if not data_str or data_str == 'None':
+        return None, None
+    try:
+        return _parse_kpi_data_cached(data_str)
+    except TypeError:
+        # Unhashable input - parse without the memo
+        return _parse_kpi_data(data_str)
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE, typed=True)
+def _parse_kpi_data_cached(data_str) -> Tuple[Optional[float], Optional[str]]:
+    return _parse_kpi_data(data_str)
+
+
+def _parse_kpi_data(data_str) -> Tuple[Optional[float], Optional[str]]:
+    data_str = str(data_str).strip()
+    match = KPI_VALUE_PATTERN.match(data_str)
+    if match is None:
+        # Anything else float() accepts ('nan', 'inf', '1_000') is a plain number
+        try:
+            return float(data_str), None
+        except ValueError:
+            return None, None
+    sign, currency, sign2, number, suffix, unit_token = match.groups()
+
+    unit = UNIT_TOKENS[unit_token.lower()] if unit_token else None
+    if currency:
+        if unit not in (None, UNIT_CURRENCY):
+            return None, None
+        unit = UNIT_CURRENCY
+    if sign and sign2:
+        return None, None
+
+    value = float(number.replace(',', '') if ',' in number else number)
+    if suffix:
+        if unit not in SUFFIX_UNITS:
+            return None, None
+        value *= SUFFIX_MULTIPLIERS[suffix.lower()]
+    if sign == '-' or sign2 == '-':
+        value = -value
+    return value, unit
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE, typed=True)
+def _parse_kpi_value_cached(data_str, target_unit: Optional[str]) -> Optional[float]:
+    value, unit = parse_kpi_data(data_str)
+    return convert_to_reference_unit(value, unit, target_unit)
+
+
+def parse_kpi_value(data_str, target_unit: Optional[str] = None) -> Optional[float]:
+    """
+    Parse a KPI data string and convert hours/days values to target_unit
+    (the unit of the KPI's reference range). Memoized per (raw value, target unit).
+    """
+    if not data_str or data_str == 'None':
+        return None
+    try:
+        return _parse_kpi_value_cached(data_str, target_unit)
+    except TypeError:
+        value, unit = _parse_kpi_data(data_str)
+        return convert_to_reference_unit(value, unit, target_unit)
+
+
+def kpi_number(data_str, empty: float = 0.0) -> Optional[float]:
+    """
+    Numeric KPI value in its own unit, for the proxy scorers that average raw values:
+    blank strings count as `empty`, non-numeric data returns None (skip the KPI).
+    """
+    value, _ = parse_kpi_data(data_str)
+    if value is None and not str(data_str).strip():
+        return empty
+    return value
+
+
+def parser_cache_info() -> dict:
+    """Hit/miss statistics of the parse memos"""
+    return {
+        'parse_kpi_data': _parse_kpi_data_cached.cache_info()._asdict(),
+        'parse_kpi_value': _parse_kpi_value_cached.cache_info()._asdict()
+    }
+
+
+def clear_parser_cache():
+    """Empty the parse memos"""
+    _parse_kpi_data_cached.cache_clear()
+    _parse_kpi_value_cached.cache_clear()
+
+
+def convert_to_reference_unit(value: Optional[float], unit: Optional[str], expected_unit: Optional[str]) -> Optional[float]:
+    """Convert an hours/days value to the unit the KPI's reference range expects"""
+    if value is None:
+        return None
+    if unit == UNIT_HOURS and expected_unit == 'days':
+        return value / 24.0
+    if unit == UNIT_DAYS and expected_unit == 'hours':
+        return value * 24.0
+    return value
+
+
+def parse_kpi_data_for_storage(data_str) -> Tuple[Optional[float], Optional[str], str]:
+    """
+    Parse a KPI data string for the value_numeric / value_unit / value_parse_status columns.
+    Returns (value, unit, status).
+    """
+    if not data_str or data_str == 'None':
+        return None, None, PARSE_STATUS_EMPTY
+
+    value, unit = parse_kpi_data(data_str)
+    if value is None:
+        return None, None, PARSE_STATUS_INVALID
+    if not math.isfinite(value):
+        return None, unit, PARSE_STATUS_NON_FINITE
+    return value, unit, PARSE_STATUS_PARSED
+
+
+def stored_kpi_value(kpi) -> Tuple[bool, Optional[float], Optional[str]]:
+    """
+    Read the persisted parse of a KPI row.
+    Returns (available, value, unit); available is False when the row has not been
+    parsed yet (pre-backfill) or holds a non-finite value, in which case callers
+    should parse kpi.data themselves.
+    """
+    status = getattr(kpi, 'value_parse_status', None)
+    if status in (PARSE_STATUS_PARSED, PARSE_STATUS_EMPTY, PARSE_STATUS_INVALID):
+        return True, kpi.value_numeric, kpi.value_unit
+    return False, None, None
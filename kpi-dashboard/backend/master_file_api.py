@@ -13,6 +13,8 @@ from werkzeug.utils import secure_filename
 import os
 from models import db, Customer, CustomerConfig
 from extensions import get_customer_id
+from category_weight_index import invalidate_category_weights
+from tenant_result_cache import invalidate_tenant_results
 
 master_file_api = Blueprint('master_file_api', __name__)
 
@@ -91,6 +93,8 @@ def upload_master_file():
         config.category_weights = json.dumps(category_weights)
         config.master_file_name = filename
         db.session.commit()
+        invalidate_category_weights(customer_id)
+        invalidate_tenant_results(customer_id)
         
         # Clean up temporary file
         os.remove(temp_path)
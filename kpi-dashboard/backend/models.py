@@ -1,5 +1,11 @@
+import re
+
+from sqlalchemy import event
 from extensions import db
 
+# Reporting period in upload file names ('Acme_DC_KPIs_Month_3.csv' -> 3)
+UPLOAD_PERIOD_PATTERN = re.compile(r'Month[_\s](\d+)', re.IGNORECASE)
+
 class Customer(db.Model):
     __tablename__ = 'customers'
     customer_id = db.Column(db.Integer, primary_key=True)
@@ -7,6 +13,7 @@ class Customer(db.Model):
     email = db.Column(db.String, unique=True)
     phone = db.Column(db.String)
     domain = db.Column(db.String, unique=True, nullable=True)  # Email domain for multi-tenant identification
+    data_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # Bumped on every data change (see tenant_data_version)
     created_at = db.Column(db.DateTime, server_default=db.func.now())
     updated_at = db.Column(db.DateTime, server_default=db.func.now(), onupdate=db.func.now())
 
@@ -69,6 +76,7 @@ class User(db.Model):
     email = db.Column(db.String, nullable=False)
     password_hash = db.Column(db.String(128))
     active = db.Column(db.Boolean, default=True)  # For account deactivation
+    is_admin = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())  # Admin-only tools (e.g. /api/debug/perf)
     last_login = db.Column(db.DateTime)
     created_at = db.Column(db.DateTime, server_default=db.func.now())
     updated_at = db.Column(db.DateTime, server_default=db.func.now(), onupdate=db.func.now())
@@ -109,15 +117,34 @@ class KPIUpload(db.Model):
     uploaded_at = db.Column(db.DateTime, server_default=db.func.now(), index=True)
     version = db.Column(db.Integer, nullable=False)
     original_filename = db.Column(db.String)
-    raw_excel = db.Column(db.LargeBinary)  # Store original file
+    content_sha256 = db.Column(db.String(64), index=True)  # Original file in the blob store (see blob_store)
     parsed_json = db.Column(db.JSON)       # Optionally store parsed structure
+    period = db.Column(db.Integer)  # Reporting period from original_filename (set by _sync_upload_period)
+    # Background processing (see upload_jobs): stored/parsing/writing/scoring/indexing, then completed or failed
+    phase = db.Column(db.String(20), nullable=False, default='completed', server_default='completed', index=True)
+    rows_processed = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    processing_errors = db.Column(db.JSON)  # Messages of skipped sheets/rows and of a failure
+    phase_updated_at = db.Column(db.DateTime)
     
     # Composite indexes for common query patterns
     __table_args__ = (
         db.Index('idx_upload_customer_uploaded', 'customer_id', 'uploaded_at'),
         db.Index('idx_upload_account_uploaded', 'account_id', 'uploaded_at'),
+        db.Index('idx_upload_customer_period', 'customer_id', 'period'),
     )
 
+
+def upload_period_from_filename(filename):
+    """Reporting period number in an upload file name, or None"""
+    match = UPLOAD_PERIOD_PATTERN.search(filename or '')
+    return int(match.group(1)) if match else None
+
+
+@event.listens_for(KPIUpload.original_filename, 'set')
+def _sync_upload_period(target, value, oldvalue, initiator):
+    """Derive KPIUpload.period whenever the file name is assigned"""
+    target.period = upload_period_from_filename(value)
+
 class KPI(db.Model):
     __tablename__ = 'kpis'
     kpi_id = db.Column(db.Integer, primary_key=True)
@@ -136,6 +163,10 @@ class KPI(db.Model):
     measurement_frequency = db.Column(db.String)
     last_edited_by = db.Column(db.Integer, db.ForeignKey('users.user_id'))
     last_edited_at = db.Column(db.DateTime, index=True)
+    # Parsed form of `data`, kept in sync on write (see _sync_kpi_parsed_value)
+    value_numeric = db.Column(db.Float, index=True)  # Value in its own unit; NULL unless parsed
+    value_unit = db.Column(db.String(20))  # '%', '$', 'hours', 'days' or NULL for plain numbers
+    value_parse_status = db.Column(db.String(20), index=True)  # parsed/empty/invalid/non_finite; NULL = not backfilled
     
     # Composite indexes for common query patterns
     __table_args__ = (
@@ -143,8 +174,17 @@ class KPI(db.Model):
         db.Index('idx_kpi_account_parameter', 'account_id', 'kpi_parameter'),
         db.Index('idx_kpi_account_aggregation', 'account_id', 'aggregation_type'),
         db.Index('idx_kpi_upload_account', 'upload_id', 'account_id'),
+        db.Index('idx_kpi_parameter_value', 'kpi_parameter', 'value_numeric'),
     )
 
+
+@event.listens_for(KPI.data, 'set')
+def _sync_kpi_parsed_value(target, value, oldvalue, initiator):
+    """Parse KPI.data whenever it is assigned (upload, rehydration, edit_kpi)"""
+    from kpi_value_parser import parse_kpi_data_for_storage
+    target.value_numeric, target.value_unit, target.value_parse_status = parse_kpi_data_for_storage(value)
+
+
 class HealthTrend(db.Model):
     __tablename__ = 'health_trends'
     trend_id = db.Column(db.Integer, primary_key=True)
@@ -170,6 +210,40 @@ class HealthTrend(db.Model):
         db.Index('idx_health_trend_customer_date', 'customer_id', 'year', 'month'),
     )
 
+class AccountHealthPartial(db.Model):
+    """Per-account category partial sums used for incremental health recomputation"""
+    __tablename__ = 'account_health_partials'
+    partial_id = db.Column(db.Integer, primary_key=True)
+    account_id = db.Column(db.Integer, db.ForeignKey('accounts.account_id', ondelete='CASCADE'), nullable=False, index=True)
+    customer_id = db.Column(db.Integer, db.ForeignKey('customers.customer_id'), nullable=False, index=True)
+    category = db.Column(db.String, nullable=False)
+    total_score = db.Column(db.Float, nullable=False, default=0.0)  # Sum of impact-weighted KPI scores
+    total_units = db.Column(db.Float, nullable=False, default=0.0)  # Sum of impact weights
+    valid_kpi_count = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, server_default=db.func.now(), onupdate=db.func.now())
+    
+    __table_args__ = (
+        db.UniqueConstraint('account_id', 'category', name='unique_account_category_partial'),
+    )
+
+class AccountHealthSummary(db.Model):
+    """Read model behind GET /api/accounts, refreshed by upload, KPI edit and health trend writes"""
+    __tablename__ = 'account_health_summary'
+    account_id = db.Column(db.Integer, db.ForeignKey('accounts.account_id', ondelete='CASCADE'), primary_key=True)
+    customer_id = db.Column(db.Integer, db.ForeignKey('customers.customer_id'), nullable=False, index=True)
+    health_score = db.Column(db.Float)
+    health_source = db.Column(db.String(20))  # 'health_trend' or 'kpi_proxy'
+    trend_month = db.Column(db.Integer)  # Month/year of the HealthTrend the score came from
+    trend_year = db.Column(db.Integer)
+    products_used = db.Column(db.JSON)  # Product names of the account
+    total_kpis = db.Column(db.Integer, default=0)
+    valid_kpis = db.Column(db.Integer, default=0)
+    refreshed_at = db.Column(db.DateTime, server_default=db.func.now(), onupdate=db.func.now())
+    
+    __table_args__ = (
+        db.Index('idx_account_health_summary_customer_account', 'customer_id', 'account_id'),
+    )
+
 class KPIReferenceRange(db.Model):
     __tablename__ = 'kpi_reference_ranges'
     range_id = db.Column(db.Integer, primary_key=True)
@@ -584,6 +658,12 @@ class AccountSnapshot(db.Model):
     snapshot_sequence_number = db.Column(db.Integer, default=1)
     is_significant_change = db.Column(db.Boolean, default=False)
     
+    # Delta encoding (see snapshot_storage): bases (chain_position 0) hold the full state,
+    # later rows of the chain only the fields changed since the previous snapshot
+    base_snapshot_id = db.Column(db.Integer, db.ForeignKey('account_snapshots.snapshot_id'), nullable=True, index=True)
+    chain_position = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    state_delta = db.Column(db.JSON)  # {column: value} changed since the previous snapshot
+    
     # Timestamps
     created_at = db.Column(db.DateTime, server_default=db.func.now())
     updated_at = db.Column(db.DateTime, server_default=db.func.now(), onupdate=db.func.now())
@@ -10,6 +10,7 @@ from models import db, Account, KPI, KPITimeSeries
 from datetime import datetime, timedelta
 from sqlalchemy import func
 import json
+from kpi_value_parser import PARSE_STATUS_PARSED, kpi_number
 
 playbook_recommendations_api = Blueprint('playbook_recommendations_api', __name__)
 
@@ -21,7 +22,11 @@ def calculate_health_score_proxy(account_id):
     """Calculate a health score proxy from KPIs using a simplified approach"""
     # Get recent KPIs for the account
     kpis = KPI.query.filter_by(account_id=account_id).all()
-    
+    return health_score_proxy_from_kpis(kpis)
+
+
+def health_score_proxy_from_kpis(kpis):
+    """Health score proxy for already-loaded KPIs of one account"""
     if not kpis:
         return 50.0  # Default middle score
     
@@ -31,9 +36,13 @@ def calculate_health_score_proxy(account_id):
     
     for kpi in kpis:
         try:
-            # Parse the KPI data value
-            data_str = str(kpi.data).replace('%', '').replace('$', '').replace('K', '000').replace('M', '000000')
-            value = float(data_str) if data_str.strip() else 0
+            # Use the value parsed at write time, falling back to the KPI data string
+            if kpi.value_parse_status == PARSE_STATUS_PARSED:
+                value = kpi.value_numeric
+            else:
+                value = kpi_number(kpi.data)
+                if value is None:
+                    continue
             
             # Normalize to 0-100 scale based on KPI type
             if 'score' in kpi.kpi_parameter.lower() or 'rate' in kpi.kpi_parameter.lower():
@@ -2,6 +2,7 @@ from flask import Blueprint, request, jsonify
 from auth_middleware import get_current_customer_id, get_current_user_id
 from extensions import db
 from models import KPI, KPIUpload, Account
+from kpi_value_parser import kpi_number
 import pandas as pd
 import numpy as np
 from sklearn.feature_extraction.text import TfidfVectorizer
@@ -510,8 +511,9 @@ def calculate_health_score(kpis, component_name):
     for kpi in component_kpis:
         try:
             # Parse data value
-            data_str = str(kpi.data).replace('%', '').replace('$', '').replace('K', '000').replace('M', '000000')
-            value = float(data_str) if data_str.strip() else 0
+            value = kpi_number(kpi.data)
+            if value is None:
+                continue
             
             # Use weight if available
             weight = float(kpi.weight) if kpi.weight else 1
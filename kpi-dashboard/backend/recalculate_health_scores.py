@@ -1,15 +1,21 @@
 #!/usr/bin/env python3
 """
-Recalculate health scores for all Test Company accounts
-This ensures health scores are properly calculated from KPI data
+Recalculate health scores from KPI data for one, several or all customers.
+Accounts are partitioned across a process pool (see health_recalc_jobs.py);
+pass --checkpoint to make a long run resumable.
+
+Usage:
+    python recalculate_health_scores.py [--customer ID ...] [--all] [--workers N]
+                                        [--partition-size N] [--checkpoint PATH]
+    python recalculate_health_scores.py --check|--repair [--customer ID]
 """
 
 import os
 from dotenv import load_dotenv
 from flask import Flask
 from extensions import db
-from models import Account, KPI, HealthTrend, Customer
-from health_score_engine import HealthScoreEngine
+from models import HealthTrend, Customer
+from health_recalc_jobs import HealthRecalcJobRunner
 from datetime import datetime
 
 load_dotenv('.env')
@@ -19,112 +25,44 @@ app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 db.init_app(app)
 
-def recalculate_health_scores(customer_id=1):
-    """Recalculate health scores for all accounts"""
-    print(f"🔄 Recalculating health scores for customer_id={customer_id}...")
+def recalculate_health_scores(customer_ids=(1,), workers=None, partition_size=500, checkpoint_path=None):
+    """Recalculate health scores for all accounts of the given customers (None = every customer)"""
+    def report(progress):
+        print(f"   {progress['partitions_done']}/{progress['partitions_total']} partitions, "
+              f"{progress['accounts_done']} accounts, {progress['accounts_per_sec']:.1f} accounts/sec")
     
     with app.app_context():
-        customer = Customer.query.get(customer_id)
-        if not customer:
-            print(f"❌ Customer {customer_id} not found")
+        if customer_ids is None:
+            customer_ids = [c.customer_id for c in Customer.query.order_by(Customer.customer_id).all()]
+        else:
+            existing = {c.customer_id for c in Customer.query.filter(Customer.customer_id.in_(customer_ids)).all()}
+            for customer_id in customer_ids:
+                if customer_id not in existing:
+                    print(f"❌ Customer {customer_id} not found")
+            customer_ids = [c for c in customer_ids if c in existing]
+        if not customer_ids:
             return
         
-        accounts = Account.query.filter_by(customer_id=customer_id).all()
-        print(f"   Found {len(accounts)} accounts")
+        print(f"🔄 Recalculating health scores for {len(customer_ids)} customer(s)...")
+        runner = HealthRecalcJobRunner(
+            database_url=app.config['SQLALCHEMY_DATABASE_URI'],
+            workers=workers,
+            partition_size=partition_size,
+            checkpoint_path=checkpoint_path,
+            progress=report
+        )
+        result = runner.run(customer_ids)
+        print(f"\n✅ Recalculated {result['accounts_done']} accounts in {result['elapsed_seconds']:.1f}s "
+              f"({result['accounts_per_sec']:.1f} accounts/sec)")
         
+        # Show sample scores
         current_month = datetime.now().month
         current_year = datetime.now().year
-        
-        recalculated = 0
-        skipped = 0
-        
-        for account in accounts:
-            # Get KPIs for this account
-            kpis = KPI.query.filter_by(account_id=account.account_id).all()
-            
-            if not kpis:
-                skipped += 1
-                continue
-            
-            # Group KPIs by category
-            categories = {}
-            for kpi in kpis:
-                cat = kpi.category
-                if cat not in categories:
-                    categories[cat] = []
-                categories[cat].append({
-                    'kpi_parameter': kpi.kpi_parameter,
-                    'data': kpi.data,
-                    'impact_level': kpi.impact_level,
-                    'category': kpi.category,
-                    'weight': kpi.weight
-                })
-            
-            # Calculate category scores
-            category_scores = []
-            for category, kpis_list in categories.items():
-                if kpis_list:
-                    try:
-                        cat_score = HealthScoreEngine.calculate_category_health_score(kpis_list, category, customer_id)
-                        category_scores.append(cat_score)
-                    except Exception as e:
-                        print(f"   ⚠️  Error calculating score for {account.account_name}, category {category}: {e}")
-                        continue
-            
-            # Calculate overall score
-            if category_scores:
-                overall = HealthScoreEngine.calculate_overall_health_score(category_scores)
-                overall_score = overall.get('overall_score', 0)
-                
-                # Extract category scores
-                product_usage = next((cs.get('score', 0) for cs in category_scores if 'Product Usage' in cs.get('category', '')), 0)
-                support = next((cs.get('score', 0) for cs in category_scores if 'Support' in cs.get('category', '')), 0)
-                customer_sentiment = next((cs.get('score', 0) for cs in category_scores if 'Customer Sentiment' in cs.get('category', '')), 0)
-                business_outcomes = next((cs.get('score', 0) for cs in category_scores if 'Business Outcomes' in cs.get('category', '')), 0)
-                relationship_strength = next((cs.get('score', 0) for cs in category_scores if 'Relationship Strength' in cs.get('category', '')), 0)
-                
-                # Update or create health trend
-                trend = HealthTrend.query.filter_by(
-                    account_id=account.account_id,
-                    customer_id=customer_id,
-                    month=current_month,
-                    year=current_year
-                ).first()
-                
-                if trend:
-                    trend.overall_health_score = overall_score
-                    trend.product_usage_score = product_usage
-                    trend.support_score = support
-                    trend.customer_sentiment_score = customer_sentiment
-                    trend.business_outcomes_score = business_outcomes
-                    trend.relationship_strength_score = relationship_strength
-                    trend.total_kpis = len(kpis)
-                    trend.valid_kpis = len([k for k in kpis if k.data and str(k.data).strip() and str(k.data) != '0'])
-                else:
-                    trend = HealthTrend(
-                        account_id=account.account_id,
-                        customer_id=customer_id,
-                        month=current_month,
-                        year=current_year,
-                        overall_health_score=overall_score,
-                        product_usage_score=product_usage,
-                        support_score=support,
-                        customer_sentiment_score=customer_sentiment,
-                        business_outcomes_score=business_outcomes,
-                        relationship_strength_score=relationship_strength,
-                        total_kpis=len(kpis),
-                        valid_kpis=len([k for k in kpis if k.data and str(k.data).strip() and str(k.data) != '0'])
-                    )
-                    db.session.add(trend)
-                
-                recalculated += 1
-        
-        db.session.commit()
-        print(f"\n✅ Recalculated {recalculated} health scores")
-        print(f"   Skipped {skipped} accounts (no KPIs)")
-        
-        # Show sample scores
-        trends = HealthTrend.query.filter_by(customer_id=customer_id, month=current_month, year=current_year).all()
+        trends = HealthTrend.query.filter(
+            HealthTrend.customer_id.in_(customer_ids),
+            HealthTrend.month == current_month,
+            HealthTrend.year == current_year
+        ).all()
         if trends:
             scores = [float(t.overall_health_score) for t in trends if t.overall_health_score]
             if scores:
@@ -134,9 +72,41 @@ def recalculate_health_scores(customer_id=1):
                 print(f"   Avg: {sum(scores)/len(scores):.1f}")
                 if all(s == 50.0 for s in scores):
                     print("   ⚠️  All scores are 50 - may need to check KPI data")
+        return result
 
-if __name__ == '__main__':
-    recalculate_health_scores(1)
-
-
+def check_health_consistency(customer_id=1, repair=False):
+    """Compare incrementally updated health scores (KPI edits) with a full recompute"""
+    from incremental_health import IncrementalHealthService
+    
+    print(f"🔍 Checking incremental health scores for customer_id={customer_id}...")
+    
+    with app.app_context():
+        mismatches = IncrementalHealthService.check_consistency(customer_id, repair=repair)
+        for m in mismatches:
+            print(f"   ⚠️  Account {m['account_id']} {m['field']}: stored {m['stored']:.2f}, expected {m['expected']:.2f}")
+        if repair and mismatches:
+            db.session.commit()
+            print(f"   🔧 Rebuilt {len(set(m['account_id'] for m in mismatches))} accounts")
+        if not mismatches:
+            print("✅ Incremental health scores match the full recompute")
+        return mismatches
 
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Recalculate account health scores')
+    parser.add_argument('--customer', type=int, action='append', help='Customer ID (repeatable, default 1)')
+    parser.add_argument('--all', action='store_true', help='Recalculate every customer')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--partition-size', type=int, default=500, help='Accounts per partition')
+    parser.add_argument('--checkpoint', default=None, help='Checkpoint file for resuming an interrupted run')
+    parser.add_argument('--check', action='store_true', help='Compare incremental scores with a full recompute')
+    parser.add_argument('--repair', action='store_true', help='Rebuild accounts whose incremental scores differ')
+    args = parser.parse_args()
+    
+    customer_ids = args.customer or [1]
+    if args.check or args.repair:
+        for customer_id in customer_ids:
+            check_health_consistency(customer_id, repair=args.repair)
+    else:
+        recalculate_health_scores(None if args.all else customer_ids, workers=args.workers,
+                                  partition_size=args.partition_size, checkpoint_path=args.checkpoint)
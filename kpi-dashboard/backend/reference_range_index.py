@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Tenant-scoped KPI Reference Range Index
+Loads each customer's effective reference ranges once (system defaults overlaid
+with the customer's copy-on-write overrides) so health scoring does no range
+queries per KPI.
+
+Entries are keyed on the customer's data version (see tenant_data_version), so
+a change committed by any process retires them. Writers must call
+invalidate_tenant_results() (which bumps the version) and
+invalidate_reference_ranges() after committing a reference range change:
+- customer override changed  -> invalidate_reference_ranges(customer_id)
+- system default changed     -> invalidate_reference_ranges()  (all tenants)
+"""
+
+import logging
+from typing import Dict, Optional
+
+from tenant_cache import TenantCache
+
+logger = logging.getLogger(__name__)
+
+
+def reference_range_to_config(ref_range) -> Dict:
+    """Convert a KPIReferenceRange row to the health_score_config format"""
+    return {
+        'unit': ref_range.unit,
+        'higher_is_better': ref_range.higher_is_better,
+        'ranges': {
+            'low': {
+                'min': float(ref_range.critical_min),
+                'max': float(ref_range.critical_max),
+                'color': 'red'
+            },
+            'medium': {
+                'min': float(ref_range.risk_min),
+                'max': float(ref_range.risk_max),
+                'color': 'yellow'
+            },
+            'high': {
+                'min': float(ref_range.healthy_min),
+                'max': float(ref_range.healthy_max),
+                'color': 'green'
+            }
+        }
+    }
+
+
+def _load_ranges(customer_id: Optional[int]) -> Dict[str, Dict]:
+    """One query: system defaults plus the customer's overrides"""
+    from models import KPIReferenceRange
+
+    query = KPIReferenceRange.query
+    if customer_id is None:
+        rows = query.filter(KPIReferenceRange.customer_id.is_(None)).all()
+    else:
+        rows = query.filter(
+            (KPIReferenceRange.customer_id == customer_id) | (KPIReferenceRange.customer_id.is_(None))
+        ).all()
+
+    ranges = {}
+    # System defaults first, then customer overrides take precedence
+    for row in sorted(rows, key=lambda r: r.customer_id is not None):
+        ranges[row.kpi_name] = reference_range_to_config(row)
+    return ranges
+
+
+# Global index instance: {customer_id: {kpi_name: config}}
+reference_range_index = TenantCache('reference_ranges', loader=_load_ranges)
+
+
+def get_reference_ranges(customer_id: Optional[int] = None) -> Dict[str, Dict]:
+    """Effective ranges for a customer (None = system defaults only)"""
+    return reference_range_index.get(customer_id)
+
+
+def get_reference_range(kpi_name: str, customer_id: Optional[int] = None) -> Optional[Dict]:
+    """Reference range config for one KPI, or None if the tenant has none"""
+    return get_reference_ranges(customer_id).get(kpi_name)
+
+
+def invalidate_reference_ranges(customer_id: Optional[int] = None):
+    """Invalidate cached reference ranges after a committed change"""
+    reference_range_index.invalidate(customer_id)
+    logger.info(f"Reference range index invalidated for customer {customer_id if customer_id is not None else 'ALL'}")
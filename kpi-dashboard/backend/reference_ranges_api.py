@@ -7,9 +7,12 @@ from flask import Blueprint, request, jsonify
 from auth_middleware import get_current_customer_id, get_current_user_id
 from extensions import db
 from models import KPIReferenceRange
+from tenant_result_cache import invalidate_tenant_results
+from tenant_data_version import enable_conditional_get
 from decimal import Decimal
 
 reference_ranges_api = Blueprint('reference_ranges_api', __name__)
+enable_conditional_get(reference_ranges_api)
 
 @reference_ranges_api.route('/api/reference-ranges', methods=['GET'])
 def get_all_reference_ranges():
@@ -87,6 +90,7 @@ def update_reference_range(range_id):
         
         # Save changes
         db.session.commit()
+        invalidate_tenant_results(ref_range.customer_id)
         
         return jsonify({
             'success': True,
@@ -160,6 +164,7 @@ def bulk_update_reference_ranges():
         
         # Save all changes
         db.session.commit()
+        invalidate_tenant_results()
         
         return jsonify({
             'success': True,
@@ -7,6 +7,8 @@ Allows new customers to self-register and create their own accounts
 from flask import Blueprint, request, jsonify
 from auth_middleware import get_current_customer_id, get_current_user_id
 from models import db, Customer, User, CustomerConfig
+from category_weight_index import invalidate_category_weights
+from tenant_result_cache import invalidate_tenant_results
 from werkzeug.security import generate_password_hash
 import json
 import re
@@ -170,6 +172,8 @@ def register_customer():
                 db.session.add(trigger)
         
         db.session.commit()
+        invalidate_category_weights(customer_id)
+        invalidate_tenant_results(customer_id)
         
         return jsonify({
             'status': 'success',
@@ -11,6 +11,12 @@ from models import (
     PlaybookReport, FeatureToggle
 )
 from werkzeug.utils import secure_filename
+from reference_range_index import invalidate_reference_ranges
+from category_weight_index import invalidate_category_weights
+from account_health_summary import refresh_account_health_summaries
+from tenant_result_cache import invalidate_tenant_results
+from kpi_bulk_writer import write_kpis
+from blob_store import get_blob_store
 import pandas as pd
 import io
 import json
@@ -107,6 +113,8 @@ def import_account_data():
             'products_created': 0,
             'kpis_deleted': 0,
             'kpis_created': 0,
+            'kpi_rows_per_second': 0,
+            'kpi_batch_count': 0,
             'playbook_triggers_deleted': 0,
             'playbook_triggers_created': 0,
             'playbook_executions_deleted': 0,
@@ -317,77 +325,77 @@ def import_account_data():
                     account_id=None,  # Multi-account import
                     version=1,
                     original_filename=file.filename,
-                    raw_excel=raw_excel
+                    content_sha256=get_blob_store().put(raw_excel)
                 )
                 db.session.add(upload)
                 db.session.flush()
                 
-                for _, row in kpis_df.iterrows():
-                    try:
-                        account_id_val = row.get('Account ID')
-                        if pd.isna(account_id_val):
-                            continue
-                        
-                        # Find account
-                        account = Account.query.filter_by(
-                            customer_id=customer_id,
-                            account_id=int(account_id_val)
-                        ).first()
-                        
-                        if not account:
-                            account_name = str(row.get('Account Name', '')).strip() if pd.notna(row.get('Account Name')) else None
-                            if account_name:
-                                account = Account.query.filter_by(
-                                    customer_id=customer_id,
-                                    account_name=account_name
-                                ).first()
-                        
-                        if not account:
-                            results['errors'].append(f"Account not found for KPI {row.get('KPI Parameter', 'unknown')}")
-                            continue
-                        
-                        kpi_parameter = str(row.get('KPI Parameter', '')).strip()
-                        if not kpi_parameter or kpi_parameter == 'nan':
-                            continue
-                        
-                        # Find product if product_id is provided
-                        product = None
-                        product_id_val = row.get('Product ID')
-                        if pd.notna(product_id_val) and str(product_id_val).strip() and str(product_id_val) != 'nan':
-                            product = Product.query.filter_by(
-                                product_id=int(product_id_val),
-                                account_id=account.account_id
-                            ).first()
+                # Resolve accounts and products from memory rather than per row
+                accounts_by_id, accounts_by_name = {}, {}
+                for account in Account.query.filter_by(customer_id=customer_id).order_by(Account.account_id):
+                    accounts_by_id[account.account_id] = account.account_id
+                    accounts_by_name.setdefault(account.account_name, account.account_id)
+                products_by_id, products_by_name = {}, {}
+                for product in Product.query.filter(Product.account_id.in_(list(accounts_by_id))).order_by(Product.product_id):
+                    products_by_id[(product.account_id, product.product_id)] = product.product_id
+                    products_by_name.setdefault((product.account_id, product.product_name), product.product_id)
+                
+                def kpi_rows():
+                    for _, row in kpis_df.iterrows():
+                        try:
+                            account_id_val = row.get('Account ID')
+                            if pd.isna(account_id_val):
+                                continue
                             
-                            # If not found by ID, try by name
-                            if not product:
-                                product_name = str(row.get('Product Name', '')).strip() if pd.notna(row.get('Product Name')) else None
-                                if product_name and product_name != 'nan':
-                                    product = Product.query.filter_by(
-                                        account_id=account.account_id,
-                                        product_name=product_name
-                                    ).first()
-                        
-                        # Create new KPI (all existing KPIs were deleted)
-                        kpi_data = {
-                            'upload_id': upload.upload_id,
-                            'account_id': account.account_id,
-                            'product_id': product.product_id if product else None,
-                            'category': str(row.get('Category', '')) if pd.notna(row.get('Category')) else None,
-                            'kpi_parameter': kpi_parameter,
-                            'data': str(row.get('Data', '')) if pd.notna(row.get('Data')) else None,
-                            'impact_level': str(row.get('Impact Level', '')) if pd.notna(row.get('Impact Level')) else None,
-                            'measurement_frequency': str(row.get('Measurement Frequency', '')) if pd.notna(row.get('Measurement Frequency')) else None,
-                            'health_score_component': str(row.get('Health Score Component', '')) if pd.notna(row.get('Health Score Component')) else None,
-                            'weight': str(row.get('Weight', '')) if pd.notna(row.get('Weight')) else None,
-                            'aggregation_type': str(row.get('Aggregation Type', '')) if pd.notna(row.get('Aggregation Type')) else None
-                        }
-                        
-                        new_kpi = KPI(**kpi_data)
-                        db.session.add(new_kpi)
-                        results['kpis_created'] += 1
-                    except Exception as e:
-                        results['errors'].append(f"Error processing KPI {row.get('KPI Parameter', 'unknown')}: {str(e)}")
+                            # Find account
+                            account_id = accounts_by_id.get(int(account_id_val))
+                            if account_id is None:
+                                account_name = str(row.get('Account Name', '')).strip() if pd.notna(row.get('Account Name')) else None
+                                if account_name:
+                                    account_id = accounts_by_name.get(account_name)
+                            
+                            if account_id is None:
+                                results['errors'].append(f"Account not found for KPI {row.get('KPI Parameter', 'unknown')}")
+                                continue
+                            
+                            kpi_parameter = str(row.get('KPI Parameter', '')).strip()
+                            if not kpi_parameter or kpi_parameter == 'nan':
+                                continue
+                            
+                            # Find product if product_id is provided
+                            product_id = None
+                            product_id_val = row.get('Product ID')
+                            if pd.notna(product_id_val) and str(product_id_val).strip() and str(product_id_val) != 'nan':
+                                product_id = products_by_id.get((account_id, int(product_id_val)))
+                                
+                                # If not found by ID, try by name
+                                if product_id is None:
+                                    product_name = str(row.get('Product Name', '')).strip() if pd.notna(row.get('Product Name')) else None
+                                    if product_name and product_name != 'nan':
+                                        product_id = products_by_name.get((account_id, product_name))
+                            
+                            # Create new KPI (all existing KPIs were deleted)
+                            yield {
+                                'upload_id': upload.upload_id,
+                                'account_id': account_id,
+                                'product_id': product_id,
+                                'category': str(row.get('Category', '')) if pd.notna(row.get('Category')) else None,
+                                'kpi_parameter': kpi_parameter,
+                                'data': str(row.get('Data', '')) if pd.notna(row.get('Data')) else None,
+                                'impact_level': str(row.get('Impact Level', '')) if pd.notna(row.get('Impact Level')) else None,
+                                'measurement_frequency': str(row.get('Measurement Frequency', '')) if pd.notna(row.get('Measurement Frequency')) else None,
+                                'health_score_component': str(row.get('Health Score Component', '')) if pd.notna(row.get('Health Score Component')) else None,
+                                'weight': str(row.get('Weight', '')) if pd.notna(row.get('Weight')) else None,
+                                'aggregation_type': str(row.get('Aggregation Type', '')) if pd.notna(row.get('Aggregation Type')) else None
+                            }
+                        except Exception as e:
+                            results['errors'].append(f"Error processing KPI {row.get('KPI Parameter', 'unknown')}: {str(e)}")
+                
+                # Batched inserts in this import's transaction (the deletes above are not committed yet)
+                kpi_write = write_kpis(kpi_rows())
+                results['kpis_created'] = kpi_write['rows']
+                results['kpi_rows_per_second'] = kpi_write['rows_per_second']
+                results['kpi_batch_count'] = kpi_write['batch_count']
         
         db.session.flush()  # Get account_ids before processing profile data
         
@@ -829,6 +837,10 @@ def import_account_data():
                         results['errors'].append(f"Error processing feature toggle {row.get('Feature Name', 'unknown')}: {str(e)}")
         
         db.session.commit()
+        invalidate_reference_ranges(customer_id)
+        invalidate_category_weights(customer_id)
+        refresh_account_health_summaries(customer_id)
+        invalidate_tenant_results(customer_id)
         
         return jsonify({
             'status': 'success',
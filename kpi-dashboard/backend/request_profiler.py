@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Request SQL Profiler
+Opt-in per-request profiling of the SQL a Flask request runs, to find endpoints
+that issue one query per row (N+1) instead of a batched query.
+
+- SQL_PROFILER_ENABLED=true profiles every request; otherwise a single request
+  is profiled when it sends the X-Profile-SQL: 1 header and comes from a
+  logged-in admin (or from anyone with SQL_PROFILER_ALLOW_HEADER=true, for
+  local debugging)
+- engine events record each statement's count and time under its "shape"
+  (the SQL with literals, bound parameters and IN-lists collapsed)
+- a shape run SQL_PROFILER_N_PLUS_ONE_THRESHOLD times or more in one request is
+  reported as an N+1 pattern and logged
+- profiled responses carry X-SQL-Query-Count, X-SQL-Time-Ms, X-SQL-N-Plus-One
+  and a Server-Timing db entry
+- totals are aggregated per endpoint (method + URL rule) for /api/debug/perf
+
+Requests that are not profiled only pay a flag check per statement.
+"""
+
+import logging
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from flask import g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from auth_decorators import is_admin_session
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = 'X-Profile-SQL'
+DEFAULT_N_PLUS_ONE_THRESHOLD = 10
+# Worst N+1 shapes kept per endpoint
+MAX_SHAPES_PER_ENDPOINT = 5
+MAX_SHAPE_LENGTH = 300
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'(?<![\w.])-?\d+(?:\.\d+)?\b')
+_NAMED_PARAMETER = re.compile(r'%\(\w+\)s|(?<![:\w]):\w+|\$\d+|%s')
+_PARAMETER_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def statement_shape(statement: str) -> str:
+    """SQL statement with literals and parameters replaced by ? and IN-lists collapsed"""
+    shape = _STRING_LITERAL.sub('?', statement)
+    shape = _NAMED_PARAMETER.sub('?', shape)
+    shape = _NUMBER_LITERAL.sub('?', shape)
+    shape = _PARAMETER_LIST.sub('(?)', shape)
+    return _WHITESPACE.sub(' ', shape).strip()
+
+
+class RequestProfile:
+    """SQL executed by one request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.query_count = 0
+        self.db_time = 0.0
+        self.shapes: Dict[str, List] = {}  # shape -> [count, seconds]
+
+    def record(self, statement: str, seconds: float):
+        self.query_count += 1
+        self.db_time += seconds
+        entry = self.shapes.setdefault(statement_shape(statement), [0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+
+    def n_plus_one(self, threshold: int) -> List[Dict[str, Any]]:
+        """Shapes repeated at least threshold times, most repeated first"""
+        repeated = [
+            {'shape': shape[:MAX_SHAPE_LENGTH], 'count': count, 'db_ms': round(seconds * 1000, 2)}
+            for shape, (count, seconds) in self.shapes.items() if count >= threshold
+        ]
+        return sorted(repeated, key=lambda r: (-r['count'], r['shape']))
+
+
+class RequestProfiler:
+    """
+    Flask extension wiring the engine events and request hooks, and keeping the
+    per-endpoint aggregates served by /api/debug/perf
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.allow_header = False
+        self.n_plus_one_threshold = DEFAULT_N_PLUS_ONE_THRESHOLD
+        self._endpoints: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = _config_flag(app, 'SQL_PROFILER_ENABLED')
+        self.allow_header = _config_flag(app, 'SQL_PROFILER_ALLOW_HEADER')
+        self.n_plus_one_threshold = int(app.config.get(
+            'SQL_PROFILER_N_PLUS_ONE_THRESHOLD',
+            os.getenv('SQL_PROFILER_N_PLUS_ONE_THRESHOLD', DEFAULT_N_PLUS_ONE_THRESHOLD)
+        ))
+        _listen_to_engines()
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        app.extensions['request_profiler'] = self
+
+    # ==================== REQUEST HOOKS ====================
+
+    def _start(self):
+        if self.enabled or (request.headers.get(PROFILE_HEADER, '').lower() in ('1', 'true')
+                            and (self.allow_header or is_admin_session())):
+            g.sql_profile = RequestProfile()
+
+    def _finish(self, response):
+        profile = g.pop('sql_profile', None)
+        if profile is None:
+            return response
+
+        n_plus_one = profile.n_plus_one(self.n_plus_one_threshold)
+        db_ms = round(profile.db_time * 1000, 2)
+        response.headers['X-SQL-Query-Count'] = str(profile.query_count)
+        response.headers['X-SQL-Time-Ms'] = str(db_ms)
+        response.headers['X-SQL-N-Plus-One'] = str(len(n_plus_one))
+        response.headers.add('Server-Timing', f'db;dur={db_ms};desc="{profile.query_count} queries"')
+
+        endpoint = f"{request.method} {request.url_rule.rule if request.url_rule else request.path}"
+        if n_plus_one:
+            worst = n_plus_one[0]
+            logger.warning(
+                f"N+1 queries in {endpoint}: {len(n_plus_one)} statement shape(s) repeated "
+                f">= {self.n_plus_one_threshold} times, worst x{worst['count']}: {worst['shape']}"
+            )
+        self._aggregate(endpoint, profile, n_plus_one, time.perf_counter() - profile.started)
+        return response
+
+    # ==================== AGGREGATES ====================
+
+    def _aggregate(self, endpoint: str, profile: RequestProfile, n_plus_one: List[Dict], seconds: float):
+        db_ms = profile.db_time * 1000
+        with self._lock:
+            stats = self._endpoints.setdefault(endpoint, {
+                'endpoint': endpoint, 'requests': 0, 'total_queries': 0, 'max_queries': 0,
+                'total_db_ms': 0.0, 'max_db_ms': 0.0, 'total_ms': 0.0,
+                'n_plus_one_requests': 0, 'n_plus_one': {}
+            })
+            stats['requests'] += 1
+            stats['total_queries'] += profile.query_count
+            stats['max_queries'] = max(stats['max_queries'], profile.query_count)
+            stats['total_db_ms'] += db_ms
+            stats['max_db_ms'] = max(stats['max_db_ms'], db_ms)
+            stats['total_ms'] += seconds * 1000
+            if n_plus_one:
+                stats['n_plus_one_requests'] += 1
+                shapes = dict(stats['n_plus_one'])
+                for pattern in n_plus_one:
+                    shapes[pattern['shape']] = max(shapes.get(pattern['shape'], 0), pattern['count'])
+                worst = sorted(shapes.items(), key=lambda item: -item[1])[:MAX_SHAPES_PER_ENDPOINT]
+                stats['n_plus_one'] = dict(worst)
+
+    def report(self, sort: str = 'total_db_ms', limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Per-endpoint aggregates, worst first by the given field"""
+        with self._lock:
+            endpoints = [dict(stats, n_plus_one=dict(stats['n_plus_one'])) for stats in self._endpoints.values()]
+        for stats in endpoints:
+            stats['avg_queries'] = round(stats['total_queries'] / stats['requests'], 2)
+            stats['avg_db_ms'] = round(stats['total_db_ms'] / stats['requests'], 2)
+            stats['avg_ms'] = round(stats['total_ms'] / stats['requests'], 2)
+            for key in ('total_db_ms', 'max_db_ms', 'total_ms'):
+                stats[key] = round(stats[key], 2)
+            stats['n_plus_one'] = [{'shape': shape, 'max_count': count} for shape, count in stats['n_plus_one'].items()]
+        endpoints.sort(key=lambda stats: (-stats.get(sort, 0), stats['endpoint']))
+        return endpoints[:limit] if limit else endpoints
+
+    def reset(self):
+        with self._lock:
+            self._endpoints = {}
+
+
+def _config_flag(app, name: str) -> bool:
+    value = app.config.get(name, os.getenv(name, 'false'))
+    return value if isinstance(value, bool) else str(value).lower() == 'true'
+
+
+# ==================== ENGINE EVENTS ====================
+
+_listening = False
+
+
+def _current_profile() -> Optional[RequestProfile]:
+    return g.get('sql_profile') if has_app_context() else None
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_profile() is not None:
+        conn.info.setdefault('request_profiler_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current_profile()
+    started = conn.info.get('request_profiler_started')
+    if profile is not None and started:
+        profile.record(statement, time.perf_counter() - started.pop())
+
+
+def _listen_to_engines():
+    """Listen on every Engine once; statements outside a profiled request are ignored"""
+    global _listening
+    if not _listening:
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        _listening = True
+
+
+request_profiler = RequestProfiler()
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Account Snapshot Storage
+Delta-encodes AccountSnapshot rows and thins old snapshot history.
+
+Snapshots of an account form chains: a base row stores the full account state,
+and each following row stores only the state fields that changed since the
+snapshot before it (state_delta) with its state columns left NULL. A new base
+starts every SNAPSHOT_BASE_INTERVAL snapshots, so a chain is at most that long.
+Rows written before delta encoding are bases of one-row chains.
+
+- encode_snapshot() turns a fully built snapshot into a base or a delta
+- hydrate_snapshots() rebuilds the full state of loaded snapshots in one query;
+  every reader of AccountSnapshot state columns calls it first
+- thin_snapshot_history() keeps every snapshot of the last week, the newest per
+  day up to 90 days and the newest per month beyond (manual snapshots are always
+  kept), then re-encodes the remaining chains
+
+Usage: python snapshot_storage.py <customer_id> [<customer_id> ...]
+"""
+
+import json
+import os
+import sys
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import Date, Numeric, or_
+from sqlalchemy.orm.attributes import flag_modified, set_committed_value
+
+from extensions import db
+from models import AccountSnapshot
+
+# Snapshots per chain (one base followed by up to SNAPSHOT_BASE_INTERVAL - 1 deltas)
+SNAPSHOT_BASE_INTERVAL = 24
+
+# (maximum age, bucket format) from newest to oldest history; the newest snapshot
+# of each bucket is kept, a None bucket keeps every snapshot
+SNAPSHOT_RETENTION_TIERS = (
+    (timedelta(days=7), None),
+    (timedelta(days=90), '%Y-%m-%d'),
+    (None, '%Y-%m'),
+)
+
+# Columns describing the snapshot itself rather than the account state; always stored
+SNAPSHOT_METADATA_COLUMNS = {
+    'snapshot_id', 'account_id', 'customer_id', 'snapshot_timestamp', 'snapshot_type',
+    'snapshot_reason', 'snapshot_version', 'created_by', 'trigger_event',
+    'days_since_last_snapshot', 'snapshot_sequence_number', 'is_significant_change',
+    'created_at', 'updated_at', 'base_snapshot_id', 'chain_position', 'state_delta',
+}
+
+SNAPSHOT_STATE_COLUMNS = [
+    column for column in AccountSnapshot.__table__.columns if column.name not in SNAPSHOT_METADATA_COLUMNS
+]
+
+
+# ==================== STATE ENCODING ====================
+
+def _normalize(column, value):
+    """JSON-safe value, rounded as the column stores it, so equal states compare equal"""
+    if value is None:
+        return None
+    if isinstance(column.type, Numeric):
+        return round(float(value), column.type.scale or 0)
+    if isinstance(column.type, Date):
+        return value.isoformat() if isinstance(value, date) else value
+    return value
+
+
+def _denormalize(column, value):
+    """Value as it would be loaded from the column"""
+    if value is None:
+        return None
+    if isinstance(column.type, Numeric):
+        return Decimal(str(value))
+    if isinstance(column.type, Date):
+        return date.fromisoformat(value) if isinstance(value, str) else value
+    return value
+
+
+def snapshot_state(snapshot):
+    """Normalized {column: value} account state of a full (base or hydrated) snapshot"""
+    return {column.name: _normalize(column, getattr(snapshot, column.name)) for column in SNAPSHOT_STATE_COLUMNS}
+
+
+def state_delta(previous_state, state):
+    """State fields that differ from the previous snapshot's state"""
+    return {name: value for name, value in state.items() if previous_state.get(name) != value}
+
+
+def _store_as_base(snapshot, state):
+    for column in SNAPSHOT_STATE_COLUMNS:
+        setattr(snapshot, column.name, _denormalize(column, state[column.name]))
+        if snapshot.snapshot_id is not None:
+            # Values may equal the hydrated ones while the row still holds NULLs
+            flag_modified(snapshot, column.name)
+    snapshot.chain_position = 0
+    snapshot.base_snapshot_id = None
+    snapshot.state_delta = None
+
+
+def _store_as_delta(snapshot, state, previous, previous_state):
+    for column in SNAPSHOT_STATE_COLUMNS:
+        setattr(snapshot, column.name, None)
+    snapshot.chain_position = (previous.chain_position or 0) + 1
+    snapshot.base_snapshot_id = previous.base_snapshot_id if previous.chain_position else previous.snapshot_id
+    snapshot.state_delta = state_delta(previous_state, state)
+
+
+def encode_snapshot(snapshot, previous=None):
+    """
+    Store a new, fully built snapshot as a delta against the previous snapshot of its
+    account (which must be hydrated), or as a base when it starts a new chain
+    """
+    state = snapshot_state(snapshot)
+    if previous is None or previous.snapshot_id is None or \
+            (previous.chain_position or 0) + 1 >= SNAPSHOT_BASE_INTERVAL:
+        _store_as_base(snapshot, state)
+    else:
+        _store_as_delta(snapshot, state, previous, snapshot_state(previous))
+    return snapshot
+
+
+# ==================== READING ====================
+
+def hydrate_snapshots(snapshots):
+    """
+    Fill the state columns of delta snapshots from their chains (one query).
+    Values are set as loaded state, so hydrated rows are not written back.
+    Returns the snapshots.
+    """
+    deltas = [s for s in snapshots if s.chain_position]
+    if not deltas:
+        return snapshots
+
+    base_ids = {s.base_snapshot_id for s in deltas}
+    depth = max(s.chain_position for s in deltas)
+    chain_rows = AccountSnapshot.query.filter(
+        or_(AccountSnapshot.snapshot_id.in_(base_ids), AccountSnapshot.base_snapshot_id.in_(base_ids)),
+        AccountSnapshot.chain_position <= depth
+    ).order_by(AccountSnapshot.chain_position, AccountSnapshot.snapshot_id).all()
+
+    states = {}
+    for row in chain_rows:
+        if not row.chain_position:
+            states[row.snapshot_id] = snapshot_state(row)
+            continue
+        state = states.get(row.base_snapshot_id)
+        if state is None:
+            continue  # chain broken (base deleted outside thin_snapshot_history)
+        state.update(row.state_delta or {})
+        for column in SNAPSHOT_STATE_COLUMNS:
+            set_committed_value(row, column.name, _denormalize(column, state[column.name]))
+    return snapshots
+
+
+def snapshot_storage_bytes(snapshots):
+    """Approximate bytes of account state stored by the given rows (full states and deltas, as JSON)"""
+    total = 0
+    for snapshot in snapshots:
+        if snapshot.chain_position:
+            total += len(json.dumps(snapshot.state_delta or {}, default=str))
+        else:
+            total += len(json.dumps(snapshot_state(snapshot), default=str))
+    return total
+
+
+# ==================== RETENTION ====================
+
+def _retention_bucket(timestamp, now):
+    """Bucket a snapshot is thinned within, or None when every snapshot of its age is kept"""
+    age = now - timestamp
+    for max_age, bucket_format in SNAPSHOT_RETENTION_TIERS:
+        if max_age is None or age < max_age:
+            return timestamp.strftime(bucket_format) if bucket_format else None
+    return None
+
+
+def _snapshots_to_keep(snapshots, now):
+    """Snapshots (oldest first) kept by the retention tiers"""
+    kept = []
+    seen_buckets = set()
+    for snapshot in reversed(snapshots):
+        bucket = _retention_bucket(snapshot.snapshot_timestamp, now)
+        if snapshot.snapshot_type == 'manual' or bucket is None or bucket not in seen_buckets:
+            kept.append(snapshot)
+        if bucket is not None:
+            seen_buckets.add(bucket)
+    kept.reverse()
+    return kept
+
+
+def _reencode_chain(snapshots):
+    """Re-encode an account's snapshots (oldest first, hydrated); returns the number of rows changed"""
+    changed = 0
+    previous, previous_state = None, None
+    for index, snapshot in enumerate(snapshots):
+        state = snapshot_state(snapshot)
+        if index % SNAPSHOT_BASE_INTERVAL == 0:
+            if snapshot.chain_position or snapshot.base_snapshot_id is not None:
+                _store_as_base(snapshot, state)
+                changed += 1
+        else:
+            expected_base = previous.base_snapshot_id if previous.chain_position else previous.snapshot_id
+            delta = state_delta(previous_state, state)
+            if (snapshot.chain_position != index % SNAPSHOT_BASE_INTERVAL
+                    or snapshot.base_snapshot_id != expected_base or snapshot.state_delta != delta):
+                _store_as_delta(snapshot, state, previous, previous_state)
+                changed += 1
+        previous, previous_state = snapshot, state
+    return changed
+
+
+def thin_snapshot_history(customer_id, now=None):
+    """
+    Apply the retention tiers to every account of a customer and re-encode what is
+    left into delta chains (full rows written before delta encoding are compacted
+    too). Commits. Returns counts of accounts and kept, deleted and re-encoded rows,
+    with the stored state size before and after (state_bytes_before/after).
+    """
+    now = now or datetime.now()
+    snapshots = AccountSnapshot.query.filter_by(customer_id=customer_id).order_by(
+        AccountSnapshot.account_id, AccountSnapshot.snapshot_timestamp, AccountSnapshot.snapshot_id
+    ).all()
+    hydrate_snapshots(snapshots)
+
+    by_account = {}
+    for snapshot in snapshots:
+        by_account.setdefault(snapshot.account_id, []).append(snapshot)
+
+    stats = {'customer_id': customer_id, 'accounts': len(by_account), 'kept': 0, 'deleted': 0, 'reencoded': 0,
+             'state_bytes_before': snapshot_storage_bytes(snapshots)}
+    deleted_ids = set()
+    kept_snapshots = []
+    try:
+        for account_snapshots in by_account.values():
+            kept = _snapshots_to_keep(account_snapshots, now)
+            kept_ids = {s.snapshot_id for s in kept}
+            deleted_ids.update(s.snapshot_id for s in account_snapshots if s.snapshot_id not in kept_ids)
+            stats['reencoded'] += _reencode_chain(kept)
+            kept_snapshots.extend(kept)
+        stats['kept'] = len(kept_snapshots)
+        stats['state_bytes_after'] = snapshot_storage_bytes(kept_snapshots)
+
+        # Point the kept rows at their new bases before removing the old ones
+        db.session.flush()
+        if deleted_ids:
+            AccountSnapshot.query.filter(AccountSnapshot.snapshot_id.in_(deleted_ids)).delete(
+                synchronize_session=False
+            )
+            for snapshot in snapshots:
+                if snapshot.snapshot_id in deleted_ids:
+                    db.session.expunge(snapshot)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    stats['deleted'] = len(deleted_ids)
+    print(f"✅ Thinned snapshot history for customer {customer_id}: kept {stats['kept']}, "
+          f"deleted {stats['deleted']}, re-encoded {stats['reencoded']}")
+    return stats
+
+
+if __name__ == '__main__':
+    from dotenv import load_dotenv
+    from flask import Flask
+
+    load_dotenv('.env')
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL')
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+
+    customer_ids = [int(arg) for arg in sys.argv[1:]]
+    if not customer_ids:
+        sys.exit('usage: python snapshot_storage.py <customer_id> [<customer_id> ...]')
+    with app.app_context():
+        for customer_id in customer_ids:
+            thin_snapshot_history(customer_id)
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Per-tenant Cache
+In-memory, copy-on-write cache of values derived from one customer's data.
+The reference range index, the category weight cache and the tenant result
+caches are all instances of TenantCache; each module keeps its own
+invalidate_* helper for writers to call after committing a change.
+
+A cache either has a loader (one value per customer, loader(customer_id)) or
+is given a compute callback per get (several keyed values per customer).
+Entries are keyed on the customer's data version (see tenant_data_version);
+customer_id None (e.g. system default reference ranges) follows the highest
+version of any customer.
+"""
+
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from tenant_data_version import bumped_in_request, current_data_version
+
+
+class TenantCache:
+    """
+    In-memory {customer_id: {key: (data version, value)}} cache.
+    Entries are immutable once stored; invalidation swaps the outer dict
+    (copy-on-write) so readers never see a half-built tenant. An entry only
+    hits while the customer's data version is the one it was computed at, so
+    a bump committed by any process retires it; invalidate() frees this
+    process's entries at once.
+    """
+
+    def __init__(self, name: str, loader: Optional[Callable[[Optional[int]], Any]] = None):
+        self.name = name
+        self.loader = loader
+        self._tenants: Dict[Optional[int], Dict[Hashable, tuple]] = {}
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.stats = {'loads': 0, 'hits': 0, 'invalidations': 0}
+
+    def get(self, customer_id: Optional[int], key: Hashable = None,
+            compute: Optional[Callable[[], Any]] = None) -> Any:
+        """Cached value for (customer, key), computing (or loading) and storing it on a miss"""
+        version = current_data_version(customer_id)
+        entry = self._tenants.get(customer_id, {}).get(key)
+        if entry is not None and entry[0] == version:
+            self.stats['hits'] += 1
+            return entry[1]
+
+        generation = self._generation
+        value = compute() if compute is not None else self.loader(customer_id)
+        self.stats['loads'] += 1
+        # A value whose computation bumped the version itself (e.g. the rollup
+        # storing health trends) is current at the version it bumped to
+        after = current_data_version(customer_id)
+        if after != version and bumped_in_request(customer_id, version, after):
+            version, generation = after, self._generation
+        with self._lock:
+            # Don't cache a value that raced with an invalidation
+            if generation == self._generation:
+                tenants = dict(self._tenants)
+                tenants[customer_id] = {**tenants.get(customer_id, {}), key: (version, value)}
+                self._tenants = tenants
+        return value
+
+    def invalidate(self, customer_id: Optional[int] = None):
+        """Drop one customer's entries, or every entry"""
+        with self._lock:
+            if customer_id is None:
+                self._tenants = {}
+            else:
+                tenants = dict(self._tenants)
+                tenants.pop(customer_id, None)
+                self._tenants = tenants
+            self._generation += 1
+            self.stats['invalidations'] += 1
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Tenant Data Version
+Monotonically increasing per-customer counter (customers.data_version) bumped
+after every committed change to a customer's data: uploads, KPI/account edits,
+rehydration, deletes, reference-range changes and trend generation.
+
+- invalidate_tenant_results() bumps it; writers already call that after commit
+- server-side caches (tenant result caches, reference ranges, category weights,
+  the analytics cube) are keyed on it, so a bump made by any process retires
+  their entries
+- enable_conditional_get(blueprint) makes a read blueprint emit an ETag derived
+  from it and answer If-None-Match with 304 before the view runs
+
+The version is bumped after the data commit, never before: a reader racing a
+write may tag new data with the old version (and refetch after the bump), but
+can never tag old data with the new version.
+
+A version is read once per request or, outside requests (upload jobs, recalc
+workers, scripts), once per app context; a long-lived context starts a new
+pass with clear_data_version_memo().
+"""
+
+import logging
+from typing import Callable, Dict, List, Optional
+
+from flask import current_app, g, has_app_context, has_request_context, request
+from sqlalchemy import func, update
+
+from extensions import db
+from models import Customer
+
+logger = logging.getLogger(__name__)
+
+# Memo of versions read/bumped, kept in the WSGI environ per request (requests may
+# share a pushed app context) and in g per app context outside requests
+_ENVIRON_VERSIONS = 'tenant_data_version.versions'
+_ENVIRON_BUMPS = 'tenant_data_version.bumps'
+_G_MEMO = 'tenant_data_version'
+_ENVIRON_ETAG = 'tenant_data_version.etag'
+
+# Called with (customer_id, old_version, new_version) after a single-customer bump commits
+_bump_listeners: List[Callable[[int, int, int], None]] = []
+
+
+def _memo(key: str) -> Optional[Dict]:
+    if has_request_context():
+        return request.environ.setdefault(key, {})
+    if has_app_context():
+        return g.setdefault(_G_MEMO, {}).setdefault(key, {})
+    return None
+
+
+def clear_data_version_memo():
+    """Forget the versions read in this app context (outside requests), e.g. between recalc partitions"""
+    if has_app_context():
+        g.pop(_G_MEMO, None)
+
+
+def current_data_version(customer_id: Optional[int]) -> int:
+    """
+    Data version of a customer (read once per request, or per app context
+    outside requests). None gives the highest version of any customer, which
+    moves with every all-tenant bump (e.g. a system default changed).
+    """
+    versions = _memo(_ENVIRON_VERSIONS)
+    if versions is not None and customer_id in versions:
+        return versions[customer_id]
+    if customer_id is None:
+        version = db.session.query(func.max(Customer.data_version)).scalar() or 0
+    else:
+        version = db.session.query(Customer.data_version).filter(
+            Customer.customer_id == customer_id
+        ).scalar() or 0
+    if versions is not None:
+        versions[customer_id] = version
+    return version
+
+
+def bump_data_version(customer_id: Optional[int] = None) -> Optional[int]:
+    """
+    Increment a customer's data version (every customer's if None) and commit.
+    Call after the data change itself has been committed.
+    Returns the new version of a single customer.
+    """
+    query = update(Customer).values(
+        data_version=Customer.data_version + 1, updated_at=Customer.updated_at
+    ).execution_options(synchronize_session=False)
+    if customer_id is not None:
+        query = query.where(Customer.customer_id == customer_id)
+
+    new_version = None
+    try:
+        db.session.execute(query)
+        if customer_id is not None:
+            new_version = db.session.query(Customer.data_version).filter(
+                Customer.customer_id == customer_id
+            ).scalar()
+        db.session.commit()
+    except Exception as e:
+        # The data change is already committed; don't fail the write because of its version
+        db.session.rollback()
+        logger.error(f"Failed to bump data version for customer {customer_id}: {e}")
+        return None
+
+    versions = _memo(_ENVIRON_VERSIONS)
+    if versions is not None:
+        if customer_id is None:
+            versions.clear()
+        elif new_version is not None:
+            bumps = _memo(_ENVIRON_BUMPS)
+            bumps.setdefault(customer_id, []).append((new_version - 1, new_version))
+            versions[customer_id] = new_version
+            versions.pop(None, None)
+
+    if new_version is not None:
+        for listener in _bump_listeners:
+            listener(customer_id, new_version - 1, new_version)
+    return new_version
+
+
+def on_data_version_bump(listener: Callable[[int, int, int], None]):
+    """Register listener(customer_id, old_version, new_version) for single-customer bumps"""
+    _bump_listeners.append(listener)
+
+
+def bumped_in_request(customer_id: int, old_version: int, new_version: int) -> bool:
+    """True when this request's (or app context's) own bumps took the customer from old_version to new_version"""
+    bumps = _memo(_ENVIRON_BUMPS)
+    version = old_version
+    for old, new in (bumps or {}).get(customer_id, []):
+        if old == version:
+            version = new
+    return version == new_version
+
+
+# ==================== CONDITIONAL GET ====================
+
+def data_version_etag(customer_id: int, version: int) -> str:
+    return f'{customer_id}-{version}'
+
+
+def enable_conditional_get(blueprint, customer_id_getter: Callable[[], Optional[int]] = None):
+    """
+    Tag the blueprint's GET responses with the customer's data version and answer
+    matching If-None-Match requests with 304 Not Modified
+    """
+    if customer_id_getter is None:
+        from auth_middleware import get_current_customer_id as customer_id_getter
+
+    @blueprint.before_request
+    def _not_modified_since_data_version():
+        if request.method not in ('GET', 'HEAD'):
+            return None
+        try:
+            customer_id = int(customer_id_getter() or 0)
+        except (TypeError, ValueError):
+            return None
+        if not customer_id:
+            return None
+
+        etag = data_version_etag(customer_id, current_data_version(customer_id))
+        request.environ[_ENVIRON_ETAG] = etag
+        if request.if_none_match.contains_weak(etag):
+            response = current_app.response_class(status=304)
+            response.set_etag(etag, weak=True)
+            return response
+        return None
+
+    @blueprint.after_request
+    def _tag_with_data_version(response):
+        etag = request.environ.get(_ENVIRON_ETAG)
+        if etag and response.status_code == 200 and 'ETag' not in response.headers:
+            response.set_etag(etag, weak=True)
+            response.headers.setdefault('Cache-Control', 'private, no-cache')
+        return response
+
+    return blueprint
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Per-tenant Result Cache
+Keeps derived per-customer results (corporate rollup, performance summaries)
+until the customer's data changes, so read endpoints recompute them only after
+a write.
+
+Entries are keyed on the customer's data version (see tenant_data_version), so
+a write committed by any process retires them. Writers must call
+invalidate_tenant_results() after committing a change to the customer's data
+(uploads, edits, rehydration, deletes, reference ranges, trends); it bumps the
+data version and frees this process's entries:
+- one customer's data changed  -> invalidate_tenant_results(customer_id)
+- bulk/unknown change          -> invalidate_tenant_results()  (all tenants)
+"""
+
+import logging
+from typing import List, Optional
+
+from tenant_cache import TenantCache
+from tenant_data_version import bump_data_version
+
+logger = logging.getLogger(__name__)
+
+
+# Every cache created through tenant_result_cache(), invalidated together
+_caches: List[TenantCache] = []
+
+
+def tenant_result_cache(name: str) -> TenantCache:
+    """
+    Create a result cache that invalidate_tenant_results() clears.
+    cache.get(customer_id, key, compute) distinguishes variants of the result
+    (e.g. the reporting month) by key.
+    """
+    cache = TenantCache(name)
+    _caches.append(cache)
+    return cache
+
+
+def invalidate_tenant_results(customer_id: Optional[int] = None):
+    """Bump the data version and drop cached per-tenant results after a committed data change"""
+    bump_data_version(customer_id)
+    for cache in _caches:
+        cache.invalidate(customer_id)
+    logger.info(f"Tenant result caches invalidated for customer {customer_id if customer_id is not None else 'ALL'}")
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: compiled KPI value parser vs the previous substring/replace parser.
+
+Parses a tenant-like stream of KPI strings (few distinct values, many repeats)
+with the legacy parser, the compiled parser without its memo, and the memoized
+parse_kpi_data / parse_kpi_value entry points.
+
+Usage: python tests/benchmark_kpi_value_parser.py [n_values]
+"""
+
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from kpi_value_parser import parse_kpi_data, parse_kpi_value, clear_parser_cache, _parse_kpi_data
+from test_kpi_value_parser import legacy_parse_kpi_data, random_kpi_string
+
+
+def make_values(n, distinct=2000, seed=1):
+    rng = random.Random(seed)
+    pool = [random_kpi_string(rng)[0] for _ in range(distinct)]
+    pool += ['', 'N/A', 'None', '1,200', '$2.5M']
+    return [rng.choice(pool) for _ in range(n)]
+
+
+def bench(label, fn, values, repeat=5):
+    best = min(timeit.repeat(lambda: [fn(v) for v in values], number=1, repeat=repeat))
+    print(f"   {label:<34} {best * 1000:8.1f} ms  ({len(values) / best / 1e6:5.2f} M values/sec)")
+    return best
+
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    values = make_values(n)
+    print(f"📊 Parsing {n} KPI strings")
+
+    legacy = bench('legacy substring/replace', legacy_parse_kpi_data, values)
+    bench('compiled (no memo)', _parse_kpi_data, values)
+    clear_parser_cache()
+    compiled = bench('compiled + memo: parse_kpi_data', parse_kpi_data, values)
+    clear_parser_cache()
+    bench('compiled + memo: parse_kpi_value', lambda v: parse_kpi_value(v, 'days'), values)
+
+    print(f"\n✅ Memoized parser is {legacy / compiled:.1f}x the legacy throughput")
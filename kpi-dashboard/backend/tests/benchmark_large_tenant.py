@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark: hot endpoints against a synthetic large tenant.
+
+Generates a tenant with generate_large_tenant (or reuses one), then times the
+endpoints that scale with tenant size through the Flask test client:
+accounts, all KPIs, corporate rollup, performance summary, export, trigger
+evaluation and rehydration (last, since it replaces the tenant's data).
+Each request is profiled (X-Profile-SQL) so query counts and database time are
+recorded next to the wall time. The first run of an endpoint is reported as
+cold; the rest are warm (served from result caches where the endpoint has one).
+
+Results are written as JSON; pass --compare with an earlier result file to
+print the change per endpoint.
+
+Usage: python tests/benchmark_large_tenant.py [--accounts N] [--repeat N]
+           [--database-url URL] [--reuse] [--output PATH] [--compare PATH]
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from flask_login import LoginManager
+
+from extensions import db
+from models import Account, User
+from generate_large_tenant import generate_large_tenant
+from request_profiler import request_profiler
+from kpi_api import kpi_api
+from corporate_api import corporate_api
+from customer_performance_summary_api import customer_perf_summary_api
+from export_api import export_api
+from playbook_triggers_api import playbook_triggers_api
+from rehydration_api import rehydration_api
+
+CUSTOMER_ID = 900
+USER_ID = 900
+
+# name -> (method, path); rehydrate is run separately with the exported file
+ENDPOINTS = {
+    'accounts': ('GET', '/api/accounts'),
+    'all_kpis': ('GET', '/api/kpis/customer/all'),
+    'corporate_rollup': ('GET', '/api/corporate/rollup'),
+    'performance_summary': ('GET', '/api/customer-performance/summary'),
+    'export': ('GET', '/api/export/all-account-data'),
+    'trigger_evaluation': ('POST', '/api/playbook-triggers/evaluate-all'),
+}
+
+
+def create_app(database_url):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_url
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # The benchmark user is not an admin; let its X-Profile-SQL header through
+    app.config['SQL_PROFILER_ALLOW_HEADER'] = True
+    db.init_app(app)
+    request_profiler.init_app(app)
+    # Every request runs as the benchmark user, as with a logged-in session
+    login_manager = LoginManager()
+    login_manager.init_app(app)
+    login_manager.request_loader(lambda request: db.session.get(User, USER_ID))
+    for blueprint in (kpi_api, corporate_api, customer_perf_summary_api, export_api,
+                      playbook_triggers_api, rehydration_api):
+        app.register_blueprint(blueprint)
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def prepare_tenant(app, accounts, reuse):
+    with app.app_context():
+        existing = Account.query.filter_by(customer_id=CUSTOMER_ID).count()
+        if reuse and existing:
+            print(f"♻️  Reusing tenant {CUSTOMER_ID} ({existing} accounts)")
+            counts, elapsed = {'accounts': existing}, 0.0
+        else:
+            started = time.perf_counter()
+            counts = generate_large_tenant(customer_id=CUSTOMER_ID, accounts=accounts, replace=True)
+            elapsed = time.perf_counter() - started
+        if db.session.get(User, USER_ID) is None:
+            db.session.add(User(user_id=USER_ID, customer_id=CUSTOMER_ID, user_name='Benchmark',
+                                email='benchmark@example.com', password_hash='x'))
+            db.session.commit()
+        return counts, elapsed
+
+
+def timed_request(client, method, path, **kwargs):
+    headers = {'X-Customer-ID': str(CUSTOMER_ID), 'X-User-ID': str(USER_ID), 'X-Profile-SQL': '1'}
+    started = time.perf_counter()
+    response = client.open(path, method=method, headers=headers, **kwargs)
+    elapsed = time.perf_counter() - started
+    return response, {
+        'status': response.status_code,
+        'ms': round(elapsed * 1000, 2),
+        'queries': int(response.headers.get('X-SQL-Query-Count', 0)),
+        'db_ms': float(response.headers.get('X-SQL-Time-Ms', 0)),
+        'n_plus_one': int(response.headers.get('X-SQL-N-Plus-One', 0)),
+        'bytes': len(response.get_data()),
+    }
+
+
+def summarize(runs):
+    warm = runs[1:] or runs
+    return {
+        'status': runs[-1]['status'],
+        'cold_ms': runs[0]['ms'],
+        'cold_queries': runs[0]['queries'],
+        'cold_db_ms': runs[0]['db_ms'],
+        'median_ms': round(statistics.median(r['ms'] for r in warm), 2),
+        'min_ms': min(r['ms'] for r in warm),
+        'queries': warm[-1]['queries'],
+        'n_plus_one': max(r['n_plus_one'] for r in runs),
+        'bytes': runs[-1]['bytes'],
+        'runs': runs,
+    }
+
+
+def run_benchmark(app, repeat, only=None):
+    client = app.test_client()
+    results = {}
+    exported = None
+    for name, (method, path) in ENDPOINTS.items():
+        if only and name not in only and not (name == 'export' and 'rehydrate' in only):
+            continue
+        runs = []
+        for _ in range(repeat):
+            response, run = timed_request(client, method, path)
+            runs.append(run)
+        if name == 'export' and response.status_code == 200:
+            exported = response.get_data()
+        results[name] = summarize(runs)
+        assert results[name]['cold_queries'] > 0, f'{name} was not profiled (no X-SQL-Query-Count header)'
+        print(f"   {name:<22} cold {results[name]['cold_ms']:9.1f} ms  warm {results[name]['median_ms']:9.1f} ms"
+              f"  {results[name]['cold_queries']:6d} queries  HTTP {results[name]['status']}")
+
+    if exported is not None and (not only or 'rehydrate' in only):
+        # Replaces the tenant with its own export, so it runs once and last
+        _, run = timed_request(client, 'POST', '/api/rehydrate/import', content_type='multipart/form-data',
+                               data={'file': (io.BytesIO(exported), 'export.xlsx')})
+        results['rehydrate'] = summarize([run])
+        print(f"   {'rehydrate':<22} once {run['ms']:9.1f} ms  {run['queries']:6d} queries  HTTP {run['status']}")
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(results, previous_path):
+    with open(previous_path) as f:
+        previous = json.load(f)
+    print(f"\n📈 Compared with {previous_path} ({previous.get('git_commit')}, {previous.get('recorded_at')})")
+    for name, current in results['endpoints'].items():
+        before = previous.get('endpoints', {}).get(name)
+        if not before:
+            continue
+        for key in ('cold_ms', 'median_ms'):
+            if before[key]:
+                print(f"   {name:<22} {key:<10} {before[key]:9.1f} -> {current[key]:9.1f} ms"
+                      f"  ({current[key] / before[key]:5.2f}x)")
+        if before['cold_queries'] != current['cold_queries']:
+            print(f"   {name:<22} queries    {before['cold_queries']:9d} -> {current['cold_queries']:9d}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark hot endpoints against a synthetic large tenant')
+    parser.add_argument('--accounts', type=int, default=1000, help='Accounts in the generated tenant')
+    parser.add_argument('--repeat', type=int, default=3, help='Requests per endpoint')
+    parser.add_argument('--database-url', default=None,
+                        help='Database (default: a SQLite file in the temp directory)')
+    parser.add_argument('--reuse', action='store_true', help='Reuse the tenant if it already exists')
+    parser.add_argument('--only', action='append', help='Endpoint name to run (repeatable)')
+    parser.add_argument('--output', default=None, help='Result JSON path')
+    parser.add_argument('--compare', default=None, help='Earlier result JSON to compare with')
+    args = parser.parse_args()
+
+    database_url = args.database_url or f"sqlite:///{os.path.join(tempfile.gettempdir(), 'benchmark_large_tenant.db')}"
+    app = create_app(database_url)
+    print(f"📊 Large-tenant benchmark: {args.accounts} accounts on {database_url.split(':')[0]}")
+    counts, generation_seconds = prepare_tenant(app, args.accounts, args.reuse)
+    if generation_seconds:
+        print(f"   generated {sum(counts.values()):,} rows in {generation_seconds:.1f}s")
+
+    results = {
+        'benchmark': 'large_tenant',
+        'recorded_at': datetime.utcnow().isoformat(),
+        'git_commit': git_commit(),
+        'database': database_url.split(':')[0],
+        'python': platform.python_version(),
+        'repeat': args.repeat,
+        'tenant': {'customer_id': CUSTOMER_ID, **counts},
+        'generation_seconds': round(generation_seconds, 2),
+        'endpoints': run_benchmark(app, args.repeat, args.only),
+    }
+
+    output = args.output or f"large_tenant_{counts.get('accounts', args.accounts)}_{datetime.now():%Y%m%d_%H%M%S}.json"
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\n✅ Results written to {output}")
+    if args.compare:
+        compare(results, args.compare)
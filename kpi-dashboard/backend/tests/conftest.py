@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Shared fixtures for the backend tests.
+- make_app: a Flask app on a fresh in-memory SQLite database with the tables
+  created and tenants (and an admin user) committed; the rest of the test runs
+  in its app context
+- record_sql: collects the SQL statements a block of code runs
+"""
+
+import os
+import sys
+from contextlib import contextmanager
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+from flask import Flask
+from sqlalchemy import event
+
+from extensions import db
+from models import Customer, User
+
+
+@pytest.fixture
+def make_app(tmp_path):
+    """
+    make_app(*blueprints, customers=(1,), admin=False, **config) -> app
+
+    Customers are 'Tenant A' (a@example.com), 'Tenant B', ... by id; admin adds
+    user 1 of the first customer, with is_admin set. Config overrides the
+    defaults (in-memory SQLite, BLOB_STORE_DIR under tmp_path). Each call
+    creates a separate app.
+    """
+    contexts = []
+
+    def make(*blueprints, customers=(1,), admin=False, **config):
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        app.config['BLOB_STORE_DIR'] = str(tmp_path / 'blobs')
+        app.config.update(config)
+        db.init_app(app)
+        for blueprint in blueprints:
+            app.register_blueprint(blueprint)
+
+        context = app.app_context()
+        context.push()
+        contexts.append(context)
+        db.create_all()
+        for customer_id in customers:
+            letter = chr(ord('A') + customer_id - 1)
+            db.session.add(Customer(customer_id=customer_id, customer_name=f'Tenant {letter}',
+                                    email=f'{letter.lower()}@example.com'))
+        if admin:
+            db.session.add(User(user_id=1, customer_id=customers[0], user_name='Admin', email='admin@example.com',
+                                password_hash='x', is_admin=True))
+        db.session.commit()
+        return app
+
+    yield make
+    for context in reversed(contexts):
+        context.pop()
+
+
+@pytest.fixture
+def record_sql():
+    """
+    with record_sql() as statements: ... collects the SQL run on db.engine inside
+    the block (optionally only statements for which match(statement) is true)
+    """
+    @contextmanager
+    def record(match=None):
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            if match is None or match(statement):
+                statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+    return record
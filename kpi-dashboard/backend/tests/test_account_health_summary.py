@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Tests for the account_health_summary read model behind GET /api/accounts.
+Validates:
+- refreshed summaries match the per-account trend / proxy / product lookups
+- GET /api/accounts reads the summaries with a constant number of queries
+- a refresh picks up a newer health trend
+- bulk account deletes (cleanup) take the summaries and partials with them
+- data quality fixes and upload clears refresh the summaries they change
+"""
+
+from unittest import mock
+
+import pytest
+from sqlalchemy import text
+
+from extensions import db
+from models import Account, KPI, KPIUpload, HealthTrend, Product, AccountHealthSummary, AccountHealthPartial
+from account_health_summary import refresh_account_health_summaries
+from playbook_recommendations_api import calculate_health_score_proxy
+from kpi_api import kpi_api
+from data_quality_api import data_quality_api
+from data_management_api import data_management_api
+from cleanup_api import cleanup_existing_data
+
+
+@pytest.fixture
+def app(make_app):
+    app = make_app(kpi_api, data_quality_api, data_management_api, admin=True)
+    for account_id in range(1, 21):
+        db.session.add(Account(account_id=account_id, customer_id=1, account_name=f'Account {account_id}'))
+        db.session.add_all([
+            KPI(account_id=account_id, kpi_parameter='Net Promoter Score (NPS)', data=f'{account_id * 4}%',
+                impact_level='High'),
+            KPI(account_id=account_id, kpi_parameter='Ticket Volume', data='N/A', impact_level='Low'),
+        ])
+        if account_id % 2:
+            db.session.add(HealthTrend(account_id=account_id, customer_id=1, month=1, year=2025,
+                                       overall_health_score=40 + account_id))
+        if account_id % 3 == 0:
+            db.session.add(Product(account_id=account_id, customer_id=1, product_name=f'Product {account_id}'))
+    db.session.commit()
+    return app
+
+
+def test_refresh_matches_per_account_lookups(app):
+    with app.app_context():
+        assert refresh_account_health_summaries(1) == 20
+        for summary in AccountHealthSummary.query.all():
+            if summary.account_id % 2:
+                assert summary.health_source == 'health_trend'
+                assert summary.health_score == 40 + summary.account_id
+            else:
+                assert summary.health_source == 'kpi_proxy'
+                assert summary.health_score == calculate_health_score_proxy(summary.account_id)
+            expected_products = [f'Product {summary.account_id}'] if summary.account_id % 3 == 0 else []
+            assert summary.products_used == expected_products
+            assert (summary.total_kpis, summary.valid_kpis) == (2, 1)
+
+
+def test_get_accounts_uses_constant_queries(app, record_sql):
+    client = app.test_client()
+    with mock.patch('kpi_api.get_current_customer_id', return_value=1):
+        first = client.get('/api/accounts').get_json()  # fills the summaries
+        with record_sql() as statements:
+            second = client.get('/api/accounts').get_json()
+            page = client.get('/api/accounts?page=2&per_page=5').get_json()
+
+    assert first == second
+    assert len(second['accounts']) == 20
+    assert [a['account_id'] for a in page['accounts']] == [6, 7, 8, 9, 10]
+    assert page['total'] == 20
+    # one read for the full list; one read plus one count for the page
+    assert len(statements) == 3
+
+
+def test_refresh_picks_up_newer_trend(app):
+    with app.app_context():
+        refresh_account_health_summaries(1)
+        db.session.add(HealthTrend(account_id=2, customer_id=1, month=2, year=2025, overall_health_score=77))
+        db.session.commit()
+        refresh_account_health_summaries(1, [2])
+
+        summary = db.session.get(AccountHealthSummary, 2)
+        assert (summary.health_score, summary.health_source, summary.trend_month) == (77.0, 'health_trend', 2)
+
+
+def test_account_delete_cascades_to_health_rows(app):
+    with app.app_context():
+        refresh_account_health_summaries(1)
+        db.session.add(AccountHealthPartial(account_id=1, customer_id=1, category='Support'))
+        # Only the health rows are left referencing the accounts
+        for model in (KPI, HealthTrend, Product):
+            model.query.delete()
+        db.session.commit()
+        db.session.execute(text('PRAGMA foreign_keys=ON'))
+        try:
+            cleanup_existing_data(1)
+        finally:
+            db.session.execute(text('PRAGMA foreign_keys=OFF'))
+
+        assert Account.query.count() == 0
+        assert AccountHealthSummary.query.count() == AccountHealthPartial.query.count() == 0
+
+
+def test_data_fixes_refresh_summaries(app):
+    client = app.test_client()
+    with app.app_context():
+        upload = KPIUpload(customer_id=1, user_id=1, account_id=2, version=1, original_filename='kpis.xlsx')
+        db.session.add(upload)
+        db.session.flush()
+        db.session.add_all([
+            KPI(account_id=2, upload_id=upload.upload_id, kpi_parameter='Ticket Volume', data='3'),
+            KPI(account_id=2, upload_id=upload.upload_id, kpi_parameter='Ticket Volume', data='5'),
+        ])
+        db.session.commit()
+        upload_id = upload.upload_id
+        refresh_account_health_summaries(1)
+        assert db.session.get(AccountHealthSummary, 2).total_kpis == 4
+
+    assert client.post('/api/data-quality/fix/seed-missing-products').get_json()['created_products'] == 14
+    assert client.post('/api/data-quality/fix/dedupe-account-level').get_json()['removed'] == 2
+    with app.app_context():
+        summary = db.session.get(AccountHealthSummary, 2)
+        assert summary.products_used == ['Default Product for Account 2']
+        assert summary.total_kpis == 2
+
+    with mock.patch('data_management_api.get_current_customer_id', return_value=1):
+        response = client.post('/api/data/clear-uploads', json={'upload_ids': [upload_id]})
+    assert response.get_json()['deleted'] == {'kpis': 1, 'uploads': 1}
+    with app.app_context():
+        assert db.session.get(AccountHealthSummary, 2).total_kpis == 1
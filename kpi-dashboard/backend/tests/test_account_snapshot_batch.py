@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Tests for batch account snapshot creation.
+Validates:
+- create_snapshots_for_customer fills each snapshot from that account's own
+  snapshots, trend, products, KPIs, playbooks, reports and notes
+- the duplicate-interval safeguards skip, and force_create bypasses them
+- the number of reads does not grow with the number of accounts
+"""
+
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from extensions import db
+from models import (
+    Account, AccountSnapshot, AccountNote, Product, KPI, HealthTrend,
+    PlaybookExecution, PlaybookReport, PlaybookTrigger
+)
+from health_score_engine import HealthScoreEngine
+from playbook_recommendations_api import calculate_health_score_proxy
+from account_snapshot_api import create_snapshots_for_customer, create_account_snapshot
+from reference_range_index import invalidate_reference_ranges
+
+KPI_NAMES = ['Feature Adoption Rate', 'First Response Time', 'Net Promoter Score (NPS)', 'Ticket Volume']
+VALUES = ['85%', '10%', '40 hours', '2 days', '12', 'N/A']
+NOW = datetime.now()
+
+
+@pytest.fixture
+def app(make_app):
+    app = make_app(customers=(1, 2))
+    invalidate_reference_ranges()
+    for customer_id in (1, 2):
+        db.session.add(PlaybookTrigger(customer_id=customer_id, playbook_type='renewal', auto_trigger_enabled=True))
+    db.session.commit()
+    yield app
+    invalidate_reference_ranges()
+
+
+def add_accounts(customer_id, count, seed=3):
+    rng = random.Random(seed)
+    first = (db.session.query(db.func.max(Account.account_id)).scalar() or 0) + 1
+    for account_id in range(first, first + count):
+        db.session.add(Account(account_id=account_id, customer_id=customer_id, account_name=f'Account {account_id}',
+                               revenue=rng.choice([0, 1000, 5000]),
+                               profile_metadata={'products_used': 'Legacy A, Legacy B',
+                                                 'champions': [{'name': 'Jane', 'status': 'Active'}]}))
+        for p in range(rng.randint(0, 2)):
+            db.session.add(Product(account_id=account_id, customer_id=customer_id, product_name=f'Product {account_id}-{p}'))
+        for _ in range(rng.randint(0, 8)):
+            db.session.add(KPI(account_id=account_id, kpi_parameter=rng.choice(KPI_NAMES),
+                               data=rng.choice(VALUES), category='Support KPI'))
+        for month in range(1, rng.randint(1, 4)):
+            db.session.add(HealthTrend(account_id=account_id, customer_id=customer_id, month=month, year=2025,
+                                       overall_health_score=40 + 10 * month, support_score=30 + month))
+        for n in range(rng.randint(0, 4)):
+            db.session.add(AccountSnapshot(account_id=account_id, customer_id=customer_id,
+                                           snapshot_timestamp=NOW - timedelta(days=10 - n), snapshot_type='manual',
+                                           overall_health_score=50 + 5 * n, revenue=1000,
+                                           snapshot_sequence_number=n + 1))
+        for n in range(rng.randint(0, 4)):
+            execution_id = f'exec-{account_id}-{n}'
+            status = rng.choice(['in-progress', 'completed', 'failed'])
+            db.session.add(PlaybookExecution(execution_id=execution_id, customer_id=customer_id,
+                                             account_id=account_id, playbook_id=f'playbook-{n}', status=status,
+                                             execution_data={}, started_at=NOW - timedelta(days=40 - n),
+                                             completed_at=NOW - timedelta(days=rng.choice([5, 60]))
+                                             if status == 'completed' else None))
+            db.session.add(PlaybookReport(execution_id=execution_id, customer_id=customer_id, account_id=account_id,
+                                          playbook_id=f'playbook-{n}', playbook_name='Playbook', report_data={},
+                                          started_at=NOW, report_generated_at=NOW - timedelta(hours=n)))
+        for n in range(rng.randint(0, 7)):
+            db.session.add(AccountNote(account_id=account_id, customer_id=customer_id, note_type='general',
+                                       note_content='note', created_by=1, created_at=NOW - timedelta(hours=n)))
+    db.session.commit()
+
+
+def expected_snapshot(account):
+    """The snapshot fields, read with one query per relation as create_account_snapshot used to"""
+    account_id, customer_id = account.account_id, account.customer_id
+    snapshots = AccountSnapshot.query.filter_by(account_id=account_id).order_by(
+        AccountSnapshot.snapshot_timestamp.desc()).limit(3).all()
+    trend = HealthTrend.query.filter_by(account_id=account_id).order_by(
+        HealthTrend.year.desc(), HealthTrend.month.desc()).first()
+    executions = PlaybookExecution.query.filter_by(account_id=account_id).all()
+    last_execution = PlaybookExecution.query.filter_by(account_id=account_id).order_by(
+        PlaybookExecution.started_at.desc()).first()
+    statuses = [HealthScoreEngine.calculate_health_status(
+        HealthScoreEngine.parse_kpi_value(kpi.data, kpi.kpi_parameter, customer_id=customer_id),
+        kpi.kpi_parameter, customer_id)['status'] for kpi in KPI.query.filter_by(account_id=account_id)]
+    products = [p.product_name for p in Product.query.filter_by(account_id=account_id)]
+    return {
+        'snapshot_sequence_number': (snapshots[0].snapshot_sequence_number + 1) if snapshots else 1,
+        'overall_health_score': float(trend.overall_health_score) if trend else calculate_health_score_proxy(account_id),
+        'support_score': float(trend.support_score) if trend else None,
+        'products_used': products or ['Legacy A', 'Legacy B'],
+        'playbooks_running': sorted(e.playbook_id for e in executions if e.status == 'in-progress'),
+        'playbooks_completed_count': len([e for e in executions if e.status == 'completed']),
+        'playbooks_completed_last_30_days': len([e for e in executions if e.status == 'completed'
+                                                 and e.completed_at >= NOW - timedelta(days=30)]),
+        'last_playbook_executed': last_execution.playbook_id if last_execution else None,
+        'recent_playbook_report_ids': [r.report_id for r in PlaybookReport.query.filter_by(
+            account_id=account_id).order_by(PlaybookReport.report_generated_at.desc()).limit(3)],
+        'recent_csm_note_ids': [n.note_id for n in AccountNote.query.filter_by(
+            account_id=account_id).order_by(AccountNote.created_at.desc()).limit(5)],
+        'total_kpis': len(statuses),
+        'critical_kpis_count': statuses.count('low'),
+        'at_risk_kpis_count': statuses.count('medium'),
+        'playbook_recommendations_active': ['renewal'],
+    }
+
+
+def actual_snapshot(snapshot):
+    return {
+        'snapshot_sequence_number': snapshot.snapshot_sequence_number,
+        'overall_health_score': float(snapshot.overall_health_score),
+        'support_score': float(snapshot.support_score) if snapshot.support_score is not None else None,
+        'products_used': snapshot.products_used,
+        'playbooks_running': sorted(snapshot.playbooks_running),
+        'playbooks_completed_count': snapshot.playbooks_completed_count,
+        'playbooks_completed_last_30_days': snapshot.playbooks_completed_last_30_days,
+        'last_playbook_executed': (snapshot.last_playbook_executed or {}).get('playbook_id'),
+        'recent_playbook_report_ids': snapshot.recent_playbook_report_ids,
+        'recent_csm_note_ids': snapshot.recent_csm_note_ids,
+        'total_kpis': snapshot.total_kpis,
+        'critical_kpis_count': snapshot.critical_kpis_count,
+        'at_risk_kpis_count': snapshot.at_risk_kpis_count,
+        'playbook_recommendations_active': snapshot.playbook_recommendations_active,
+    }
+
+
+def test_batch_matches_per_account_relations(app):
+    with app.app_context():
+        add_accounts(1, 25)
+        add_accounts(2, 3, seed=4)
+        expected = {a.account_id: expected_snapshot(a) for a in Account.query.filter_by(customer_id=1)}
+
+        snapshots = create_snapshots_for_customer(1, snapshot_type='manual')
+        assert sorted(s.account_id for s in snapshots) == sorted(expected)
+        for snapshot in snapshots:
+            assert snapshot.snapshot_id is not None
+            assert actual_snapshot(snapshot) == expected[snapshot.account_id]
+
+
+def test_duplicate_interval_safeguards(app):
+    with app.app_context():
+        add_accounts(1, 6)
+        db.session.add(AccountSnapshot(account_id=1, customer_id=1, snapshot_type='scheduled',
+                                       snapshot_timestamp=NOW - timedelta(hours=2)))
+        db.session.commit()
+        with_recent = {s.account_id for s in AccountSnapshot.query if s.snapshot_timestamp > NOW - timedelta(days=1)}
+
+        # Event-driven needs 1 hour since the last snapshot, scheduled 24 hours
+        assert len(create_snapshots_for_customer(1, snapshot_type='event_driven')) == 6
+        assert create_snapshots_for_customer(1, snapshot_type='event_driven') == []
+        assert create_snapshots_for_customer(1, snapshot_type='scheduled') == []
+        assert with_recent == {1}
+
+        assert create_account_snapshot(1, 1, snapshot_type='rag_auto') is None
+        assert create_account_snapshot(1, 1, snapshot_type='rag_auto', force_create=True) is not None
+        assert create_account_snapshot(1, 2, snapshot_type='manual') is None  # other customer's account
+        manual = create_snapshots_for_customer(1, snapshot_type='manual', account_ids=[1, 2])
+        assert [s.account_id for s in manual] == [1, 2]
+        assert manual[0].snapshot_sequence_number == 4
+
+
+def test_read_count_is_independent_of_account_count(app, record_sql):
+    def count_statements(customer_id):
+        with record_sql(lambda statement: statement.startswith('SELECT')) as statements:
+            created = create_snapshots_for_customer(customer_id, snapshot_type='manual')
+        return len(statements), len(created)
+
+    with app.app_context():
+        add_accounts(1, 3)
+        add_accounts(2, 60, seed=8)
+        # Warm the reference range index (and this app context's data versions) so
+        # both runs resolve ranges from memory
+        for customer_id in (1, 2):
+            count_statements(customer_id)
+        small, small_created = count_statements(1)
+        large, large_created = count_statements(2)
+        assert (small_created, large_created) == (3, 60)
+        # Every relation is read once per tenant, plus rebuilding delta-encoded state
+        # before and after the insert; the INSERT is batched where the dialect can
+        # return generated keys for many rows (PostgreSQL), per row on SQLite
+        assert small == large == 14
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Tests for the analytics cube.
+Validates:
+- /api/analytics/* answers from the cube match SQL aggregates and only read the data version once it is built
+- ORM account/KPI writes keep the cube equal to a freshly built one without reloading it
+- rolled back writes are not applied, bulk deletes drop the cube
+"""
+
+import random
+from unittest import mock
+
+import pytest
+from sqlalchemy import func
+
+from extensions import db
+from models import Account, KPI
+from analytics_cube import analytics_cube, load_tenant_cube
+from analytics_api import analytics_api
+
+INDUSTRIES = ['Tech', 'Retail', 'Health', None]
+REGIONS = ['NA', 'EMEA', 'APAC']
+STATUSES = ['active', 'inactive']
+CATEGORIES = ['Product Usage', 'Support', 'Business Outcomes']
+IMPACTS = ['High', 'Medium', 'Low']
+VALUES = ['85%', '4.5', '$1,200', '3 days', 'N/A', '', '12']
+
+
+def cube_cells(cube):
+    """Comparable view of a cube's cells and accounts"""
+    def measures(cells):
+        return {key: (m.count, m.value_count, round(float(m.total), 6), m.minimum, m.maximum)
+                for key, m in cells.items()}
+    return (measures(cube.account_cells), measures(cube.kpi_cells), dict(cube.accounts),
+            {a: measures(k) for a, k in cube.account_kpis.items()}, list(cube.ranking))
+
+
+@pytest.fixture
+def app(make_app):
+    app = make_app(analytics_api, customers=(1, 2))
+    rng = random.Random(13)
+    for account_id in range(1, 41):
+        db.session.add(Account(
+            account_id=account_id, customer_id=1 if account_id <= 30 else 2,
+            account_name=f'Account {account_id}',
+            revenue=None if account_id % 11 == 0 else rng.randint(1, 500) * 1000,
+            industry=rng.choice(INDUSTRIES), region=rng.choice(REGIONS),
+            account_status=rng.choice(STATUSES)
+        ))
+    db.session.flush()
+    for _ in range(300):
+        db.session.add(KPI(account_id=rng.randint(1, 40), category=rng.choice(CATEGORIES),
+                           impact_level=rng.choice(IMPACTS), kpi_parameter='KPI',
+                           data=rng.choice(VALUES)))
+    db.session.commit()
+    analytics_cube.invalidate()
+    yield app
+    analytics_cube.invalidate()
+
+
+def test_endpoints_match_sql_and_skip_the_database(app, record_sql):
+    client = app.test_client()
+
+    def count_queries(fn):
+        with record_sql() as statements:
+            result = fn()
+        return result, len(statements)
+
+    with app.app_context(), mock.patch('analytics_api.get_current_customer_id', return_value=1):
+        client.get('/api/analytics/statistics')  # builds the cube
+        loads = analytics_cube.stats['loads']
+
+        by_industry, queries = count_queries(lambda: client.get('/api/analytics/revenue/by-industry').get_json())
+        assert queries == 1  # the data version
+        expected = db.session.query(
+            Account.industry, func.sum(Account.revenue), func.count(Account.account_id),
+            func.min(Account.revenue), func.max(Account.revenue)
+        ).filter(Account.customer_id == 1).group_by(Account.industry).all()
+        assert {r['industry']: (r['total_revenue'], r['account_count'], r['min_revenue'], r['max_revenue'])
+                for r in by_industry['result']} == \
+            {i: (float(s or 0), c, float(lo or 0), float(hi or 0)) for i, s, c, lo, hi in expected}
+        totals = [r['total_revenue'] for r in by_industry['result']]
+        assert totals == sorted(totals, reverse=True)
+
+        total = client.get('/api/analytics/revenue/total?region=EMEA').get_json()['result']['total_revenue']
+        assert total == float(db.session.query(func.sum(Account.revenue)).filter(
+            Account.customer_id == 1, Account.region == 'EMEA', Account.account_status == 'active').scalar() or 0)
+
+        count = client.get('/api/analytics/accounts/count?min_revenue=100000&status=active').get_json()
+        assert count['result']['count'] == Account.query.filter(
+            Account.customer_id == 1, Account.revenue >= 100000, Account.account_status == 'active').count()
+
+        top = client.get('/api/analytics/revenue/top-accounts?limit=5').get_json()['result']['accounts']
+        expected_top = Account.query.filter(Account.customer_id == 1, Account.revenue.isnot(None)).order_by(
+            Account.revenue.desc(), Account.account_id).limit(5).all()
+        assert [a['account_id'] for a in top] == [a.account_id for a in expected_top]
+
+        summary, queries = count_queries(lambda: client.get('/api/analytics/kpis/summary').get_json()['result'])
+        assert queries == 1  # the data version
+        kpis = KPI.query.join(Account).filter(Account.customer_id == 1)
+        assert summary['total_kpis'] == kpis.count()
+        assert summary['accounts_with_kpis'] == kpis.with_entities(func.count(func.distinct(KPI.account_id))).scalar()
+        for category in summary['by_category']:
+            values = [k.value_numeric for k in kpis.filter(KPI.category == category['category'])
+                      if k.value_numeric is not None]
+            assert category['numeric_count'] == len(values)
+            assert category['average_value'] == pytest.approx(sum(values) / len(values))
+
+        grouped = client.post('/api/analytics/aggregate', json={
+            'metric': 'kpi_value', 'operation': 'max', 'group_by': ['impact_level'],
+            'filters': {'category': 'Support', 'min_revenue': 50000}
+        }).get_json()['result']
+        expected = db.session.query(KPI.impact_level, func.max(KPI.value_numeric)).join(Account).filter(
+            Account.customer_id == 1, KPI.category == 'Support', Account.revenue >= 50000
+        ).group_by(KPI.impact_level).all()
+        assert {r['impact_level']: r['value'] for r in grouped} == {i: float(v or 0) for i, v in expected}
+
+        fallback = client.post('/api/analytics/aggregate', json={'metric': 'account_id', 'operation': 'max'})
+        assert fallback.get_json()['result']['value'] == 30
+        assert client.post('/api/analytics/aggregate', json={'operation': 'median'}).status_code == 400
+
+    assert analytics_cube.stats['loads'] == loads
+
+
+def test_orm_writes_maintain_the_cube(app):
+    with app.app_context():
+        cube = analytics_cube.get(1)
+        loads = analytics_cube.stats['loads']
+
+        # LATAM cells only hold the new account, so moving it never removes a cell's min/max
+        db.session.add(Account(account_id=100, customer_id=1, account_name='New', revenue=250000,
+                               industry='Tech', region='LATAM', account_status='active'))
+        db.session.flush()
+        db.session.add_all([KPI(account_id=100, category='Support', impact_level='High', data=data)
+                            for data in ('10', '20', '30')])
+        db.session.commit()
+
+        account = db.session.get(Account, 100)
+        account.industry = 'Retail'
+        account.revenue = 260000
+        middle = KPI.query.filter_by(account_id=100, data='20').one()
+        middle.data = '25.5'
+        db.session.add(KPI(account_id=100, category='Product Usage', impact_level='Low', data=''))
+        db.session.commit()
+
+        KPI.query.filter_by(account_id=100, category='Product Usage').one().category = 'Support'
+        db.session.delete(KPI.query.filter_by(account_id=100, data='25.5').one())
+        other = db.session.get(Account, 31)
+        other.revenue = 1  # another tenant: not loaded, ignored
+        db.session.commit()
+
+        assert analytics_cube.get(1) is cube
+        assert analytics_cube.stats['loads'] == loads
+        assert cube_cells(cube) == cube_cells(load_tenant_cube(1))
+
+        for kpi in KPI.query.filter_by(account_id=100).all():
+            db.session.delete(kpi)
+        db.session.delete(db.session.get(Account, 100))
+        db.session.commit()
+        fresh = load_tenant_cube(1)
+        current = analytics_cube.get(1)
+        assert cube_cells(current) == cube_cells(fresh)
+
+
+def test_rollback_and_bulk_delete(app):
+    with app.app_context():
+        cube = analytics_cube.get(1)
+        before = cube_cells(cube)
+
+        db.session.add(Account(account_id=101, customer_id=1, account_name='Rolled back', revenue=5))
+        db.session.flush()
+        db.session.rollback()
+        assert analytics_cube.get(1) is cube
+        assert cube_cells(cube) == before
+
+        account_ids = [a.account_id for a in Account.query.filter_by(customer_id=1, region='NA')]
+        KPI.query.filter(KPI.account_id.in_(account_ids)).delete(synchronize_session=False)
+        db.session.commit()
+        rebuilt = analytics_cube.get(1)
+        assert rebuilt is not cube
+        assert cube_cells(rebuilt) == cube_cells(load_tenant_cube(1))
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Tests for the content-addressed blob store.
+Validates:
+- blobs are keyed by SHA-256, stored once per content and written atomically
+- zstd-compressed blobs read back as the original bytes (when zstandard is installed)
+- uploads reference their file by hash: identical re-uploads share one blob and
+  /api/download streams it from disk
+- a relative BLOB_STORE_DIR means the same directory whatever the working directory
+"""
+
+import hashlib
+import io
+import os
+from unittest import mock
+
+import pytest
+
+from extensions import db
+from models import KPIUpload
+from blob_store import BACKEND_DIR, BlobStore, BlobNotFound, get_blob_store
+from upload_api import upload_api
+from download_api import download_api
+from test_excel_ingest import kpi_workbook
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app(upload_api, download_api, admin=True)
+
+
+def stored_files(root):
+    return sorted(os.path.relpath(os.path.join(d, f), root) for d, _, files in os.walk(root) for f in files)
+
+
+def test_put_deduplicates_by_content(tmp_path):
+    store = BlobStore(str(tmp_path / 'blobs'))
+    data = b'workbook bytes'
+    sha256 = hashlib.sha256(data).hexdigest()
+
+    assert store.put(data) == sha256
+    assert store.put(data) == sha256
+    source = tmp_path / 'copy.xlsx'
+    source.write_bytes(data)
+    assert store.put_file(str(source)) == sha256
+
+    assert stored_files(store.root) == [os.path.join(sha256[:2], sha256[2:4], sha256)]
+    assert store.read(sha256) == data
+    with pytest.raises(BlobNotFound):
+        store.open('0' * 64)
+    with pytest.raises(ValueError):
+        store.locate('../../etc/passwd')
+
+
+def test_compressed_blobs_read_back(tmp_path):
+    pytest.importorskip('zstandard')
+    store = BlobStore(str(tmp_path / 'blobs'), compression='zstd')
+    data = kpi_workbook() * 4
+    sha256 = store.put(data)
+    assert store.locate(sha256).endswith('.zst')
+    assert os.path.getsize(store.locate(sha256)) < len(data)
+    assert store.read(sha256) == data
+
+
+def test_uploads_share_blob_and_download_streams_it(app):
+    client = app.test_client()
+    raw = kpi_workbook()
+    with mock.patch('upload_api.get_current_customer_id', return_value=1):
+        for account_name in ('Acme', 'Globex'):
+            response = client.post('/api/upload', headers={'X-User-ID': '1'}, data={
+                'account_name': account_name, 'sync': 'true', 'file': (io.BytesIO(raw), 'kpis.xlsx')
+            }, content_type='multipart/form-data')
+            assert response.status_code == 200
+
+    uploads = KPIUpload.query.order_by(KPIUpload.upload_id).all()
+    assert {u.content_sha256 for u in uploads} == {hashlib.sha256(raw).hexdigest()}
+    assert len(stored_files(app.config['BLOB_STORE_DIR'])) == 1
+
+    with mock.patch('download_api.get_current_customer_id', return_value=1):
+        response = client.get(f'/api/download/{uploads[1].upload_id}')
+        assert response.status_code == 200
+        assert response.data == raw
+        assert response.headers['Content-Disposition'] == 'attachment; filename=kpis.xlsx'
+        assert response.headers['ETag'] == f'"{uploads[1].content_sha256}"'
+        response.close()
+
+        uploads[0].content_sha256 = None
+        db.session.commit()
+        assert client.get(f'/api/download/{uploads[0].upload_id}').status_code == 404
+
+
+def test_relative_store_dir_ignores_working_directory(app, tmp_path, monkeypatch):
+    blobs = tmp_path / 'relative-blobs'
+    app.config['BLOB_STORE_DIR'] = os.path.relpath(blobs, BACKEND_DIR)
+    assert get_blob_store().root == str(blobs)
+
+    # Store and serve from a working directory that is neither the backend nor the app root
+    monkeypatch.chdir(tmp_path)
+    client = app.test_client()
+    raw = kpi_workbook()
+    with mock.patch('upload_api.get_current_customer_id', return_value=1):
+        body = client.post('/api/upload', headers={'X-User-ID': '1'}, data={
+            'account_name': 'Acme', 'sync': 'true', 'file': (io.BytesIO(raw), 'kpis.xlsx')
+        }, content_type='multipart/form-data').get_json()
+    assert len(stored_files(str(blobs))) == 1
+    with mock.patch('download_api.get_current_customer_id', return_value=1):
+        response = client.get(f"/api/download/{body['upload_id']}")
+        assert (response.status_code, response.data) == (200, raw)
+        response.close()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Tests for the parallel bulk file loader.
+Validates:
+- a directory load stores one account, upload and batch of KPIs per file and
+  reports a status per file (loaded, skipped as duplicate content, failed)
+- identical content is only a duplicate for the same account
+- a rerun skips files already ingested by content hash and account and loads the rest
+- the process pool parses files the same way as the inline parser
+"""
+
+from unittest import mock
+
+import pytest
+
+from extensions import db
+from models import Account, KPI, KPIUpload
+from bulk_file_loader import BulkFileLoader, parse_kpi_file
+from cleanup_api import cleanup_api
+from test_excel_ingest import kpi_workbook, workbook_bytes
+
+EMPTY = workbook_bytes({'Account Info': [], 'Notes': [['nothing']], 'Rollup': []})
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app(cleanup_api, admin=True, KPI_BULK_BATCH_SIZE=4, BULK_LOAD_WORKERS=1)
+
+
+@pytest.fixture
+def drop(tmp_path):
+    # One build: workbooks saved in different seconds differ in their timestamps
+    raw = kpi_workbook()
+    (tmp_path / 'acme.xlsx').write_bytes(raw)
+    (tmp_path / 'acme_kpis.xlsx').write_bytes(raw)
+    (tmp_path / 'acme_resend.xlsx').write_bytes(raw)
+    (tmp_path / 'broken.xlsx').write_bytes(EMPTY)
+    (tmp_path / 'notes.txt').write_text('not a workbook')
+    return tmp_path
+
+
+def test_loads_directory_with_file_statuses(app, drop, record_sql):
+    with record_sql() as statements:
+        result = BulkFileLoader(1, 1, workers=1).load_directory(str(drop))
+
+    statuses = {s['file']: s for s in result['files']}
+    assert [s['status'] for s in result['files']] == ['loaded', 'skipped', 'loaded', 'failed']
+    assert statuses['acme_kpis.xlsx']['reason'] == 'duplicate content'
+    assert statuses['acme_resend.xlsx']['sha256'] == statuses['acme.xlsx']['sha256']
+    assert statuses['broken.xlsx']['error'] == 'Failed to process broken.xlsx: No valid KPI data found in broken.xlsx'
+    assert (result['total_files'], result['successful_uploads'], result['skipped_files'],
+            result['failed_uploads'], result['total_kpis_created']) == (4, 2, 1, 1, 12)
+    assert result['errors'] == [{'file': 'broken.xlsx', 'error': statuses['broken.xlsx']['error']}]
+
+    loaded = statuses['acme.xlsx']
+    assert loaded['account_name'] == 'acme' and loaded['kpi_count'] == 6
+    upload = db.session.get(KPIUpload, loaded['upload_id'])
+    assert upload.content_sha256 == loaded['sha256'] and upload.rows_processed == 6
+    assert KPI.query.filter_by(upload_id=upload.upload_id, account_id=loaded['account_id']).count() == 6
+    assert len([s for s in statements if s.startswith('INSERT INTO kpis')]) == 4
+
+    # The failed file left nothing behind
+    assert [a.account_name for a in Account.query] == ['acme', 'acme_resend']
+    assert KPIUpload.query.count() == 2
+
+
+def test_rerun_skips_ingested_files(app, drop):
+    client = app.test_client()
+    BulkFileLoader(1, 1, workers=1).load_directory(str(drop))
+    (drop / 'broken.xlsx').write_bytes(workbook_bytes({
+        'Account Info': [],
+        'Support KPI': [['Health Score Component', 'Data', 'KPI/Parameter'], ['Tickets', '4', 'Open tickets']],
+        'Rollup': [],
+    }))
+
+    with mock.patch('cleanup_api.get_current_customer_id', return_value=1):
+        body = client.post('/api/cleanup/bulk-upload', headers={'X-User-ID': '1'},
+                           json={'directory_path': str(drop), 'resume': True}).get_json()
+    assert body['cleanup_result'] is None
+    result = body['upload_result']
+    assert [(s['file'], s['status']) for s in result['files']] == [
+        ('acme.xlsx', 'skipped'), ('acme_kpis.xlsx', 'skipped'), ('acme_resend.xlsx', 'skipped'),
+        ('broken.xlsx', 'loaded')
+    ]
+    assert {s['reason'] for s in result['files'] if s['status'] == 'skipped'} == {'already ingested'}
+    assert sorted(a.account_name for a in Account.query) == ['acme', 'acme_resend', 'broken']
+    assert KPI.query.count() == 13
+
+    # The same workbook dropped for a new account is loaded for it
+    (drop / 'globex.xlsx').write_bytes((drop / 'acme.xlsx').read_bytes())
+    result = BulkFileLoader(1, 1, workers=1).load_directory(str(drop))
+    assert [s['file'] for s in result['files'] if s['status'] == 'loaded'] == ['globex.xlsx']
+
+
+def test_process_pool_parses_like_inline(drop):
+    files = [str(drop / 'acme.xlsx'), str(drop / 'broken.xlsx')]
+    parsed = {path: (rows, error) for path, rows, error in BulkFileLoader(1, 1, workers=2)._parse(files)}
+    assert parsed == {files[0]: (parse_kpi_file(files[0]), None), files[1]: ([], None)}
+    assert [row['impact_level'] for row in parsed[files[0]][0]] == ['High', None, 'Medium', 'Low', 'High', None]
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Tests for the per-customer category weight cache.
+Validates:
+- customer weights are parsed from CustomerConfig, with config defaults as fallback
+- scoring a whole tenant reads CustomerConfig once
+- invalidation picks up committed changes
+- a data version bump by another process retires the cached entry
+"""
+
+import json
+
+import pytest
+from sqlalchemy import update
+
+from extensions import db
+from models import Customer, CustomerConfig
+from health_score_config import get_category_weight
+from health_score_batch import BatchHealthScoreEngine
+from category_weight_index import category_weight_index, invalidate_category_weights
+from reference_range_index import invalidate_reference_ranges
+
+
+@pytest.fixture
+def app(make_app):
+    app = make_app(customers=(1, 2))
+    db.session.add(CustomerConfig(customer_id=1, category_weights=json.dumps({
+        'Product Usage KPI': 0.4, 'Support': 0.1
+    })))
+    db.session.commit()
+    invalidate_category_weights()
+    invalidate_reference_ranges()
+    yield app
+    invalidate_category_weights()
+    invalidate_reference_ranges()
+
+
+def test_customer_weights_and_defaults(app):
+    with app.app_context():
+        assert get_category_weight('Product Usage KPI', 1) == 0.4
+        # Normalized name lookup
+        assert get_category_weight('Support KPI', 1) == 0.1
+        # Missing from the customer's weights -> config default
+        assert get_category_weight('Business Outcomes KPI', 1) == 0.25
+        # No CustomerConfig row -> config default
+        assert get_category_weight('Product Usage KPI', 2) == 0.20
+
+
+def test_tenant_scoring_reads_config_once(app, record_sql):
+    with app.app_context():
+        kpis = [{'account_id': account_id, 'kpi_parameter': 'Feature Adoption Rate', 'data': f'{account_id}%',
+                 'impact_level': 'High', 'category': category}
+                for account_id in range(1, 21)
+                for category in ('Product Usage KPI', 'Support KPI', 'Customer Sentiment KPI')]
+        with record_sql(lambda statement: 'customer_configs' in statement) as statements:
+            results = BatchHealthScoreEngine.calculate_health_scores(kpis, 1)
+        for account_id in range(1, 21):
+            weights = [c['category_weight'] for c in results[account_id]['category_scores']]
+            assert weights == [0.4, 0.1, 0.20]
+        assert len(statements) == 1
+
+
+def test_invalidation_after_commit(app):
+    with app.app_context():
+        assert get_category_weight('Product Usage KPI', 1) == 0.4
+
+        config = CustomerConfig.query.filter_by(customer_id=1).first()
+        config.category_weights = json.dumps({'Product Usage KPI': 0.3})
+        db.session.commit()
+
+        # Still cached until the writer invalidates
+        assert get_category_weight('Product Usage KPI', 1) == 0.4
+        invalidate_category_weights(1)
+        assert get_category_weight('Product Usage KPI', 1) == 0.3
+        assert category_weight_index.stats['invalidations'] >= 1
+
+
+def test_change_committed_by_another_process(app):
+    with app.app_context():
+        assert get_category_weight('Product Usage KPI', 1) == 0.4
+
+        # Another process stored new weights and bumped the data version
+        config = CustomerConfig.query.filter_by(customer_id=1).first()
+        config.category_weights = json.dumps({'Product Usage KPI': 0.3})
+        db.session.execute(update(Customer).where(Customer.customer_id == 1)
+                           .values(data_version=Customer.data_version + 1))
+        db.session.commit()
+
+    # The next request or job (app context) sees the new version
+    with app.app_context():
+        assert get_category_weight('Product Usage KPI', 1) == 0.3
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Tests for the SQL-side corporate rollup.
+Validates:
+- the GROUP BY rollup matches the per-account revenue-weighted averaging it replaced
+- rows without a stored parse are still included
+- the rollup endpoint is served from the cache until the tenant's data changes
+"""
+
+import random
+from unittest import mock
+
+import pytest
+
+from extensions import db
+from models import Account, KPI
+from kpi_value_parser import kpi_number
+from reference_range_index import invalidate_reference_ranges
+from tenant_result_cache import invalidate_tenant_results
+from corporate_api import corporate_api, calculate_revenue_weighted_rollup, corporate_rollup_cache
+
+KPI_NAMES = ['Feature Adoption Rate', 'First Response Time', 'Net Promoter Score (NPS)', 'Ticket Volume', 'ARR']
+VALUES = ['85%', '40.5%', '4 hours', '$45,000', '$2.5M', '12', '1.5K', 'N/A', '', None, 'nan']
+CATEGORIES = ['Product Usage KPI', 'Support KPI', 'Business Outcomes KPI']
+
+
+def legacy_rollup(customer_id):
+    """The per-account rollup this query replaced (metadata from each parameter's first KPI)"""
+    groups = {}
+    for account in Account.query.filter_by(customer_id=customer_id).order_by(Account.account_id).all():
+        for kpi in KPI.query.filter_by(account_id=account.account_id).order_by(KPI.kpi_id).all():
+            groups.setdefault(kpi.kpi_parameter, []).append((kpi, account))
+    result = []
+    for kpi_parameter, kpi_accounts in groups.items():
+        weighted_sum = total_weight = 0
+        for kpi, account in kpi_accounts:
+            value = kpi_number(kpi.data)
+            if value is None:
+                continue
+            revenue = float(account.revenue) if account.revenue else 0
+            weighted_sum += value * revenue
+            total_weight += revenue
+        first_kpi = kpi_accounts[0][0]
+        result.append({
+            'kpi_parameter': kpi_parameter,
+            'category': first_kpi.category,
+            'weighted_average': weighted_sum / total_weight if total_weight > 0 else 0,
+            'companies_count': len(set(kpi.account_id for kpi, _ in kpi_accounts))
+        })
+    return result
+
+
+@pytest.fixture
+def app(make_app):
+    app = make_app(corporate_api, customers=(1, 2))
+    invalidate_reference_ranges()
+    invalidate_tenant_results()
+    rng = random.Random(5)
+    for account_id in range(1, 16):
+        customer_id = 1 if account_id <= 12 else 2
+        db.session.add(Account(account_id=account_id, customer_id=customer_id, account_name=f'Account {account_id}',
+                               revenue=rng.choice([0, None, 50000, 125000.5, 2000000])))
+        for _ in range(rng.randint(0, 8)):
+            db.session.add(KPI(account_id=account_id, kpi_parameter=rng.choice(KPI_NAMES),
+                               data=rng.choice(VALUES), category=rng.choice(CATEGORIES),
+                               impact_level='High'))
+    db.session.commit()
+    # Simulate rows written before the parsed-value backfill
+    KPI.query.filter(KPI.kpi_id % 5 == 0).update({'value_parse_status': None, 'value_numeric': None},
+                                                 synchronize_session=False)
+    db.session.commit()
+    yield app
+    invalidate_reference_ranges()
+    invalidate_tenant_results()
+
+
+def test_rollup_matches_per_account_averaging(app):
+    with app.app_context():
+        rollup = calculate_revenue_weighted_rollup(1)
+        expected = legacy_rollup(1)
+        assert [r['kpi_parameter'] for r in rollup] == [e['kpi_parameter'] for e in expected]
+        for row, legacy in zip(rollup, expected):
+            assert row['category'] == legacy['category']
+            assert row['companies_count'] == legacy['companies_count']
+            if legacy['weighted_average'] != legacy['weighted_average']:  # nan from a 'nan' string
+                assert row['weighted_average'] != row['weighted_average']
+            else:
+                assert row['weighted_average'] == pytest.approx(legacy['weighted_average'], rel=1e-9)
+
+
+def test_rollup_endpoint_is_cached_until_invalidated(app, record_sql):
+    client = app.test_client()
+    with app.app_context():
+        accounts_with_kpis = sorted({kpi.account_id for kpi in KPI.query.join(Account).filter(Account.customer_id == 1)})
+    loads = corporate_rollup_cache.stats['loads']
+
+    with mock.patch('corporate_api.get_current_customer_id', return_value=1):
+        first = client.get('/api/corporate/rollup').get_json()
+        assert first['companies_loaded'] == len(accounts_with_kpis)
+
+        with record_sql() as statements:
+            second = client.get('/api/corporate/rollup').get_json()
+        assert statements == [s for s in statements if 'data_version' in s]  # only the version read
+        assert len(statements) == 1
+        assert second == first
+
+        with app.app_context():
+            account = db.session.get(Account, accounts_with_kpis[0])
+            account.revenue = 9999999
+            db.session.commit()
+            invalidate_tenant_results(1)
+        third = client.get('/api/corporate/rollup').get_json()
+        assert third['total_revenue'] != first['total_revenue']
+        assert corporate_rollup_cache.stats['loads'] == loads + 2
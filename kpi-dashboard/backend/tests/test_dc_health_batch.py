@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Tests for batch DC health scoring.
+Validates:
+- the NumPy scorer matches a per-KPI calculate_risk_band reference for KPIs matched by id or name
+- uploads derive their period from the file name
+- the batch endpoint scores every account of a month in one KPI query, and aggregates across months
+"""
+
+import random
+from unittest import mock
+
+import pytest
+
+from extensions import db
+from models import Account, KPI, KPIUpload
+from kpi_definitions_dc import DC_KPIS, calculate_risk_band
+from kpi_value_parser import parse_kpi_data
+from health_calculator_dc import (
+    calculate_dc_health_score, load_dc_health_scores, DC_CATEGORY_WEIGHTS, DC_RISK_BAND_SCORES
+)
+from api_routes_dc import api_routes_dc
+
+VALUES = ['99.7%', '98%', '12', '4', '85', '$1,200', '40%', '3 hours', 'N/A', '', None]
+
+
+def reference_dc_health_score(account_kpis):
+    """Per-KPI scoring with calculate_risk_band, the behaviour the batch scorer must reproduce"""
+    by_name = {kpi['name']: kpi for kpi in DC_KPIS.values()}
+    category_kpis = {}
+    for kpi_data in account_kpis:
+        kpi_def = DC_KPIS.get(kpi_data.get('kpi_id')) or by_name.get(kpi_data.get('kpi_parameter'))
+        if kpi_def:
+            category_kpis.setdefault(kpi_def['pillar'], []).append((kpi_def, kpi_data.get('data')))
+
+    total_weighted_score = total_weight = 0
+    for category, kpis in category_kpis.items():
+        scores = [DC_RISK_BAND_SCORES[calculate_risk_band(kpi_def['id'], value)]
+                  for kpi_def, value in ((d, parse_kpi_data(v)[0] if v else None) for d, v in kpis)
+                  if value is not None]
+        avg = sum(scores) / len(scores) if scores else 0
+        total_weighted_score += avg * DC_CATEGORY_WEIGHTS[category]
+        total_weight += DC_CATEGORY_WEIGHTS[category]
+    return round(total_weighted_score / total_weight, 2) if total_weight else 0
+
+
+def random_account_kpis(rng):
+    kpis = []
+    for _ in range(rng.randint(1, 25)):
+        kpi_def = rng.choice(list(DC_KPIS.values()))
+        key = rng.choice(['id', 'name', 'unknown'])
+        kpis.append({
+            'kpi_id': kpi_def['id'] if key == 'id' else None,
+            'kpi_parameter': kpi_def['name'] if key != 'unknown' else 'Unmapped KPI',
+            'data': rng.choice(VALUES)
+        })
+    return kpis
+
+
+def test_batch_scorer_matches_reference():
+    rng = random.Random(9)
+    for _ in range(300):
+        kpis = random_account_kpis(rng)
+        health = calculate_dc_health_score(kpis)
+        assert health['overall_score'] == pytest.approx(reference_dc_health_score(kpis), abs=1e-9)
+        assert health['kpi_count'] == len(kpis)
+        assert health['valid_kpi_count'] == sum(k['kpi_parameter'] != 'Unmapped KPI' for k in kpis)
+
+
+def test_name_matched_kpis_use_risk_bands():
+    # Uploads store the KPI name; a critical uptime must not score as healthy
+    health = calculate_dc_health_score([{'kpi_parameter': 'Server Uptime %', 'data': '98%'}])
+    assert health['category_scores']['Infrastructure & Performance']['score'] == 30
+    assert health['health_status'] == 'critical'
+    assert calculate_dc_health_score([])['health_status'] == 'unknown'
+
+
+def test_upload_period_from_filename():
+    assert KPIUpload(original_filename='Acme_DC_KPIs_Month_3.csv').period == 3
+    assert KPIUpload(original_filename='month 12 export.xlsx').period == 12
+    assert KPIUpload(original_filename='kpis.xlsx').period is None
+
+
+@pytest.fixture
+def app(make_app):
+    app = make_app(api_routes_dc, customers=(1, 2))
+    for account_id in (1, 2, 3):
+        db.session.add(Account(account_id=account_id, customer_id=1, account_name=f'DC {account_id}'))
+    db.session.add(Account(account_id=4, customer_id=2, account_name='Other tenant'))
+    for month, uptime in ((1, '98.6%'), (2, '99.8%')):
+        upload = KPIUpload(customer_id=1, version=month, original_filename=f'A_DC_KPIs_Month_{month}.csv')
+        db.session.add(upload)
+        db.session.flush()
+        for account_id in (1, 2):
+            db.session.add(KPI(upload_id=upload.upload_id, account_id=account_id,
+                               kpi_parameter='Server Uptime %', data=uptime))
+            db.session.add(KPI(upload_id=upload.upload_id, account_id=account_id,
+                               kpi_parameter='Network Latency', data='20' if account_id == 1 else '4'))
+    other = KPIUpload(customer_id=2, version=1, original_filename='B_DC_KPIs_Month_1.csv')
+    db.session.add(other)
+    db.session.flush()
+    db.session.add(KPI(upload_id=other.upload_id, account_id=4, kpi_parameter='Server Uptime %', data='98%'))
+    db.session.commit()
+    return app
+
+
+def test_load_scores_month_and_aggregate(app):
+    with app.app_context():
+        month_1 = load_dc_health_scores(1, 1)
+        assert sorted(month_1) == [1, 2]
+        # Uptime critical (30); latency critical for account 1 (30), healthy for account 2 (85)
+        assert month_1[1]['overall_score'] == 30
+        assert month_1[2]['overall_score'] == pytest.approx((30 + 85) / 2)
+        assert load_dc_health_scores(1, 2)[2]['overall_score'] == 85
+        assert load_dc_health_scores(1, 3) == {}
+
+        # Aggregate: uptime mean 99.2% -> at_risk (60)
+        aggregate = load_dc_health_scores(1)
+        assert aggregate[2]['overall_score'] == pytest.approx((60 + 85) / 2)
+        assert aggregate[2]['kpi_count'] == 2
+
+
+def test_batch_endpoint_uses_one_kpi_query(app, record_sql):
+    client = app.test_client()
+    with record_sql(lambda statement: 'FROM kpis' in statement) as statements:
+        with mock.patch('api_routes_dc.get_current_customer_id', return_value=1):
+            response = client.get('/api/dc/health-scores?month=2')
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert [a['account_id'] for a in body['accounts']] == [1, 2, 3]
+    assert body['accounts'][1]['overall_score'] == 85
+    assert body['accounts'][2]['health_status'] == 'unknown'
+    assert len(statements) == 1
+
+    with mock.patch('api_routes_dc.get_current_customer_id', return_value=1):
+        assert client.get('/api/dc/health-scores?month=x').status_code == 400
+        single = client.get('/api/dc/health-score/2?month=aggregate').get_json()
+    assert single['overall_score'] == pytest.approx((60 + 85) / 2)
+    assert single['is_aggregate'] is True
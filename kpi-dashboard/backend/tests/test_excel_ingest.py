@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Tests for streaming Excel ingestion.
+Validates:
+- iter_workbook_kpis yields the rows the previous pandas iterrows parser produced
+  (header found below title rows, alternative column spellings, missing values)
+- iter_sheet_records leaves empty cells out
+- /api/upload and cleanup_api.process_single_file store the streamed KPIs
+"""
+
+import io
+from unittest import mock
+
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+
+from models import Account, KPI, KPIUpload
+from excel_ingest import iter_workbook_kpis, iter_sheet_records
+from upload_api import upload_api
+from cleanup_api import process_single_file
+
+
+def legacy_parse_workbook(raw_excel, keep_short_workbooks=False):
+    """The pandas parser upload_api used before excel_ingest (logging removed)"""
+    xls = pd.ExcelFile(io.BytesIO(raw_excel))
+    if keep_short_workbooks and len(xls.sheet_names) <= 2:
+        kpi_sheets = xls.sheet_names
+    else:
+        kpi_sheets = xls.sheet_names[1:-1]
+    kpi_data = []
+    for sheet_name in kpi_sheets:
+        df = pd.read_excel(xls, sheet_name, header=None)
+        header_row_idx = df[df.iloc[:, 0] == 'Health Score Component'].index
+        if len(header_row_idx) == 0:
+            continue
+        header_row_idx = header_row_idx[0]
+        df.columns = df.iloc[header_row_idx]
+        df = df.iloc[header_row_idx + 1:]
+        df = df.dropna(subset=['Health Score Component'])
+        for idx, row in df.iterrows():
+            weight_value = row.get('Weight (%)')
+            if weight_value is None:
+                weight_value = row.get('Weight') or row.get('weight') or row.get('WEIGHT') or row.get('WEIGHT (%)')
+            impact_value = (row.get('Impact level') or row.get('Impact Level') or row.get('Impact')
+                            or row.get('impact level') or row.get('IMPACT LEVEL') or None)
+            kpi_row = {
+                'category': sheet_name,
+                'row_index': str(idx),
+                'health_score_component': row.get('Health Score Component'),
+                'weight': weight_value,
+                'data': row.get('Data'),
+                'source_review': row.get('Source Review'),
+                'kpi_parameter': row.get('KPI/Parameter'),
+                'impact_level': impact_value,
+                'measurement_frequency': row.get('Measurement Frequency'),
+            }
+            for key, value in kpi_row.items():
+                if pd.isna(value):
+                    kpi_row[key] = None
+                elif key == 'weight' and value is not None:
+                    kpi_row[key] = str(value)
+            kpi_data.append(kpi_row)
+    return kpi_data
+
+
+def workbook_bytes(sheets):
+    """xlsx bytes of {sheet name: rows}"""
+    workbook = Workbook()
+    workbook.remove(workbook.active)
+    for name, rows in sheets.items():
+        sheet = workbook.create_sheet(name)
+        for row in rows:
+            sheet.append(row)
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+def kpi_workbook():
+    return workbook_bytes({
+        'Account Info': [['Account', 'Acme']],
+        'Product Usage KPI': [
+            ['Product Usage KPIs'],
+            [],
+            ['Health Score Component', 'Weight (%)', 'Data', 'Source Review', 'KPI/Parameter', 'Impact level',
+             'Measurement Frequency'],
+            ['Adoption', 10, '85%', 'Usage logs', 'Feature Adoption Rate', 'High', 'Monthly'],
+            ['Adoption', 12.5, 'N/A', None, 'Active Users', None, 'Weekly'],
+            [None, 5, 'orphan row', None, None, None, None],
+            ['Engagement', None, 42.0, 'CRM', 'Logins', 'Medium'],
+            [],
+            ['Engagement', '15', 3.25, 'CRM', 'Session Length', 'Low', 'Monthly'],
+        ],
+        'Support KPI': [
+            ['Health Score Component', 'KPI/Parameter', 'Data', 'WEIGHT', 'Impact', 'Notes'],
+            ['Response', 'First Response Time', '4 hours', 20, 'High', 'x'],
+            ['Response', 'Ticket Volume', 120, None, 'NA', None],
+        ],
+        'Notes': [['No KPI table here'], ['Health score component', 'lower case is not a header']],
+        'Rollup': [['Health Score Component', 'Data'], ['Rollup row', 1]],
+    })
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app(upload_api)
+
+
+def test_matches_legacy_pandas_parser():
+    raw = kpi_workbook()
+    rows = [row._asdict() for row in iter_workbook_kpis(raw)]
+    assert rows == legacy_parse_workbook(raw)
+    assert len(rows) == 6
+    assert rows[0] == {
+        'category': 'Product Usage KPI', 'row_index': '3', 'health_score_component': 'Adoption', 'weight': '10',
+        'data': '85%', 'source_review': 'Usage logs', 'kpi_parameter': 'Feature Adoption Rate',
+        'impact_level': 'High', 'measurement_frequency': 'Monthly',
+    }
+    assert (rows[2]['weight'], rows[2]['data'], rows[2]['measurement_frequency']) == (None, 42, None)
+    assert (rows[4]['weight'], rows[4]['impact_level'], rows[4]['source_review']) == ('20', 'High', None)
+
+    # Short workbooks are read whole when asked
+    short = workbook_bytes({'KPIs': [['Health Score Component', 'Data'], ['Adoption', '50%']]})
+    assert list(iter_workbook_kpis(short)) == []
+    assert [row._asdict() for row in iter_workbook_kpis(short, keep_short_workbooks=True)] == \
+        legacy_parse_workbook(short, keep_short_workbooks=True)
+
+
+def test_sheet_records_leave_out_empty_cells():
+    raw = workbook_bytes({'Tenants': [
+        ['tenant_id', 'tenant_name', 'arr', None, 'is_strategic'],
+        ['T-1', 'Acme', 1200.0, 'ignored', True],
+        ['T-2', 'Globex', None, None, 'N/A'],
+        [],
+    ]})
+    assert list(iter_sheet_records(raw, 'Tenants')) == [
+        {'tenant_id': 'T-1', 'tenant_name': 'Acme', 'arr': 1200, 'is_strategic': True},
+        {'tenant_id': 'T-2', 'tenant_name': 'Globex'},
+    ]
+
+
+def test_upload_and_cleanup_store_streamed_kpis(app, tmp_path):
+    raw = kpi_workbook()
+    client = app.test_client()
+    with mock.patch('upload_api.get_current_customer_id', return_value=1):
+        response = client.post('/api/upload', headers={'X-User-ID': '1'}, data={
+            'account_name': 'Acme', 'sync': 'true', 'file': (io.BytesIO(raw), 'acme.xlsx')
+        }, content_type='multipart/form-data')
+        assert response.status_code == 200
+        assert response.get_json()['kpi_count'] == 6
+
+        empty = workbook_bytes({'Account Info': [], 'Notes': [['nothing']], 'Rollup': []})
+        response = client.post('/api/upload', headers={'X-User-ID': '1'}, data={
+            'account_name': 'Empty', 'sync': 'true', 'file': (io.BytesIO(empty), 'empty.xlsx')
+        }, content_type='multipart/form-data')
+        assert response.status_code == 400
+
+    account = Account.query.filter_by(account_name='Acme').one()
+    stored = KPI.query.filter_by(account_id=account.account_id).order_by(KPI.kpi_id).all()
+    assert [(k.category, k.kpi_parameter, k.weight, k.data) for k in stored[:2]] == [
+        ('Product Usage KPI', 'Feature Adoption Rate', '10', '85%'),
+        ('Product Usage KPI', 'Active Users', '12.5', None),
+    ]
+    assert Account.query.filter_by(account_name='Empty').count() == 0
+    assert [u.phase for u in KPIUpload.query.order_by(KPIUpload.upload_id)] == ['completed', 'failed']
+
+    path = tmp_path / 'globex_kpis.xlsx'
+    path.write_bytes(raw)
+    result = process_single_file(str(path), 'Globex', 1, 1)
+    assert result['kpi_count'] == 6
+    kpis = KPI.query.filter_by(upload_id=result['upload_id']).order_by(KPI.kpi_id).all()
+    assert [k.impact_level for k in kpis] == ['High', None, 'Medium', 'Low', 'High', None]
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Tests for the synthetic large-tenant generator.
+Validates:
+- the reported row counts match the tables and every related table is populated
+- the same seed produces the same tenant, KPI rows carry their parsed values
+- replace=True swaps the tenant's rows instead of adding to them
+- on PostgreSQL the id sequences are moved past the explicitly written ids
+"""
+
+from datetime import datetime
+from unittest import mock
+
+import pytest
+
+from extensions import db
+from models import (
+    Account, Product, KPI, KPITimeSeries, HealthTrend, AccountSnapshot,
+    PlaybookTrigger, PlaybookExecution, AccountHealthSummary
+)
+from kpi_value_parser import parse_kpi_data_for_storage
+from generate_large_tenant import generate_large_tenant, _sync_id_sequences
+
+AS_OF = datetime(2025, 3, 1)
+
+
+def tenant_rows():
+    accounts = [(a.account_name, float(a.revenue), a.industry, a.region)
+                for a in Account.query.order_by(Account.account_id)]
+    kpis = [(k.account_id, k.product_id, k.kpi_parameter, k.data) for k in KPI.query.order_by(KPI.kpi_id)]
+    return accounts, kpis
+
+
+def test_counts_and_related_tables(make_app):
+    make_app(customers=())
+    counts = generate_large_tenant(customer_id=7, accounts=12, kpis_per_account=8, months=4,
+                                   snapshots_per_account=2, playbook_rate=0.5, as_of=AS_OF, batch_size=7)
+    assert counts['accounts'] == Account.query.count() == 12
+    assert counts['products'] == Product.query.count()
+    assert counts['kpis'] == KPI.query.count() >= 12 * 8
+    assert counts['kpi_time_series'] == KPITimeSeries.query.count() == 12 * 8 * 4
+    assert counts['health_trends'] == HealthTrend.query.count() == 12 * 4
+    assert counts['account_snapshots'] == AccountSnapshot.query.count() == 24
+    assert counts['playbook_triggers'] == PlaybookTrigger.query.count() == 2
+    assert counts['playbook_executions'] == PlaybookExecution.query.count()
+    assert AccountHealthSummary.query.count() == 12
+
+    assert {(t.year, t.month) for t in HealthTrend.query} == {(2024, 12), (2025, 1), (2025, 2), (2025, 3)}
+    product_kpis = KPI.query.filter(KPI.product_id.isnot(None)).all()
+    assert all(db.session.get(Product, k.product_id).account_id == k.account_id for k in product_kpis)
+    for kpi in KPI.query.all():
+        assert (kpi.value_numeric, kpi.value_unit, kpi.value_parse_status) == parse_kpi_data_for_storage(kpi.data)
+
+    with pytest.raises(ValueError):
+        generate_large_tenant(customer_id=8, accounts=5)
+
+
+def test_deterministic_and_replace(make_app):
+    snapshots = []
+    for _ in range(2):
+        make_app(customers=())
+        generate_large_tenant(customer_id=3, accounts=10, as_of=AS_OF, seed=11)
+        snapshots.append(tenant_rows())
+    assert snapshots[0] == snapshots[1]
+
+    make_app(customers=())
+    generate_large_tenant(customer_id=3, accounts=10, as_of=AS_OF, seed=12)
+    assert tenant_rows() != snapshots[0]
+    first_kpis = KPI.query.count()
+
+    generate_large_tenant(customer_id=3, accounts=10, as_of=AS_OF, seed=12, replace=True)
+    assert Account.query.count() == 10
+    assert KPI.query.count() == first_kpis
+    assert HealthTrend.query.count() == 10 * 12
+
+
+def test_postgres_sequences_follow_explicit_ids(make_app):
+    with mock.patch('generate_large_tenant.db') as fake_db:
+        fake_db.session.get_bind.return_value.dialect.name = 'postgresql'
+        _sync_id_sequences()
+    statements = [str(call.args[0]) for call in fake_db.session.execute.call_args_list]
+    assert statements[1] == ("SELECT setval(pg_get_serial_sequence('accounts', 'account_id'), "
+                             "(SELECT COALESCE(MAX(account_id), 1) FROM accounts))")
+    assert [s.split("'")[1] for s in statements] == ['customers', 'accounts', 'products', 'kpi_uploads', 'kpis']
+
+    # SQLite assigns max(id) + 1 itself; the generated tenant keeps accepting ordinary inserts
+    make_app(customers=())
+    generate_large_tenant(customer_id=3, accounts=10, as_of=AS_OF)
+    db.session.add(Account(customer_id=3, account_name='Added later'))
+    db.session.commit()
+    assert Account.query.count() == 11
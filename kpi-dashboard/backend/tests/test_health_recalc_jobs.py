@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Tests for the partitioned health recalculation job runner.
+Validates:
+- partitioned runs store the same scores as the full rollup recompute
+- existing HealthTrend rows are updated in place by the bulk upsert
+- a crashed run resumes from its checkpoint without redoing finished partitions
+- the process pool path writes the same rows
+"""
+
+import os
+import random
+from unittest import mock
+
+import pytest
+
+from extensions import db
+from models import Account, KPI, HealthTrend, AccountHealthPartial
+from health_score_storage import HealthScoreStorageService
+from reference_range_index import invalidate_reference_ranges
+import health_recalc_jobs
+from health_recalc_jobs import HealthRecalcJobRunner
+
+CATEGORIES = ['Product Usage KPI', 'Support KPI', 'Customer Sentiment KPI',
+              'Business Outcomes KPI', 'Relationship Strength KPI']
+KPI_NAMES = ['Feature Adoption Rate', 'First Response Time', 'Net Promoter Score (NPS)', 'Ticket Volume']
+VALUES = ['85%', '40%', '4 hours', '2 days', '$45', '12', 'N/A', '']
+MONTH, YEAR = 3, 2025
+
+
+@pytest.fixture
+def database_url(tmp_path):
+    return f"sqlite:///{tmp_path / 'health.db'}"
+
+
+@pytest.fixture
+def app(make_app, database_url):
+    app = make_app(customers=(1, 2, 3), SQLALCHEMY_DATABASE_URI=database_url)
+    invalidate_reference_ranges()
+    rng = random.Random(11)
+    account_id = 0
+    for customer_id in (1, 2, 3):
+        for _ in range(7):
+            account_id += 1
+            db.session.add(Account(account_id=account_id, customer_id=customer_id,
+                                   account_name=f'Account {account_id}'))
+            for _ in range(rng.randint(0, 12)):
+                db.session.add(KPI(account_id=account_id, kpi_parameter=rng.choice(KPI_NAMES),
+                                   data=rng.choice(VALUES), category=rng.choice(CATEGORIES),
+                                   impact_level=rng.choice(['High', 'Medium', 'Low'])))
+    # Stale row that the job must overwrite
+    db.session.add(HealthTrend(account_id=1, customer_id=1, month=MONTH, year=YEAR, overall_health_score=1))
+    db.session.commit()
+    yield app
+    invalidate_reference_ranges()
+
+
+def assert_matches_full_recompute(customer_ids):
+    service = HealthScoreStorageService()
+    trends = {t.account_id: t for t in HealthTrend.query.filter_by(month=MONTH, year=YEAR).all()}
+    for customer_id in customer_ids:
+        expected = service._calculate_customer_health_scores(customer_id)
+        for account in Account.query.filter_by(customer_id=customer_id).all():
+            trend = trends[account.account_id]
+            health = expected.get(account.account_id)
+            if health is None:
+                assert float(trend.overall_health_score) == 0
+                continue
+            assert float(trend.overall_health_score) == pytest.approx(health['overall'], abs=0.01)
+            assert float(trend.support_score) == pytest.approx(health['support'], abs=0.01)
+            assert trend.total_kpis == health['total_kpis']
+            assert trend.valid_kpis == health['valid_kpis']
+    assert HealthTrend.query.filter_by(account_id=1).count() == 1
+
+
+def test_partitioned_run_matches_full_recompute(app):
+    with app.app_context():
+        updates = []
+        runner = HealthRecalcJobRunner(workers=1, partition_size=3, progress=updates.append)
+        result = runner.run([1, 2, 3], month=MONTH, year=YEAR)
+
+        assert result['accounts_done'] == 21
+        assert result['partitions_total'] == 9
+        assert len(updates) == 10 and updates[-1]['finished']
+        assert_matches_full_recompute([1, 2, 3])
+        assert AccountHealthPartial.query.count() == 21 * 5
+
+
+def test_resume_from_checkpoint(app, tmp_path):
+    checkpoint = str(tmp_path / 'recalc.json')
+    real_run_partition = health_recalc_jobs._run_partition
+    calls = []
+
+    def crash_on_fourth(partition, month, year):
+        calls.append(partition)
+        if len(calls) == 4:
+            raise RuntimeError('worker died')
+        return real_run_partition(partition, month, year)
+
+    def record(partition, month, year):
+        calls.append(partition)
+        return real_run_partition(partition, month, year)
+
+    with app.app_context():
+        runner = HealthRecalcJobRunner(workers=1, partition_size=3, checkpoint_path=checkpoint)
+        with mock.patch.object(health_recalc_jobs, '_run_partition', side_effect=crash_on_fourth):
+            with pytest.raises(RuntimeError):
+                runner.run([1, 2, 3], month=MONTH, year=YEAR)
+        assert os.path.exists(checkpoint)
+
+        calls.clear()
+        with mock.patch.object(health_recalc_jobs, '_run_partition', side_effect=record):
+            result = runner.run([1, 2, 3], month=MONTH, year=YEAR)
+
+        # The three partitions (customer 1) finished before the crash are not run again
+        assert len(calls) == 6
+        assert result['accounts_done'] == 21
+        assert result['resumed_accounts'] == 7
+        assert not os.path.exists(checkpoint)
+        assert_matches_full_recompute([1, 2, 3])
+
+
+def test_process_pool_run(app, database_url):
+    with app.app_context():
+        runner = HealthRecalcJobRunner(database_url=database_url, workers=2, partition_size=4)
+        result = runner.run([1, 2, 3], month=MONTH, year=YEAR)
+        assert result['accounts_done'] == 21
+        db.session.expire_all()
+        assert_matches_full_recompute([1, 2, 3])
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Tests for the NumPy batch health score engine.
+The batch path must reproduce the per-KPI HealthScoreEngine results exactly.
+"""
+
+import math
+import random
+from unittest import mock
+
+import pytest
+
+from health_score_config import KPI_REFERENCE_RANGES, get_kpi_reference_range
+from health_score_engine import HealthScoreEngine
+from health_score_batch import BatchHealthScoreEngine
+
+CATEGORIES = ['Product Usage KPI', 'Support KPI', 'Customer Sentiment KPI',
+              'Business Outcomes KPI', 'Relationship Strength KPI']
+VALUES = ['85%', '12.5%', '$45', '$2.5K', '$1M', '3.2', '4 hours', '2 days', '1,200',
+          '', 'None', 'N/A', 'nan', '-20', '150%', '0', '999999', '7 days', '1.5K']
+
+
+@pytest.fixture(autouse=True)
+def config_reference_ranges():
+    """Resolve reference ranges from config so no database is needed"""
+    with mock.patch.object(HealthScoreEngine, 'get_kpi_reference_range_from_db',
+                           side_effect=lambda kpi_name, customer_id=None: get_kpi_reference_range(kpi_name)):
+        yield
+
+
+def make_kpis(n_accounts=12, seed=7):
+    rng = random.Random(seed)
+    names = list(KPI_REFERENCE_RANGES.keys()) + ['Unknown Custom KPI']
+    kpis = []
+    for account_id in range(1, n_accounts + 1):
+        for _ in range(rng.randint(0, 25)):
+            kpis.append({
+                'account_id': account_id,
+                'kpi_parameter': rng.choice(names),
+                'data': rng.choice(VALUES),
+                'impact_level': rng.choice(['High', 'Medium', 'Low', None]),
+                'category': rng.choice(CATEGORIES),
+            })
+    return kpis
+
+
+def same(a, b):
+    if isinstance(a, float) and isinstance(b, float) and math.isnan(a) and math.isnan(b):
+        return True
+    return a == b
+
+
+def per_kpi_scores(kpis):
+    """Reference implementation: the existing per-account, per-category loop"""
+    by_account = {}
+    for kpi in kpis:
+        by_account.setdefault(kpi['account_id'], {}).setdefault(kpi['category'], []).append(kpi)
+    results = {}
+    for account_id, categories in by_account.items():
+        category_scores = [HealthScoreEngine.calculate_category_health_score(k, c) for c, k in categories.items()]
+        results[account_id] = {
+            'category_scores': category_scores,
+            'overall_score': HealthScoreEngine.calculate_overall_health_score(category_scores),
+        }
+    return results
+
+
+def test_batch_matches_per_kpi_path():
+    kpis = make_kpis()
+    expected = per_kpi_scores(kpis)
+    actual = BatchHealthScoreEngine.calculate_health_scores(kpis, include_kpi_details=True)
+
+    assert list(actual.keys()) == list(expected.keys())
+    for account_id, exp in expected.items():
+        act = actual[account_id]
+        assert act['overall_score']['overall_score'] == exp['overall_score']['overall_score']
+        assert act['overall_score']['health_status'] == exp['overall_score']['health_status']
+        assert len(act['category_scores']) == len(exp['category_scores'])
+        for a, e in zip(act['category_scores'], exp['category_scores']):
+            for key in ('category', 'total_score', 'total_units', 'normalized_score', 'weighted_category_score',
+                        'health_status', 'color', 'kpi_count', 'valid_kpi_count', 'category_weight'):
+                assert a[key] == e[key], (account_id, a['category'], key)
+            for ak, ek in zip(a['enhanced_kpis'], e['enhanced_kpis']):
+                for key in ('parsed_value', 'health_status', 'health_score', 'health_color',
+                            'reference_range', 'impact_weight', 'weighted_score'):
+                    assert same(ak[key], ek[key]), (account_id, ek['kpi_parameter'], ek['data'], key)
+
+
+def test_single_group_rollup():
+    kpis = make_kpis(n_accounts=5, seed=11)
+    categories = {}
+    for kpi in kpis:
+        categories.setdefault(kpi['category'], []).append(kpi)
+    expected = HealthScoreEngine.calculate_overall_health_score(
+        [HealthScoreEngine.calculate_category_health_score(k, c) for c, k in categories.items()])
+
+    actual = BatchHealthScoreEngine.calculate_health_scores(kpis, group_by=None)[None]
+    assert actual['overall_score']['overall_score'] == expected['overall_score']
+
+
+def test_category_weight_override_skips_invalid_categories():
+    kpis = [
+        {'account_id': 1, 'kpi_parameter': 'Feature Adoption Rate', 'data': '90%',
+         'impact_level': 'High', 'category': 'Product Usage KPI'},
+        {'account_id': 1, 'kpi_parameter': 'First Response Time', 'data': 'n/a',
+         'impact_level': 'High', 'category': 'Support KPI'},
+        {'account_id': 1, 'kpi_parameter': 'Ticket Volume', 'data': '50',
+         'impact_level': 'Low', 'category': 'Other'},
+    ]
+    weights = {'Product Usage KPI': 0.3, 'Support KPI': 0.2}
+    result = BatchHealthScoreEngine.calculate_health_scores(kpis, category_weights=weights)[1]
+
+    assert [c['category'] for c in result['category_scores']] == ['Product Usage KPI']
+    assert result['overall_score']['overall_score'] == result['category_scores'][0]['normalized_score']
+
+
+def test_empty_input():
+    assert BatchHealthScoreEngine.calculate_health_scores([]) == {}
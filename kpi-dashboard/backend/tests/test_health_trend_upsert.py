@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Tests for the set-based HealthTrend write after a rollup.
+Validates:
+- stored trends match _calculate_account_health_scores run per account
+- an existing trend for the month is updated in place, KPI counts included
+- the number of statements does not grow with the number of accounts
+- per-tenant timings are recorded for each store
+"""
+
+import random
+
+import pytest
+
+from extensions import db
+from models import Account, KPI, HealthTrend
+from health_score_storage import HealthScoreStorageService
+from reference_range_index import invalidate_reference_ranges
+
+CATEGORIES = ['Product Usage KPI', 'Support KPI', 'Customer Sentiment KPI',
+              'Business Outcomes KPI', 'Relationship Strength KPI']
+KPI_NAMES = ['Feature Adoption Rate', 'First Response Time', 'Net Promoter Score (NPS)', 'Ticket Volume']
+VALUES = ['85%', '40%', '4 hours', '2 days', '$45', '12', 'N/A', '']
+MONTH, YEAR = 3, 2025
+
+
+@pytest.fixture
+def app(make_app):
+    app = make_app(customers=(1, 2))
+    invalidate_reference_ranges()
+    rng = random.Random(7)
+    account_id = 0
+    for customer_id, accounts in ((1, 3), (2, 30)):
+        for _ in range(accounts):
+            account_id += 1
+            db.session.add(Account(account_id=account_id, customer_id=customer_id,
+                                   account_name=f'Account {account_id}'))
+            # Some accounts have no KPIs and are stored with empty health
+            for _ in range(rng.choice([0, 4, 10])):
+                db.session.add(KPI(account_id=account_id, kpi_parameter=rng.choice(KPI_NAMES),
+                                   data=rng.choice(VALUES), category=rng.choice(CATEGORIES),
+                                   impact_level=rng.choice(['High', 'Medium', 'Low'])))
+    db.session.commit()
+    yield app
+    invalidate_reference_ranges()
+
+
+def test_matches_per_account_scores(app):
+    with app.app_context():
+        service = HealthScoreStorageService()
+        assert service.store_health_scores_after_rollup({}, 2, MONTH, YEAR) == 30
+
+        trends = {t.account_id: t for t in HealthTrend.query.all()}
+        assert len(trends) == 30
+        for account in Account.query.filter_by(customer_id=2):
+            expected = service._calculate_account_health_scores(account, 2)
+            trend = trends[account.account_id]
+            assert (trend.customer_id, trend.month, trend.year) == (2, MONTH, YEAR)
+            assert float(trend.overall_health_score) == pytest.approx(expected['overall'], abs=0.01)
+            # Categories without a valid KPI are left out of the per-account dict
+            assert float(trend.support_score) == pytest.approx(expected.get('support', 0), abs=0.01)
+            assert trend.total_kpis == expected['total_kpis']
+            assert trend.valid_kpis == expected['valid_kpis']
+
+
+def test_existing_trend_updated_in_place(app):
+    with app.app_context():
+        db.session.add(HealthTrend(account_id=1, customer_id=1, month=MONTH, year=YEAR,
+                                   overall_health_score=1, total_kpis=99, valid_kpis=99))
+        db.session.commit()
+        trend_id = HealthTrend.query.one().trend_id
+
+        HealthScoreStorageService().store_health_scores_after_rollup({}, 1, MONTH, YEAR)
+        db.session.expire_all()
+
+        trend = HealthTrend.query.filter_by(account_id=1).one()
+        assert trend.trend_id == trend_id
+        assert trend.total_kpis == KPI.query.filter_by(account_id=1).count()
+        assert HealthTrend.query.count() == 3
+
+
+def test_statement_count_is_independent_of_account_count(app, record_sql):
+    def count_statements(customer_id):
+        service = HealthScoreStorageService()
+        with record_sql() as statements:
+            service.store_health_scores_after_rollup({}, customer_id, MONTH, YEAR)
+        return len(statements), service.timings['health_trends']
+
+    with app.app_context():
+        # Warm the reference range index so both runs resolve ranges from memory
+        for customer_id in (1, 2):
+            count_statements(customer_id)
+        small, _ = count_statements(1)
+        large, timing = count_statements(2)
+        assert small == large
+
+        assert timing['customer_id'] == 2 and timing['rows'] == 30
+        assert timing['total_ms'] >= timing['score_ms'] + timing['write_ms'] - 0.1
+        assert timing['rows_per_second'] > 0
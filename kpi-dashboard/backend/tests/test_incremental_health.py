@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Tests for incremental health recomputation on single-KPI edits.
+Validates:
+- edits update the current-month HealthTrend from the category partial sums
+- a run of random edits stays consistent with the full recompute
+- accounts without partials are rebuilt on their first edit
+"""
+
+import random
+
+import pytest
+
+from extensions import db
+from models import Account, KPI, HealthTrend, AccountHealthPartial
+from health_score_storage import HealthScoreStorageService
+from incremental_health import IncrementalHealthService
+from reference_range_index import invalidate_reference_ranges
+
+CATEGORIES = ['Product Usage KPI', 'Support KPI', 'Customer Sentiment KPI',
+              'Business Outcomes KPI', 'Relationship Strength KPI', 'Other']
+KPI_NAMES = ['Feature Adoption Rate', 'First Response Time', 'Net Promoter Score (NPS)', 'Ticket Volume']
+VALUES = ['85%', '40%', '4 hours', '2 days', '$45', '12', 'N/A', '']
+
+
+@pytest.fixture
+def app(make_app):
+    app = make_app()
+    invalidate_reference_ranges()
+    rng = random.Random(3)
+    for account_id in (1, 2, 3):
+        db.session.add(Account(account_id=account_id, customer_id=1, account_name=f'Account {account_id}'))
+        for _ in range(20):
+            db.session.add(KPI(account_id=account_id, kpi_parameter=rng.choice(KPI_NAMES),
+                               data=rng.choice(VALUES), category=rng.choice(CATEGORIES),
+                               impact_level=rng.choice(['High', 'Medium', 'Low'])))
+    db.session.commit()
+    return app
+
+
+def edit(kpi, **fields):
+    before = IncrementalHealthService.capture(kpi)
+    for field, value in fields.items():
+        setattr(kpi, field, value)
+    IncrementalHealthService.apply_kpi_edit(before, kpi, customer_id=1)
+    db.session.commit()
+
+
+def test_edit_updates_health_trend(app):
+    with app.app_context():
+        HealthScoreStorageService().store_health_scores_after_rollup({}, 1)
+        kpi = KPI.query.filter_by(account_id=1, category='Product Usage KPI').first()
+        trend = HealthTrend.query.filter_by(account_id=1).one()
+        before_score = float(trend.overall_health_score)
+
+        edit(kpi, kpi_parameter='Feature Adoption Rate', data='0%', impact_level='High')
+        assert float(HealthTrend.query.filter_by(account_id=1).one().overall_health_score) < before_score
+        assert IncrementalHealthService.check_consistency(1) == []
+
+
+def test_random_edits_match_full_recompute(app):
+    with app.app_context():
+        HealthScoreStorageService().store_health_scores_after_rollup({}, 1)
+        rng = random.Random(5)
+        kpis = KPI.query.order_by(KPI.kpi_id).all()
+        for _ in range(100):
+            kpi = rng.choice(kpis)
+            field = rng.choice(['data', 'impact_level', 'category', 'kpi_parameter', 'account_id'])
+            value = {
+                'data': rng.choice(VALUES),
+                'impact_level': rng.choice(['High', 'Medium', 'Low', None]),
+                'category': rng.choice(CATEGORIES),
+                'kpi_parameter': rng.choice(KPI_NAMES),
+                'account_id': rng.choice([1, 2, 3]),
+            }[field]
+            edit(kpi, **{field: value})
+
+        assert IncrementalHealthService.check_consistency(1) == []
+        for trend in HealthTrend.query.all():
+            kpis = KPI.query.filter_by(account_id=trend.account_id).all()
+            assert trend.total_kpis == len(kpis)
+            assert trend.valid_kpis == sum(k.value_parse_status == 'parsed' for k in kpis)
+
+
+def test_unseeded_account_is_rebuilt(app):
+    with app.app_context():
+        kpi = KPI.query.filter_by(account_id=2).first()
+        edit(kpi, data='50%')
+
+        assert AccountHealthPartial.query.filter_by(account_id=2).count() == 5
+        assert HealthTrend.query.filter_by(account_id=2).count() == 1
+        assert IncrementalHealthService.check_consistency(1) == []
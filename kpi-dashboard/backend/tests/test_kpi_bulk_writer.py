@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Tests for the bulk KPI writer.
+Validates:
+- write_kpis stores the rows the ORM path stored, parsed values included, in
+  one INSERT per batch, and reports rows/sec and the batch count
+- COPY rows quote every value so NULL and empty strings stay distinct
+- /api/upload and /api/rehydrate/import write through it and report timings
+"""
+
+import csv
+import io
+from unittest import mock
+
+import pandas as pd
+import pytest
+
+from extensions import db
+from models import Account, Product, KPI, KPIUpload
+from kpi_bulk_writer import KPI_BULK_COLUMNS, _csv_field, write_kpis
+from analytics_cube import analytics_cube
+from upload_api import upload_api
+from rehydration_api import rehydration_api
+from test_excel_ingest import kpi_workbook
+
+DATA = ['85%', '4 hours', '$45,000', 'N/A', '', None, '1.2e400', 12]
+
+
+@pytest.fixture
+def app(make_app):
+    app = make_app(upload_api, rehydration_api, admin=True, KPI_BULK_BATCH_SIZE=4)
+    db.session.add(Account(account_id=1, customer_id=1, account_name='Acme'))
+    db.session.commit()
+    return app
+
+
+def test_matches_orm_rows_in_batches(app, record_sql):
+    with app.app_context():
+        values = [{'account_id': 1, 'category': 'Support KPI', 'kpi_parameter': f'KPI {n}', 'data': data,
+                   'weight': '10', 'row_index': n} for n, data in enumerate(DATA)]
+        for row in values:
+            db.session.add(KPI(**row))
+        db.session.commit()
+        expected = [tuple(getattr(k, c) for c in KPI_BULK_COLUMNS) for k in KPI.query.order_by(KPI.kpi_id)]
+        KPI.query.delete()
+        db.session.commit()
+
+        invalidations = analytics_cube.stats['invalidations']
+        with record_sql() as statements:
+            stats = write_kpis(iter(values))
+        db.session.commit()
+
+        assert (stats['rows'], stats['batch_count'], stats['method']) == (8, 2, 'insert')
+        assert stats['rows_per_second'] > 0
+        assert len([s for s in statements if s.startswith('INSERT')]) == 2
+        assert [tuple(getattr(k, c) for c in KPI_BULK_COLUMNS) for k in KPI.query.order_by(KPI.kpi_id)] == expected
+        assert analytics_cube.stats['invalidations'] > invalidations
+
+        empty = write_kpis([])
+        assert (empty['rows'], empty['batch_count'], empty['rows_per_second']) == (0, 0, 0)
+
+
+def test_commit_batches(app):
+    with app.app_context():
+        with mock.patch.object(db.session, 'commit', wraps=db.session.commit) as commit:
+            stats = write_kpis(({'account_id': 1, 'kpi_parameter': f'KPI {n}'} for n in range(10)),
+                               batch_size=3, commit_batches=True)
+        assert stats['batch_count'] == commit.call_count == 4
+        db.session.rollback()
+        assert KPI.query.count() == 10
+
+
+def test_copy_fields_keep_null_and_empty_apart():
+    line = ','.join(_csv_field(v) for v in [None, '', 'say "hi"', 'a,b', 12, 1.5])
+    assert line == ',"","say ""hi""","a,b","12","1.5"'
+    assert next(csv.reader([line])) == ['', '', 'say "hi"', 'a,b', '12', '1.5']
+
+
+def test_upload_and_rehydrate_report_write_timings(app):
+    client = app.test_client()
+    with app.app_context():
+        with mock.patch('upload_api.get_current_customer_id', return_value=1):
+            body = client.post('/api/upload', headers={'X-User-ID': '1'}, data={
+                'account_name': 'Globex', 'sync': 'true', 'file': (io.BytesIO(kpi_workbook()), 'globex.xlsx')
+            }, content_type='multipart/form-data').get_json()
+        assert (body['kpi_count'], body['batch_count']) == (6, 2)
+        assert body['rows_per_second'] > 0
+        globex = Account.query.filter_by(account_name='Globex').one()
+        assert KPI.query.filter_by(account_id=globex.account_id).count() == 6
+
+        buffer = io.BytesIO()
+        with pd.ExcelWriter(buffer) as writer:
+            pd.DataFrame(['Customer ID: 1', 'Export Version: 1']).to_excel(
+                writer, sheet_name='Export Metadata', header=False, index=False)
+            pd.DataFrame({'Account ID': [1, 2], 'Account Name': ['Acme', 'Initech']}).to_excel(
+                writer, sheet_name='Accounts Summary', index=False)
+            pd.DataFrame({'Product ID': [7], 'Account ID': [2], 'Account Name': ['Initech'],
+                          'Product Name': ['Core']}).to_excel(writer, sheet_name='Products', index=False)
+            pd.DataFrame({
+                'Account ID': [1] * 5 + [99, 2],
+                'Account Name': ['Acme'] * 5 + ['Initech', 'Unknown'],
+                'KPI Parameter': [f'KPI {n}' for n in range(7)],
+                'Product ID': [None] * 5 + [7, None],
+                'Product Name': [None] * 5 + ['Core', None],
+                'Data': ['85%', '4 hours', None, '12', 'N/A', '50%', '1'],
+            }).to_excel(writer, sheet_name='All KPIs', index=False)
+
+        with mock.patch('rehydration_api.get_current_customer_id', return_value=1), \
+                mock.patch('rehydration_api.get_current_user_id', return_value=1):
+            body = client.post('/api/rehydrate/import', data={
+                'file': (io.BytesIO(buffer.getvalue()), 'export.xlsx')
+            }, content_type='multipart/form-data').get_json()
+        results = body['results']
+        assert (results['kpis_created'], results['kpi_batch_count']) == (7, 2), body
+        assert results['kpi_rows_per_second'] > 0
+
+        db.session.expire_all()
+        accounts = {a.account_name: a.account_id for a in Account.query}
+        assert set(accounts) == {'Acme', 'Initech'}
+        kpis = KPI.query.order_by(KPI.kpi_parameter).all()
+        product = Product.query.one()
+        assert [k.account_id for k in kpis] == [accounts['Acme']] * 5 + [accounts['Initech']] * 2
+        assert kpis[5].product_id == product.product_id and kpis[6].product_id is None
+        assert (kpis[0].value_numeric, kpis[0].value_unit) == (85.0, '%')
+        assert KPIUpload.query.count() == 1
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Tests for GET /api/kpis/customer/all pagination, projection and streaming.
+Validates:
+- the default response is still the full JSON array
+- keyset pages (cursor on kpi_id) concatenate to the full list
+- fields= projects the response and skips unneeded joins
+- category / account / product filters
+- format=ndjson streams one KPI per line
+"""
+
+import json
+from unittest import mock
+
+import pytest
+
+from extensions import db
+from models import Account, KPI, KPIUpload, Product
+from kpi_api import kpi_api, KPI_LIST_COLUMNS
+
+CATEGORIES = ['Product Usage KPI', 'Support KPI']
+
+
+@pytest.fixture
+def app(make_app):
+    app = make_app(kpi_api, customers=(1, 2))
+    upload = KPIUpload(upload_id=1, customer_id=1, version=1, original_filename='kpis.xlsx')
+    db.session.add(upload)
+    for account_id in range(1, 6):
+        db.session.add(Account(account_id=account_id, customer_id=1, account_name=f'Account {account_id}',
+                               revenue=1000 * account_id))
+        db.session.add(Product(product_id=account_id, account_id=account_id, customer_id=1,
+                               product_name=f'Product {account_id}'))
+        for i in range(5):
+            db.session.add(KPI(account_id=account_id, upload_id=1 if i % 2 else None,
+                               product_id=account_id if i == 0 else None,
+                               kpi_parameter=f'KPI {i}', data=f'{i * 10}%', category=CATEGORIES[i % 2]))
+    db.session.add(Account(account_id=6, customer_id=2, account_name='Other tenant'))
+    db.session.add(KPI(account_id=6, kpi_parameter='KPI 0', data='1'))
+    db.session.commit()
+    return app
+
+
+def get(app, path):
+    client = app.test_client()
+    with mock.patch('kpi_api.get_current_customer_id', return_value=1):
+        return client.get(path)
+
+
+def test_default_response_is_full_list(app):
+    data = get(app, '/api/kpis/customer/all').get_json()
+    assert isinstance(data, list) and len(data) == 25
+    assert set(data[0]) == set(KPI_LIST_COLUMNS)
+    first = data[0]
+    assert first['account_revenue'] == 1000.0
+    assert first['product_name'] == 'Product 1'
+    assert data[1]['upload_filename'] == 'kpis.xlsx'
+    assert [kpi['kpi_id'] for kpi in data] == sorted(kpi['kpi_id'] for kpi in data)
+
+
+def test_keyset_pages_cover_the_list(app):
+    full = get(app, '/api/kpis/customer/all').get_json()
+    pages, cursor = [], None
+    while True:
+        path = '/api/kpis/customer/all?limit=7' + (f'&cursor={cursor}' if cursor else '')
+        body = get(app, path).get_json()
+        pages.extend(body['kpis'])
+        cursor = body['next_cursor']
+        if cursor is None:
+            break
+    assert pages == full
+
+
+def test_projection_and_filters(app, record_sql):
+    with record_sql(lambda statement: 'FROM kpis' in statement) as statements:
+        data = get(app, '/api/kpis/customer/all?fields=kpi_parameter,data&category=Support+KPI&account_id=2').get_json()
+
+    assert data == [{'kpi_parameter': 'KPI 1', 'data': '10%'}, {'kpi_parameter': 'KPI 3', 'data': '30%'}]
+    assert 'products' not in statements[0] and 'kpi_uploads' not in statements[0]
+
+    by_product = get(app, '/api/kpis/customer/all?product_id=3&fields=kpi_id,product_name').get_json()
+    assert [kpi['product_name'] for kpi in by_product] == ['Product 3']
+
+    response = get(app, '/api/kpis/customer/all?fields=data,secret')
+    assert response.status_code == 400
+
+
+def test_ndjson_stream(app):
+    response = get(app, '/api/kpis/customer/all?format=ndjson&fields=kpi_id,account_name')
+    assert response.mimetype == 'application/x-ndjson'
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert len(rows) == 25
+    assert rows[0] == {'kpi_id': 1, 'account_name': 'Account 1'}
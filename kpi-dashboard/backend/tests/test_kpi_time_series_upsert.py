@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Tests for the bulk KPITimeSeries monthly capture.
+Validates:
+- stored values, statuses and scores match the per-KPI HealthScoreEngine path
+- capturing the same month again updates rows in place (same ids, no duplicates)
+- the number of statements does not grow with the number of KPIs
+"""
+
+import random
+
+import pytest
+
+from extensions import db
+from models import Account, KPI, KPITimeSeries
+from health_score_engine import HealthScoreEngine
+from health_score_storage import HealthScoreStorageService, upsert_kpi_time_series
+from kpi_value_parser import parse_kpi_data_for_storage
+from reference_range_index import invalidate_reference_ranges
+
+KPI_NAMES = ['Feature Adoption Rate', 'First Response Time', 'Net Promoter Score (NPS)', 'Ticket Volume']
+VALUES = ['85%', '40%', '4 hours', '2 days', '$45', '12', 'N/A', '']
+MONTH, YEAR = 3, 2025
+
+
+@pytest.fixture
+def app(make_app):
+    app = make_app(customers=(1, 2))
+    invalidate_reference_ranges()
+    yield app
+    invalidate_reference_ranges()
+
+
+def add_kpis(customer_id, accounts, kpis_per_account, seed=5):
+    rng = random.Random(seed)
+    first = (db.session.query(db.func.max(Account.account_id)).scalar() or 0) + 1
+    for account_id in range(first, first + accounts):
+        db.session.add(Account(account_id=account_id, customer_id=customer_id, account_name=f'Account {account_id}'))
+        for n in range(kpis_per_account):
+            data = rng.choice(VALUES)
+            kpi = KPI(account_id=account_id, kpi_parameter=rng.choice(KPI_NAMES), data=data, category='Support KPI')
+            # Half the rows carry the value parsed at write time, the rest are pre-backfill
+            if n % 2:
+                kpi.value_numeric, kpi.value_unit, kpi.value_parse_status = parse_kpi_data_for_storage(data)
+            db.session.add(kpi)
+    db.session.commit()
+
+
+def test_matches_per_kpi_scoring(app):
+    with app.app_context():
+        add_kpis(1, accounts=6, kpis_per_account=10)
+        add_kpis(2, accounts=2, kpis_per_account=5, seed=9)
+
+        stored = HealthScoreStorageService().store_monthly_kpi_data(1, MONTH, YEAR)
+
+        expected = {}
+        for kpi in KPI.query.join(Account).filter(Account.customer_id == 1):
+            value = HealthScoreEngine.parse_kpi_value(kpi.data, kpi.kpi_parameter, customer_id=1)
+            if value is not None:
+                health = HealthScoreEngine.calculate_health_status(value, kpi.kpi_parameter, 1)
+                expected[kpi.kpi_id] = (kpi.account_id, value, health)
+
+        rows = KPITimeSeries.query.all()
+        assert stored == len(rows) == len(expected) > 0
+        for row in rows:
+            account_id, value, health = expected[row.kpi_id]
+            assert (row.account_id, row.customer_id, row.month, row.year) == (account_id, 1, MONTH, YEAR)
+            assert float(row.value) == pytest.approx(value, abs=0.01)
+            assert row.health_status == health['status']
+            assert float(row.health_score) == pytest.approx(health['score'], abs=0.01)
+
+
+def test_recapture_updates_in_place(app):
+    with app.app_context():
+        add_kpis(1, accounts=4, kpis_per_account=6)
+        service = HealthScoreStorageService()
+        service.store_monthly_kpi_data(1, MONTH, YEAR)
+        ids = {row.kpi_id: row.id for row in KPITimeSeries.query}
+
+        kpi = db.session.get(KPI, next(iter(ids)))
+        kpi.kpi_parameter, kpi.data, kpi.value_parse_status = 'Ticket Volume', '7', None
+        db.session.commit()
+        service.store_monthly_kpi_data(1, MONTH, YEAR)
+        db.session.expire_all()
+
+        assert {row.kpi_id: row.id for row in KPITimeSeries.query} == ids
+        assert float(KPITimeSeries.query.filter_by(kpi_id=kpi.kpi_id).one().value) == 7
+
+        service.store_monthly_kpi_data(1, MONTH + 1, YEAR)
+        assert KPITimeSeries.query.count() == 2 * len(ids)
+        assert upsert_kpi_time_series([]) == 0
+
+
+def test_statement_count_is_independent_of_kpi_count(app, record_sql):
+    def count_statements(customer_id):
+        with record_sql() as statements:
+            HealthScoreStorageService().store_monthly_kpi_data(customer_id, MONTH, YEAR)
+        return len(statements)
+
+    with app.app_context():
+        add_kpis(1, accounts=2, kpis_per_account=20)
+        add_kpis(2, accounts=20, kpis_per_account=20)
+        # Warm the reference range index (and this app context's data versions) so
+        # both runs resolve ranges from memory
+        for customer_id in (1, 2):
+            count_statements(customer_id)
+        assert count_statements(1) == count_statements(2) == 2
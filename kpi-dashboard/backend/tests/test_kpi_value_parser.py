@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Property tests for the compiled KPI value parser.
+Validates:
+- randomly generated KPI strings parse exactly like the previous substring/replace
+  parser, except for its known K/M suffix bug on decimal plain values
+- commas, B suffixes and hour/day aliases are accepted everywhere
+- malformed strings are rejected
+- the (raw string, target unit) memo returns the converted values
+"""
+
+import math
+import random
+
+import pytest
+
+from kpi_value_parser import (
+    parse_kpi_data, parse_kpi_value, kpi_number, parser_cache_info, clear_parser_cache,
+    UNIT_PERCENT, UNIT_CURRENCY, UNIT_HOURS, UNIT_DAYS
+)
+
+
+def legacy_parse_kpi_data(data_str):
+    """The substring/replace parser this module replaced, kept as the reference behaviour"""
+    if not data_str or data_str == 'None':
+        return None, None
+
+    data_str = str(data_str).strip()
+
+    try:
+        if '%' in data_str:
+            return float(data_str.replace('%', '')), UNIT_PERCENT
+
+        if '$' in data_str:
+            data_str = data_str.replace('$', '').replace(',', '')
+            if 'k' in data_str.lower():
+                if '.' in data_str:
+                    data_str = str(float(data_str.lower().replace('k', '')) * 1000)
+                else:
+                    data_str = data_str.lower().replace('k', '000')
+            elif 'm' in data_str.lower():
+                if '.' in data_str:
+                    data_str = str(float(data_str.lower().replace('m', '')) * 1000000)
+                else:
+                    data_str = data_str.lower().replace('m', '000000')
+            return float(data_str), UNIT_CURRENCY
+
+        if 'hours' in data_str.lower():
+            return float(data_str.lower().replace('hours', '').strip()), UNIT_HOURS
+
+        if 'days' in data_str.lower():
+            return float(data_str.lower().replace('days', '').strip()), UNIT_DAYS
+
+        if 'k' in data_str.lower():
+            data_str = data_str.lower().replace('k', '000')
+        elif 'm' in data_str.lower():
+            data_str = data_str.lower().replace('m', '000000')
+
+        return float(data_str), None
+    except ValueError:
+        return None, None
+
+
+def random_number(rng):
+    whole = str(rng.randint(0, 99999))
+    if rng.random() < 0.4:
+        return f"{whole}.{rng.randint(0, 999)}"
+    return whole
+
+
+def random_kpi_string(rng):
+    """A KPI string in the grammar both parsers understand, and whether it hits the legacy suffix bug"""
+    sign = rng.choice(['', '', '-'])
+    number = random_number(rng)
+    pad = lambda: rng.choice(['', ' '])
+    kind = rng.choice(['percent', 'currency', 'hours', 'days', 'plain'])
+    if kind == 'percent':
+        return f"{pad()}{sign}{number}{pad()}%{pad()}", False
+    if kind == 'hours':
+        return f"{sign}{number}{pad()}{rng.choice(['hours', 'Hours', 'HOURS'])}", False
+    if kind == 'days':
+        return f"{sign}{number}{pad()}{rng.choice(['days', 'Days'])}", False
+    suffix = rng.choice(['', '', 'k', 'K', 'm', 'M'])
+    if kind == 'currency':
+        if '.' not in number and rng.random() < 0.5:
+            number = f"{int(number):,}"
+        return f"{sign}${number}{suffix}", False
+    return f"{sign}{number}{suffix}", bool(suffix) and '.' in number
+
+
+def same(a, b):
+    (va, ua), (vb, ub) = a, b
+    if ua != ub:
+        return False
+    if va is None or vb is None:
+        return va is vb
+    if math.isnan(va) and math.isnan(vb):
+        return True
+    return va == vb
+
+
+def test_matches_legacy_parser_on_generated_strings():
+    rng = random.Random(8)
+    for _ in range(5000):
+        data, legacy_bug = random_kpi_string(rng)
+        if legacy_bug:
+            continue
+        assert same(parse_kpi_data(data), legacy_parse_kpi_data(data)), data
+
+
+def test_decimal_suffixes_are_scaled():
+    rng = random.Random(9)
+    for _ in range(500):
+        number = f"{rng.randint(0, 999)}.{rng.randint(1, 99)}"
+        for suffix, multiplier in (('K', 1000.0), ('m', 1000000.0), ('B', 1000000000.0)):
+            value, unit = parse_kpi_data(f"{number}{suffix}")
+            assert unit is None
+            assert value == float(number) * multiplier
+    # The legacy parser read "2.5M" as 2.5
+    assert legacy_parse_kpi_data('2.5M') == (2.5, None)
+    assert parse_kpi_data('2.5M') == (2500000.0, None)
+
+
+@pytest.mark.parametrize('data,expected', [
+    ('1,200', (1200.0, None)),
+    ('1,250.5%', (1250.5, UNIT_PERCENT)),
+    ('$1B', (1000000000.0, UNIT_CURRENCY)),
+    ('45$', (45.0, UNIT_CURRENCY)),
+    ('-$45', (-45.0, UNIT_CURRENCY)),
+    ('1 hour', (1.0, UNIT_HOURS)),
+    ('3 hrs', (3.0, UNIT_HOURS)),
+    ('1 day', (1.0, UNIT_DAYS)),
+    ('1e3', (1000.0, None)),
+    (' 85 % ', (85.0, UNIT_PERCENT)),
+    (85, (85.0, None)),
+])
+def test_extended_formats(data, expected):
+    assert parse_kpi_data(data) == expected
+
+
+@pytest.mark.parametrize('data', [
+    '', None, 'None', 'N/A', 'pending', '$', '%', '$1.2.3K', '5k%', '$5K%', '3 months', '+-5', '12 weeks', '4 hours ago'
+])
+def test_rejects_malformed_strings(data):
+    assert parse_kpi_data(data) == (None, None)
+
+
+def test_non_finite_strings_fall_back_to_float():
+    value, unit = parse_kpi_data('nan')
+    assert math.isnan(value) and unit is None
+    assert parse_kpi_data('inf') == (float('inf'), None)
+
+
+def test_memo_converts_to_target_unit():
+    clear_parser_cache()
+    assert parse_kpi_value('48 hours', 'days') == 2.0
+    assert parse_kpi_value('48 hours', 'hours') == 48.0
+    assert parse_kpi_value('2 days', 'hours') == 48.0
+    assert parse_kpi_value('2 days', None) == 2.0
+    assert parse_kpi_value('48 hours', 'days') == 2.0
+    info = parser_cache_info()['parse_kpi_value']
+    assert (info['hits'], info['misses']) == (1, 4)
+    assert parse_kpi_value('') is None
+
+
+def test_kpi_number_for_proxy_scorers():
+    assert kpi_number('') == 0.0
+    assert kpi_number('   ') == 0.0
+    assert kpi_number('$2.5M') == 2500000.0
+    assert kpi_number('N/A') is None
+    assert kpi_number(None) is None
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Tests for the batched customer performance summary.
+Validates:
+- vectorized category scores, focus areas and revenue growth match the per-account computation
+- the summary endpoint prefetches KPIs once and counts playbooks with one aggregate query
+- cached summaries are reused until invalidate_tenant_results()
+"""
+
+import random
+import statistics
+from collections import defaultdict
+from datetime import datetime, timedelta
+from unittest import mock
+
+import pytest
+
+from extensions import db
+from models import Account, KPI, PlaybookExecution
+from kpi_value_parser import parse_kpi_data
+from kpi_queries import get_customer_account_level_kpis
+from tenant_result_cache import invalidate_tenant_results
+from customer_performance_summary_api import customer_perf_summary_api, summarize_account_kpis
+
+CATEGORIES = ['Product Usage KPI', 'Support KPI', 'Customer Sentiment KPI']
+KPI_NAMES = ['Revenue Growth', 'Revenue Growth', 'Feature Adoption Rate', 'First Response Time']
+VALUES = ['85%', '25.7%', '-4.2%', '0%', '4 hours', '$50,000', '120', '', 'N/A', None, '-5']
+
+
+def reference_summary(kpis):
+    """Per-account computation the vectorized summary replaced"""
+    by_account = defaultdict(list)
+    for kpi in kpis:
+        by_account[kpi.account_id].append(kpi)
+    result = {}
+    for account_id, account_kpis in by_account.items():
+        groups = defaultdict(list)
+        for kpi in account_kpis:
+            value = parse_kpi_data(kpi.data)[0]
+            if value is None:
+                groups[kpi.category].append(65)
+            elif 0 <= value <= 100:
+                groups[kpi.category].append(value)
+            else:
+                groups[kpi.category].append(min(100, max(0, value / 10)))
+        category_scores = {category: sum(scores) / len(scores) for category, scores in groups.items()}
+        growth_values = [parse_kpi_data(k.data)[0] for k in account_kpis if k.kpi_parameter == 'Revenue Growth']
+        growth_values = [v for v in growth_values if v is not None]
+        growth = 0.0
+        if len(growth_values) >= 2:
+            mid = len(growth_values) // 2
+            earlier = statistics.mean(growth_values[:mid])
+            if earlier != 0:
+                growth = round((statistics.mean(growth_values[mid:]) - earlier) / earlier * 100, 1)
+        result[account_id] = {
+            'overall_health_score': sum(category_scores.values()) / len(category_scores),
+            'category_scores': category_scores,
+            'focus_areas': sorted(category_scores.items(), key=lambda x: x[1])[:2],
+            'revenue_growth_pct': growth
+        }
+    return result
+
+
+@pytest.fixture
+def app(make_app):
+    app = make_app(customer_perf_summary_api)
+    invalidate_tenant_results()
+    rng = random.Random(12)
+    for account_id in range(1, 31):
+        db.session.add(Account(account_id=account_id, customer_id=1, account_name=f'Account {account_id}',
+                               revenue=account_id * 1000))
+        for _ in range(rng.randint(0, 14)):
+            db.session.add(KPI(account_id=account_id, kpi_parameter=rng.choice(KPI_NAMES),
+                               data=rng.choice(VALUES), category=rng.choice(CATEGORIES)))
+        if account_id % 4 == 0:
+            db.session.add(PlaybookExecution(execution_id=f'exec-{account_id}', customer_id=1,
+                                             account_id=account_id, playbook_id='voc-sprint',
+                                             execution_data={}, started_at=datetime.utcnow() - timedelta(days=10)))
+    db.session.commit()
+    yield app
+    invalidate_tenant_results()
+
+
+def test_vectorized_summary_matches_per_account(app):
+    with app.app_context():
+        kpis = get_customer_account_level_kpis(1)
+        summaries = summarize_account_kpis(kpis)
+        expected = reference_summary(kpis)
+        assert sorted(summaries) == sorted(expected)
+        for account_id, summary in summaries.items():
+            reference = expected[account_id]
+            assert summary['overall_health_score'] == pytest.approx(reference['overall_health_score'])
+            assert list(summary['category_scores']) == list(reference['category_scores'])
+            for category, score in reference['category_scores'].items():
+                assert summary['category_scores'][category] == pytest.approx(score)
+            assert [f['category'] for f in summary['focus_areas']] == [c for c, _ in reference['focus_areas']]
+            assert summary['revenue_growth_pct'] == reference['revenue_growth_pct']
+
+
+def test_summary_endpoint_queries_and_cache(app, record_sql):
+    client = app.test_client()
+    with record_sql() as statements, \
+            mock.patch('customer_performance_summary_api.get_current_customer_id', return_value=1):
+        first = client.get('/api/customer-performance/summary').get_json()
+        cold = len(statements)
+        statements.clear()
+        second = client.get('/api/customer-performance/summary').get_json()
+        warm = len(statements)
+
+    assert first['status'] == 'success'
+    assert first == second
+    # data version + accounts + KPI prefetch + playbook aggregate; then data version + playbook aggregate
+    assert cold == 4
+    assert warm == 2
+    assert first['summary']['total_accounts'] == 30
+    playbooks = {a['account_id']: a['active_playbooks_count'] for a in first['accounts_needing_attention']}
+    assert all(count == (1 if account_id % 4 == 0 else 0) for account_id, count in playbooks.items())
+
+    with app.app_context():
+        db.session.add(KPI(account_id=1, kpi_parameter='Feature Adoption Rate', data='1%', category='Support KPI'))
+        db.session.commit()
+    invalidate_tenant_results(1)
+    with mock.patch('customer_performance_summary_api.get_current_customer_id', return_value=1):
+        third = client.get('/api/customer-performance/summary').get_json()
+    assert third != first
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Tests for the tenant-scoped reference range index.
+Validates:
+- customer overrides take precedence over system defaults
+- scoring many KPIs issues a single reference range query per tenant
+- invalidation picks up committed changes
+- a data version bump by another process retires the cached entry
+- outside requests the data version is read once per app context
+"""
+
+import pytest
+from sqlalchemy import update
+
+from extensions import db
+from models import Customer, KPIReferenceRange
+from health_score_engine import HealthScoreEngine
+from reference_range_index import reference_range_index, invalidate_reference_ranges
+
+
+def make_range(kpi_name, customer_id=None, healthy_min=81):
+    return KPIReferenceRange(
+        customer_id=customer_id, kpi_name=kpi_name, unit='%', higher_is_better=True,
+        critical_min=0, critical_max=50, risk_min=51, risk_max=healthy_min - 1,
+        healthy_min=healthy_min, healthy_max=100
+    )
+
+
+@pytest.fixture
+def app(make_app):
+    app = make_app(customers=(1, 2))
+    db.session.add_all([
+        make_range('Feature Adoption Rate'),
+        make_range('Feature Adoption Rate', customer_id=1, healthy_min=95),
+    ])
+    db.session.commit()
+    invalidate_reference_ranges()
+    yield app
+    invalidate_reference_ranges()
+
+
+def test_customer_override_takes_precedence(app):
+    with app.app_context():
+        override = HealthScoreEngine.get_kpi_reference_range_from_db('Feature Adoption Rate', 1)
+        default = HealthScoreEngine.get_kpi_reference_range_from_db('Feature Adoption Rate', 2)
+        assert override['ranges']['high']['min'] == 95.0
+        assert default['ranges']['high']['min'] == 81.0
+        # Unknown KPIs still fall back to the config file
+        assert HealthScoreEngine.get_kpi_reference_range_from_db('First Response Time', 1)['unit'] == 'hours'
+
+
+def test_scoring_does_one_range_query_per_tenant(app, record_sql):
+    with app.app_context():
+        kpis = [{'kpi_parameter': 'Feature Adoption Rate', 'data': f'{v}%', 'impact_level': 'High'}
+                for v in range(0, 100, 5)]
+        kpis.append({'kpi_parameter': 'Time to First Value (TTFV)', 'data': '48 hours', 'impact_level': 'High'})
+        with record_sql(lambda statement: 'kpi_reference_ranges' in statement) as statements:
+            HealthScoreEngine.calculate_category_health_score(kpis, 'Product Usage KPI', 1)
+        assert len(statements) == 1
+
+
+def test_invalidation_after_commit(app):
+    with app.app_context():
+        assert HealthScoreEngine.calculate_health_status(90.0, 'Feature Adoption Rate', 1)['status'] == 'medium'
+
+        override = KPIReferenceRange.query.filter_by(customer_id=1, kpi_name='Feature Adoption Rate').first()
+        override.healthy_min = 85
+        override.risk_max = 84
+        db.session.commit()
+
+        # Still cached until the writer invalidates
+        assert HealthScoreEngine.calculate_health_status(90.0, 'Feature Adoption Rate', 1)['status'] == 'medium'
+        invalidate_reference_ranges(1)
+        assert HealthScoreEngine.calculate_health_status(90.0, 'Feature Adoption Rate', 1)['status'] == 'high'
+        assert reference_range_index.stats['invalidations'] >= 1
+
+
+def test_change_committed_by_another_process(app):
+    with app.app_context():
+        assert HealthScoreEngine.calculate_health_status(90.0, 'Feature Adoption Rate', 1)['status'] == 'medium'
+        assert HealthScoreEngine.calculate_health_status(90.0, 'Feature Adoption Rate', None)['status'] == 'high'
+
+        # Another process changed customer 1's override and the system default, and
+        # bumped every customer's data version; this process's index was not invalidated
+        override = KPIReferenceRange.query.filter_by(customer_id=1, kpi_name='Feature Adoption Rate').first()
+        override.healthy_min, override.risk_max = 85, 84
+        default = KPIReferenceRange.query.filter_by(customer_id=None, kpi_name='Feature Adoption Rate').first()
+        default.healthy_min, default.risk_max = 95, 94
+        db.session.execute(update(Customer).values(data_version=Customer.data_version + 1))
+        db.session.commit()
+
+    # The next request or job (app context) sees the new versions
+    with app.app_context():
+        assert HealthScoreEngine.calculate_health_status(90.0, 'Feature Adoption Rate', 1)['status'] == 'high'
+        assert HealthScoreEngine.calculate_health_status(90.0, 'Feature Adoption Rate', None)['status'] == 'medium'
+
+
+def test_data_version_read_once_per_app_context(app, record_sql):
+    with app.app_context():
+        HealthScoreEngine.get_kpi_reference_range_from_db('NPS', 1)
+        with record_sql() as statements:
+            for _ in range(100):
+                HealthScoreEngine.get_kpi_reference_range_from_db('NPS', 1)
+        assert statements == []
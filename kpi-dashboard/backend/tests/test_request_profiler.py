@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Tests for the request SQL profiler.
+Validates:
+- only admin requests sending X-Profile-SQL (or every request when enabled) are
+  profiled; other users' headers are ignored unless SQL_PROFILER_ALLOW_HEADER is set
+- query count headers match the statements executed and per-row lookups are flagged as N+1
+- /api/debug/perf ranks endpoints for admins (users.is_admin) and rejects other users
+- without Flask-Login nobody is an admin: the route answers 403, the header is ignored
+"""
+
+import pytest
+from flask import g
+from flask_login import LoginManager
+
+from extensions import db
+from models import Account, KPI, User
+from request_profiler import request_profiler, statement_shape
+from corporate_api import corporate_api
+from debug_perf_api import debug_perf_api
+
+TENANT_A = {'X-Customer-ID': '1'}
+# Logged-in users, by the test request loader
+ADMIN = {**TENANT_A, 'X-Test-User': '1'}
+USER = {**TENANT_A, 'X-Test-User': '2'}
+
+
+@pytest.fixture
+def app(make_app):
+    app = make_app(corporate_api, debug_perf_api, admin=True,
+                   SQL_PROFILER_ENABLED=False, SQL_PROFILER_N_PLUS_ONE_THRESHOLD=5)
+    # Requests share the test's app context (and g); load each one's user afresh
+    app.before_request(lambda: g.pop('_login_user', None) and None)
+    request_profiler.init_app(app)
+    login_manager = LoginManager(app)
+    login_manager.request_loader(
+        lambda request: db.session.get(User, int(request.headers['X-Test-User']))
+        if 'X-Test-User' in request.headers else None
+    )
+    db.session.add(User(user_id=2, customer_id=1, user_name='User', email='user@example.com', password_hash='x'))
+    for account_id in range(1, 13):
+        db.session.add(Account(account_id=account_id, customer_id=1, account_name=f'Account {account_id}'))
+        db.session.add(KPI(account_id=account_id, kpi_parameter='NPS', category='Support', data='40'))
+    db.session.commit()
+    request_profiler.reset()
+    yield app
+    request_profiler.enabled = request_profiler.allow_header = False
+    request_profiler.reset()
+
+
+def test_statement_shape():
+    assert statement_shape("SELECT * FROM kpis_2 WHERE account_id = 7 AND data = 'a''b'") == \
+        statement_shape('SELECT *  FROM kpis_2\nWHERE account_id = ? AND data = ?') == \
+        'SELECT * FROM kpis_2 WHERE account_id = ? AND data = ?'
+    assert statement_shape('SELECT x FROM t WHERE id IN (%(id_1_1)s, %(id_1_2)s) AND y::text = :y') == \
+        'SELECT x FROM t WHERE id IN (?) AND y::text = ?'
+
+
+def test_profiles_only_opted_in_requests(app, record_sql):
+    client = app.test_client()
+    plain = client.get('/api/corporate/companies', headers=TENANT_A)
+    assert plain.status_code == 200
+    assert 'X-SQL-Query-Count' not in plain.headers
+    assert request_profiler.report() == []
+
+    # The header alone does not turn profiling on
+    ignored = client.get('/api/corporate/companies', headers={**USER, 'X-Profile-SQL': '1'})
+    assert 'X-SQL-Query-Count' not in ignored.headers
+    assert request_profiler.report() == []
+
+    # The session's user is loaded before profiling starts
+    with record_sql(lambda statement: 'FROM users' not in statement) as statements:
+        profiled = client.get('/api/corporate/companies', headers={**ADMIN, 'X-Profile-SQL': '1'})
+
+    # data version, the accounts, then one KPI count per account
+    assert int(profiled.headers['X-SQL-Query-Count']) == len(statements) == 14
+    assert profiled.headers['X-SQL-N-Plus-One'] == '1'
+    assert float(profiled.headers['X-SQL-Time-Ms']) >= 0
+    assert profiled.headers['Server-Timing'].startswith('db;dur=')
+
+    [endpoint] = request_profiler.report()
+    assert endpoint['endpoint'] == 'GET /api/corporate/companies'
+    assert endpoint['requests'] == 1
+    assert endpoint['max_queries'] == 14
+    assert endpoint['n_plus_one_requests'] == 1
+    [pattern] = endpoint['n_plus_one']
+    assert pattern['max_count'] == 12
+    assert pattern['shape'].startswith('SELECT count(*)') and 'kpis.account_id' in pattern['shape']
+
+    request_profiler.allow_header = True
+    assert 'X-SQL-Query-Count' in client.get('/api/corporate/test', headers={'X-Profile-SQL': 'true'}).headers
+    request_profiler.enabled = True
+    assert 'X-SQL-Query-Count' in client.get('/api/corporate/test').headers
+
+
+def test_debug_perf_route(app):
+    client = app.test_client()
+    request_profiler.enabled = True
+    client.get('/api/corporate/companies', headers=TENANT_A)
+    client.get('/api/corporate/test')
+    request_profiler.enabled = False
+
+    assert client.get('/api/debug/perf').status_code == 401
+    assert client.get('/api/debug/perf', headers=USER).status_code == 403
+
+    report = client.get('/api/debug/perf?sort=max_queries&limit=1', headers=ADMIN).get_json()
+    assert [e['endpoint'] for e in report['endpoints']] == ['GET /api/corporate/companies']
+    assert report['n_plus_one_threshold'] == 5
+    assert client.get('/api/debug/perf?sort=bogus', headers=ADMIN).status_code == 400
+
+    assert client.delete('/api/debug/perf', headers=ADMIN).status_code == 200
+    assert client.get('/api/debug/perf', headers=ADMIN).get_json()['endpoints'] == []
+
+
+def test_no_admins_without_login_manager(make_app):
+    app = make_app(corporate_api, debug_perf_api, admin=True, SQL_PROFILER_ENABLED=False)
+    request_profiler.init_app(app)
+    client = app.test_client()
+
+    response = client.get('/api/corporate/companies', headers={**ADMIN, 'X-Profile-SQL': '1'})
+    assert response.status_code == 200
+    assert 'X-SQL-Query-Count' not in response.headers
+    assert client.get('/api/debug/perf', headers=ADMIN).status_code == 403
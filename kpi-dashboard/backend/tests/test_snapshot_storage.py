@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Tests for delta-encoded account snapshot storage.
+Validates:
+- new snapshots are stored as a full base followed by deltas, with a new base
+  every SNAPSHOT_BASE_INTERVAL snapshots, and read back with their full state
+- the latest/history endpoints return the reconstructed state
+- thinning a year of hourly history keeps the retention tiers, preserves the
+  state of every kept snapshot and cuts the stored state by over 10x
+"""
+
+from datetime import datetime, timedelta
+from unittest import mock
+
+import pytest
+from sqlalchemy import insert
+
+from extensions import db
+from models import Account, AccountSnapshot, AccountNote
+from account_snapshot_api import account_snapshot_api, create_account_snapshot
+from snapshot_storage import (
+    SNAPSHOT_BASE_INTERVAL, hydrate_snapshots, snapshot_state, snapshot_storage_bytes, thin_snapshot_history
+)
+
+NOW = datetime(2025, 6, 30, 12, 0)
+
+
+@pytest.fixture
+def app(make_app):
+    app = make_app(account_snapshot_api)
+    db.session.add(Account(account_id=1, customer_id=1, account_name='Account 1', revenue=1000,
+                           profile_metadata={'assigned_csm': 'Sam', 'products_used': ['Core', 'Analytics']}))
+    db.session.commit()
+    return app
+
+
+def reload_states():
+    db.session.expire_all()
+    snapshots = AccountSnapshot.query.order_by(AccountSnapshot.snapshot_timestamp, AccountSnapshot.snapshot_id).all()
+    return {s.snapshot_id: snapshot_state(s) for s in hydrate_snapshots(snapshots)}, snapshots
+
+
+def test_snapshots_stored_as_base_and_deltas(app):
+    with app.app_context():
+        created = {}
+        for n in range(SNAPSHOT_BASE_INTERVAL + 3):
+            account = db.session.get(Account, 1)
+            account.revenue = 1000 + 100 * (n // 5)
+            if n % 4 == 0:
+                db.session.add(AccountNote(account_id=1, customer_id=1, note_type='call', note_content=f'Call {n}',
+                                           created_by=1, created_at=NOW + timedelta(hours=n)))
+            db.session.commit()
+            snapshot = create_account_snapshot(1, 1, snapshot_type='manual')
+            created[snapshot.snapshot_id] = snapshot_state(snapshot)
+
+        states, snapshots = reload_states()
+        assert states == created
+        assert [s.chain_position for s in snapshots] == \
+            list(range(SNAPSHOT_BASE_INTERVAL)) + [0, 1, 2]
+        base, delta = snapshots[0], snapshots[1]
+        assert base.state_delta is None and base.products_used == ['Core', 'Analytics']
+        assert delta.base_snapshot_id == base.snapshot_id
+        # Only the changed fields are stored on the delta row
+        assert set(delta.state_delta) <= {'revenue_change_from_last', 'revenue_change_percent',
+                                          'health_score_change_from_last', 'recent_csm_note_ids'}
+        stored = db.session.execute(db.text(
+            'SELECT products_used, revenue FROM account_snapshots WHERE snapshot_id = :id'
+        ), {'id': delta.snapshot_id}).one()
+        assert stored.revenue is None and stored.products_used in (None, 'null')
+        assert snapshots[-3].base_snapshot_id is None and snapshots[-1].base_snapshot_id == snapshots[-3].snapshot_id
+
+        client = app.test_client()
+        with mock.patch('account_snapshot_api.get_current_customer_id', return_value=1):
+            db.session.expire_all()
+            latest = client.get('/api/account-snapshots/latest?account_id=1').get_json()['snapshot']
+            assert latest['revenue'] == 1500.0
+            assert latest['products_used'] == ['Core', 'Analytics']
+            assert latest['assigned_csm'] == 'Sam'
+            assert len(latest['recent_csm_note_ids']) == 5
+            history = client.get('/api/account-snapshots/history?account_id=1').get_json()['history']
+            assert {h['revenue'] for h in history} == {1000.0, 1100.0, 1200.0, 1300.0, 1400.0, 1500.0}
+
+
+def hourly_history(days):
+    """A year of hourly full (pre-delta) snapshots whose state drifts slowly"""
+    rows = []
+    start = NOW - timedelta(days=days)
+    for hour in range(days * 24):
+        timestamp = start + timedelta(hours=hour)
+        day = hour // 24
+        rows.append({
+            'account_id': 1, 'customer_id': 1, 'snapshot_timestamp': timestamp,
+            'snapshot_type': 'event_driven', 'snapshot_version': 1,
+            'revenue': 1000 + 10 * (day // 30), 'overall_health_score': 60 + (hour // 6) % 10,
+            'health_score_trend': 'stable', 'account_status': 'active', 'industry': 'Software',
+            'region': 'EMEA', 'assigned_csm': 'Sam', 'products_used': ['Core', 'Analytics', 'Mobile'],
+            'product_count': 3, 'primary_product': 'Core', 'playbooks_running': ['voc-sprint'],
+            'playbooks_running_count': 1, 'playbook_recommendations_active': ['renewal', 'expansion'],
+            'recent_playbook_report_ids': [day // 14, day // 14 + 1], 'total_kpis': 40,
+            'critical_kpis_count': (day // 7) % 5, 'top_critical_kpis': [
+                {'kpi_name': 'Ticket Volume', 'value': '120', 'health_status': 'Critical', 'category': 'Support KPI'}
+            ],
+            'recent_csm_note_ids': list(range(day // 3, day // 3 + 5)), 'snapshot_sequence_number': hour + 1,
+        })
+    return rows
+
+
+def test_retention_thins_and_compacts_history(app):
+    with app.app_context():
+        db.session.execute(insert(AccountSnapshot), hourly_history(365))
+        db.session.add(AccountSnapshot(account_id=1, customer_id=1, snapshot_type='manual', revenue=5,
+                                       snapshot_timestamp=NOW - timedelta(days=200, minutes=30)))
+        db.session.commit()
+        original, _ = reload_states()
+        before = snapshot_storage_bytes(AccountSnapshot.query.all())
+
+        stats = thin_snapshot_history(1, now=NOW)
+        states, snapshots = reload_states()
+
+        timestamps = [s.snapshot_timestamp for s in snapshots]
+        recent = [t for t in timestamps if NOW - t < timedelta(days=7)]
+        daily = [t for t in timestamps if timedelta(days=7) <= NOW - t < timedelta(days=90)]
+        monthly = [t for t in timestamps if NOW - t >= timedelta(days=90)]
+        assert len(recent) == 7 * 24 - 1  # hourly up to an hour before NOW
+        assert len(daily) == len({t.date() for t in daily}) == 84  # partial days at both ends
+        assert len({(t.year, t.month) for t in monthly}) == len(monthly) - 1  # plus the manual snapshot
+        assert any(s.snapshot_type == 'manual' for s in snapshots)
+        assert stats['kept'] == len(snapshots) and stats['deleted'] == 365 * 24 + 1 - len(snapshots)
+
+        # Every kept snapshot reads back with the state it had before thinning
+        assert states == {snapshot_id: original[snapshot_id] for snapshot_id in states}
+        assert max(s.chain_position for s in snapshots) == SNAPSHOT_BASE_INTERVAL - 1
+
+        after = snapshot_storage_bytes(snapshots)
+        assert stats['state_bytes_before'] == before and stats['state_bytes_after'] == after
+        assert before / after > 10
+
+        # Re-running is a no-op
+        assert thin_snapshot_history(1, now=NOW)['reencoded'] == 0
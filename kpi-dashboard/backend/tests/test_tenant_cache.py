@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Tests for the generic per-tenant cache.
+Validates:
+- a loader cache loads once per customer; a compute cache once per (customer, key)
+- invalidation drops one customer or every customer
+- a value computed across an invalidation is returned but not stored
+- a data version bump made elsewhere retires entries, including the None entry,
+  once the app context's memoized versions are cleared
+"""
+
+import pytest
+from sqlalchemy import update
+
+from extensions import db
+from models import Customer
+from tenant_cache import TenantCache
+from tenant_data_version import clear_data_version_memo
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app(customers=(1, 2))
+
+
+def test_loader_and_compute_caches(app):
+    loaded = []
+    cache = TenantCache('loader', loader=lambda customer_id: loaded.append(customer_id) or {'id': customer_id})
+    assert cache.get(1) == {'id': 1}
+    assert cache.get(1) is cache.get(1)
+    assert cache.get(None) == {'id': None}
+    assert loaded == [1, None]
+    assert cache.stats == {'loads': 2, 'hits': 2, 'invalidations': 0}
+
+    results = TenantCache('results')
+    assert results.get(1, '2025-01', lambda: 'january') == 'january'
+    assert results.get(1, '2025-02', lambda: 'february') == 'february'
+    assert results.get(1, '2025-01', lambda: 'recomputed') == 'january'
+
+
+def test_invalidation(app):
+    cache = TenantCache('loader', loader=lambda customer_id: object())
+    first, other = cache.get(1), cache.get(2)
+
+    cache.invalidate(1)
+    assert cache.get(1) is not first
+    assert cache.get(2) is other
+
+    cache.invalidate()
+    assert cache.get(2) is not other
+    assert cache.stats['invalidations'] == 2
+
+
+def test_value_racing_an_invalidation_is_not_stored(app):
+    cache = TenantCache('results')
+
+    def compute():
+        cache.invalidate(1)
+        return 'stale'
+
+    assert cache.get(1, None, compute) == 'stale'
+    assert cache.get(1, None, lambda: 'fresh') == 'fresh'
+
+
+def test_version_bump_from_another_process_retires_entries(app):
+    cache = TenantCache('loader', loader=lambda customer_id: object())
+    first, other, defaults = cache.get(1), cache.get(2), cache.get(None)
+
+    # Another process committed a change for customer 1 and bumped its version
+    db.session.execute(update(Customer).where(Customer.customer_id == 1)
+                       .values(data_version=Customer.data_version + 1))
+    db.session.commit()
+    # This app context keeps the versions it read until a new pass starts
+    assert cache.get(1) is first
+    clear_data_version_memo()
+    assert cache.get(1) is not first
+    assert cache.get(2) is other
+    assert cache.get(None) is not defaults
+    assert cache.stats['invalidations'] == 0
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Tests for the per-tenant data version.
+Validates:
+- read blueprints tag responses with a version ETag and answer If-None-Match with 304
+  after one version read, until a write bumps the tenant's version
+- caches keyed on the version drop results when another process bumps it
+- the rollup, which bumps the version itself when storing trends, is served from cache
+"""
+
+import pytest
+from sqlalchemy import text, update
+
+from extensions import db
+from models import Customer, Account, KPI
+from reference_range_index import invalidate_reference_ranges
+from tenant_data_version import current_data_version
+from tenant_result_cache import invalidate_tenant_results
+from analytics_cube import analytics_cube
+from analytics_api import analytics_api
+from corporate_api import corporate_api, corporate_rollup_cache
+
+TENANT_A = {'X-Customer-ID': '1'}
+
+
+@pytest.fixture
+def app(make_app):
+    app = make_app(analytics_api, corporate_api, customers=(1, 2))
+    for account_id in range(1, 9):
+        db.session.add(Account(account_id=account_id, customer_id=1 if account_id <= 6 else 2,
+                               account_name=f'Account {account_id}', revenue=account_id * 10000,
+                               industry='Tech', region='NA', account_status='active'))
+        db.session.add_all([
+            KPI(account_id=account_id, kpi_parameter='Net Promoter Score (NPS)', category='Support KPI',
+                impact_level='High', data=str(40 + account_id)),
+            KPI(account_id=account_id, kpi_parameter='Feature Adoption Rate', category='Product Usage KPI',
+                impact_level='Medium', data=f'{50 + account_id}%'),
+        ])
+    db.session.commit()
+    invalidate_reference_ranges()
+    analytics_cube.invalidate()
+    yield app
+    invalidate_reference_ranges()
+    invalidate_tenant_results()
+    analytics_cube.invalidate()
+
+
+def test_etag_and_not_modified_until_a_write(app, record_sql):
+    client = app.test_client()
+    first = client.get('/api/analytics/statistics', headers=TENANT_A)
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+    assert first.headers['Cache-Control'] == 'private, no-cache'
+
+    with record_sql() as statements:
+        cached = client.get('/api/analytics/statistics', headers={**TENANT_A, 'If-None-Match': etag})
+    queries = len(statements)
+    assert cached.status_code == 304
+    assert cached.headers['ETag'] == etag
+    assert queries == 1
+
+    # Another tenant's ETag never matches
+    other = client.get('/api/analytics/statistics', headers={'X-Customer-ID': '2', 'If-None-Match': etag})
+    assert other.status_code == 200
+
+    with app.app_context():
+        db.session.get(Account, 1).revenue = 1
+        db.session.commit()
+        invalidate_tenant_results(1)
+        assert current_data_version(1) == 1
+        assert current_data_version(2) == 0
+
+    changed = client.get('/api/analytics/statistics', headers={**TENANT_A, 'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+    assert client.get('/api/analytics/statistics',
+                      headers={**TENANT_A, 'If-None-Match': changed.headers['ETag']}).status_code == 304
+
+
+def test_caches_follow_a_bump_from_another_process(app):
+    client = app.test_client()
+    before = client.get('/api/analytics/revenue/total', headers=TENANT_A).get_json()['result']['total_revenue']
+    loads = analytics_cube.stats['loads']
+
+    # Raw write and bump as another worker would commit them, bypassing this process's caches
+    with app.app_context():
+        db.session.execute(text('UPDATE accounts SET revenue = revenue + 5 WHERE account_id = 2'))
+        db.session.execute(update(Customer).where(Customer.customer_id == 1)
+                           .values(data_version=Customer.data_version + 1))
+        db.session.commit()
+
+    after = client.get('/api/analytics/revenue/total', headers=TENANT_A).get_json()['result']['total_revenue']
+    assert after == before + 5
+    assert analytics_cube.stats['loads'] == loads + 1
+
+
+def test_rollup_is_cached_at_the_version_it_bumped_to(app):
+    client = app.test_client()
+    loads = corporate_rollup_cache.stats['loads']
+
+    first = client.get('/api/corporate/rollup', headers=TENANT_A)
+    assert first.get_json()['storage_info']['health_scores_stored'] > 0
+    with app.app_context():
+        assert current_data_version(1) == 1  # storing the trends bumped it
+
+    # The response was tagged before the bump, so the next request refetches from the cache
+    second = client.get('/api/corporate/rollup', headers={**TENANT_A, 'If-None-Match': first.headers['ETag']})
+    assert second.status_code == 200
+    assert second.get_json() == first.get_json()
+    assert corporate_rollup_cache.stats['loads'] == loads + 1
+
+    third = client.get('/api/corporate/rollup', headers={**TENANT_A, 'If-None-Match': second.headers['ETag']})
+    assert third.status_code == 304
+    with app.app_context():
+        assert current_data_version(1) == 1
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Tests for background upload jobs.
+Validates:
+- /api/upload stores the file and returns 202 with a job id at once; the job
+  parses and writes it and /api/upload/status reports the phases and rows
+- a failed job is reported with its errors and leaves no account or KPIs behind,
+  also when it fails after the account was scored
+- the queue is bounded: a full queue answers 503 and marks the upload failed
+- status is scoped to the tenant
+"""
+
+import io
+import threading
+from unittest import mock
+
+import pytest
+from sqlalchemy import text
+
+from extensions import db
+from models import Account, KPI, KPIUpload, AccountHealthSummary
+from upload_api import upload_api
+from upload_jobs import upload_jobs, set_upload_phase
+from test_excel_ingest import kpi_workbook, workbook_bytes
+
+
+@pytest.fixture
+def app(make_app):
+    yield make_app(upload_api, customers=(1, 2), admin=True,
+                   KPI_BULK_BATCH_SIZE=4, UPLOAD_JOB_WORKERS=1, UPLOAD_JOB_MAX_PENDING=2)
+    upload_jobs.shutdown()
+
+
+def post_upload(client, account_name, raw):
+    with mock.patch('upload_api.get_current_customer_id', return_value=1):
+        return client.post('/api/upload', headers={'X-User-ID': '1'}, data={
+            'account_name': account_name, 'file': (io.BytesIO(raw), f'{account_name}.xlsx')
+        }, content_type='multipart/form-data')
+
+
+def get_status(client, upload_id, customer_id=1):
+    with mock.patch('upload_api.get_current_customer_id', return_value=customer_id):
+        return client.get(f'/api/upload/status/{upload_id}')
+
+
+def test_upload_returns_job_and_reports_progress(app):
+    client = app.test_client()
+    with mock.patch('upload_jobs.set_upload_phase', wraps=set_upload_phase) as set_phase:
+        response = post_upload(client, 'Acme', kpi_workbook())
+        assert response.status_code == 202
+        body = response.get_json()
+        assert body['job_id'] == body['upload_id']
+        assert (body['phase'], body['status_url']) == ('stored', f"/api/upload/status/{body['upload_id']}")
+
+        # The job runs on the pool; wait for it before reading the shared in-memory database
+        upload_jobs.shutdown()
+    phases = [call.args[1] for call in set_phase.call_args_list]
+
+    status = get_status(client, body['upload_id']).get_json()
+    assert (status['phase'], status['done'], status['rows_processed'], status['kpi_count']) == \
+        ('completed', True, 6, 6)
+    assert status['errors'] == []
+    assert phases == ['parsing', 'writing', 'writing', 'scoring', 'indexing', 'completed']
+
+    account = Account.query.filter_by(account_name='Acme').one()
+    upload = db.session.get(KPIUpload, body['upload_id'])
+    assert upload.account_id == account.account_id
+    assert KPI.query.filter_by(account_id=account.account_id, upload_id=upload.upload_id).count() == 6
+
+    assert get_status(client, body['upload_id'], customer_id=2).status_code == 404
+
+
+def test_failed_job_is_reported_and_discarded(app):
+    client = app.test_client()
+    empty = workbook_bytes({'Account Info': [], 'Notes': [['nothing']], 'Rollup': []})
+    body = post_upload(client, 'Empty', empty).get_json()
+    upload_jobs.shutdown()
+
+    status = get_status(client, body['upload_id']).get_json()
+    assert (status['phase'], status['done'], status['rows_processed']) == ('failed', True, 0)
+    assert status['errors'] == ['No valid KPI data found in Excel file']
+    assert status['account_id'] is None
+    assert Account.query.filter_by(account_name='Empty').count() == 0
+    assert KPI.query.count() == 0
+
+
+def test_job_failing_after_scoring_discards_account(app):
+    client = app.test_client()
+    db.session.execute(text('PRAGMA foreign_keys=ON'))
+    try:
+        with mock.patch('upload_jobs.invalidate_tenant_results', side_effect=RuntimeError('cache down')):
+            body = post_upload(client, 'Acme', kpi_workbook()).get_json()
+            upload_jobs.shutdown()
+    finally:
+        db.session.execute(text('PRAGMA foreign_keys=OFF'))
+
+    status = get_status(client, body['upload_id']).get_json()
+    assert (status['phase'], status['errors']) == ('failed', ['Upload failed: cache down'])
+    assert Account.query.count() == AccountHealthSummary.query.count() == KPI.query.count() == 0
+
+
+def test_full_queue_rejects_uploads(app):
+    client = app.test_client()
+    release = threading.Event()
+    with mock.patch('upload_api._process_upload', side_effect=lambda upload, name: release.wait(5)):
+        codes = [post_upload(client, f'Account {n}', kpi_workbook()).status_code for n in range(3)]
+        release.set()
+        upload_jobs.shutdown()
+    assert codes == [202, 202, 503]
+
+    rejected = KPIUpload.query.order_by(KPIUpload.upload_id.desc()).first()
+    assert rejected.phase == 'failed'
+    assert [u.phase for u in KPIUpload.query.order_by(KPIUpload.upload_id)][:2] == ['completed', 'completed']
@@ -6,9 +6,12 @@ Time Series API for retrieving KPI trends and health score history.
 from flask import Blueprint, request, jsonify
 from auth_middleware import get_current_customer_id, get_current_user_id
 from health_score_storage import HealthScoreStorageService
+from tenant_result_cache import invalidate_tenant_results
+from tenant_data_version import enable_conditional_get
 from datetime import datetime
 
 time_series_api = Blueprint('time_series_api', __name__)
+enable_conditional_get(time_series_api)
 
 @time_series_api.route('/api/time-series/kpi-trends', methods=['GET'])
 def get_kpi_trends():
@@ -103,6 +106,8 @@ def generate_historical_data():
             generated_data['kpi_time_series'] += kpi_count
             generated_data['months_generated'].append(f"{year}-{month:02d}")
         
+        invalidate_tenant_results(int(customer_id))
+        
         return jsonify({
             'message': 'Historical data generated successfully',
             'generated_data': generated_data
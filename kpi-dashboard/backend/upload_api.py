@@ -1,22 +1,30 @@
 from flask import Blueprint, request, jsonify
 from auth_middleware import get_current_customer_id, get_current_user_id
 from werkzeug.utils import secure_filename
-import pandas as pd
 from extensions import db
 from models import KPIUpload, KPI, CustomerConfig, Account
-import io
+from excel_ingest import iter_workbook_kpis
+from blob_store import get_blob_store
+from upload_jobs import (
+    upload_jobs, UploadJobFailed, UploadQueueFull, PHASE_COMPLETED, PHASE_FAILED,
+    create_upload_account, write_upload_kpis, finish_upload, set_upload_phase, upload_job_status
+)
 from datetime import datetime
 
 upload_api = Blueprint('upload_api', __name__)
 
 @upload_api.route('/api/upload', methods=['POST'])
 def upload_excel():
-    """Upload and parse a KPI Excel file, create a new versioned upload, and store KPIs."""
+    """
+    Store a KPI Excel file as a new versioned upload and parse it in a background job.
+    Returns 202 with the job id (the upload_id); poll /api/upload/status/<upload_id>.
+    With sync=true the file is processed before responding.
+    """
     file = request.files.get('file')
     customer_id = get_current_customer_id()
     user_id = request.headers.get('X-User-ID')
     account_name = request.form.get('account_name')  # Account name from frontend
-    account_id = None
+    sync = (request.form.get('sync') or request.args.get('sync', '')).lower() == 'true'
     
     if not file:
         return jsonify({'error': 'Missing file'}), 400
@@ -35,119 +43,18 @@ def upload_excel():
         db.session.add(config)
         db.session.commit()
     
-    # Handle account creation/validation
-    if account_name:
-        # Check for duplicate account name
-        existing_account = Account.query.filter_by(
-            account_name=account_name, 
-            customer_id=customer_id
-        ).first()
-        
-        if existing_account:
-            return jsonify({'error': f'Account "{account_name}" already exists for this customer'}), 400
-        
-        # Create new account
-        account = Account(
-            customer_id=customer_id,
-            account_name=account_name,
-            revenue=0,  # Default revenue
-            industry='Unknown',
-            region='Unknown',
-            account_status='active'
-        )
-        db.session.add(account)
-        db.session.flush()  # Get the account_id
-        account_id = account.account_id
-    else:
+    # Validate the account name; the account itself is created by the job
+    if not account_name:
         return jsonify({'error': 'Account name is required'}), 400
+    existing_account = Account.query.filter_by(
+        account_name=account_name, 
+        customer_id=customer_id
+    ).first()
+    if existing_account:
+        return jsonify({'error': f'Account "{account_name}" already exists for this customer'}), 400
 
     filename = secure_filename(file.filename)
-    raw_excel = file.read()
-    file.seek(0)
-
-    # Parse Excel
-    xls = pd.ExcelFile(io.BytesIO(raw_excel))
-    kpi_data = []
-    
-    # Skip first sheet, process middle sheets (KPI tabs), skip last sheet (rollup)
-    kpi_sheets = xls.sheet_names[1:-1]
-    print(f"Processing sheets: {kpi_sheets}")
-    
-    for sheet_name in kpi_sheets:
-        try:
-            print(f"\n--- Processing sheet: {sheet_name} ---")
-            df = pd.read_excel(xls, sheet_name, header=None)
-            print(f"Sheet shape: {df.shape}")
-            print(f"First few rows:")
-            print(df.head())
-            
-            # Find header row
-            header_row_idx = df[df.iloc[:,0] == 'Health Score Component'].index
-            if len(header_row_idx) == 0:
-                print(f"No header row found in {sheet_name}")
-                continue
-            header_row_idx = header_row_idx[0]
-            print(f"Header row found at index: {header_row_idx}")
-            
-            # Get the actual header row and print column names
-            header_row = df.iloc[header_row_idx]
-            print(f"Header row values: {list(header_row)}")
-            
-            df.columns = df.iloc[header_row_idx]
-            df = df.iloc[header_row_idx+1:]
-            df = df.dropna(subset=['Health Score Component'])
-            
-            print(f"Available columns: {list(df.columns)}")
-            print(f"Data rows after processing:")
-            print(df.head())
-            
-            for idx, row in df.iterrows():
-                # Try different possible column names for each field
-                weight_value = row.get('Weight (%)')
-                if weight_value is None:
-                    weight_value = row.get('Weight') or row.get('weight') or row.get('WEIGHT') or row.get('WEIGHT (%)')
-                
-                impact_value = (
-                    row.get('Impact level') or 
-                    row.get('Impact Level') or 
-                    row.get('Impact') or
-                    row.get('impact level') or
-                    row.get('IMPACT LEVEL') or
-                    None
-                )
-                
-                # Convert NaN values to None for JSON compatibility
-                kpi_row = {
-                    'category': sheet_name,
-                    'row_index': str(idx),
-                    'health_score_component': row.get('Health Score Component'),
-                    'weight': weight_value,
-                    'data': row.get('Data'),
-                    'source_review': row.get('Source Review'),
-                    'kpi_parameter': row.get('KPI/Parameter'),
-                    'impact_level': impact_value,
-                    'measurement_frequency': row.get('Measurement Frequency'),
-                }
-                
-                # Convert any NaN values to None, but preserve weight values
-                for key, value in kpi_row.items():
-                    if pd.isna(value):
-                        kpi_row[key] = None
-                    elif key == 'weight' and value is not None:
-                        # Convert weight to string to preserve the value
-                        kpi_row[key] = str(value)
-                
-                print(f"KPI row: {kpi_row}")
-                kpi_data.append(kpi_row)
-                
-        except Exception as e:
-            print(f"Error processing sheet {sheet_name}: {str(e)}")
-            continue
-
-    print(f"Total KPIs parsed: {len(kpi_data)}")
-    
-    if not kpi_data:
-        return jsonify({'error': 'No valid KPI data found in Excel file'}), 400
+    content_sha256 = get_blob_store().put(file.read())
 
     # Create new upload record
     latest_upload = KPIUpload.query.filter_by(customer_id=customer_id).order_by(KPIUpload.version.desc()).first()
@@ -158,41 +65,85 @@ def upload_excel():
         user_id=user_id,
         version=new_version,
         original_filename=filename,
-        raw_excel=raw_excel,
-        account_id=account_id  # Always use account_id now
+        content_sha256=content_sha256,
+        phase='stored'
     )
-    
     db.session.add(upload)
-    db.session.flush()  # Get the upload_id
+    db.session.commit()
+    upload_id = upload.upload_id
+
+    if sync:
+        try:
+            result = upload_jobs.submit(upload_id, _process_upload, account_name, wait=True)
+        except UploadJobFailed as e:
+            return jsonify({'error': str(e), 'upload_id': upload_id}), 400
+        except Exception as e:
+            return jsonify({'error': f'Upload failed: {str(e)}', 'upload_id': upload_id}), 500
+        return jsonify(dict(result, account_name=account_name))
+
+    try:
+        upload_jobs.submit(upload_id, _process_upload, account_name)
+    except UploadQueueFull:
+        upload = db.session.get(KPIUpload, upload_id)
+        set_upload_phase(upload, PHASE_FAILED, errors=['Too many uploads are being processed, please retry'])
+        db.session.commit()
+        return jsonify({'error': 'Too many uploads are being processed, please retry shortly',
+                        'upload_id': upload_id}), 503
+
+    return jsonify({
+        'job_id': upload_id,
+        'upload_id': upload_id,
+        'version': new_version,
+        'filename': filename,
+        'phase': 'stored',
+        'status_url': f'/api/upload/status/{upload_id}',
+        'account_name': account_name
+    }), 202
+
+
+def _process_upload(upload, account_name):
+    """Upload job: create the account, stream the KPI sheets into batched writes, then score"""
+    account_id = create_upload_account(upload, account_name)
+
+    # Stream KPIs from the KPI sheets (skips the first and last sheet) into batched inserts
+    errors = []
+    kpi_write = write_upload_kpis(upload, (
+        dict(kpi_row._asdict(), upload_id=upload.upload_id, account_id=account_id)
+        for kpi_row in iter_workbook_kpis(get_blob_store().read(upload.content_sha256), errors=errors)
+    ), errors)
+    kpi_count = kpi_write['rows']
+    print(f"Total KPIs parsed: {kpi_count} ({kpi_write['rows_per_second']} rows/sec, "
+          f"{kpi_write['batch_count']} batches)")
     
-    # Store KPIs
-    for kpi_row in kpi_data:
-        kpi = KPI(
-            upload_id=upload.upload_id,
-            account_id=account_id,  # Always use account_id now
-            category=kpi_row['category'],
-            row_index=kpi_row['row_index'],
-            health_score_component=kpi_row['health_score_component'],
-            weight=kpi_row['weight'],
-            data=kpi_row['data'],
-            source_review=kpi_row['source_review'],
-            kpi_parameter=kpi_row['kpi_parameter'],
-            impact_level=kpi_row['impact_level'],
-            measurement_frequency=kpi_row['measurement_frequency']
-        )
-        db.session.add(kpi)
+    if not kpi_count:
+        raise UploadJobFailed('No valid KPI data found in Excel file')
     
-    db.session.commit()
+    finish_upload(upload, kpi_count)
     
-    return jsonify({
+    return {
         'upload_id': upload.upload_id,
         'version': upload.version,
-        'filename': filename,
-        'kpi_count': len(kpi_data),
+        'filename': upload.original_filename,
+        'kpi_count': kpi_count,
+        'rows_per_second': kpi_write['rows_per_second'],
+        'batch_count': kpi_write['batch_count'],
         'upload_mode': 'account_rollup',
-        'account_id': account_id,
-        'account_name': account_name
-    })
+        'account_id': account_id
+    }
+
+@upload_api.route('/api/upload/status/<int:upload_id>', methods=['GET'])
+def get_upload_status(upload_id):
+    """Phase, rows processed and errors of an upload's background job."""
+    customer_id = get_current_customer_id()
+    if not customer_id:
+        return jsonify({'error': 'Authentication required (handled by middleware)'}), 400
+    upload = KPIUpload.query.filter_by(upload_id=upload_id, customer_id=customer_id).first()
+    if not upload:
+        return jsonify({'error': 'Upload not found'}), 404
+    status = upload_job_status(upload)
+    if upload.phase == PHASE_COMPLETED:
+        status['kpi_count'] = KPI.query.filter_by(upload_id=upload_id).count()
+    return jsonify(status)
 
 @upload_api.route('/api/uploads', methods=['GET'])
 def get_upload_history():
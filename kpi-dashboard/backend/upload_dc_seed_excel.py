@@ -4,7 +4,6 @@ Upload Data Center seed data from Excel file to PostgreSQL database
 """
 import sys
 import os
-import pandas as pd
 from datetime import datetime
 from pathlib import Path
 from dotenv import load_dotenv
@@ -17,6 +16,7 @@ from extensions import db
 from models import Customer, User, Account, KPI, KPIUpload
 from werkzeug.security import generate_password_hash
 from kpi_definitions_dc import DC_KPIS
+from excel_ingest import iter_sheet_records
 
 # Load environment variables
 basedir = os.path.abspath(os.path.dirname(__file__))
@@ -174,9 +174,21 @@ def upload_from_excel(excel_file_path):
         
         print("\n[2/4] Reading Excel file...")
         try:
-            df_tenants = pd.read_excel(excel_file_path, sheet_name='Tenants')
-            df_kpis = pd.read_excel(excel_file_path, sheet_name='KPI_History')
-            print(f"✅ Read {len(df_tenants)} tenants and {len(df_kpis)} KPI records")
+            # Group KPIs by tenant and month
+            kpis_by_tenant_month = {}
+            kpi_records = 0
+            for row in iter_sheet_records(excel_file_path, 'KPI_History'):
+                tenant_id = str(row['tenant_id'])
+                month = str(row['month'])
+                key = (tenant_id, month)
+                if key not in kpis_by_tenant_month:
+                    kpis_by_tenant_month[key] = []
+                kpis_by_tenant_month[key].append({
+                    'kpi_id': row['kpi_id'],
+                    'value': float(row['value'])
+                })
+                kpi_records += 1
+            print(f"✅ Read {kpi_records} KPI records")
         except Exception as e:
             print(f"❌ Error reading Excel file: {e}")
             return
@@ -185,23 +197,10 @@ def upload_from_excel(excel_file_path):
         accounts_created = 0
         kpis_created = 0
         
-        # Group KPIs by tenant and month
-        kpis_by_tenant_month = {}
-        for _, row in df_kpis.iterrows():
-            tenant_id = str(row['tenant_id'])
-            month = str(row['month'])
-            key = (tenant_id, month)
-            if key not in kpis_by_tenant_month:
-                kpis_by_tenant_month[key] = []
-            kpis_by_tenant_month[key].append({
-                'kpi_id': row['kpi_id'],
-                'value': float(row['value'])
-            })
-        
         # Process each tenant
         tenant_account_map = {}  # Map tenant_id to account_id
         
-        for _, tenant_row in df_tenants.iterrows():
+        for tenant_row in iter_sheet_records(excel_file_path, 'Tenants'):
             tenant_id = str(tenant_row['tenant_id'])
             tenant_name = str(tenant_row['tenant_name'])
             
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Upload Jobs
+Parses and writes uploaded KPI files on a bounded background worker pool.
+
+An upload endpoint validates the request, stores the file as a KPIUpload in
+phase 'stored' and submits a job; the response carries the upload_id as the
+job id. The job moves the upload through its phases, committing each one so
+any worker process can report it (GET /api/upload/status/<upload_id>):
+
+    stored -> parsing -> writing -> scoring -> indexing -> completed
+                                                     (or failed at any point)
+
+KPIs are committed batch by batch together with rows_processed. A job that
+fails has its KPIs and the account it created removed, and the error is kept in
+processing_errors. Jobs run in this process: an upload whose process stops
+mid-job stays in its last phase (see phase_updated_at).
+
+UPLOAD_JOB_WORKERS (default 2) jobs run at a time and at most
+UPLOAD_JOB_MAX_PENDING (default 20) wait; submit() raises UploadQueueFull beyond.
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional
+
+from flask import current_app
+
+from extensions import db
+from models import Account, AccountHealthPartial, AccountHealthSummary, KPI, KPIUpload
+from kpi_bulk_writer import write_kpis
+from account_health_summary import refresh_account_health_summaries
+from tenant_result_cache import invalidate_tenant_results
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_PHASES = ('stored', 'parsing', 'writing', 'scoring', 'indexing')
+PHASE_COMPLETED = 'completed'
+PHASE_FAILED = 'failed'
+
+DEFAULT_WORKERS = 2
+DEFAULT_MAX_PENDING = 20
+
+
+class UploadQueueFull(Exception):
+    """Too many upload jobs are waiting; the client should retry later"""
+
+
+class UploadJobFailed(Exception):
+    """An upload that can't be processed (no KPIs, duplicate account, ...); the message is reported"""
+
+
+# ==================== JOB STEPS ====================
+
+def set_upload_phase(upload: KPIUpload, phase: str, rows_processed: Optional[int] = None,
+                     errors: Optional[List[str]] = None):
+    """Move an upload to a phase (not committed); errors replace processing_errors when given"""
+    upload.phase = phase
+    upload.phase_updated_at = datetime.utcnow()
+    if rows_processed is not None:
+        upload.rows_processed = rows_processed
+    if errors is not None:
+        upload.processing_errors = list(errors)
+
+
+def create_upload_account(upload: KPIUpload, account_name: str) -> int:
+    """Create the upload's new account and commit it with the 'parsing' phase; returns the account_id"""
+    if Account.query.filter_by(customer_id=upload.customer_id, account_name=account_name).first():
+        raise UploadJobFailed(f'Account "{account_name}" already exists for this customer')
+    account = Account(
+        customer_id=upload.customer_id,
+        account_name=account_name,
+        revenue=0,
+        industry='Unknown',
+        region='Unknown',
+        account_status='active'
+    )
+    db.session.add(account)
+    db.session.flush()
+    upload.account_id = account.account_id
+    set_upload_phase(upload, 'parsing')
+    db.session.commit()
+    return account.account_id
+
+
+def write_upload_kpis(upload: KPIUpload, rows: Iterable[Dict], errors: Optional[List[str]] = None) -> Dict:
+    """
+    Write the upload's KPI rows, committing each batch with the 'writing' phase and
+    rows_processed (and the parse errors so far). Returns write_kpis' stats.
+    """
+    def on_batch(written):
+        set_upload_phase(upload, 'writing', rows_processed=written, errors=errors)
+
+    return write_kpis(rows, commit_batches=True, on_batch=on_batch)
+
+
+def finish_upload(upload: KPIUpload, kpi_count: int, index: Optional[Callable[[], None]] = None):
+    """Score the upload's account and refresh cached results ('scoring', 'indexing')"""
+    set_upload_phase(upload, 'scoring', rows_processed=kpi_count)
+    db.session.commit()
+    refresh_account_health_summaries(upload.customer_id, [upload.account_id] if upload.account_id else None)
+
+    set_upload_phase(upload, 'indexing')
+    db.session.commit()
+    invalidate_tenant_results(upload.customer_id)
+    if index:
+        index()
+
+
+def discard_upload_data(upload: KPIUpload):
+    """Remove what a failed job wrote: the upload's KPIs, and its account and health rows if nothing else uses it"""
+    KPI.query.filter_by(upload_id=upload.upload_id).delete(synchronize_session=False)
+    account_id = upload.account_id
+    if account_id is not None:
+        upload.account_id = None
+        db.session.flush()
+        in_use = KPIUpload.query.filter_by(account_id=account_id).first() or \
+            KPI.query.filter_by(account_id=account_id).first()
+        if not in_use:
+            # finish_upload may already have scored the account
+            for model in (AccountHealthSummary, AccountHealthPartial):
+                model.query.filter_by(account_id=account_id).delete(synchronize_session=False)
+            Account.query.filter_by(account_id=account_id).delete(synchronize_session=False)
+
+
+def upload_job_status(upload: KPIUpload) -> Dict:
+    """Progress of an upload's job, as reported by the status endpoints"""
+    done = upload.phase in (PHASE_COMPLETED, PHASE_FAILED)
+    return {
+        'job_id': upload.upload_id,
+        'upload_id': upload.upload_id,
+        'version': upload.version,
+        'filename': upload.original_filename,
+        'account_id': upload.account_id,
+        'uploaded_at': upload.uploaded_at.isoformat() if upload.uploaded_at else None,
+        'phase': upload.phase,
+        'done': done,
+        'rows_processed': upload.rows_processed,
+        'errors': upload.processing_errors or [],
+        'phase_updated_at': upload.phase_updated_at.isoformat() if upload.phase_updated_at else None,
+    }
+
+
+# ==================== WORKER POOL ====================
+
+class UploadJobRunner:
+    """Runs upload jobs on a bounded thread pool, each in its own app context and session"""
+
+    def __init__(self):
+        self._executor = None
+        self._workers = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def submit(self, upload_id: int, job: Callable, *args, wait: bool = False):
+        """
+        Run job(upload, *args) for a stored upload. Returns a Future, or with wait
+        the job's result (raising UploadJobFailed or its error once the upload is
+        marked failed).
+        """
+        app = current_app._get_current_object()
+        if wait:
+            return self._run(app, upload_id, job, args)
+
+        with self._lock:
+            max_pending = int(app.config.get('UPLOAD_JOB_MAX_PENDING', DEFAULT_MAX_PENDING))
+            if self._pending >= max_pending:
+                raise UploadQueueFull(f'{self._pending} upload jobs are already queued')
+            if self._executor is None:
+                self._workers = int(app.config.get('UPLOAD_JOB_WORKERS', DEFAULT_WORKERS))
+                self._executor = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix='upload-job')
+            self._pending += 1
+        future = self._executor.submit(self._run, app, upload_id, job, args)
+        future.add_done_callback(self._job_done)
+        return future
+
+    def _job_done(self, future):
+        with self._lock:
+            self._pending -= 1
+
+    def _run(self, app, upload_id: int, job: Callable, args):
+        with app.app_context():
+            upload = db.session.get(KPIUpload, upload_id)
+            try:
+                result = job(upload, *args)
+                set_upload_phase(upload, PHASE_COMPLETED)
+                db.session.commit()
+                return result
+            except Exception as e:
+                db.session.rollback()
+                if not isinstance(e, UploadJobFailed):
+                    logger.exception(f"Upload job {upload_id} failed")
+                errors = list(upload.processing_errors or [])
+                errors.append(str(e) if isinstance(e, UploadJobFailed) else f'Upload failed: {str(e)}')
+                try:
+                    discard_upload_data(upload)
+                    set_upload_phase(upload, PHASE_FAILED, rows_processed=0, errors=errors)
+                    db.session.commit()
+                except Exception:
+                    db.session.rollback()
+                    logger.exception(f"Could not mark upload {upload_id} failed")
+                raise
+
+    def shutdown(self, wait: bool = True):
+        """Stop the pool (waiting for running jobs); the next submit starts a new one"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=wait)
+
+
+upload_jobs = UploadJobRunner()
@@ -0,0 +1,43 @@
+"""add account health partials for incremental recomputation
+
+Revision ID: j3e4f5g6h7i8
+Revises: i2d3e4f5g6h7
+Create Date: 2025-11-13 09:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'j3e4f5g6h7i8'
+down_revision = 'i2d3e4f5g6h7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Per-account category partial sums, seeded by the health score rollup
+    op.create_table('account_health_partials',
+        sa.Column('partial_id', sa.Integer(), nullable=False),
+        sa.Column('account_id', sa.Integer(), nullable=False),
+        sa.Column('customer_id', sa.Integer(), nullable=False),
+        sa.Column('category', sa.String(), nullable=False),
+        sa.Column('total_score', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('total_units', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('valid_kpi_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(['account_id'], ['accounts.account_id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['customer_id'], ['customers.customer_id'], ),
+        sa.PrimaryKeyConstraint('partial_id'),
+        sa.UniqueConstraint('account_id', 'category', name='unique_account_category_partial')
+    )
+
+    op.create_index('ix_account_health_partials_account_id', 'account_health_partials', ['account_id'], unique=False)
+    op.create_index('ix_account_health_partials_customer_id', 'account_health_partials', ['customer_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_account_health_partials_customer_id', table_name='account_health_partials')
+    op.drop_index('ix_account_health_partials_account_id', table_name='account_health_partials')
+    op.drop_table('account_health_partials')
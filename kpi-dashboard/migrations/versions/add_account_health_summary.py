@@ -0,0 +1,45 @@
+"""add account health summary read model
+
+Revision ID: k4f5g6h7i8j9
+Revises: j3e4f5g6h7i8
+Create Date: 2025-11-14 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'k4f5g6h7i8j9'
+down_revision = 'j3e4f5g6h7i8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # One row per account, read by GET /api/accounts (rows are filled on first read)
+    op.create_table('account_health_summary',
+        sa.Column('account_id', sa.Integer(), nullable=False),
+        sa.Column('customer_id', sa.Integer(), nullable=False),
+        sa.Column('health_score', sa.Float(), nullable=True),
+        sa.Column('health_source', sa.String(length=20), nullable=True),
+        sa.Column('trend_month', sa.Integer(), nullable=True),
+        sa.Column('trend_year', sa.Integer(), nullable=True),
+        sa.Column('products_used', sa.JSON(), nullable=True),
+        sa.Column('total_kpis', sa.Integer(), nullable=True),
+        sa.Column('valid_kpis', sa.Integer(), nullable=True),
+        sa.Column('refreshed_at', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(['account_id'], ['accounts.account_id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['customer_id'], ['customers.customer_id'], ),
+        sa.PrimaryKeyConstraint('account_id')
+    )
+
+    op.create_index('ix_account_health_summary_customer_id', 'account_health_summary', ['customer_id'], unique=False)
+    op.create_index('idx_account_health_summary_customer_account', 'account_health_summary',
+                    ['customer_id', 'account_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('idx_account_health_summary_customer_account', table_name='account_health_summary')
+    op.drop_index('ix_account_health_summary_customer_id', table_name='account_health_summary')
+    op.drop_table('account_health_summary')
@@ -0,0 +1,33 @@
+"""add data version counter to customers
+
+Revision ID: m6h7i8j9k0l1
+Revises: l5g6h7i8j9k0
+Create Date: 2025-11-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'm6h7i8j9k0l1'
+down_revision = 'l5g6h7i8j9k0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Per-customer data version, bumped after every committed data change (ETags, cache keys)"""
+
+    print("Adding data_version column to customers...")
+
+    op.add_column('customers', sa.Column('data_version', sa.Integer(), nullable=False, server_default='0'))
+
+    print("✅ data_version column added")
+
+
+def downgrade():
+    """Remove the data_version column"""
+    op.drop_column('customers', 'data_version')
+
+    print("⚠️  Customer data_version column removed")
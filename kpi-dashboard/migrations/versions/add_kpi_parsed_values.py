@@ -0,0 +1,58 @@
+"""add parsed numeric value columns to kpis
+
+Revision ID: i2d3e4f5g6h7
+Revises: h1c2d3e4f5g6
+Create Date: 2025-11-12 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'i2d3e4f5g6h7'
+down_revision = 'h1c2d3e4f5g6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Store KPI.data parsed at write time (run backfill_kpi_parsed_values.py afterwards)"""
+
+    print("Adding parsed value columns to kpis...")
+
+    op.add_column('kpis', sa.Column('value_numeric', sa.Float(), nullable=True))
+    op.add_column('kpis', sa.Column('value_unit', sa.String(length=20), nullable=True))
+    op.add_column('kpis', sa.Column('value_parse_status', sa.String(length=20), nullable=True))
+
+    try:
+        op.create_index('ix_kpis_value_numeric', 'kpis', ['value_numeric'])
+        print("  ✅ ix_kpis_value_numeric")
+    except:
+        print("  ⏭  ix_kpis_value_numeric already exists")
+
+    try:
+        op.create_index('ix_kpis_value_parse_status', 'kpis', ['value_parse_status'])
+        print("  ✅ ix_kpis_value_parse_status")
+    except:
+        print("  ⏭  ix_kpis_value_parse_status already exists")
+
+    try:
+        op.create_index('idx_kpi_parameter_value', 'kpis', ['kpi_parameter', 'value_numeric'])
+        print("  ✅ idx_kpi_parameter_value")
+    except:
+        print("  ⏭  idx_kpi_parameter_value already exists")
+
+    print("✅ Parsed value columns added - run backfill_kpi_parsed_values.py to populate existing rows")
+
+
+def downgrade():
+    """Remove parsed value columns"""
+    op.drop_index('idx_kpi_parameter_value', 'kpis')
+    op.drop_index('ix_kpis_value_parse_status', 'kpis')
+    op.drop_index('ix_kpis_value_numeric', 'kpis')
+    op.drop_column('kpis', 'value_parse_status')
+    op.drop_column('kpis', 'value_unit')
+    op.drop_column('kpis', 'value_numeric')
+
+    print("⚠️  Parsed value columns removed")
@@ -0,0 +1,45 @@
+"""add delta encoding columns to account snapshots
+
+Revision ID: n7i8j9k0l1m2
+Revises: m6h7i8j9k0l1
+Create Date: 2025-11-25 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'n7i8j9k0l1m2'
+down_revision = 'm6h7i8j9k0l1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Snapshot chains: full base rows followed by rows holding only the changed state"""
+
+    print("Adding delta encoding columns to account_snapshots...")
+
+    op.add_column('account_snapshots', sa.Column('base_snapshot_id', sa.Integer(), nullable=True))
+    op.add_column('account_snapshots', sa.Column('chain_position', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('account_snapshots', sa.Column('state_delta', sa.JSON(), nullable=True))
+    op.create_foreign_key(
+        'fk_account_snapshots_base_snapshot_id', 'account_snapshots', 'account_snapshots',
+        ['base_snapshot_id'], ['snapshot_id']
+    )
+    op.create_index('ix_account_snapshots_base_snapshot_id', 'account_snapshots', ['base_snapshot_id'])
+
+    # Existing rows keep their full state and become one-row chains
+    print("✅ Delta encoding columns added (run snapshot_storage.py to compact existing history)")
+
+
+def downgrade():
+    """Remove the delta encoding columns (rehydrate or thin history first: delta rows lose their state)"""
+    op.drop_index('ix_account_snapshots_base_snapshot_id', table_name='account_snapshots')
+    op.drop_constraint('fk_account_snapshots_base_snapshot_id', 'account_snapshots', type_='foreignkey')
+    op.drop_column('account_snapshots', 'state_delta')
+    op.drop_column('account_snapshots', 'chain_position')
+    op.drop_column('account_snapshots', 'base_snapshot_id')
+
+    print("⚠️  Account snapshot delta encoding columns removed")
@@ -0,0 +1,35 @@
+"""add content hash to kpi_uploads
+
+Revision ID: p9k0l1m2n3o4
+Revises: o8j9k0l1m2n3
+Create Date: 2025-12-02 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'p9k0l1m2n3o4'
+down_revision = 'o8j9k0l1m2n3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """The bulk loader skips files whose content an upload already holds"""
+
+    print("Adding content_sha256 to kpi_uploads...")
+
+    op.add_column('kpi_uploads', sa.Column('content_sha256', sa.String(length=64), nullable=True))
+    op.create_index('ix_kpi_uploads_content_sha256', 'kpi_uploads', ['content_sha256'])
+
+    print("✅ content_sha256 added to kpi_uploads")
+
+
+def downgrade():
+    """Remove the upload content hash"""
+    op.drop_index('ix_kpi_uploads_content_sha256', table_name='kpi_uploads')
+    op.drop_column('kpi_uploads', 'content_sha256')
+
+    print("⚠️  content_sha256 removed from kpi_uploads")
@@ -0,0 +1,42 @@
+"""add background processing progress columns to kpi_uploads
+
+Revision ID: o8j9k0l1m2n3
+Revises: n7i8j9k0l1m2
+Create Date: 2025-11-28 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'o8j9k0l1m2n3'
+down_revision = 'n7i8j9k0l1m2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Uploads are parsed and written by background jobs that report their phase and progress here"""
+
+    print("Adding upload job progress columns to kpi_uploads...")
+
+    op.add_column('kpi_uploads', sa.Column('phase', sa.String(length=20), nullable=False, server_default='completed'))
+    op.add_column('kpi_uploads', sa.Column('rows_processed', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('kpi_uploads', sa.Column('processing_errors', sa.JSON(), nullable=True))
+    op.add_column('kpi_uploads', sa.Column('phase_updated_at', sa.DateTime(), nullable=True))
+    op.create_index('ix_kpi_uploads_phase', 'kpi_uploads', ['phase'])
+
+    # Existing uploads were processed in the request and are complete
+    print("✅ Upload job progress columns added")
+
+
+def downgrade():
+    """Remove the upload job progress columns"""
+    op.drop_index('ix_kpi_uploads_phase', table_name='kpi_uploads')
+    op.drop_column('kpi_uploads', 'phase_updated_at')
+    op.drop_column('kpi_uploads', 'processing_errors')
+    op.drop_column('kpi_uploads', 'rows_processed')
+    op.drop_column('kpi_uploads', 'phase')
+
+    print("⚠️  Upload job progress columns removed")
@@ -0,0 +1,56 @@
+"""add reporting period column to kpi_uploads
+
+Revision ID: l5g6h7i8j9k0
+Revises: k4f5g6h7i8j9
+Create Date: 2025-11-16 10:00:00.000000
+
+"""
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'l5g6h7i8j9k0'
+down_revision = 'k4f5g6h7i8j9'
+branch_labels = None
+depends_on = None
+
+# Same pattern as models.UPLOAD_PERIOD_PATTERN
+UPLOAD_PERIOD_PATTERN = re.compile(r'Month[_\s](\d+)', re.IGNORECASE)
+
+
+def upgrade():
+    """Store the reporting period ('..._Month_3.csv' -> 3) so DC health queries filter in SQL"""
+
+    print("Adding period column to kpi_uploads...")
+
+    op.add_column('kpi_uploads', sa.Column('period', sa.Integer(), nullable=True))
+
+    try:
+        op.create_index('idx_upload_customer_period', 'kpi_uploads', ['customer_id', 'period'])
+        print("  ✅ idx_upload_customer_period")
+    except:
+        print("  ⏭  idx_upload_customer_period already exists")
+
+    # Backfill from the file names of existing uploads
+    conn = op.get_bind()
+    uploads = sa.table('kpi_uploads', sa.column('upload_id', sa.Integer), sa.column('original_filename', sa.String),
+                       sa.column('period', sa.Integer))
+    filled = 0
+    for upload_id, filename in conn.execute(sa.select(uploads.c.upload_id, uploads.c.original_filename)):
+        match = UPLOAD_PERIOD_PATTERN.search(filename or '')
+        if match:
+            conn.execute(uploads.update().where(uploads.c.upload_id == upload_id).values(period=int(match.group(1))))
+            filled += 1
+
+    print(f"✅ Period column added - {filled} uploads backfilled")
+
+
+def downgrade():
+    """Remove the period column"""
+    op.drop_index('idx_upload_customer_period', 'kpi_uploads')
+    op.drop_column('kpi_uploads', 'period')
+
+    print("⚠️  Upload period column removed")
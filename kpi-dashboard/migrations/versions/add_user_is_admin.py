@@ -0,0 +1,33 @@
+"""add users.is_admin for admin-only tools
+
+Revision ID: s2n3o4p5q6r7
+Revises: r1m2n3o4p5q6
+Create Date: 2025-12-09 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 's2n3o4p5q6r7'
+down_revision = 'r1m2n3o4p5q6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Admins (e.g. for /api/debug/perf and SQL profiling by header) are granted by setting the flag"""
+
+    print("Adding is_admin to users...")
+
+    op.add_column('users', sa.Column('is_admin', sa.Boolean(), nullable=False, server_default=sa.false()))
+
+    print("✅ is_admin added to users (grant with: UPDATE users SET is_admin = true WHERE email = '...')")
+
+
+def downgrade():
+    """Remove users.is_admin"""
+    op.drop_column('users', 'is_admin')
+
+    print("⚠️  is_admin removed from users")
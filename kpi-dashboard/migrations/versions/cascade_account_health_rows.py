@@ -0,0 +1,42 @@
+"""delete account health summaries and partials with their account
+
+Revision ID: r1m2n3o4p5q6
+Revises: q0l1m2n3o4p5
+Create Date: 2025-12-08 10:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'r1m2n3o4p5q6'
+down_revision = 'q0l1m2n3o4p5'
+branch_labels = None
+depends_on = None
+
+TABLES = ('account_health_summary', 'account_health_partials')
+
+
+def upgrade():
+    """Bulk account deletes (cleanup, clear data, rehydration) must not trip over the derived rows"""
+    if op.get_bind().dialect.name == 'sqlite':
+        # SQLite can't alter constraints; tables created from add_account_health_* already cascade
+        return
+
+    print("Recreating account foreign keys of the account health tables with ON DELETE CASCADE...")
+    for table in TABLES:
+        op.drop_constraint(f'{table}_account_id_fkey', table, type_='foreignkey')
+        op.create_foreign_key(f'{table}_account_id_fkey', table, 'accounts',
+                              ['account_id'], ['account_id'], ondelete='CASCADE')
+    print("✅ Account health rows are deleted with their account")
+
+
+def downgrade():
+    """Restore the plain account foreign keys"""
+    if op.get_bind().dialect.name == 'sqlite':
+        return
+
+    for table in TABLES:
+        op.drop_constraint(f'{table}_account_id_fkey', table, type_='foreignkey')
+        op.create_foreign_key(f'{table}_account_id_fkey', table, 'accounts', ['account_id'], ['account_id'])
+    print("⚠️  Account health foreign keys no longer cascade")
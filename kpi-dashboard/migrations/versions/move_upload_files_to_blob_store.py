@@ -0,0 +1,74 @@
+"""move kpi_uploads.raw_excel into the content-addressed blob store
+
+Revision ID: q0l1m2n3o4p5
+Revises: p9k0l1m2n3o4
+Create Date: 2025-12-05 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'q0l1m2n3o4p5'
+down_revision = 'p9k0l1m2n3o4'
+branch_labels = None
+depends_on = None
+
+kpi_uploads = sa.table(
+    'kpi_uploads',
+    sa.column('upload_id', sa.Integer),
+    sa.column('raw_excel', sa.LargeBinary),
+    sa.column('content_sha256', sa.String),
+)
+
+
+def upgrade():
+    """Original files are kept on disk by SHA-256 (BLOB_STORE_DIR); uploads only reference them"""
+    # Same store the app serves from: a relative BLOB_STORE_DIR is resolved against the backend
+    # directory, not the directory the migration runs from
+    from blob_store import get_blob_store
+
+    print("Moving upload files into the blob store...")
+
+    bind = op.get_bind()
+    store = get_blob_store()
+    upload_ids = [upload_id for (upload_id,) in bind.execute(
+        sa.select(kpi_uploads.c.upload_id).where(kpi_uploads.c.raw_excel.isnot(None))
+    )]
+    # One file at a time so memory stays flat on large tables
+    for upload_id in upload_ids:
+        raw_excel = bind.execute(
+            sa.select(kpi_uploads.c.raw_excel).where(kpi_uploads.c.upload_id == upload_id)
+        ).scalar()
+        bind.execute(
+            kpi_uploads.update().where(kpi_uploads.c.upload_id == upload_id)
+            .values(content_sha256=store.put(raw_excel))
+        )
+
+    op.drop_column('kpi_uploads', 'raw_excel')
+
+    print(f"✅ Moved {len(upload_ids)} upload files to {store.root}")
+
+
+def downgrade():
+    """Copy the stored files back into kpi_uploads.raw_excel"""
+    from blob_store import get_blob_store
+
+    op.add_column('kpi_uploads', sa.Column('raw_excel', sa.LargeBinary(), nullable=True))
+
+    bind = op.get_bind()
+    store = get_blob_store()
+    restored = 0
+    for upload_id, content_sha256 in bind.execute(
+        sa.select(kpi_uploads.c.upload_id, kpi_uploads.c.content_sha256)
+        .where(kpi_uploads.c.content_sha256.isnot(None))
+    ).fetchall():
+        if store.exists(content_sha256):
+            bind.execute(
+                kpi_uploads.update().where(kpi_uploads.c.upload_id == upload_id)
+                .values(raw_excel=store.read(content_sha256))
+            )
+            restored += 1
+
+    print(f"⚠️  Restored {restored} upload files into kpi_uploads.raw_excel (the blob store is left in place)")
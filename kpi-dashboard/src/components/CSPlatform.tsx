@@ -582,7 +582,28 @@ const CSPlatform = () => {
       });
       
       if (response.ok) {
-        const result = await response.json();
+        const job = await response.json();
+        
+        // The file is parsed in a background job: poll its status until it finishes
+        let result = job;
+        while (!result.done) {
+          setError(`Processing ${job.filename}: ${result.phase || 'stored'} (${result.rows_processed || 0} rows)`);
+          await new Promise(resolve => setTimeout(resolve, 1000));
+          const statusResponse = await fetch(`/api/upload/status/${job.upload_id}`, {
+            headers: {
+              'X-Customer-ID': session.customer_id.toString(),
+              'X-User-ID': session.user_id.toString(),
+            },
+          });
+          if (!statusResponse.ok) {
+            throw new Error(`Could not get upload status: ${statusResponse.statusText}`);
+          }
+          result = await statusResponse.json();
+        }
+        if (result.phase === 'failed') {
+          setError(`Upload failed: ${(result.errors || []).join('; ') || 'Unknown error'}`);
+          return;
+        }
         console.log('Upload successful:', result);
         
         // Show success message